@@ -1,13 +1,50 @@
 import json
 import asyncio
-from typing import List, Dict, Any, Callable, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import List, Dict, Any, Callable, Iterator, Optional, Set
 from .core.base import BaseLLMClient
+from .core.rate_limiter import get_rate_limiter_for_client
 from .tools.registry import ToolRegistry
 from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
 
 logger = get_logger(__name__)
 
 
+@dataclass
+class ExecutorStats:
+    """LLM round-trips issued, and avoided by terminal tools, within a scope."""
+
+    llm_calls: int = 0
+    calls_saved: int = 0
+
+
+_current_stats: ContextVar[Optional[ExecutorStats]] = ContextVar(
+    "executor_stats", default=None
+)
+
+
+@contextmanager
+def track_executor_stats() -> Iterator[ExecutorStats]:
+    """
+    Collects ExecutorStats for every executor run inside the block,
+    including tasks spawned from it (they inherit the context).
+    """
+    stats = ExecutorStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+async def _maybe_await(value: Any):
+    if asyncio.iscoroutine(value):
+        await value
+
+
 class AgentExecutor:
     def __init__(
         self,
@@ -22,9 +59,17 @@ class AgentExecutor:
         self.on_event = on_event
         self.tools_registry: Dict[str, Callable] = {}
         self.tools_definitions: List[Dict[str, Any]] = []
+        self.terminal_tools: Set[str] = set()
         self.messages: List[Dict[str, Any]] = []
-
-    def register_tool(self, definition: Dict[str, Any], func: Callable):
+        # Set once a terminal tool has run successfully
+        self.terminal_result: Any = None
+        self.finished = False
+        # Shared by every executor talking to the same provider/model
+        self.rate_limiter = get_rate_limiter_for_client(client)
+
+    def register_tool(
+        self, definition: Dict[str, Any], func: Callable, terminal: bool = False
+    ):
         """
         Manually registers a tool by linking its LLM-readable definition with its Python implementation.
 
@@ -35,10 +80,15 @@ class AgentExecutor:
             definition: A dictionary containing the tool's JSON schema (name, description, parameters).
                       Must follow the OpenAI/Ollama... tool calling format.
             func: The callable Python function or coroutine that implements the tool's logic.
+            terminal: If True, a successful call to this tool ends the agent loop.
+                      Use it for `submit_*` tools whose result is the whole point of the
+                      run, so no extra LLM round-trip is spent on a closing reply.
         """
         name = definition["function"]["name"]
         self.tools_registry[name] = func
         self.tools_definitions.append(definition)
+        if terminal:
+            self.terminal_tools.add(name)
 
     def _get_tools_definitions(self) -> List[Dict[str, Any]]:
         """Returns all available tools from manual and dynamic registries."""
@@ -61,10 +111,34 @@ class AgentExecutor:
             else:
                 self.on_event(event)
 
-    async def run_step(self) -> Dict[str, Any]:
+    async def _stream_message(
+        self, tools: List[Dict[str, Any]], on_delta: Callable[[Dict[str, Any]], Any]
+    ) -> Dict[str, Any]:
+        """
+        One streamed LLM call: forwards every delta event of
+        `client.stream_messages` to `on_delta` and returns the final message.
+        Each attempt starts with a {"start": True} event, so consumers can
+        discard the partial output of an attempt that was retried.
+        """
+        await _maybe_await(on_delta({"start": True}))
+        message: Dict[str, Any] = {}
+        async for event in self.client.stream_messages(
+            self.messages, tools=tools if tools else None
+        ):
+            if "message" in event:
+                message = event["message"]
+            else:
+                await _maybe_await(on_delta(event))
+        return message
+
+    async def run_step(
+        self, on_delta: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> Dict[str, Any]:
         """
         Performs a single execution step: Chat -> Tool Execution -> History Update.
         Returns the LLM's response message after tool executions (if any).
+        With `on_delta`, the reply is streamed and its deltas are passed to it
+        while it is generated (see BaseLLMClient.stream_messages).
         """
         tools = self._get_tools_definitions()
 
@@ -73,9 +147,26 @@ class AgentExecutor:
             "llm_request", {"messages": self.messages[-1] if self.messages else None}
         )
 
-        response_message = await self.client.process_messages(
-            self.messages, tools=tools if tools else None
+        prompt_tokens = Tokenizer.count_messages(
+            self.messages,
+            provider=getattr(self.client, "provider", None),
+            model=getattr(self.client, "model", None),
         )
+        stats = _current_stats.get()
+        if stats:
+            stats.llm_calls += 1
+        if on_delta:
+            response_message = await self.rate_limiter.run(
+                lambda: self._stream_message(tools, on_delta),
+                tokens=prompt_tokens,
+            )
+        else:
+            response_message = await self.rate_limiter.run(
+                lambda: self.client.process_messages(
+                    self.messages, tools=tools if tools else None
+                ),
+                tokens=prompt_tokens,
+            )
 
         await self._emit("llm_response", {"content": response_message.get("content")})
 
@@ -113,16 +204,41 @@ class AgentExecutor:
 
                 self.messages.append(tool_msg)
 
+                if self._is_terminal_success(tool_call, result):
+                    self.finished = True
+                    self.terminal_result = result
+
         return response_message
 
-    async def run_until_complete(self, max_iterations: int = 2) -> str:
+    def _is_terminal_success(self, tool_call: Dict[str, Any], result: Any) -> bool:
+        """True when a terminal tool ran without returning an error."""
+        name = tool_call.get("function", {}).get("name")
+        if name not in self.terminal_tools:
+            return False
+        return not (isinstance(result, dict) and "error" in result)
+
+    async def run_until_complete(
+        self,
+        max_iterations: int = 2,
+        on_delta: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ) -> str:
         """
-        Runs multiple steps until the agent provides a final text response without tool calls.
+        Runs multiple steps until the agent provides a final text response without tool calls,
+        or until a terminal tool has run successfully (its result is returned as text).
+        With `on_delta`, every step is streamed (see `run_step`).
         """
         for i in range(max_iterations):
             logger.debug(f"Iteration {i+1}/{max_iterations}")
 
-            response = await self.run_step()
+            response = await self.run_step(on_delta=on_delta)
+
+            if self.finished:
+                if i < max_iterations - 1:
+                    stats = _current_stats.get()
+                    if stats:
+                        stats.calls_saved += 1
+                result = self.terminal_result
+                return result if isinstance(result, str) else json.dumps(result)
 
             # If the LLM didn't ask for tools in its LAST response, and we have some content
             # we consider it a final answer.
@@ -1,34 +1,48 @@
 import json
-import os
-from collections import defaultdict
 from typing import Dict, Any, Optional, List, Callable
 
 from app.agents.core.base import BaseLLMClient
 from app.agents.agent_executor import AgentExecutor
+from app.core.constants import (
+    ARCHITECT_DIRECT_CONTEXT_TOKENS,
+    ARCHITECT_HEURISTIC_MIN_CONFIDENCE,
+)
+from app.core.fact_index import FactIndex
 from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
 from .prompts import ARCHITECT_NAVIGATION_PROMPT, ARCHITECT_PAGE_WRITER_PROMPT
+from .heuristic import HeuristicPlanner
 from .schema import WikiNavigation, WikiPageDetail
 from .subsystems import SubsystemDetector
+from .summarizer import SubtreeSummarizer
 
 logger = get_logger(__name__)
 
 
 class ArchitectAgent:
-    def __init__(self, client: BaseLLMClient, on_event: Optional[Callable] = None):
+    def __init__(
+        self,
+        client: BaseLLMClient,
+        on_event: Optional[Callable] = None,
+        fact_index: Optional[FactIndex] = None,
+        summary_cache: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
         self.client = client
         self.on_event = on_event
         self.detector = SubsystemDetector(client, on_event=on_event)
+        # Map-reduce summaries for repositories too large for one prompt
+        self.summarizer = SubtreeSummarizer(
+            client, on_event=on_event, cache=summary_cache
+        )
+        # Shared project-level index; built from `miner_output` when missing
+        self.fact_index = fact_index
+        # How the last navigation was planned ("heuristic" or "llm") and the
+        # heuristic confidence, when it was evaluated
+        self.plan_source: Optional[str] = None
+        self.plan_confidence: Optional[float] = None
 
-    def _group_by_module(self, data: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
-        """Groups file analyses by their parent directory (module)."""
-        modules = defaultdict(list)
-        for item in data:
-            file_path = item.get("file", "")
-            parent_dir = os.path.dirname(file_path)
-            if not parent_dir:
-                parent_dir = "root"
-            modules[parent_dir].append(item)
-        return modules
+    def _index_for(self, miner_output: Dict[str, Any]) -> FactIndex:
+        return self.fact_index or FactIndex.from_miner_output(miner_output)
 
     async def _summarize_module_for_context(
         self, module_name: str, files: List[Dict[str, Any]]
@@ -42,39 +56,62 @@ class ArchitectAgent:
         context = f"Module: {module_name}\nFiles: {len(files)}\nTopics: {', '.join(list(topics)[:10])}"
         return context
 
-    async def _prepare_module_facts(
-        self, module_name: str, files: List[Dict[str, Any]]
-    ) -> str:
-        """Prepare FULL DETAILED facts for Page Writing."""
-        text = f"=== MODULE: {module_name} ===\n"
-        for f in files:
-            fname = os.path.basename(f.get("file", ""))
-            text += f"\nFILE: {fname}\n"
-            for c in f.get("conclusions", []):
-                text += f"- [{c.get('topic')}]: {c.get('statement')}\n"
-        return text
-
     async def plan_navigation(
-        self, miner_output: Dict[str, Any]
+        self,
+        miner_output: Dict[str, Any],
+        ecosystems: Optional[List[Dict[str, Any]]] = None,
+        repo_path: str = "",
     ) -> Optional[WikiNavigation]:
         """
         Step 1: Analyze structure and propose a Sidebar Tree.
+
+        With `ecosystems` (TechnologyScanner results), a deterministic plan is
+        tried first and returned without any LLM call when its confidence
+        reaches ARCHITECT_HEURISTIC_MIN_CONFIDENCE.
         """
         raw_results = miner_output.get("results", [])
-        modules_map = self._group_by_module(raw_results)
-
-        # 1. Detect Subsystems
-        detected_subsystems = await self.detector.detect(raw_results)
+        fact_index = self._index_for(miner_output)
+        modules_map = fact_index.modules
+
+        if ecosystems is not None:
+            plan = HeuristicPlanner(fact_index, ecosystems, repo_path).plan()
+            self.plan_confidence = plan.confidence
+            if plan.confidence >= ARCHITECT_HEURISTIC_MIN_CONFIDENCE:
+                logger.info(
+                    f"Architect is using the heuristic plan "
+                    f"(confidence {plan.confidence:.2f}), skipping LLM planning."
+                )
+                self.plan_source = "heuristic"
+                return plan.navigation
+        self.plan_source = "llm"
+
+        # 1. Detect Subsystems. Large repositories are first summarized
+        # subtree by subtree (map) and merged up the directory tree (reduce),
+        # so both prompts see the whole project instead of a truncated prefix.
+        detector_context = self.detector.build_context(raw_results)
+        if await Tokenizer.count_async(detector_context) > ARCHITECT_DIRECT_CONTEXT_TOKENS:
+            logger.info(
+                f"Architect is summarizing {len(raw_results)} files by directory "
+                f"before planning."
+            )
+            outline = await self.summarizer.outline(raw_results)
+            detected_subsystems = await self.detector.detect_from_context(
+                f"Directory summaries:\n{outline}"
+            )
+            overview_text = f"Project Structure (summarized by directory):\n{outline}\n"
+        else:
+            detected_subsystems = await self.detector.detect_from_context(
+                detector_context
+            )
+            overview_text = "Project Modules:\n"
+            for mod, files in modules_map.items():
+                overview_text += f"- {mod} ({len(files)} files)\n"
 
         subsys_text = "DETECTED SUBSYSTEMS:\n"
         for sub in detected_subsystems:
             subsys_text += f"- {sub.name} ({sub.role}) [Root: {sub.root_path}]\n"
             subsys_text += f"  Tech: {', '.join(sub.technologies)}\n"
 
-        overview_text = "Project Modules:\n"
-        for mod, files in modules_map.items():
-            overview_text += f"- {mod} ({len(files)} files)\n"
-
         logger.info(
             f"Architect is planning navigation. Subsystems: {[s.name for s in detected_subsystems]}"
         )
@@ -101,7 +138,7 @@ class ArchitectAgent:
             result["data"] = kwargs
             return "Saved."
 
-        executor.register_tool(submit_tool, submit_navigation)
+        executor.register_tool(submit_tool, submit_navigation, terminal=True)
 
         try:
             await executor.run_until_complete(max_iterations=2)
@@ -122,10 +159,9 @@ class ArchitectAgent:
         """
         Step 2: Write a specific page in full detail.
         """
-        raw_results = miner_output.get("results", [])
-        modules_map = self._group_by_module(raw_results)
+        fact_index = self._index_for(miner_output)
+        modules_map = fact_index.modules
 
-        relevant_facts = ""
         target_modules = []
 
         # KEYWORD MATCHING STRATEGY
@@ -164,11 +200,11 @@ class ArchitectAgent:
 
         logger.info(f"Writing page '{page_id}' using module context: {target_modules}")
 
-        for mod in target_modules:
-            if mod in modules_map:
-                relevant_facts += (
-                    await self._prepare_module_facts(mod, modules_map[mod]) + "\n"
-                )
+        relevant_facts = "".join(
+            fact_index.block(mod, full_paths=False) + "\n"
+            for mod in target_modules
+            if mod in modules_map
+        )
 
         # Executor
         executor = AgentExecutor(client=self.client)
@@ -205,7 +241,7 @@ class ArchitectAgent:
             result["data"] = kwargs
             return "Saved."
 
-        executor.register_tool(submit_tool, submit_page)
+        executor.register_tool(submit_tool, submit_page, terminal=True)
 
         try:
             await executor.run_until_complete(max_iterations=2)
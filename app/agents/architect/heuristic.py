@@ -0,0 +1,276 @@
+import os
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.core.constants import ARCHITECT_HEURISTIC_MAX_MODULES
+from app.core.fact_index import FactIndex
+from app.core.logger import get_logger
+from .schema import NavigationNode, WikiNavigation
+
+logger = get_logger(__name__)
+
+# Conventional top-level directory names and the role they imply
+_DIRECTORY_ROLES = {
+    "backend": "backend",
+    "server": "backend",
+    "api": "backend",
+    "app": "backend",
+    "src": "backend",
+    "services": "backend",
+    "frontend": "frontend",
+    "web": "frontend",
+    "client": "frontend",
+    "ui": "frontend",
+    "cli": "cli",
+    "cmd": "cli",
+    "bin": "cli",
+    "scripts": "cli",
+    "infra": "infrastructure",
+    "deploy": "infrastructure",
+    "docker": "infrastructure",
+    "k8s": "infrastructure",
+    "db": "database",
+    "database": "database",
+    "migrations": "database",
+    "lib": "library",
+    "libs": "library",
+    "pkg": "library",
+    "packages": "library",
+    "tests": "tests",
+    "test": "tests",
+    "docs": "docs",
+}
+
+# Scanner frameworks that settle the role of the directories of their language
+_FRAMEWORK_ROLES = {
+    "django": "backend",
+    "flask": "backend",
+    "fastapi": "backend",
+    "pyramid": "backend",
+    "bottle": "backend",
+    "tornado": "backend",
+    "aiohttp": "backend",
+    "express": "backend",
+    "nestjs": "backend",
+    "koa": "backend",
+    "fastify": "backend",
+    "hapi": "backend",
+    "react": "frontend",
+    "next": "frontend",
+    "astro": "frontend",
+    "vue": "frontend",
+    "nuxt": "frontend",
+    "angular": "frontend",
+    "svelte": "frontend",
+    "sveltekit": "frontend",
+    "streamlit": "frontend",
+    "dash": "frontend",
+}
+
+# Miner topics (lowercased) that point at a role when names and scanners don't
+_TOPIC_ROLES = {
+    "ui": "frontend",
+    "frontend": "frontend",
+    "components": "frontend",
+    "api": "backend",
+    "routing": "backend",
+    "auth": "backend",
+    "data": "database",
+    "database": "database",
+    "persistence": "database",
+    "cli": "cli",
+    "testing": "tests",
+    "deployment": "infrastructure",
+}
+
+# Most common topics of a module that still count as one coherent concern
+_COHERENT_TOPICS = 3
+
+_ROOT = "root"
+
+
+@dataclass
+class HeuristicPlan:
+    """A deterministic navigation and how far it can be trusted."""
+
+    navigation: WikiNavigation
+    confidence: float
+    # The factors behind `confidence`, for logs and cost reports
+    signals: Dict[str, float] = field(default_factory=dict)
+
+
+def _label(segment: str) -> str:
+    return segment.replace("_", " ").replace("-", " ").title()
+
+
+class HeuristicPlanner:
+    """
+    Plans the wiki navigation without an LLM, from:
+    - the module map of the FactIndex (one page per module, grouped under
+      its top-level directory);
+    - the TechnologyScanner ecosystems (languages per directory, frameworks
+      and infrastructure) and conventional directory names, for roles;
+    - the distribution of Miner topics per module.
+
+    The confidence score is the product of a size factor (1.0 up to
+    ARCHITECT_HEURISTIC_MAX_MODULES modules) and the mean of:
+    - convention: share of mined files in a directory whose role was
+      resolved from its name, the scanners or its topics;
+    - coherence: share of each module's conclusions covered by its top
+      topics, weighted by conclusions. A module spanning many concerns is
+      what an LLM would split across pages, so it lowers confidence.
+    """
+
+    def __init__(
+        self,
+        fact_index: FactIndex,
+        ecosystems: Optional[List[Dict[str, Any]]] = None,
+        repo_path: str = "",
+    ):
+        self.fact_index = fact_index
+        self.ecosystems = ecosystems or []
+        self.repo_path = repo_path
+
+    @staticmethod
+    def _top_level(module: str) -> str:
+        return module.replace("\\", "/").split("/")[0]
+
+    def _relative(self, path: str) -> str:
+        if self.repo_path and os.path.isabs(path):
+            path = os.path.relpath(path, self.repo_path)
+        return path.replace("\\", "/")
+
+    def _scanner_roles(self) -> Dict[str, Counter]:
+        """Top-level directory -> role votes (one per scanned file) from the scanners."""
+        votes: Dict[str, Counter] = defaultdict(Counter)
+        for eco in self.ecosystems:
+            frameworks = eco.get("frameworks", {}).get("items", [])
+            roles = {_FRAMEWORK_ROLES[f] for f in frameworks if f in _FRAMEWORK_ROLES}
+            if eco.get("type") == "infrastructure":
+                roles = {"database" if eco.get("name") == "database" else "infrastructure"}
+            if len(roles) != 1:
+                # No framework, or a mix of them (full-stack): not decisive
+                continue
+            role = roles.pop()
+
+            files: List[str] = []
+            for key, val in eco.items():
+                if not isinstance(val, dict):
+                    continue
+                entries = [val] + [v for v in val.values() if isinstance(v, dict)]
+                for entry in entries:
+                    if entry.get("detected"):
+                        files.extend(entry.get("files") or entry.get("paths") or [])
+            for path in files:
+                rel = self._relative(str(path))
+                top = rel.split("/")[0] if "/" in rel else _ROOT
+                votes[top][role] += 1
+        return votes
+
+    @staticmethod
+    def _topic_role(topics: Counter) -> Optional[str]:
+        votes: Counter = Counter()
+        for topic, count in topics.items():
+            role = _TOPIC_ROLES.get(str(topic).lower())
+            if role:
+                votes[role] += count
+        if not votes:
+            return None
+        role, count = votes.most_common(1)[0]
+        return role if count * 2 > sum(topics.values()) else None
+
+    def plan(self, project_name: str = "") -> HeuristicPlan:
+        modules = self.fact_index.modules
+        project_name = project_name or (
+            os.path.basename(os.path.normpath(self.repo_path)) if self.repo_path else "Project"
+        )
+
+        groups: Dict[str, List[str]] = defaultdict(list)
+        for module in modules:
+            groups[self._top_level(module)].append(module)
+
+        topics: Dict[str, Counter] = {
+            module: Counter(
+                c.get("topic") for f in files for c in f.get("conclusions", [])
+            )
+            for module, files in modules.items()
+        }
+        scanner_roles = self._scanner_roles()
+
+        roles: Dict[str, Optional[str]] = {}
+        for top, members in groups.items():
+            if top == _ROOT:
+                roles[top] = _ROOT
+            elif top.lower() in _DIRECTORY_ROLES:
+                roles[top] = _DIRECTORY_ROLES[top.lower()]
+            elif scanner_roles.get(top):
+                roles[top] = scanner_roles[top].most_common(1)[0][0]
+            else:
+                roles[top] = self._topic_role(
+                    sum((topics[m] for m in members), Counter())
+                )
+
+        # ---- Confidence ----
+        file_counts = {top: sum(len(modules[m]) for m in members) for top, members in groups.items()}
+        total_files = sum(file_counts.values())
+        convention = (
+            sum(n for top, n in file_counts.items() if roles[top]) / total_files
+            if total_files
+            else 0.0
+        )
+        total_facts = sum(sum(t.values()) for t in topics.values())
+        coherence = (
+            sum(
+                sum(count for _, count in t.most_common(_COHERENT_TOPICS))
+                for t in topics.values()
+            )
+            / total_facts
+            if total_facts
+            else 0.0
+        )
+        size = min(1.0, ARCHITECT_HEURISTIC_MAX_MODULES / max(len(modules), 1))
+        confidence = size * (convention + coherence) / 2 if modules else 0.0
+
+        # ---- Navigation ----
+        tree = [
+            NavigationNode(id="architecture-overview", label="Architecture Overview", type="page")
+        ]
+        ordered = sorted(groups, key=lambda top: (top == _ROOT, -file_counts[top], top))
+        for top in ordered:
+            members = groups[top]
+            if top == _ROOT:
+                tree.append(NavigationNode(id=_ROOT, label="Top-level Files", type="page"))
+            elif members == [top]:
+                tree.append(NavigationNode(id=top, label=_label(top), type="page"))
+            else:
+                # Page ids are the module path segments, so the Scribe's
+                # module matching resolves each page to its own module
+                children = []
+                for module in members:
+                    parts = module.replace("\\", "/").split("/")
+                    if len(parts) == 1:
+                        page_id, label = f"{top}-overview", "Overview"
+                    else:
+                        page_id = "-".join(parts)
+                        label = " / ".join(_label(part) for part in parts[1:])
+                    children.append(NavigationNode(id=page_id, label=label, type="page"))
+                tree.append(
+                    NavigationNode(id=top, label=_label(top), type="category", children=children)
+                )
+
+        detected = sorted({r for r in roles.values() if r and r != _ROOT})
+        navigation = WikiNavigation(
+            project_name=project_name, detected_subsystems=detected, tree=tree
+        )
+        signals = {
+            "modules": len(modules),
+            "size": round(size, 3),
+            "convention": round(convention, 3),
+            "coherence": round(coherence, 3),
+        }
+        logger.info(
+            f"[Architect] Heuristic plan: {len(modules)} modules, "
+            f"confidence {confidence:.2f} ({signals})"
+        )
+        return HeuristicPlan(navigation, round(confidence, 3), signals)
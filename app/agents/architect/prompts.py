@@ -58,3 +58,22 @@ Write a comprehensive, deep-dive technical document in Markdown.
 ## OUTPUT
 Use `submit_page` tool.
 """
+
+SUBTREE_SUMMARY_PROMPT = """
+You are a Senior Software Architect summarizing one part of a large codebase.
+
+## INPUT
+Either the file paths and extracted facts of one directory subtree, or the
+summaries of several sub-directories that must be condensed into one.
+
+## TASK
+Describe what this part of the codebase does:
+- **Summary**: 2-4 sentences on its responsibility and how it is organized.
+- **Role**: backend, frontend, cli, infrastructure, library, tests or docs.
+- **Technologies**: The main frameworks and libraries it relies on.
+
+Only describe what the input supports. Do NOT invent components.
+
+## OUTPUT
+Use the `submit_subtree_summary` tool.
+"""
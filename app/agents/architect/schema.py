@@ -41,3 +41,8 @@ class WikiPageDetail(BaseModel):
         None, description="Mermaid chart definition."
     )
     related_files: List[str] = Field(default_factory=list)
+    summary: Optional[str] = Field(
+        None,
+        description="Compact plain-text summary of the page (at most 80 words): "
+        "what it documents and its key components. Parent pages are written from it.",
+    )
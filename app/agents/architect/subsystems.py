@@ -2,6 +2,7 @@ from typing import List, Dict, Any, Callable, Optional
 from pydantic import BaseModel, Field
 from app.agents.core.base import BaseLLMClient
 from app.agents.agent_executor import AgentExecutor
+from app.core.constants import ARCHITECT_DIRECT_CONTEXT_TOKENS
 from app.core.logger import get_logger
 from .prompts import SUBSYSTEM_DETECTION_PROMPT
 from app.core.tokenizer import Tokenizer
@@ -27,6 +28,14 @@ class SubsystemsList(BaseModel):
     subsystems: List[Subsystem]
 
 
+def describe_file(file_result: Dict[str, Any]) -> str:
+    """A file path plus its top 2 conclusions (to help detect technologies)."""
+    lines = [f"File: {file_result.get('file', '')}"]
+    for c in file_result.get("conclusions", [])[:2]:
+        lines.append(f"  - Fact: {c.get('statement')}")
+    return "\n".join(lines)
+
+
 class SubsystemDetector:
     """
     Uses LLM to analyze file structure and detect subsystems.
@@ -36,24 +45,27 @@ class SubsystemDetector:
         self.client = client
         self.on_event = on_event
 
-    async def detect(self, files: List[Dict[str, Any]]) -> List[Subsystem]:
-        logger.info("Detecting subsystems using AI...")
+    @staticmethod
+    def build_context(files: List[Dict[str, Any]]) -> str:
+        """The per-file context used for detection on small repositories."""
+        return "\n".join(describe_file(f) for f in files)
 
-        # Prepare Context
-        context_lines = []
-        for f in files:
-            path = f.get("file", "")
-            context_lines.append(f"File: {path}")
-            # Add top 2 conclusions if any (to help detect technologies)
-            conclusions = f.get("conclusions", [])
-            for c in conclusions[:2]:
-                context_lines.append(f"  - Fact: {c.get('statement')}")
+    async def detect(self, files: List[Dict[str, Any]]) -> List[Subsystem]:
+        return await self.detect_from_context(self.build_context(files))
 
-        context_str = "\n".join(context_lines)
+    async def detect_from_context(self, context_str: str) -> List[Subsystem]:
+        """
+        Detects subsystems from a prepared description of the codebase: the
+        file list of `build_context`, or a summarized directory outline.
+        """
+        logger.info("Detecting subsystems using AI...")
 
         # Safety Limit (Tokens)
-        MAX_DETECTOR_TOKENS = 50_000  # Subsystem detection keeps it lighter
-        context_str = Tokenizer.truncate(context_str, MAX_DETECTOR_TOKENS)
+        # Subsystem detection keeps it lighter; larger repositories are
+        # summarized first (see SubtreeSummarizer)
+        context_str = await Tokenizer.truncate_async(
+            context_str, ARCHITECT_DIRECT_CONTEXT_TOKENS
+        )
 
         executor = AgentExecutor(client=self.client, on_event=self.on_event)
         executor.set_system_prompt(SUBSYSTEM_DETECTION_PROMPT)
@@ -74,7 +86,7 @@ class SubsystemDetector:
             result["data"] = kwargs
             return "Saved."
 
-        executor.register_tool(submit_tool, submit_subsystems)
+        executor.register_tool(submit_tool, submit_subsystems, terminal=True)
 
         try:
             await executor.run_until_complete(max_iterations=1)
@@ -0,0 +1,227 @@
+import asyncio
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from app.agents.core.base import BaseLLMClient
+from app.agents.agent_executor import AgentExecutor
+from app.core.constants import (
+    ARCHITECT_REDUCE_TOKEN_BUDGET,
+    ARCHITECT_SUBTREE_TOKEN_BUDGET,
+    ARCHITECT_SUMMARY_PROMPT_VERSION,
+)
+from app.core.content_hash import content_hash, miner_cache_key
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+from .prompts import SUBTREE_SUMMARY_PROMPT
+from .subsystems import describe_file
+
+logger = get_logger(__name__)
+
+
+class SubtreeSummary(BaseModel):
+    summary: str = Field(
+        ..., description="2-4 sentences on the responsibility of this part of the code."
+    )
+    role: str = Field(
+        ...,
+        description="Role: 'backend', 'frontend', 'cli', 'infrastructure', 'library', 'tests', 'docs'.",
+    )
+    technologies: List[str] = Field(
+        default_factory=list, description="Main frameworks/libraries used."
+    )
+
+
+@dataclass
+class DirectoryNode:
+    """A directory of the mined files, with subtree totals."""
+
+    path: str
+    # (file description, its token count) for files directly in this directory
+    files: List[Tuple[str, int]] = field(default_factory=list)
+    children: Dict[str, "DirectoryNode"] = field(default_factory=dict)
+    file_count: int = 0
+    tokens: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.path or 'root'}/ ({self.file_count} files)"
+
+    def subtree_files(self) -> List[Tuple[str, int]]:
+        collected = list(self.files)
+        for child in self.children.values():
+            collected.extend(child.subtree_files())
+        return collected
+
+
+def build_directory_tree(results: List[Dict[str, Any]]) -> DirectoryNode:
+    """Arranges Miner results by directory, counting files and context tokens."""
+    root = DirectoryNode(path="")
+    descriptions = [describe_file(item) for item in results]
+    counts = Tokenizer.count_batch(descriptions)
+    for item, description, tokens in zip(results, descriptions, counts):
+        node = root
+        node.file_count += 1
+        node.tokens += tokens
+        parent = os.path.dirname(item.get("file", "").replace("\\", "/"))
+        for part in [p for p in parent.split("/") if p]:
+            if part not in node.children:
+                path = f"{node.path}/{part}" if node.path else part
+                node.children[part] = DirectoryNode(path=path)
+            node = node.children[part]
+            node.file_count += 1
+            node.tokens += tokens
+        node.files.append((description, tokens))
+    return root
+
+
+class SubtreeSummarizer:
+    """
+    Map-reduce summary of a large codebase for Architect planning.
+
+    Map: every directory subtree whose file context fits the subtree budget
+    is summarized by one LLM call; files sitting directly in a larger
+    directory are summarized in budget-sized groups. All map calls of the
+    tree run concurrently (paced by the shared RateLimiter).
+
+    Reduce: summaries are merged up the directory tree into an indented
+    outline. A directory whose merged outline exceeds the reduce budget is
+    condensed by one more call, so the outline stays bounded and the number
+    of sequential rounds follows the tree depth, not the file count.
+
+    Summaries are cached by a hash of their input (plus model and prompt
+    version) in `cache`, so unchanged subtrees are not summarized again.
+    """
+
+    def __init__(
+        self,
+        client: BaseLLMClient,
+        on_event: Optional[Callable] = None,
+        cache: Optional[Dict[str, Dict[str, Any]]] = None,
+        subtree_budget: int = ARCHITECT_SUBTREE_TOKEN_BUDGET,
+        reduce_budget: int = ARCHITECT_REDUCE_TOKEN_BUDGET,
+    ):
+        self.client = client
+        self.on_event = on_event
+        self.cache = cache if cache is not None else {}
+        self.subtree_budget = subtree_budget
+        self.reduce_budget = reduce_budget
+        self.stats = {"map_calls": 0, "reduce_calls": 0, "cached": 0, "failed": 0}
+
+    async def outline(self, results: List[Dict[str, Any]]) -> str:
+        """Returns the summarized directory outline of the Miner results."""
+        root = await Tokenizer.offload(build_directory_tree, results)
+        lines = await self._reduce(root)
+        logger.info(
+            f"[Architect] Summarized {root.file_count} files into "
+            f"{len(lines)} outline lines ({self.stats})"
+        )
+        return "\n".join(lines)
+
+    # ==================== MAP / REDUCE ====================
+
+    async def _reduce(self, node: DirectoryNode) -> List[str]:
+        if node.tokens <= self.subtree_budget:
+            body = "\n".join(text for text, _ in node.subtree_files())
+            summary = await self._summarize(f"Directory: {node.label}", body, "map")
+            return [self._line(node.label, summary)]
+
+        groups = self._group_files(node.files)
+        own_label = f"{node.path or 'root'}/* ({len(node.files)} files directly inside)"
+        results = await asyncio.gather(
+            *(
+                self._summarize(
+                    f"Directory: {own_label}, part {i + 1} of {len(groups)}",
+                    body,
+                    "map",
+                )
+                for i, body in enumerate(groups)
+            ),
+            *(self._reduce(child) for _, child in sorted(node.children.items())),
+        )
+        own_summaries, child_outlines = results[: len(groups)], results[len(groups) :]
+
+        parts = [self._line(own_label, s) for s in own_summaries]
+        for child_lines in child_outlines:
+            parts.extend(child_lines)
+        lines = [f"- {node.label}"] + [f"  {line}" for line in parts]
+
+        if await Tokenizer.count_async("\n".join(lines)) > self.reduce_budget:
+            summary = await self._summarize(
+                f"Directory: {node.label} (merge these sub-directory summaries)",
+                "\n".join(parts),
+                "reduce",
+            )
+            return [self._line(node.label, summary)]
+        return lines
+
+    def _group_files(self, files: List[Tuple[str, int]]) -> List[str]:
+        """Splits file descriptions into groups that fit the subtree budget."""
+        groups: List[List[str]] = []
+        used = self.subtree_budget
+        for text, tokens in files:
+            if used + tokens > self.subtree_budget:
+                groups.append([])
+                used = 0
+            groups[-1].append(text)
+            used += tokens
+        return ["\n".join(group) for group in groups]
+
+    @staticmethod
+    def _line(label: str, summary: Optional[SubtreeSummary]) -> str:
+        if summary is None:
+            return f"- {label}: (summary unavailable)"
+        tech = f" Tech: {', '.join(summary.technologies)}." if summary.technologies else ""
+        return f"- {label}: [{summary.role}] {summary.summary}{tech}"
+
+    # ==================== LLM ====================
+
+    async def _summarize(
+        self, title: str, body: str, kind: str
+    ) -> Optional[SubtreeSummary]:
+        """One summary call (`kind` is 'map' or 'reduce'), served from cache when possible."""
+        key = miner_cache_key(
+            content_hash(f"{title}\n{body}"),
+            getattr(self.client, "model", "default"),
+            ARCHITECT_SUMMARY_PROMPT_VERSION,
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["cached"] += 1
+            return SubtreeSummary(**cached)
+
+        executor = AgentExecutor(client=self.client, on_event=self.on_event)
+        executor.set_system_prompt(SUBTREE_SUMMARY_PROMPT)
+        executor.add_user_message(f"{title}\n\n{body}")
+
+        submit_tool = {
+            "type": "function",
+            "function": {
+                "name": "submit_subtree_summary",
+                "description": "Submit the summary of this part of the codebase.",
+                "parameters": SubtreeSummary.model_json_schema(),
+            },
+        }
+
+        result = {"data": None}
+
+        def submit_subtree_summary(**kwargs):
+            result["data"] = kwargs
+            return "Saved."
+
+        executor.register_tool(submit_tool, submit_subtree_summary, terminal=True)
+
+        self.stats[f"{kind}_calls"] += 1
+        try:
+            await executor.run_until_complete(max_iterations=1)
+            if result["data"]:
+                summary = SubtreeSummary(**result["data"])
+                self.cache[key] = summary.model_dump()
+                return summary
+        except Exception as e:
+            logger.error(f"Subtree summary failed for {title}: {e}")
+
+        self.stats["failed"] += 1
+        return None
@@ -23,3 +23,19 @@ class BaseLLMClient(ABC):
     ) -> AsyncGenerator[str, None]:
         """Stream the generation of a response."""
         pass
+
+    async def stream_messages(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Streams the next message of a conversation as events:
+        - {"content": str}: a piece of the text reply;
+        - {"tool_call": int, "name": str, "arguments": str}: a piece of the
+          JSON arguments of the tool call at that index;
+        - {"message": dict}: the complete message (as `process_messages`
+          returns it), always the last event.
+        Clients without native streaming yield the complete message only.
+        """
+        yield {"message": await self.process_messages(messages, tools)}
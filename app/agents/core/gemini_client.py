@@ -3,11 +3,14 @@ import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from .base import BaseLLMClient
 from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
 
 logger = get_logger(__name__)
 
 
 class GeminiClient(BaseLLMClient):
+    provider = "gemini"
+
     def __init__(self, api_key: str, model: str = "gemini-pro-latest"):
         """
         Initialize Gemini client.
@@ -18,6 +21,7 @@ class GeminiClient(BaseLLMClient):
 
         genai.configure(api_key=api_key)
         self.model_name = model
+        self.model = model
         self.client = genai.GenerativeModel(model)
 
         # Configure safety settings to be less restrictive for code documentation
@@ -81,28 +85,20 @@ class GeminiClient(BaseLLMClient):
                 ),
             )
 
-            # Retry with exponential backoff for rate limit errors (429)
-            import asyncio
-
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    response = await self.client.generate_content_async(
-                        contents=chat_history,
-                        generation_config=generation_config,
-                        safety_settings=self.safety_settings,
-                    )
-                    return response.text
-                except Exception as retry_err:
-                    if "429" in str(retry_err) and attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 5
-                        logger.warning(
-                            f"Rate limited (429). Retrying in {wait_time}s "
-                            f"(attempt {attempt + 1}/{max_retries})"
-                        )
-                        await asyncio.sleep(wait_time)
-                    else:
-                        raise retry_err
+            # 429s propagate to the shared RateLimiter, which backs off and retries
+            response = await self.client.generate_content_async(
+                contents=chat_history,
+                generation_config=generation_config,
+                safety_settings=self.safety_settings,
+            )
+            usage = getattr(response, "usage_metadata", None)
+            Tokenizer.record_usage(
+                self.provider,
+                self.model,
+                messages,
+                getattr(usage, "prompt_token_count", None),
+            )
+            return response.text
 
         except Exception as e:
             logger.error(f"Gemini generation error: {e}")
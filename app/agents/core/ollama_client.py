@@ -1,24 +1,39 @@
+import json
 from typing import AsyncGenerator, Optional, List, Dict, Any
 import ollama
 from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
 from .base import BaseLLMClient
 
 logger = get_logger(__name__)
 
 
+def _prompt_messages(prompt: str, system: Optional[str]) -> List[Dict[str, Any]]:
+    return [{"role": "system", "content": system or ""}, {"role": "user", "content": prompt}]
+
+
 class OllamaClient(BaseLLMClient):
+    provider = "ollama"
+
     def __init__(self, host: Optional[str] = None, model: Optional[str] = None):
         self.host = host or settings.ollama_base_url
         self.model = model or settings.ollama_model
         self.client = ollama.AsyncClient(host=self.host)
 
+    def _record_usage(self, messages: List[Dict[str, Any]], response: Any):
+        """Feeds the prompt tokens Ollama evaluated into the token calibration."""
+        Tokenizer.record_usage(
+            self.provider, self.model, messages, response.get("prompt_eval_count")
+        )
+
     async def generate(self, prompt: str, system: Optional[str] = None) -> str:
         """Generate a complete response for a given prompt."""
         try:
             response = await self.client.generate(
                 model=self.model, prompt=prompt, system=system or ""
             )
+            self._record_usage(_prompt_messages(prompt, system), response)
             return response.get("response", "")
         except Exception as e:
             logger.error(f"Error generating response from Ollama library: {e}")
@@ -34,11 +49,53 @@ class OllamaClient(BaseLLMClient):
             response = await self.client.chat(
                 model=self.model, messages=messages, tools=tools
             )
+            self._record_usage(messages, response)
             return response.get("message", {})
         except Exception as e:
             logger.error(f"Error in process_messages with Ollama library: {e}")
             raise
 
+    async def stream_messages(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Streams text deltas, then the full message. Ollama returns each tool
+        call whole, so its arguments arrive as a single delta.
+        """
+        try:
+            content_parts: List[str] = []
+            tool_calls: List[Any] = []
+            async for part in await self.client.chat(
+                model=self.model, messages=messages, tools=tools, stream=True
+            ):
+                # The final part carries the prompt_eval_count
+                self._record_usage(messages, part)
+                message = part.get("message", {})
+                if message.get("content"):
+                    content_parts.append(message["content"])
+                    yield {"content": message["content"]}
+                for call in message.get("tool_calls") or []:
+                    function = call.get("function", {})
+                    yield {
+                        "tool_call": len(tool_calls),
+                        "name": function.get("name"),
+                        "arguments": json.dumps(function.get("arguments") or {}),
+                    }
+                    tool_calls.append(call)
+
+            result: Dict[str, Any] = {
+                "role": "assistant",
+                "content": "".join(content_parts),
+            }
+            if tool_calls:
+                result["tool_calls"] = tool_calls
+            yield {"message": result}
+        except Exception as e:
+            logger.error(f"Error streaming chat from Ollama library: {e}")
+            raise
+
     async def stream_generate(
         self, prompt: str, system: Optional[str] = None
     ) -> AsyncGenerator[str, None]:
@@ -47,6 +104,7 @@ class OllamaClient(BaseLLMClient):
             async for part in await self.client.generate(
                 model=self.model, prompt=prompt, system=system or "", stream=True
             ):
+                self._record_usage(_prompt_messages(prompt, system), part)
                 yield part.get("response", "")
         except Exception as e:
             logger.error(f"Error streaming response from Ollama library: {e}")
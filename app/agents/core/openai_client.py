@@ -2,16 +2,21 @@ from typing import List, Dict, Any, Optional, AsyncGenerator
 import os
 from openai import AsyncOpenAI
 from app.agents.core.base import BaseLLMClient
+from app.agents.core.rate_limiter import get_rate_limiter
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
 
 
 class OpenAIClient(BaseLLMClient):
+    provider = "openai"
+
     def __init__(self, model: str = "gpt-4o-mini", api_key: Optional[str] = None):
         self.model = model
-        # If api_key is not provided, AsyncOpenAI will look for 'OPENAI_API_KEY' env var
-        self.client = AsyncOpenAI(api_key=api_key, max_retries=5)
+        # If api_key is not provided, AsyncOpenAI will look for 'OPENAI_API_KEY' env var.
+        # SDK retries are disabled: 429s must reach the shared RateLimiter so it can
+        # back off every caller, not just the one that was throttled.
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
 
     async def generate(self, prompt: str, system: Optional[str] = None) -> str:
         messages = []
@@ -52,7 +57,12 @@ class OpenAIClient(BaseLLMClient):
                 kwargs["tools"] = tools
                 kwargs["tool_choice"] = "auto"
 
-            response = await self.client.chat.completions.create(**kwargs)
+            raw = await self.client.chat.completions.with_raw_response.create(**kwargs)
+            # Feed the real account limits back into the shared limiter
+            get_rate_limiter(self.provider, self.model).update_from_headers(
+                raw.headers
+            )
+            response = raw.parse()
             message = response.choices[0].message
 
             # Convert OpenAI format to our internal dict format
@@ -81,6 +91,70 @@ class OpenAIClient(BaseLLMClient):
             logger.error(f"OpenAI chat completion failed: {e}")
             raise
 
+    async def stream_messages(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Streams text and tool-call argument deltas, then the full message."""
+        try:
+            kwargs: Dict[str, Any] = {
+                "model": self.model,
+                "messages": messages,
+                "stream": True,
+            }
+            if tools:
+                kwargs["tools"] = tools
+                kwargs["tool_choice"] = "auto"
+
+            raw = await self.client.chat.completions.with_raw_response.create(**kwargs)
+            get_rate_limiter(self.provider, self.model).update_from_headers(
+                raw.headers
+            )
+            stream = raw.parse()
+
+            content_parts: List[str] = []
+            tool_calls: Dict[int, Dict[str, Any]] = {}
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content_parts.append(delta.content)
+                    yield {"content": delta.content}
+                for tc in delta.tool_calls or []:
+                    call = tool_calls.setdefault(
+                        tc.index,
+                        {
+                            "id": None,
+                            "type": "function",
+                            "function": {"name": "", "arguments": ""},
+                        },
+                    )
+                    if tc.id:
+                        call["id"] = tc.id
+                    if tc.function and tc.function.name:
+                        call["function"]["name"] += tc.function.name
+                    if tc.function and tc.function.arguments:
+                        call["function"]["arguments"] += tc.function.arguments
+                        yield {
+                            "tool_call": tc.index,
+                            "name": call["function"]["name"],
+                            "arguments": tc.function.arguments,
+                        }
+
+            result: Dict[str, Any] = {
+                "role": "assistant",
+                "content": "".join(content_parts) or None,
+            }
+            if tool_calls:
+                result["tool_calls"] = [tool_calls[i] for i in sorted(tool_calls)]
+            yield {"message": result}
+
+        except Exception as e:
+            logger.error(f"OpenAI chat streaming failed: {e}")
+            raise
+
     async def stream_generate(
         self, prompt: str, system: Optional[str] = None
     ) -> AsyncGenerator[str, None]:
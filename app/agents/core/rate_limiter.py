@@ -0,0 +1,441 @@
+import asyncio
+import contextvars
+import re
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from app.core.constants import (
+    RATE_LIMITS_BY_PROVIDER,
+    RATE_LIMIT_DEFAULTS,
+    RATE_LIMIT_MAX_RETRIES,
+    RATE_LIMIT_BACKOFF_SECONDS,
+)
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+# Deadline of each provider call made in the current context (see call_deadline)
+_call_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "llm_call_deadline", default=None
+)
+
+
+class CallDeadlineExceeded(asyncio.TimeoutError):
+    """A provider call outlived the deadline set with `call_deadline`."""
+
+
+@contextmanager
+def call_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Bounds every provider call the limiter makes inside the block. The clock
+    starts once the call holds its slot, so queueing, bucket waits and
+    Retry-After pauses do not count against it.
+    """
+    token = _call_deadline.set(seconds)
+    try:
+        yield
+    finally:
+        _call_deadline.reset(token)
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parses rate-limit reset durations into seconds.
+    Accepts plain seconds ("20", "0.5") and Go-style durations ("6m0s", "20ms").
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    total = 0.0
+    matched = False
+    for amount, unit in _DURATION_PART.findall(value):
+        matched = True
+        amount = float(amount)
+        if unit == "ms":
+            total += amount / 1000
+        elif unit == "s":
+            total += amount
+        elif unit == "m":
+            total += amount * 60
+        elif unit == "h":
+            total += amount * 3600
+    return total if matched else None
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """Detects HTTP 429 / quota errors across the supported provider SDKs."""
+    if getattr(exc, "status_code", None) == 429:
+        return True
+    text = str(exc).lower()
+    return "429" in text or "rate limit" in text or "resource exhausted" in text
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Detects errors worth retrying: timeouts, dropped connections and 5xx."""
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int) and status >= 500:
+        return True
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def is_unreachable_error(exc: BaseException) -> bool:
+    """
+    Detects a provider that cannot be reached at all (connection refused,
+    unknown host), e.g. a local Ollama server that is not running. Retrying
+    would only delay the failure, so these are raised at once.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        # httpx.ConnectError: no connection was ever established
+        if isinstance(exc, ConnectionRefusedError) or type(exc).__name__ == "ConnectError":
+            return True
+        text = str(exc).lower()
+        if "connection refused" in text or "failed to connect" in text:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def _error_headers(exc: BaseException) -> Optional[Mapping[str, str]]:
+    response = getattr(exc, "response", None)
+    return getattr(response, "headers", None)
+
+
+class RateLimiter:
+    """
+    Adaptive limiter shared by every LLM call to one provider/model.
+
+    - Two token buckets enforce requests-per-minute and tokens-per-minute.
+      Each call reserves one request plus its estimated prompt tokens.
+    - Concurrency follows AIMD: the in-flight limit grows by roughly one slot
+      per window of successful calls and halves on every 429.
+    - Provider feedback (`Retry-After`, `x-ratelimit-*` headers) pauses the
+      buckets and replaces the configured limits with the real account tier.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: Optional[float],
+        tokens_per_minute: Optional[float],
+        max_concurrency: int,
+        initial_concurrency: int,
+        min_concurrency: int = 1,
+    ):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = float(min(initial_concurrency, max_concurrency))
+
+        self._request_bucket = float(requests_per_minute or 0)
+        self._token_bucket = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._in_flight = 0
+
+        # asyncio primitives bind to the loop that first uses them, while the
+        # limiter is process-wide; they are created per loop (see _primitives)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Condition] = None
+
+        self.stats = {"requests": 0, "rate_limited": 0, "retries": 0, "waited_s": 0.0}
+
+    # ==================== ACQUIRE / RELEASE ====================
+
+    def _primitives(self) -> Tuple[asyncio.Lock, asyncio.Condition]:
+        """
+        The bucket lock and slot condition for the running event loop.
+        A limiter serves one loop at a time: when a new loop starts using it
+        (e.g. a later asyncio.run), the calls of the previous one are gone,
+        so the primitives and the in-flight count start over. Buckets and
+        learned concurrency carry over.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Condition()
+            self._in_flight = 0
+        return self._lock, self._slots
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int = 0):
+        """Waits for a concurrency slot and bucket capacity for one call."""
+        lock, slots = self._primitives()
+        async with slots:
+            await slots.wait_for(lambda: self._in_flight < int(self.concurrency))
+            self._in_flight += 1
+
+        try:
+            started = time.monotonic()
+            async with lock:
+                while True:
+                    wait = self._reserve(tokens)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+            self.stats["waited_s"] += time.monotonic() - started
+            self.stats["requests"] += 1
+            yield
+        finally:
+            async with slots:
+                self._in_flight -= 1
+                slots.notify_all()
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        tokens: int = 0,
+        timeout: Optional[float] = None,
+    ) -> T:
+        """
+        Executes `call` under the limiter, retrying 429s and transient errors.
+        429s shrink concurrency and honor Retry-After; successes grow it.
+        A provider that refuses connections fails at once (is_unreachable_error).
+
+        `timeout` (default: the enclosing `call_deadline`) bounds each attempt
+        from the moment its slot is granted. An attempt that exceeds it raises
+        CallDeadlineExceeded and is not retried here.
+        """
+        if timeout is None:
+            timeout = _call_deadline.get()
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            try:
+                async with self.acquire(tokens):
+                    result = await self._call(call, timeout)
+                self.record_success()
+                return result
+            except CallDeadlineExceeded:
+                raise
+            except Exception as exc:
+                if attempt >= RATE_LIMIT_MAX_RETRIES:
+                    raise
+                headers = _error_headers(exc)
+                if is_rate_limit_error(exc):
+                    if headers:
+                        self.update_from_headers(headers)
+                    self.record_rate_limited(self._retry_after(headers, attempt))
+                elif is_unreachable_error(exc):
+                    logger.error(
+                        f"[RateLimiter:{self.name}] Provider unreachable, not retrying: {exc}"
+                    )
+                    raise
+                elif is_transient_error(exc):
+                    await asyncio.sleep(RATE_LIMIT_BACKOFF_SECONDS * (2**attempt))
+                else:
+                    raise
+                self.stats["retries"] += 1
+                logger.warning(
+                    f"[RateLimiter:{self.name}] Retrying after {type(exc).__name__} "
+                    f"(attempt {attempt + 1}/{RATE_LIMIT_MAX_RETRIES})"
+                )
+        raise RuntimeError("unreachable")
+
+    async def _call(
+        self, call: Callable[[], Awaitable[T]], timeout: Optional[float]
+    ) -> T:
+        if not timeout:
+            return await call()
+        try:
+            return await asyncio.wait_for(call(), timeout=timeout)
+        except asyncio.TimeoutError as exc:
+            raise CallDeadlineExceeded(
+                f"[RateLimiter:{self.name}] call exceeded {timeout:.1f}s"
+            ) from exc
+
+    # ==================== FEEDBACK ====================
+
+    def record_success(self):
+        """Additive increase: about +1 slot per `concurrency` successful calls."""
+        self.concurrency = min(
+            float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency
+        )
+
+    def record_rate_limited(self, retry_after: Optional[float] = None):
+        """Multiplicative decrease, plus a global pause when the provider asks."""
+        self.stats["rate_limited"] += 1
+        self.concurrency = max(float(self.min_concurrency), self.concurrency / 2)
+        pause = retry_after if retry_after is not None else RATE_LIMIT_BACKOFF_SECONDS
+        self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        logger.warning(
+            f"[RateLimiter:{self.name}] 429 received. Concurrency -> "
+            f"{int(self.concurrency)}, pausing {pause:.1f}s"
+        )
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Corrects the token bucket once the provider reports real usage."""
+        if self.tokens_per_minute:
+            self._token_bucket -= actual_tokens - estimated_tokens
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """
+        Applies OpenAI-style rate-limit headers:
+        x-ratelimit-{limit,remaining,reset}-{requests,tokens} and Retry-After.
+        """
+        lowered = {str(k).lower(): v for k, v in headers.items()}
+
+        limit_requests = _to_float(lowered.get("x-ratelimit-limit-requests"))
+        limit_tokens = _to_float(lowered.get("x-ratelimit-limit-tokens"))
+        if limit_requests:
+            self.requests_per_minute = limit_requests
+        if limit_tokens:
+            self.tokens_per_minute = limit_tokens
+
+        self._refill()
+        remaining_requests = _to_float(lowered.get("x-ratelimit-remaining-requests"))
+        remaining_tokens = _to_float(lowered.get("x-ratelimit-remaining-tokens"))
+        if remaining_requests is not None and self.requests_per_minute:
+            self._request_bucket = min(self._request_bucket, remaining_requests)
+        if remaining_tokens is not None and self.tokens_per_minute:
+            self._token_bucket = min(self._token_bucket, remaining_tokens)
+
+        # Exhausted budgets: wait for the provider-announced reset
+        for remaining, reset_key in (
+            (remaining_requests, "x-ratelimit-reset-requests"),
+            (remaining_tokens, "x-ratelimit-reset-tokens"),
+        ):
+            if remaining is not None and remaining <= 0:
+                reset = parse_reset_duration(lowered.get(reset_key))
+                if reset:
+                    self._blocked_until = max(
+                        self._blocked_until, time.monotonic() + reset
+                    )
+
+    # ==================== BUCKETS ====================
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_bucket = min(
+                self.requests_per_minute,
+                self._request_bucket + elapsed * self.requests_per_minute / 60,
+            )
+        if self.tokens_per_minute:
+            self._token_bucket = min(
+                self.tokens_per_minute,
+                self._token_bucket + elapsed * self.tokens_per_minute / 60,
+            )
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Takes one request and `tokens` from the buckets.
+        Returns 0 on success, otherwise the seconds to wait before retrying.
+        """
+        self._refill()
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+
+        waits = [0.0]
+        if self.requests_per_minute and self._request_bucket < 1:
+            waits.append((1 - self._request_bucket) * 60 / self.requests_per_minute)
+        # A prompt larger than the whole bucket only waits for a full bucket
+        needed_tokens = min(tokens, self.tokens_per_minute or 0)
+        if self.tokens_per_minute and self._token_bucket < needed_tokens:
+            waits.append(
+                (needed_tokens - self._token_bucket) * 60 / self.tokens_per_minute
+            )
+
+        wait = max(waits)
+        if wait > 0:
+            return wait
+
+        if self.requests_per_minute:
+            self._request_bucket -= 1
+        if self.tokens_per_minute:
+            self._token_bucket -= needed_tokens
+        return 0.0
+
+    def _retry_after(
+        self, headers: Optional[Mapping[str, str]], attempt: int
+    ) -> Optional[float]:
+        if headers:
+            lowered = {str(k).lower(): v for k, v in headers.items()}
+            retry_ms = _to_float(lowered.get("retry-after-ms"))
+            if retry_ms is not None:
+                return retry_ms / 1000
+            retry_after = parse_reset_duration(lowered.get("retry-after"))
+            if retry_after is not None:
+                return retry_after
+        return RATE_LIMIT_BACKOFF_SECONDS * (2**attempt)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the current limits and counters for reporting."""
+        return {
+            "concurrency": int(self.concurrency),
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            **{k: round(v, 2) if isinstance(v, float) else v for k, v in self.stats.items()},
+        }
+
+
+def _to_float(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+
+
+def get_rate_limiter(provider: str, model: str) -> RateLimiter:
+    """
+    Returns the process-wide limiter for a provider/model pair.
+    Every caller hitting the same model shares one set of buckets.
+    Limits come from `settings.rate_limits`, falling back to the provider's
+    entry in RATE_LIMITS_BY_PROVIDER and then to RATE_LIMIT_DEFAULTS.
+    """
+    key = (provider.lower(), model)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        overrides = {k.lower(): v for k, v in settings.rate_limits.items()}
+        config = {
+            **RATE_LIMIT_DEFAULTS,
+            **RATE_LIMITS_BY_PROVIDER.get(key[0], {}),
+            **{
+                name: value
+                for name, value in overrides.get(key[0], {}).items()
+                if name in RATE_LIMIT_DEFAULTS
+            },
+        }
+        limiter = RateLimiter(name=f"{key[0]}/{model}", **config)
+        _limiters[key] = limiter
+    return limiter
+
+
+def get_rate_limiter_for_client(client: Any) -> RateLimiter:
+    """Resolves the shared limiter from a client's `provider` and `model`."""
+    provider = getattr(client, "provider", None) or "default"
+    model = getattr(client, "model", None) or "default"
+    return get_rate_limiter(provider, model)
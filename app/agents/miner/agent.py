@@ -2,6 +2,7 @@ from typing import Dict, Any, Optional, List, Tuple
 import json
 from app.agents.core.base import BaseLLMClient
 from app.agents.agent_executor import AgentExecutor
+from app.agents.core.rate_limiter import CallDeadlineExceeded
 from app.core.logger import get_logger
 from .prompts import MINER_SYSTEM_PROMPT
 from .schema import MinerOutput, MinerBatchOutput
@@ -23,39 +24,53 @@ class MinerAgent:
     - Analyze individual or batched source files.
     - extract structured 'MinerOutput' containing conclusions about the code.
     - Ensure isolation between file analyses to prevent context leakage and high token costs.
+
+    Every call runs on its own AgentExecutor, so one MinerAgent can serve any
+    number of concurrent `analyze_file` / `analyze_batch` calls.
     """
 
     def __init__(self, client: BaseLLMClient, on_event: Optional[Callable] = None):
         self.client = client
-        self.executor = AgentExecutor(client=client, on_event=on_event)
-        self.executor.set_system_prompt(MINER_SYSTEM_PROMPT)
+        self.on_event = on_event
+
+    def _new_executor(self) -> AgentExecutor:
+        """
+        Creates the isolated conversation for a single call.
+        Messages, tools and tool callbacks live only as long as that call, so
+        concurrent calls cannot see each other's content or callbacks.
+        """
+        executor = AgentExecutor(client=self.client, on_event=self.on_event)
+        executor.set_system_prompt(MINER_SYSTEM_PROMPT)
+        return executor
 
     async def analyze_file(
-        self, file_path: str, file_content: str
+        self, file_path: str, file_content: str, part: Optional[str] = None
     ) -> Optional[MinerOutput]:
         """
         Analyzes a single source file to extract key architectural conclusions.
+        `part` describes the slice being analyzed when a large file is mined
+        in chunks (e.g. "lines 120-340, part 2 of 4").
 
         This method:
-        1. Resets the executor state to ensure a clean context window (CRITICAL for cost).
+        1. Creates a fresh executor so the context window holds only this file (CRITICAL for cost).
         2. Injects the file content into the prompt.
         3. Forces the LLM to use the `submit_conclusions` tool.
         4. Returns the structured output or attempts a fallback parsing if tool calling fails.
         """
-        # CRITICAL: Reset executor state to prevent message accumulation across files
-        # Without this, each file analysis carries the ENTIRE history of all previous files,
-        # causing token usage to grow exponentially and multiply costs dramatically.
-        self.executor.set_system_prompt(MINER_SYSTEM_PROMPT)
-        self.executor.tools_definitions = []
-        self.executor.tools_registry = {}
+        # CRITICAL: a fresh executor per file prevents message accumulation across files.
+        # A shared one would carry the ENTIRE history of all previous files, causing
+        # token usage to grow dramatically, and would mix up concurrent calls.
+        executor = self._new_executor()
 
+        part_line = f"Part: {part}\n" if part else ""
         user_message = (
-            f"File Context:\nPath: {file_path}\nContent:\n```\n{file_content}\n```"
+            f"File Context:\nPath: {file_path}\n{part_line}"
+            f"Content:\n```\n{file_content}\n```"
         )
-        self.executor.add_user_message(user_message)
+        executor.add_user_message(user_message)
 
         # 1. Add instruction to force standardized output
-        self.executor.add_user_message(
+        executor.add_user_message(
             "Analyze the code above and submit your conclusions immediately using the 'submit_conclusions' tool."
         )
 
@@ -98,11 +113,11 @@ class MinerAgent:
             return "Conclusions successfully submitted."
 
         # 4. Register the tool
-        self.executor.register_tool(submit_tool_def, submit_conclusions)
+        executor.register_tool(submit_tool_def, submit_conclusions, terminal=True)
 
         try:
             # 5. Run the Agent
-            last_response = await self.executor.run_until_complete()
+            last_response = await executor.run_until_complete()
             logger.info(f"DEBUG - Raw Response: {last_response}")
 
             # 6. Retrieve the captured data
@@ -148,6 +163,9 @@ class MinerAgent:
 
             return None
 
+        except CallDeadlineExceeded:
+            # The pipeline retries timed-out calls (see MinerPipeline)
+            raise
         except Exception as e:
             logger.error(f"Miner failed to analyze {file_path}: {e}")
             return None
@@ -159,15 +177,20 @@ class MinerAgent:
         Analyzes a batch of files and extracts conclusions in a single shot.
         files: List of (file_path, file_content) tuples
         """
-        # 1. Reset executor for new session
-        self.executor.messages = [{"role": "system", "content": MINER_SYSTEM_PROMPT}]
+        # 1. Fresh executor for this batch (see analyze_file)
+        executor = self._new_executor()
 
         # 2. Build Multi-File Context
-        context_str = "Analyze the following files:\n\n"
-        for path, content in files:
-            context_str += f"=== FILE: {path} ===\n{content}\n====================\n\n"
+        context_str = "Analyze the following files:\n\n" + "".join(
+            f"=== FILE: {path} ===\n{content}\n====================\n\n"
+            for path, content in files
+        )
 
-        self.executor.add_user_message(context_str)
+        executor.add_user_message(context_str)
+        executor.add_user_message(
+            "Analyze each file above and submit your conclusions for ALL of them in a single "
+            "'submit_batch_results' call, with one result per file using its exact path."
+        )
 
         # 3. Define the Batch Tool
         submit_tool_def = {
@@ -189,11 +212,11 @@ class MinerAgent:
             extraction_result["data"] = {"results": results}
             return "Batch submitted."
 
-        self.executor.register_tool(submit_tool_def, submit_batch_results)
+        executor.register_tool(submit_tool_def, submit_batch_results, terminal=True)
 
         try:
             # 5. Execute
-            last_response = await self.executor.run_until_complete()
+            last_response = await executor.run_until_complete()
             logger.info(f"DEBUG Batch Response: {last_response}")
 
             if extraction_result["data"]:
@@ -227,6 +250,8 @@ class MinerAgent:
 
             return None
 
+        except CallDeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Batch analysis failed: {e}")
             return None
@@ -1,61 +1,149 @@
-import os
-from collections import defaultdict
-from typing import Dict, Any, Optional, List, Callable
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Callable, Set
 
 from app.agents.core.base import BaseLLMClient
 from app.agents.agent_executor import AgentExecutor
+from app.core.bm25 import tokenize
+from app.core.config import settings
+from app.core.constants import SCRIBE_QUERY_MODULE_WEIGHT
+from app.core.fact_index import FactIndex
 from app.core.logger import get_logger
 from app.agents.architect.schema import WikiPageDetail
 from .prompts import SCRIBE_ARCHITECTURE_PROMPT, SCRIBE_REFERENCE_PROMPT
+from .streaming import JsonStringFieldStream
 from app.core.tokenizer import Tokenizer
 
 logger = get_logger(__name__)
 
+# Output schema of every page, part of the input digest
+_PAGE_SCHEMA = json.dumps(WikiPageDetail.model_json_schema(), sort_keys=True)
+
+
+@dataclass
+class ScribePageInput:
+    """Everything a page is written from: prompts, facts and model."""
+
+    page_id: str
+    page_type: str
+    page_title: str
+    target_modules: List[str]
+    system_prompt: str
+    user_message: str
+    model: str
+    # Sub-page summaries in the prompt, and the fingerprint of the facts the
+    # page is written about (FactIndex.fingerprint of its source modules)
+    summaries: str = ""
+    source_facts: str = ""
+    token_budget: int = 0
+
+    @property
+    def digest(self) -> str:
+        """
+        Identifies the inputs of a page across runs. Equal digests mean the
+        page would be written from the same facts, prompt, schema and model.
+
+        The facts are those of the page's own modules (of every module with
+        relevant facts for a page matching none), not the ranked selection in
+        `user_message`: a sequential run ranks against the whole project while
+        a pipelined run ranks against the page's modules only, and both must
+        stamp a page identically. A change elsewhere in the project that would
+        only alter the cross-module facts of a page leaves it fresh.
+        """
+        raw = "\x00".join(
+            [
+                self.model,
+                _PAGE_SCHEMA,
+                self.system_prompt,
+                self.page_title,
+                "\x01".join(self.target_modules),
+                self.summaries,
+                self.source_facts,
+                str(self.token_budget),
+            ]
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
 
 class ScribeAgent:
-    def __init__(self, client: BaseLLMClient, on_event: Optional[Callable] = None):
+    def __init__(
+        self,
+        client: BaseLLMClient,
+        on_event: Optional[Callable] = None,
+        fact_index: Optional[FactIndex] = None,
+        on_content: Optional[Callable[[str, Optional[str]], Any]] = None,
+    ):
         self.client = client
         self.on_event = on_event
+        # Streaming mode: called as on_content(page_id, delta) with each new
+        # piece of a page's content_markdown while it is generated, and with
+        # delta=None when a retried attempt starts the page over
+        self.on_content = on_content
+        # Built once per pipeline run and shared by every page; when missing
+        # it is built from the `miner_output` passed to write_page
+        self.fact_index = fact_index
+        # Page inputs assembled by prepare_page, awaiting their write_page
+        self._prepared: Dict[str, ScribePageInput] = {}
 
-    def _group_by_module(self, data: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
-        """Groups file analyses by their parent directory (module)."""
-        modules = defaultdict(list)
-        for item in data:
-            file_path = item.get("file", "")
-            parent_dir = os.path.dirname(file_path)
-            if not parent_dir:
-                parent_dir = "root"
-            modules[parent_dir].append(item)
-        return modules
+    @staticmethod
+    def _module_matches(mod_target: str, mod_key: str) -> bool:
+        """Match if ALL parts of a page target appear in a module path."""
+        # Normalize the target: 'modules-scanner' -> ['modules', 'scanner']
+        target_parts = mod_target.lower().replace("_", "-").split("-")
+        # Normalize the module path: 'ira/app/modules/scanner' -> ['ira', 'app', 'modules', 'scanner']
+        key_parts = mod_key.lower().replace("\\", "/").split("/")
+        return all(part in key_parts for part in target_parts)
+
+    @classmethod
+    def depends_on_modules(
+        cls, target_modules: List[str], module_keys: Set[str]
+    ) -> bool:
+        """True if a page targeting `target_modules` draws facts from any of `module_keys`."""
+        return any(
+            cls._module_matches(mod_target, mod_key)
+            for mod_target in target_modules
+            for mod_key in module_keys
+        )
+
+    @staticmethod
+    def _page_query(
+        page_id: str, page_title: str, target_modules: List[str]
+    ) -> Dict[str, float]:
+        query = {term: 1.0 for term in tokenize(f"{page_title} {page_id}")}
+        for term in tokenize(" ".join(target_modules)):
+            query.setdefault(term, SCRIBE_QUERY_MODULE_WEIGHT)
+        return query
 
     async def _prepare_facts(
-        self, modules_map: Dict[str, List[Any]], target_modules: List[str]
+        self,
+        fact_index: FactIndex,
+        target_modules: List[str],
+        page_id: str = "",
+        page_title: str = "",
+        token_budget: Optional[int] = None,
+        placeholder: bool = True,
     ) -> str:
-        """Concatenate facts for the target modules.
-        Uses fuzzy matching because target_modules are page IDs (e.g. 'modules-scanner')
-        while modules_map keys are directory paths (e.g. 'ira/app/modules/scanner').
+        """Select the facts most relevant to a page, within the token budget.
+        Facts are ranked with BM25 against the page title and ID (full weight)
+        and the page's navigation modules (lower weight). Facts of modules whose
+        path matches a target (e.g. 'modules-scanner' -> 'ira/app/modules/scanner')
+        are boosted, so they come first, but relevant facts elsewhere still count.
+        Without `placeholder`, a page with no relevant facts gets "".
         """
-        text = ""
+        query = self._page_query(page_id, page_title, target_modules)
 
-        for mod_target in target_modules:
-            # Normalize the target: 'modules-scanner' -> ['modules', 'scanner']
-            target_parts = mod_target.lower().replace("_", "-").split("-")
-
-            for mod_key, mod_files in modules_map.items():
-                # Normalize the module path: 'ira/app/modules/scanner' -> ['ira', 'app', 'modules', 'scanner']
-                key_parts = mod_key.lower().replace("\\", "/").split("/")
-
-                # Match if ALL target parts appear in the key path
-                if all(part in key_parts for part in target_parts):
-                    text += f"=== MODULE: {mod_key} ===\n"
-                    for f in mod_files:
-                        fname = f.get("file", "")
-                        text += f"\nFILE: {fname}\n"
-                        for c in f.get("conclusions", []):
-                            text += f"- [{c.get('topic')}]: {c.get('statement')}\n"
+        # Ranking (and counting every fact on first use) runs off the event loop
+        text = await Tokenizer.offload(
+            fact_index.select_context,
+            query,
+            settings.scribe_context_token_budget if token_budget is None else token_budget,
+            target_modules,
+        )
 
         # Fallback: if no matches found, do NOT include all facts to save cost.
-        if not text:
+        if not text and placeholder:
             text = "No specific technical facts found for this module."
             logger.warning(
                 f"No matching modules found for targets: {target_modules}. Sending empty context."
@@ -63,45 +151,136 @@ class ScribeAgent:
 
         return text
 
-    async def write_page(
+    async def prepare_page(
         self,
         page_id: str,
-        page_type: str,  # 'page' (generic), 'architecture_overview', 'module_reference'
+        page_type: str,
         page_title: str,
         target_modules: List[str],
         miner_output: Dict[str, Any],
-    ) -> Optional[WikiPageDetail]:
+        fact_index: Optional[FactIndex] = None,
+        child_summaries: Optional[List[Dict[str, str]]] = None,
+    ) -> "ScribePageInput":
         """
-        Generates the content for a single wiki page.
+        Assembles the exact prompt a page would be written from, without
+        calling the LLM. The result is kept for the next `write_page` of the
+        same page, so callers can check the input digest before writing.
+        `fact_index` overrides the shared index for this page only.
+
+        `child_summaries` ({"id", "title", "summary"} of already-written
+        sub-pages) make this a synthesis page: it is written from those
+        summaries plus only the facts of modules no sub-page covers, instead
+        of sending the sub-pages' raw facts again.
         """
-        logger.info(
-            f"Scribe is writing page '{page_title}' ({page_type}). Target modules: {target_modules}"
+        fact_index = (
+            fact_index
+            or self.fact_index
+            or FactIndex.from_miner_output(miner_output)
         )
+        summaries = ""
+        if child_summaries:
+            summaries = "".join(
+                f"### {child['title']} ({child['id']})\n{child['summary'].strip()}\n\n"
+                for child in child_summaries
+            )
+            covered = {
+                key for child in child_summaries for key in fact_index.match(child["id"])
+            }
+            fact_index = fact_index.subset(k for k in fact_index.modules if k not in covered)
 
-        # 1. Prepare Context
-        raw_results = miner_output.get("results", [])
-        modules_map = self._group_by_module(raw_results)
+        token_budget = max(
+            0,
+            settings.scribe_context_token_budget - await Tokenizer.count_async(summaries),
+        )
+        relevant_facts = await self._prepare_facts(
+            fact_index,
+            target_modules,
+            page_id=page_id,
+            page_title=page_title,
+            token_budget=token_budget,
+            placeholder=not summaries,
+        )
 
-        relevant_facts = await self._prepare_facts(modules_map, target_modules)
+        # The digest covers the page's own modules; a page matching none is
+        # written from whatever is relevant, so it covers those modules instead
+        source_modules = fact_index.match_any(target_modules) or await Tokenizer.offload(
+            fact_index.relevant_modules,
+            self._page_query(page_id, page_title, target_modules),
+        )
 
         # Safety Limit (Tokens)
         # GPT-4o-mini has 128k context. Let's reserve 20k for output/system prompts.
         # So we can safely use ~100k input tokens.
         MAX_INPUT_TOKENS = 100_000
 
-        relevant_facts = Tokenizer.truncate(relevant_facts, MAX_INPUT_TOKENS)
+        relevant_facts = await Tokenizer.truncate_async(relevant_facts, MAX_INPUT_TOKENS)
 
-        # 2. Select Prompt
+        # Select Prompt
         if "overview" in page_type.lower() or "architecture" in page_title.lower():
             system_prompt = SCRIBE_ARCHITECTURE_PROMPT
         else:
             system_prompt = SCRIBE_REFERENCE_PROMPT
 
-        executor = AgentExecutor(client=self.client, on_event=self.on_event)
-        executor.set_system_prompt(system_prompt)
+        page_input = ScribePageInput(
+            page_id=page_id,
+            page_type=page_type,
+            page_title=page_title,
+            target_modules=list(target_modules),
+            system_prompt=system_prompt,
+            user_message=self._user_message(page_title, relevant_facts, summaries),
+            model=getattr(self.client, "model", "") or "",
+            summaries=summaries,
+            source_facts=fact_index.fingerprint(source_modules),
+            token_budget=token_budget,
+        )
+        self._prepared[page_id] = page_input
+        return page_input
+
+    @staticmethod
+    def _user_message(page_title: str, facts: str, summaries: str = "") -> str:
+        message = f"Page Title: {page_title}\n\n"
+        if summaries:
+            message += (
+                "SUB-PAGE SUMMARIES (these pages are already written; treat the "
+                "summaries as facts, explain how the parts fit together and link "
+                "each page as [Title](page-id) instead of repeating its details):\n"
+                f"{summaries}"
+            )
+            if not facts:
+                return message.rstrip() + "\n"
+        return message + f"TECHNICAL FACTS:\n{facts}"
+
+    async def write_page(
+        self,
+        page_id: str,
+        page_type: str,  # 'page' (generic), 'architecture_overview', 'module_reference'
+        page_title: str,
+        target_modules: List[str],
+        miner_output: Dict[str, Any],
+    ) -> Optional[WikiPageDetail]:
+        """
+        Generates the content for a single wiki page.
+        """
+        logger.info(
+            f"Scribe is writing page '{page_title}' ({page_type}). Target modules: {target_modules}"
+        )
+
+        # 1. Prepare Context (reusing the input of a prior prepare_page call)
+        page_input = self._prepared.pop(page_id, None)
+        if page_input is None or (
+            page_input.page_type,
+            page_input.page_title,
+            page_input.target_modules,
+        ) != (page_type, page_title, list(target_modules)):
+            page_input = await self.prepare_page(
+                page_id, page_type, page_title, target_modules, miner_output
+            )
+            self._prepared.pop(page_id, None)
 
-        user_msg = f"Page Title: {page_title}\n\nTECHNICAL FACTS:\n{relevant_facts}"
-        executor.add_user_message(user_msg)
+        # 2. Prompt
+        executor = AgentExecutor(client=self.client, on_event=self.on_event)
+        executor.set_system_prompt(page_input.system_prompt)
+        executor.add_user_message(page_input.user_message)
 
         # 3. Output Schema
         submit_tool = {
@@ -119,10 +298,11 @@ class ScribeAgent:
             result["data"] = kwargs
             return "Saved."
 
-        executor.register_tool(submit_tool, submit_page)
+        executor.register_tool(submit_tool, submit_page, terminal=True)
 
         try:
-            await executor.run_until_complete(max_iterations=2)
+            on_delta = self._content_forwarder(page_id) if self.on_content else None
+            await executor.run_until_complete(max_iterations=2, on_delta=on_delta)
             if result["data"]:
                 # Ensure the ID from argument matches result or force it?
                 # Ideally the LLM respects it, but let's override to be safe.
@@ -134,3 +314,35 @@ class ScribeAgent:
             logger.error(f"Scribe failed to write page {page_id}: {e}")
 
         return None
+
+    def _content_forwarder(self, page_id: str) -> Callable[[Dict[str, Any]], Any]:
+        """
+        Turns streamed LLM deltas into content_markdown deltas for `on_content`.
+        The page arrives as submit_page arguments or, for models that answer
+        with JSON text, in the reply content; both are decoded as they stream.
+        """
+        state = {"attempts": 0, "arguments": None, "text": None}
+
+        async def forward(delta: Optional[str]):
+            result = self.on_content(page_id, delta)
+            if asyncio.iscoroutine(result):
+                await result
+
+        async def on_delta(event: Dict[str, Any]):
+            if event.get("start"):
+                if state["attempts"]:
+                    await forward(None)
+                state["attempts"] += 1
+                state["arguments"] = JsonStringFieldStream("content_markdown")
+                state["text"] = JsonStringFieldStream("content_markdown")
+                return
+            if "tool_call" in event and event.get("name") in (None, "", "submit_page"):
+                piece = state["arguments"].feed(event.get("arguments") or "")
+            elif "content" in event:
+                piece = state["text"].feed(event["content"])
+            else:
+                return
+            if piece:
+                await forward(piece)
+
+        return on_delta
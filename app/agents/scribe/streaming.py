@@ -0,0 +1,70 @@
+import json
+import re
+from typing import List, Optional
+
+# First byte of a high surrogate (U+D800-U+DBFF) in a \u escape
+_HIGH_SURROGATE_PREFIXES = ("d8", "d9", "da", "db")
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JsonStringFieldStream:
+    """
+    Decodes one string field out of a JSON object that arrives in pieces,
+    such as the arguments of a streamed tool call.
+
+    `feed` returns the newly decoded characters of the field's value, so the
+    text can be shown while the rest of the object is still being generated.
+    Escape sequences split across pieces are held back until complete.
+    """
+
+    def __init__(self, field: str):
+        self._key = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ""
+        # Index in the buffer of the next undecoded character of the value
+        self._pos: Optional[int] = None
+        self.done = False
+
+    def feed(self, piece: str) -> str:
+        if self.done or not piece:
+            return ""
+        self._buffer += piece
+        if self._pos is None:
+            match = self._key.search(self._buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        out: List[str] = []
+        buf, i, n = self._buffer, self._pos, len(self._buffer)
+        while i < n:
+            ch = buf[i]
+            if ch == '"':
+                self.done = True
+                i += 1
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            if i + 1 >= n:
+                break
+            esc = buf[i + 1]
+            if esc == "u":
+                if i + 6 > n:
+                    break
+                # Surrogate pairs come as two \u escapes; decode them together
+                high = buf[i + 2 : i + 4].lower()
+                size = 12 if high in _HIGH_SURROGATE_PREFIXES else 6
+                if i + size > n:
+                    break
+                try:
+                    out.append(json.loads(f'"{buf[i : i + size]}"'))
+                except ValueError:
+                    # Malformed escape: show it as written
+                    out.append(buf[i : i + size])
+                i += size
+                continue
+            out.append(_ESCAPES.get(esc, esc))
+            i += 2
+        self._pos = i
+        return "".join(out)
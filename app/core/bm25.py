@@ -0,0 +1,78 @@
+import re
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.constants import BM25_B, BM25_K1
+
+_CAMEL_CASE = re.compile(r"([a-z0-9])([A-Z])")
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "an and are as at be by for from in is it of on or that the this to with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased alphanumeric terms. camelCase, snake_case, kebab-case and path
+    separators all split, so 'app/agents/MinerAgent' -> app, agents, miner, agent.
+    """
+    words = _WORD.findall(_CAMEL_CASE.sub(r"\1 \2", text).lower())
+    return [w for w in words if len(w) > 1 and w not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of documents, stored as posting lists.
+
+    Postings are sorted by term, and each one already carries its BM25 term
+    weight (idf times the saturated, length-normalized term frequency), so
+    scoring a query is a vectorized scatter-add per query term.
+    """
+
+    def __init__(self, documents: List[List[str]], k1: float = BM25_K1, b: float = BM25_B):
+        self.size = len(documents)
+        self.vocabulary: Dict[str, int] = {}
+
+        doc_ids: List[int] = []
+        term_ids: List[int] = []
+        for doc_id, terms in enumerate(documents):
+            for term in terms:
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                doc_ids.append(doc_id)
+
+        n_docs = max(self.size, 1)
+        docs = np.asarray(doc_ids, dtype=np.int64)
+        terms = np.asarray(term_ids, dtype=np.int64)
+        doc_len = np.bincount(docs, minlength=n_docs).astype(np.float64)
+        avg_len = doc_len.mean() if doc_len.size and doc_len.mean() > 0 else 1.0
+
+        # One posting per distinct (term, doc) pair, ordered by term then doc
+        pairs, tf = np.unique(terms * n_docs + docs, return_counts=True)
+        posting_terms = pairs // n_docs
+        self._posting_docs = pairs % n_docs
+        self._indptr = np.searchsorted(
+            posting_terms, np.arange(len(self.vocabulary) + 1)
+        )
+
+        df = np.diff(self._indptr).astype(np.float64)
+        idf = np.log1p((self.size - df + 0.5) / (df + 0.5))
+        norm = k1 * (1 - b + b * doc_len / avg_len)
+        tf = tf.astype(np.float64)
+        self._posting_weights = (
+            idf[posting_terms] * tf * (k1 + 1) / (tf + norm[self._posting_docs])
+        )
+
+    def scores(self, query: Dict[str, float]) -> np.ndarray:
+        """BM25 score of every document for weighted query terms."""
+        scores = np.zeros(self.size, dtype=np.float64)
+        for term, weight in query.items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self._indptr[term_id], self._indptr[term_id + 1]
+            # Docs are unique within a posting list, so plain fancy-index add is safe
+            scores[self._posting_docs[start:end]] += (
+                weight * self._posting_weights[start:end]
+            )
+        return scores
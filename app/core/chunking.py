@@ -0,0 +1,172 @@
+import ast
+import math
+import re
+import zlib
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import List, Set, Tuple
+
+from app.core.tokenizer import Tokenizer
+
+# Lines as ast / tokenize count them: only \r\n, \r and \n end a line
+# (str.splitlines also splits on \f, \v, \x1c-\x1e, \x85, \u2028, \u2029)
+_LINE_RE = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+\Z")
+
+# Lines that close a block rather than start a new top-level declaration
+_CLOSING_PREFIXES = ("}", ")", "]")
+
+# Content-defined cut points: once a chunk holds at least 1/_MIN_FILL_DIVISOR
+# of the budget, a new chunk starts at any segment whose first line (usually
+# a signature) has a checksum divisible by _CUT_MODULUS. Cuts depend on
+# declarations only, so editing a body changes just the chunk it lands in
+# unless that chunk grows past the budget.
+_MIN_FILL_DIVISOR = 4
+_CUT_MODULUS = 3
+
+
+def split_lines(content: str) -> List[str]:
+    """`content.splitlines(keepends=True)`, with the line breaks `ast` counts."""
+    return _LINE_RE.findall(content)
+
+
+@dataclass
+class CodeChunk:
+    """A contiguous slice of a source file, cut along syntax boundaries."""
+
+    text: str
+    # 1-based, inclusive line range within the original file
+    start_line: int
+    end_line: int
+    tokens: int
+
+
+def _python_boundaries(content: str, lines: List[str]) -> Set[int]:
+    """
+    Split points (0-based line indexes) for Python: every top-level statement
+    and every member of a class body, so an oversized class can still be cut
+    between methods. Decorators and the comments right above a definition
+    stay attached to it.
+    """
+    tree = ast.parse(content)
+    boundaries: Set[int] = set()
+
+    def visit(body: List[ast.stmt]):
+        for node in body:
+            decorators = getattr(node, "decorator_list", [])
+            start = min([node.lineno] + [d.lineno for d in decorators]) - 1
+            while start > 0 and lines[start - 1].lstrip().startswith("#"):
+                start -= 1
+            boundaries.add(start)
+            if isinstance(node, ast.ClassDef):
+                visit(node.body)
+
+    visit(tree.body)
+    return boundaries
+
+
+def _brace_boundaries(lines: List[str]) -> Set[int]:
+    """
+    Split points for brace languages (and indentation-only formats): lines
+    that start at brace depth 0, are not indented and do not close a block.
+    String contents are not lexed, so braces inside literals may shift the
+    depth; the worst case is a chunk that ends mid-block.
+    """
+    boundaries: Set[int] = set()
+    depth = 0
+    for idx, line in enumerate(lines):
+        stripped = line.strip()
+        if (
+            depth == 0
+            and stripped
+            and not line[0].isspace()
+            and not stripped.startswith(_CLOSING_PREFIXES)
+        ):
+            boundaries.add(idx)
+        depth = max(0, depth + line.count("{") - line.count("}"))
+    return boundaries
+
+
+def _split_lines_evenly(
+    start: int, end: int, tokens: int, max_tokens: int
+) -> List[range]:
+    """Fallback for a segment with no usable boundary: equal line windows."""
+    parts = math.ceil(tokens / max_tokens)
+    size = math.ceil((end - start) / parts)
+    return [range(i, min(i + size, end)) for i in range(start, end, size)]
+
+
+def _is_cut_point(first_line: str) -> bool:
+    checksum = zlib.crc32(first_line.strip().encode("utf-8"))
+    return checksum % _CUT_MODULUS == 0
+
+
+def split_into_chunks(
+    content: str, file_path: str, max_tokens: int
+) -> List[CodeChunk]:
+    """
+    Splits a source file into chunks of at most ~`max_tokens` tokens.
+
+    Files that fit are returned as a single chunk. Otherwise the file is cut
+    at syntax boundaries (top-level definitions and class members via `ast`
+    for Python, brace depth / indentation heuristics elsewhere) and adjacent
+    segments are packed up to the budget, closing chunks at content-defined
+    points so that editing one function leaves the other chunks unchanged.
+    A segment that alone exceeds the budget is split into equal line windows.
+    """
+    total_tokens = Tokenizer.count(content)
+    lines = split_lines(content)
+    if total_tokens <= max_tokens or len(lines) < 2:
+        return [CodeChunk(content, 1, max(1, len(lines)), total_tokens)]
+
+    boundaries: Set[int] = set()
+    if PurePosixPath(file_path).suffix.lower() == ".py":
+        try:
+            boundaries = _python_boundaries(content, lines)
+        except (SyntaxError, ValueError):
+            boundaries = set()
+    if not boundaries:
+        boundaries = _brace_boundaries(lines)
+    boundaries.add(0)
+
+    def count_lines(span: range) -> int:
+        return Tokenizer.count("".join(lines[span.start : span.stop]))
+
+    cuts = sorted(b for b in boundaries if 0 <= b < len(lines)) + [len(lines)]
+    segments: List[Tuple[range, int]] = []
+    for start, end in zip(cuts, cuts[1:]):
+        span = range(start, end)
+        tokens = count_lines(span)
+        if tokens > max_tokens:
+            segments.extend(
+                (window, count_lines(window))
+                for window in _split_lines_evenly(start, end, tokens, max_tokens)
+            )
+        elif span:
+            segments.append((span, tokens))
+
+    chunks: List[CodeChunk] = []
+    current_start = None
+    current_end = 0
+    current_tokens = 0
+    min_fill = max_tokens // _MIN_FILL_DIVISOR
+
+    def close():
+        text = "".join(lines[current_start:current_end])
+        chunks.append(CodeChunk(text, current_start + 1, current_end, current_tokens))
+
+    for segment, seg_tokens in segments:
+        if current_start is not None and (
+            current_tokens + seg_tokens > max_tokens
+            or (current_tokens >= min_fill and _is_cut_point(lines[segment.start]))
+        ):
+            close()
+            current_start = None
+        if current_start is None:
+            current_start, current_tokens = segment.start, 0
+        current_end = segment.stop
+        current_tokens += seg_tokens
+
+    if current_start is not None:
+        close()
+
+    return chunks
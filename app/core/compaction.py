@@ -0,0 +1,734 @@
+import ast
+import io
+import re
+import tokenize
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.chunking import split_lines
+from app.core.constants import (
+    COMPACT_COLLECTION_KEEP_ITEMS,
+    COMPACT_COMMENT_KEEP_LINES,
+    COMPACT_DOCSTRING_KEEP_LINES,
+    COMPACT_LITERAL_KEEP_CHARS,
+    COMPACT_MAX_COLLECTION_ITEMS,
+    COMPACT_MAX_COMMENT_LINES,
+    COMPACT_MAX_DOCSTRING_LINES,
+    COMPACT_MAX_LITERAL_CHARS,
+)
+from app.core.tokenizer import Tokenizer
+
+_LICENSE_RE = re.compile(
+    r"copyright|licen[cs]e|spdx-license-identifier|all rights reserved|"
+    r"permission is hereby granted",
+    re.IGNORECASE,
+)
+
+_SCRIPT_SUFFIXES = {".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".mts", ".cts"}
+
+_NON_CODE_TOKENS = {
+    tokenize.COMMENT,
+    tokenize.NL,
+    tokenize.NEWLINE,
+    tokenize.ENCODING,
+    tokenize.INDENT,
+    tokenize.DEDENT,
+    tokenize.ENDMARKER,
+}
+
+# Tokens of the placeholder left where a function body was elided
+_PLACEHOLDER_TOKENS = 8
+
+
+@dataclass
+class CompactedSource:
+    """Miner input after compaction, with its size before and after."""
+
+    text: str
+    tokens: int
+    original_tokens: int
+    # Function bodies replaced by a placeholder to fit the token budget
+    bodies_elided: int = 0
+    bodies_kept: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.tokens)
+
+    @property
+    def skeleton(self) -> bool:
+        return self.bodies_elided > 0
+
+
+@dataclass
+class _Edit:
+    """Replaces content[start:end] (character offsets) with `text`."""
+
+    start: int
+    end: int
+    text: str
+
+
+@dataclass
+class _Body:
+    """A function body that can be elided to fit the budget."""
+
+    edit: _Edit
+    public: bool
+
+
+def _apply(content: str, edits: List[_Edit]) -> str:
+    """Applies non-overlapping edits; an edit inside an earlier one is dropped."""
+    parts: List[str] = []
+    position = 0
+    for edit in sorted(edits, key=lambda e: (e.start, -e.end)):
+        if edit.start < position:
+            continue
+        parts.append(content[position : edit.start])
+        parts.append(edit.text)
+        position = edit.end
+    parts.append(content[position:])
+    return "".join(parts)
+
+
+def _line_starts(lines: List[str]) -> List[int]:
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line))
+    return starts
+
+
+def _indent(line: str) -> str:
+    return line[: len(line) - len(line.lstrip())]
+
+
+def _truncate_literal(body: str, quote: str) -> str:
+    kept = body[:COMPACT_LITERAL_KEEP_CHARS]
+    # Never end on a dangling escape
+    while kept.endswith("\\"):
+        kept = kept[:-1]
+    return f"{quote}{kept}...{quote}"
+
+
+# ==================== PYTHON ====================
+
+
+class _PythonPlanner:
+    """Plans the edits of a Python file from its AST and comment tokens."""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.lines = split_lines(content)
+        self.starts = _line_starts(self.lines)
+        self.tree = ast.parse(content)
+        self.edits: List[_Edit] = []
+        self.bodies: List[_Body] = []
+        self._docstrings: Set[int] = set()
+
+    def offset(self, lineno: int, col: int) -> int:
+        """Character offset of an AST position (columns are UTF-8 bytes)."""
+        line = self.lines[lineno - 1]
+        if not line.isascii():
+            col = len(line.encode("utf-8")[:col].decode("utf-8", errors="ignore"))
+        return self.starts[lineno - 1] + col
+
+    def span(self, node: ast.AST) -> Tuple[int, int]:
+        return (
+            self.offset(node.lineno, node.col_offset),
+            self.offset(node.end_lineno, node.end_col_offset),
+        )
+
+    def plan(self) -> Tuple[List[_Edit], List[_Body]]:
+        self._comments()
+        self._docstring(self.tree, module=True)
+        self._definitions(self.tree.body)
+        self._visit(self.tree)
+        return self.edits, self.bodies
+
+    def _comments(self):
+        """License header, and long runs of comment-only lines."""
+        try:
+            tokens = list(tokenize.generate_tokens(io.StringIO(self.content).readline))
+        except (tokenize.TokenError, SyntaxError):
+            return
+        # Runs of consecutive comment-only lines (1-based rows)
+        runs: List[List[int]] = []
+        header_runs = None
+        for tok in tokens:
+            if tok.type == tokenize.COMMENT and not tok.line[: tok.start[1]].strip():
+                row = tok.start[0]
+                if runs and runs[-1][-1] == row - 1:
+                    runs[-1].append(row)
+                else:
+                    runs.append([row])
+            elif tok.type not in _NON_CODE_TOKENS and header_runs is None:
+                header_runs = len(runs)
+        for index, rows in enumerate(runs):
+            self._comment_run(rows, header=header_runs is None or index < header_runs)
+
+    def _comment_run(self, rows: List[int], header: bool):
+        # Shebang and encoding cookie stay
+        while rows and (
+            self.lines[rows[0] - 1].startswith("#!")
+            or re.match(r"^[ \t\f]*#.*?coding[:=]", self.lines[rows[0] - 1])
+        ):
+            rows = rows[1:]
+        if not rows:
+            return
+        text = "".join(self.lines[r - 1] for r in rows)
+        start, end = self.starts[rows[0] - 1], self.starts[rows[-1]]
+        if header and _LICENSE_RE.search(text):
+            self.edits.append(_Edit(start, end, ""))
+        elif len(rows) > COMPACT_MAX_COMMENT_LINES:
+            keep = rows[COMPACT_COMMENT_KEEP_LINES]
+            indent = _indent(self.lines[keep - 1])
+            omitted = len(rows) - COMPACT_COMMENT_KEEP_LINES
+            self.edits.append(
+                _Edit(
+                    self.starts[keep - 1],
+                    end,
+                    f"{indent}# ... ({omitted} more comment lines)\n",
+                )
+            )
+
+    def _docstring(self, node: ast.AST, module: bool = False):
+        body = getattr(node, "body", None)
+        if not (
+            body
+            and isinstance(body[0], ast.Expr)
+            and isinstance(body[0].value, ast.Constant)
+            and isinstance(body[0].value.value, str)
+        ):
+            return
+        doc = body[0].value
+        self._docstrings.add(id(doc))
+        start, end = self.span(doc)
+        segment = self.content[start:end]
+        quote = re.match(r"[rRuU]*(\"\"\"|''')", segment)
+        first_paragraph = doc.value.strip().split("\n\n")[0]
+        if module and _LICENSE_RE.search(first_paragraph):
+            line_end = self.starts[min(doc.end_lineno, len(self.lines))]
+            self.edits.append(_Edit(self.starts[doc.lineno - 1], line_end, ""))
+            return
+        lines = segment.split("\n")
+        if not quote or len(lines) <= COMPACT_MAX_DOCSTRING_LINES:
+            return
+
+        # The first paragraph, up to COMPACT_DOCSTRING_KEEP_LINES lines
+        kept = [lines[0]]
+        for line in lines[1:COMPACT_DOCSTRING_KEEP_LINES]:
+            if not line.strip() and kept[-1].strip() not in ("", quote.group(0)):
+                break
+            kept.append(line)
+        indent = " " * doc.col_offset
+        self.edits.append(
+            _Edit(start, end, "\n".join(kept) + f"\n{indent}...\n{indent}{quote.group(1)}")
+        )
+
+    def _definitions(self, body: List[ast.stmt]):
+        """Docstrings and elidable bodies of module- and class-level definitions."""
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                self._docstring(node)
+                self._definitions(node.body)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self._docstring(node)
+                self._function_body(node)
+
+    def _function_body(self, node: ast.AST):
+        statements = node.body
+        if statements and id(getattr(statements[0], "value", None)) in self._docstrings:
+            statements = statements[1:]
+        if not statements or statements[0].lineno == node.lineno:
+            return
+        first, last = statements[0].lineno, node.end_lineno
+        start = self.starts[first - 1]
+        end = self.starts[last] if last < len(self.lines) else len(self.content)
+        newline = "\n" if self.content[start:end].endswith("\n") else ""
+        placeholder = (
+            f"{_indent(self.lines[first - 1])}...  # {last - first + 1} lines omitted{newline}"
+        )
+        public = not node.name.startswith("_") or node.name.startswith("__")
+        self.bodies.append(_Body(_Edit(start, end, placeholder), public))
+
+    def _visit(self, node: ast.AST):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.JoinedStr):
+                continue
+            if isinstance(child, ast.Constant) and id(child) not in self._docstrings:
+                self._literal(child)
+            elif isinstance(child, (ast.List, ast.Tuple, ast.Set, ast.Dict)):
+                if self._collection(child):
+                    continue
+            self._visit(child)
+
+    def _literal(self, node: ast.Constant):
+        if not isinstance(node.value, (str, bytes)):
+            return
+        start, end = self.span(node)
+        if end - start <= COMPACT_MAX_LITERAL_CHARS:
+            return
+        if isinstance(node.value, str):
+            value = node.value[:COMPACT_LITERAL_KEEP_CHARS] + "..."
+        else:
+            value = node.value[:COMPACT_LITERAL_KEEP_CHARS] + b"..."
+        self.edits.append(_Edit(start, end, repr(value)))
+
+    def _collection(self, node: ast.AST) -> bool:
+        """Collapses a large literal data table; True when it was collapsed."""
+        if isinstance(node, ast.Dict):
+            if None in node.keys:
+                return False
+            items = list(zip(node.keys, node.values))
+            elements = [e for pair in items for e in pair]
+        else:
+            items = [(e,) for e in node.elts]
+            elements = node.elts
+        if len(items) <= COMPACT_MAX_COLLECTION_ITEMS or not all(map(_is_data, elements)):
+            return False
+        start, end = self.span(node)
+        opener, closer = self.content[start], self.content[end - 1]
+        if opener + closer not in ("[]", "()", "{}"):
+            return False
+
+        kept = []
+        for item in items[:COMPACT_COLLECTION_KEEP_ITEMS]:
+            parts = [self.content[slice(*self.span(e))] for e in item]
+            kept.append(": ".join(parts))
+        indent = _indent(self.lines[node.lineno - 1])
+        omitted = len(items) - len(kept)
+        self.edits.append(
+            _Edit(
+                start,
+                end,
+                f"{opener}{', '.join(kept)},  # ... {omitted} more items\n{indent}{closer}",
+            )
+        )
+        return True
+
+
+def _is_data(node: ast.AST) -> bool:
+    """Literal-like values: constants, names and nested literal collections."""
+    if isinstance(node, (ast.Constant, ast.Name)):
+        return True
+    if isinstance(node, ast.Attribute):
+        return _is_data(node.value)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        return isinstance(node.operand, ast.Constant)
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return all(map(_is_data, node.elts))
+    if isinstance(node, ast.Dict):
+        return None not in node.keys and all(map(_is_data, node.keys + node.values))
+    return False
+
+
+# ==================== JAVASCRIPT / TYPESCRIPT ====================
+
+# Previous significant characters after which "/" starts a regex literal
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {
+    "return", "typeof", "case", "do", "else", "in", "of", "new", "delete",
+    "void", "throw", "yield", "await",
+}
+_CONTROL_KEYWORDS = {"if", "for", "while", "switch", "catch", "with"}
+_RETURN_TYPE_RE = re.compile(r"\)\s*:\s*[\w$.<>\[\]|&,\s?]+$")
+_DATA_LINE_RE = re.compile(r"^[\s\w$\"'`.:,\-+\[\]{}]*$")
+# Braces of these hold declarations (imports, types), not data
+_DECLARATION_RE = re.compile(
+    r"\b(import|export\s*\{|interface|type|enum|class|namespace|module)\b"
+)
+
+
+@dataclass
+class _ScriptTokens:
+    """What the lexer found outside of (and including) strings and comments."""
+
+    # (start, end) of comments; True for /* */ blocks
+    comments: List[Tuple[int, int, bool]]
+    # (start, end, has_substitutions) of string and template literals
+    strings: List[Tuple[int, int, bool]]
+    # Matching bracket positions, by opening position
+    brackets: Dict[int, int]
+    # Opening position by closing position (for parentheses)
+    parens: Dict[int, int]
+    balanced: bool
+
+
+def _lex_script(content: str) -> _ScriptTokens:
+    """
+    A small JS/TS lexer: comments, string/template/regex literals and
+    bracket pairs. Quotes that do not close on their line (e.g. apostrophes
+    in JSX text) are taken as plain characters.
+    """
+    comments: List[Tuple[int, int, bool]] = []
+    strings: List[Tuple[int, int, bool]] = []
+    brackets: Dict[int, int] = {}
+    parens: Dict[int, int] = {}
+    stack: List[Tuple[str, int]] = []
+    # Brace depths at which a template substitution resumes its template
+    templates: List[int] = []
+    balanced = True
+    last = ""
+    last_word = ""
+    i, n = 0, len(content)
+
+    def scan_template(start: int) -> Tuple[int, bool]:
+        """From after a backtick or "}": the end of the template part."""
+        j = start
+        while j < n:
+            ch = content[j]
+            if ch == "\\":
+                j += 2
+                continue
+            if ch == "`":
+                return j + 1, False
+            if ch == "$" and content.startswith("${", j):
+                return j + 2, True
+            j += 1
+        return n, False
+
+    while i < n:
+        ch = content[i]
+        if ch.isspace():
+            i += 1
+            continue
+        if content.startswith("//", i):
+            end = content.find("\n", i)
+            end = n if end < 0 else end
+            comments.append((i, end, False))
+            i = end
+            continue
+        if content.startswith("/*", i):
+            end = content.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            comments.append((i, end, True))
+            i = end
+            continue
+        if ch in "'\"":
+            j = i + 1
+            while j < n and content[j] not in (ch, "\n"):
+                j += 2 if content[j] == "\\" else 1
+            if j < n and content[j] == ch:
+                strings.append((i, j + 1, False))
+                i, last, last_word = j + 1, ch, ""
+                continue
+            i, last, last_word = i + 1, ch, ""
+            continue
+        if ch == "`" or (ch == "}" and templates and len(stack) == templates[-1]):
+            if ch == "}":
+                templates.pop()
+            end, substitution = scan_template(i + 1)
+            if substitution:
+                templates.append(len(stack))
+            strings.append((i, end, substitution or ch == "}"))
+            i, last, last_word = end, "`", ""
+            continue
+        if ch == "/" and (not last or last in _REGEX_PRECEDERS or last_word in _REGEX_KEYWORDS):
+            j, in_class = i + 1, False
+            while j < n and content[j] != "\n":
+                c = content[j]
+                if c == "\\":
+                    j += 2
+                    continue
+                if c == "[":
+                    in_class = True
+                elif c == "]":
+                    in_class = False
+                elif c == "/" and not in_class:
+                    break
+                j += 1
+            if j < n and content[j] == "/":
+                j += 1
+                while j < n and content[j].isalpha():
+                    j += 1
+                strings.append((i, j, False))
+                i, last, last_word = j, "/", ""
+                continue
+        if ch in "([{":
+            stack.append((ch, i))
+        elif ch in ")]}":
+            if not stack or "([{"[")]}".index(ch)] != stack[-1][0]:
+                balanced = False
+            else:
+                _, start = stack.pop()
+                brackets[start] = i
+                if ch == ")":
+                    parens[i] = start
+        if ch.isalnum() or ch in "_$":
+            j = i
+            while j < n and (content[j].isalnum() or content[j] in "_$"):
+                j += 1
+            last, last_word = content[j - 1], content[i:j]
+            i = j
+            continue
+        last, last_word = ch, ""
+        i += 1
+
+    return _ScriptTokens(comments, strings, brackets, parens, balanced and not stack)
+
+
+class _ScriptPlanner:
+    """Plans the edits of a JavaScript / TypeScript file from its tokens."""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.lines = split_lines(content)
+        self.starts = _line_starts(self.lines)
+        self.tokens = _lex_script(content)
+        self.edits: List[_Edit] = []
+        self.bodies: List[_Body] = []
+
+    def line_of(self, offset: int) -> int:
+        """0-based line index of a character offset."""
+        lo, hi = 0, len(self.starts) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.starts[mid] <= offset:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def plan(self) -> Tuple[List[_Edit], List[_Body]]:
+        self._comments()
+        self._literals()
+        if self.tokens.balanced:
+            self._collections()
+            self._function_bodies()
+        return self.edits, self.bodies
+
+    def _own_line(self, start: int) -> bool:
+        line = self.line_of(start)
+        return not self.content[self.starts[line] : start].strip()
+
+    def _code_start(self) -> int:
+        """Offset of the first code after the shebang and leading comments."""
+        position = self.content.find("\n") + 1 if self.content.startswith("#!") else 0
+        for start, end, _ in self.tokens.comments:
+            if self.content[position:start].strip():
+                break
+            position = end
+        return position + len(self.content[position:]) - len(self.content[position:].lstrip())
+
+    def _comments(self):
+        runs: List[List[Tuple[int, int, bool]]] = []
+        for comment in self.tokens.comments:
+            start, end, block = comment
+            if not self._own_line(start):
+                continue
+            previous = runs[-1][-1] if runs else None
+            if (
+                previous
+                and not block
+                and not previous[2]
+                and self.line_of(start) == self.line_of(previous[0]) + 1
+            ):
+                runs[-1].append(comment)
+            else:
+                runs.append([comment])
+
+        code_start = self._code_start()
+        for run in runs:
+            start, end = run[0][0], run[-1][1]
+            text = self.content[start:end]
+            if start < code_start and _LICENSE_RE.search(text):
+                line_end = self.content.find("\n", end)
+                self.edits.append(
+                    _Edit(
+                        self.starts[self.line_of(start)],
+                        len(self.content) if line_end < 0 else line_end + 1,
+                        "",
+                    )
+                )
+                continue
+            if run[0][2]:
+                lines = text.split("\n")
+                if len(lines) > COMPACT_MAX_COMMENT_LINES:
+                    omitted = len(lines) - COMPACT_COMMENT_KEEP_LINES
+                    kept = "\n".join(lines[:COMPACT_COMMENT_KEEP_LINES])
+                    self.edits.append(_Edit(start, end, f"{kept} ... ({omitted} more lines) */"))
+            elif len(run) > COMPACT_MAX_COMMENT_LINES:
+                keep_start = run[COMPACT_COMMENT_KEEP_LINES][0]
+                omitted = len(run) - COMPACT_COMMENT_KEEP_LINES
+                self.edits.append(
+                    _Edit(keep_start, end, f"// ... ({omitted} more comment lines)")
+                )
+
+    def _literals(self):
+        for start, end, substitution in self.tokens.strings:
+            quote = self.content[start]
+            if (
+                substitution
+                or quote not in "'\"`"
+                or end - start <= COMPACT_MAX_LITERAL_CHARS
+            ):
+                continue
+            body = self.content[start + 1 : end - 1]
+            self.edits.append(_Edit(start, end, _truncate_literal(body, quote)))
+
+    def _collections(self):
+        """Collapses long multi-line array / object literals of plain data."""
+        collapsed_until = -1
+        for open_at, close_at in sorted(self.tokens.brackets.items()):
+            if open_at < collapsed_until or self.content[open_at] not in "[{":
+                continue
+            first, last = self.line_of(open_at), self.line_of(close_at)
+            inner = range(first + 1, last)
+            if len(inner) <= COMPACT_MAX_COLLECTION_ITEMS:
+                continue
+            if not self.lines[last].lstrip().startswith(self.content[close_at]):
+                continue
+            prefix = self.content[self.starts[first] : open_at]
+            if _DECLARATION_RE.search(prefix):
+                continue
+            if not self._is_data(open_at + 1, close_at):
+                continue
+            keep = first + 1 + COMPACT_COLLECTION_KEEP_ITEMS
+            omitted = last - keep
+            indent = _indent(self.lines[keep])
+            self.edits.append(
+                _Edit(
+                    self.starts[keep],
+                    self.starts[last],
+                    f"{indent}// ... {omitted} more lines\n",
+                )
+            )
+            collapsed_until = close_at
+
+    def _is_data(self, start: int, end: int) -> bool:
+        """Only literals, keys, commas and nested brackets between the two offsets."""
+        parts: List[str] = []
+        position = start
+        for s, e, _ in self.tokens.strings:
+            if s >= start and e <= end:
+                parts.append(self.content[position:s])
+                parts.append('""')
+                position = e
+        parts.append(self.content[position:end])
+        text = "".join(parts)
+        for s, e, _ in self.tokens.comments:
+            if s >= start and e <= end:
+                text = text.replace(self.content[s:e], "")
+        return bool(_DATA_LINE_RE.match(text)) and "=>" not in text
+
+    def _function_bodies(self):
+        body_until = -1
+        for open_at, close_at in sorted(self.tokens.brackets.items()):
+            if open_at < body_until or self.content[open_at] != "{":
+                continue
+            first, last = self.line_of(open_at), self.line_of(close_at)
+            if last - first < 2:
+                continue
+            name = self._function_name(open_at)
+            if name is None:
+                continue
+            omitted = last - first - 1
+            self.bodies.append(
+                _Body(
+                    _Edit(open_at + 1, close_at, f" /* ... {omitted} lines omitted */ "),
+                    public=not name.startswith(("_", "#")),
+                )
+            )
+            body_until = close_at
+
+    def _function_name(self, open_at: int) -> Optional[str]:
+        """The function's name if `{` opens a function body ("" if anonymous)."""
+        close_at = open_at - 1
+        while close_at >= 0 and self.content[close_at].isspace():
+            close_at -= 1
+        if self.content[close_at - 1 : close_at + 1] == "=>":
+            return ""
+        if self.content[close_at] != ")":
+            # TypeScript return type: "): Promise<Item[]> {"
+            window = max(0, open_at - 200)
+            typed = _RETURN_TYPE_RE.search(self.content[window:open_at])
+            if not typed:
+                return None
+            close_at = window + typed.start()
+        paren = self.tokens.parens.get(close_at)
+        if paren is None:
+            return None
+        word = re.search(r"([A-Za-z_$#][\w$]*)\s*$", self.content[max(0, paren - 100) : paren])
+        if word and word.group(1) in _CONTROL_KEYWORDS:
+            return None
+        return word.group(1) if word and word.group(1) != "function" else ""
+
+
+# ==================== ENTRY POINT ====================
+
+
+def _plan(content: str, file_path: str) -> Tuple[List[_Edit], List[_Body]]:
+    suffix = PurePosixPath(file_path).suffix.lower()
+    if suffix == ".py":
+        try:
+            return _PythonPlanner(content).plan()
+        except (SyntaxError, ValueError, RecursionError):
+            return [], []
+    if suffix in _SCRIPT_SUFFIXES:
+        return _ScriptPlanner(content).plan()
+    return [], []
+
+
+def compact_source(
+    content: str,
+    file_path: str,
+    max_tokens: int,
+    original_tokens: Optional[int] = None,
+) -> CompactedSource:
+    """
+    Compacts a source file for the Miner prompt (Python via `ast`, JS/TS
+    via a small lexer; other files are returned unchanged):
+    - license headers are dropped;
+    - long comment runs, docstrings, string literals and literal data
+      tables (arrays, dicts) are cut to their first lines / items;
+    - if the file still exceeds `max_tokens`, it becomes a skeleton:
+      imports, decorators, signatures and class bodies stay, and function
+      bodies are kept (public first, then smallest first) only while they
+      fit; the others become a one-line placeholder.
+    A skeleton whose signatures alone exceed the budget is returned as is,
+    for the caller to chunk.
+    """
+    if original_tokens is None:
+        original_tokens = Tokenizer.count(content)
+    edits, bodies = _plan(content, file_path)
+    if not edits and not bodies:
+        return CompactedSource(content, original_tokens, original_tokens)
+
+    text = _apply(content, edits)
+    tokens = Tokenizer.count(text) if edits else original_tokens
+    if tokens <= max_tokens or not bodies:
+        return CompactedSource(text, tokens, original_tokens)
+
+    skeleton = _apply(content, edits + [b.edit for b in bodies])
+    base = Tokenizer.count(skeleton)
+    if base >= max_tokens:
+        return CompactedSource(skeleton, base, original_tokens, bodies_elided=len(bodies))
+
+    # Bodies by priority; each costs its text minus the placeholder it replaces
+    costs = Tokenizer.count_batch([content[b.edit.start : b.edit.end] for b in bodies])
+    order = sorted(range(len(bodies)), key=lambda i: (not bodies[i].public, costs[i]))
+    room = max_tokens - base
+    kept: List[int] = []
+    for i in order:
+        cost = max(0, costs[i] - _PLACEHOLDER_TOKENS)
+        if cost <= room:
+            kept.append(i)
+            room -= cost
+
+    # Counts of separate pieces are approximate: drop bodies until it fits
+    while True:
+        kept_set = set(kept)
+        elided = [b.edit for i, b in enumerate(bodies) if i not in kept_set]
+        text = _apply(content, edits + elided)
+        tokens = Tokenizer.count(text)
+        if tokens <= max_tokens or not kept:
+            break
+        kept.pop()
+    return CompactedSource(
+        text,
+        tokens,
+        original_tokens,
+        bodies_elided=len(bodies) - len(kept),
+        bodies_kept=len(kept),
+    )
@@ -20,6 +20,65 @@ class Settings(BaseSettings):
     # Gemini Configuration
     gemini_api_key: str | None = None
 
+    # Miner batch mode: token budget per batched request (0 disables batching)
+    miner_batch_token_budget: int = 6000
+
+    # Compact Miner input: drop license headers, cut long comments, literals
+    # and data tables, and reduce oversized files to a skeleton. Opt-in:
+    # compacted files use their own Miner cache keys, so enabling it re-mines
+    # files cached without it
+    miner_compaction: bool = False
+
+    # Miner straggler control: base deadline per LLM call (0 disables) and an
+    # optional second provider/model used to retry calls that time out
+    miner_call_timeout_seconds: float = 60.0
+    miner_fallback_provider: str | None = None
+    miner_fallback_model: str | None = None
+
+    # Token budget of the Miner facts packed into each Scribe page prompt
+    scribe_context_token_budget: int = 12_000
+
+    # Stream Scribe page content to WebSocket clients while it is generated
+    scribe_streaming: bool = True
+
+    # Collapse near-duplicate Miner facts (per module for Scribe pages,
+    # across the project for the Architect) before building prompts
+    fact_dedup: bool = True
+
+    # Write Scribe pages bottom-up: overview and parent pages are built from
+    # the summaries of their already-written sub-pages instead of raw facts
+    scribe_hierarchical: bool = True
+
+    # Architect fast path: plan small / conventional repositories from the
+    # directory layout and technology scan instead of LLM calls
+    architect_heuristic_planner: bool = True
+
+    # Run Miner, Architect and Scribe as a dependency graph: planning starts
+    # on a sample of mined files, pages once their modules are mined
+    pipelined_phases: bool = True
+
+    # Calibrate Gemini / Ollama token estimates from the prompt token counts
+    # the providers report, persisted across restarts at this path
+    token_calibration: bool = True
+    token_calibration_path: str = "output/token_calibration.json"
+
+    # Directory of tiktoken encoding files (tiktoken's cache layout, filled by
+    # scripts/fetch_tiktoken_encodings.py) for network-free cold starts; used
+    # unless TIKTOKEN_CACHE_DIR is set. Preload them when the API starts.
+    tiktoken_cache_dir: str | None = None
+    tokenizer_preload: bool = True
+
+    # Cross-project Miner fact store: least recently used entries are evicted
+    # beyond this many entries or this much serialized data
+    fact_store_max_entries: int = 200_000
+    fact_store_max_mb: int = 256
+
+    # Per-provider overrides of the shared rate limiter (RATE_LIMITS_BY_PROVIDER
+    # in app/core/constants.py), as JSON keyed by provider, e.g.
+    # IRA_RATE_LIMITS='{"gemini": {"requests_per_minute": 1000, "max_concurrency": 16}}'.
+    # Keys left out keep their defaults; null disables a bucket.
+    rate_limits: dict[str, dict[str, int | None]] = {}
+
     model_config = SettingsConfigDict(
         env_file=".env", env_prefix="IRA_", extra="ignore"
     )
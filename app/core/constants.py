@@ -172,10 +172,177 @@ COST_PER_MILLION_OUTPUT_TOKENS = {
 # Default safety limit for maximum estimated cost (USD)
 DEFAULT_MAX_COST_USD = 1.00
 
-# Miner concurrency and rate control
-MINER_CONCURRENCY_LIMIT = 3
-MINER_RATE_DELAY_SECONDS = 1.5
+# Miner worker pool size. Actual LLM concurrency is governed by the shared
+# RateLimiter, so this only bounds how many calls may wait on it at once.
+MINER_WORKER_POOL_SIZE = 16
 
-# Token limits for truncation
+# Shared LLM rate limiter, one instance per provider/model.
+# requests/tokens per minute of None disable that bucket; concurrency starts
+# at initial_concurrency and moves between min and max with AIMD.
+# The defaults apply to unknown providers (no quota, concurrency only).
+# These are conservative defaults: override them per provider with the
+# IRA_RATE_LIMITS setting (see app/core/config.py) to match the account's tier.
+RATE_LIMIT_DEFAULTS = {
+    "requests_per_minute": None,
+    "tokens_per_minute": None,
+    "max_concurrency": 8,
+    "initial_concurrency": 3,
+    "min_concurrency": 1,
+}
+RATE_LIMITS_BY_PROVIDER = {
+    # Tier-1 OpenAI limits; replaced by x-ratelimit-* headers after the first call
+    "openai": {
+        "requests_per_minute": 500,
+        "tokens_per_minute": 200_000,
+        "max_concurrency": 16,
+        "initial_concurrency": 4,
+    },
+    # Free-tier Gemini limits; paid keys allow far more, see IRA_RATE_LIMITS
+    "gemini": {
+        "requests_per_minute": 15,
+        "tokens_per_minute": 1_000_000,
+        "max_concurrency": 4,
+        "initial_concurrency": 2,
+    },
+    # Local models: no quota, only bounded by the host's throughput
+    "ollama": {
+        "requests_per_minute": None,
+        "tokens_per_minute": None,
+        "max_concurrency": 4,
+        "initial_concurrency": 2,
+    },
+}
+# Retries for 429 / transient errors and the base of the exponential backoff
+RATE_LIMIT_MAX_RETRIES = 5
+RATE_LIMIT_BACKOFF_SECONDS = 2.0
+
+# Streaming Miner pipeline: reader pool size, max file contents buffered
+# between stages, and how many results are persisted per cache write
+MINER_READER_POOL_SIZE = 4
+MINER_QUEUE_SIZE = 16
+MINER_CACHE_FLUSH_SIZE = 25
+
+# Walked paths held in the size-ordered (LPT) scheduling window. Only paths
+# are buffered, not contents, so this can be much larger than the queues.
+MINER_SCHEDULE_WINDOW = 512
+
+# Deadline allowance per 1k prompt tokens, added to
+# settings.miner_call_timeout_seconds for every Miner call
+MINER_CALL_TIMEOUT_SECONDS_PER_1K_TOKENS = 15
+
+# Estimated output tokens produced by the Miner for each file
+MINER_OUTPUT_TOKENS_PER_FILE = 200
+
+# Miner batch mode: files up to this size are bin-packed into shared
+# requests (the per-request budget is settings.miner_batch_token_budget)
+MINER_BATCH_MAX_FILE_TOKENS = 1500
+# Tokens of framing added around each file inside a batch prompt
+MINER_BATCH_FILE_OVERHEAD_TOKENS = 20
+# Small files are buffered until they fill this many batches, then packed
+MINER_BATCH_WINDOW_BATCHES = 4
+
+# Version tag of the Miner prompt/schema, part of the per-file cache key.
+# Bump it whenever MINER_SYSTEM_PROMPT or MinerOutput changes so that
+# previously mined facts are invalidated.
+MINER_PROMPT_VERSION = "1"
+
+# Token limits for truncation. Files above MINER_MAX_TOKENS_PER_FILE are
+# split into chunks of at most that size (see app/core/chunking.py), each
+# mined and cached on its own, instead of being cut off
 MINER_MAX_TOKENS_PER_FILE = 3000
+
+# Miner input compaction (settings.miner_compaction, app/core/compaction.py):
+# license headers are dropped; comment runs over COMPACT_MAX_COMMENT_LINES,
+# docstrings over COMPACT_MAX_DOCSTRING_LINES, string literals over
+# COMPACT_MAX_LITERAL_CHARS and literal data tables over
+# COMPACT_MAX_COLLECTION_ITEMS items (or lines, for JS/TS) keep only their
+# beginning. Files still above MINER_MAX_TOKENS_PER_FILE become a skeleton
+# with as many function bodies as fit. The version tag is part of the Miner
+# cache key while compaction is on; bump it when the rules change.
+MINER_COMPACTION_VERSION = "compact-1"
+COMPACT_MAX_COMMENT_LINES = 6
+COMPACT_COMMENT_KEEP_LINES = 2
+COMPACT_MAX_DOCSTRING_LINES = 8
+COMPACT_DOCSTRING_KEEP_LINES = 4
+COMPACT_MAX_LITERAL_CHARS = 200
+COMPACT_LITERAL_KEEP_CHARS = 80
+COMPACT_MAX_COLLECTION_ITEMS = 12
+COMPACT_COLLECTION_KEEP_ITEMS = 3
+# Files listed with their savings in the Miner cost report
+MINER_COMPACTION_REPORT_FILES = 20
 SCRIBE_MAX_INPUT_TOKENS = 100_000
+
+# Scribe context selection: Miner facts are ranked with BM25 against the
+# page (title and id at full weight, the page's navigation modules at
+# SCRIBE_QUERY_MODULE_WEIGHT), facts of modules matching the page get
+# SCRIBE_MODULE_MATCH_BOOST on top, and the ranking is scaled by impact
+# before packing into settings.scribe_context_token_budget
+BM25_K1 = 1.5
+BM25_B = 0.75
+SCRIBE_QUERY_MODULE_WEIGHT = 0.5
+SCRIBE_MODULE_MATCH_BOOST = 2.0
+SCRIBE_IMPACT_WEIGHTS = {"HIGH": 1.5, "MEDIUM": 1.0, "LOW": 0.6}
+
+# Tokenizer: exact token counts of texts of at least
+# TOKENIZER_COUNT_CACHE_MIN_CHARS are memoized by content digest in an LRU of
+# TOKENIZER_COUNT_CACHE_SIZE entries (shorter texts encode faster than they hash)
+TOKENIZER_COUNT_CACHE_SIZE = 8192
+TOKENIZER_COUNT_CACHE_MIN_CHARS = 512
+# Threads of the tokenizer pool that runs encoding off the event loop (the
+# *_async API), and tiktoken batch-encode threads per batch
+TOKENIZER_THREADS = 4
+# Self-calibrating estimates for providers without a local tokenizer (Gemini,
+# Ollama): chars/token ratios observed from reported prompt usage replace the
+# defaults after TOKENIZER_CALIBRATION_MIN_CALLS prompts. Ratios outside the
+# bounds (e.g. prompts served from a provider-side cache) are ignored, and
+# the running sums are halved past TOKENIZER_CALIBRATION_WINDOW_TOKENS
+TOKENIZER_CALIBRATION_MIN_CALLS = 3
+TOKENIZER_CALIBRATION_MIN_CHARS_PER_TOKEN = 1.0
+TOKENIZER_CALIBRATION_MAX_CHARS_PER_TOKEN = 8.0
+TOKENIZER_CALIBRATION_WINDOW_TOKENS = 2_000_000
+
+# Near-duplicate fact collapsing (settings.fact_dedup): conclusions are
+# MinHashed over word shingles and bucketed with LSH (FACT_DEDUP_BANDS bands
+# of FACT_DEDUP_NUM_PERM / FACT_DEDUP_BANDS rows); bucket mates whose
+# estimated Jaccard similarity reaches FACT_DEDUP_THRESHOLD are merged into
+# one fact listing its source files (at most FACT_DEDUP_MAX_LISTED_SOURCES
+# shown in prompts)
+FACT_DEDUP_NUM_PERM = 64
+FACT_DEDUP_BANDS = 16
+FACT_DEDUP_SHINGLE_SIZE = 2
+FACT_DEDUP_THRESHOLD = 0.7
+FACT_DEDUP_MAX_LISTED_SOURCES = 5
+
+# Architect map-reduce planning for large repositories. When the file list
+# given to subsystem detection exceeds ARCHITECT_DIRECT_CONTEXT_TOKENS, each
+# directory subtree fitting ARCHITECT_SUBTREE_TOKEN_BUDGET is summarized
+# (map), and the summaries are merged up the directory tree (reduce); a
+# level whose merged summaries exceed ARCHITECT_REDUCE_TOKEN_BUDGET is
+# condensed by one more call. Bump the version when the prompt changes.
+ARCHITECT_DIRECT_CONTEXT_TOKENS = 50_000
+ARCHITECT_SUBTREE_TOKEN_BUDGET = 8_000
+ARCHITECT_REDUCE_TOKEN_BUDGET = 6_000
+ARCHITECT_SUMMARY_PROMPT_VERSION = "1"
+
+# Deterministic Architect fast path. The navigation is derived from the
+# module map, scanner ecosystems and topics, and used instead of the two LLM
+# planning calls when its confidence reaches ARCHITECT_HEURISTIC_MIN_CONFIDENCE.
+# Past ARCHITECT_HEURISTIC_MAX_MODULES modules, confidence shrinks in proportion.
+ARCHITECT_HEURISTIC_MIN_CONFIDENCE = 0.7
+ARCHITECT_HEURISTIC_MAX_MODULES = 12
+
+# Pipelined phases (settings.pipelined_phases): the Architect starts once the
+# walk is done and this share of the files, at least the minimum count and at
+# least one file of every top-level directory, has been mined
+PIPELINE_ARCHITECT_SAMPLE_FRACTION = 0.3
+PIPELINE_ARCHITECT_MIN_SAMPLE_FILES = 20
+# With the heuristic planner, layouts it could still plan confidently (the
+# size factor alone stays above ARCHITECT_HEURISTIC_MIN_CONFIDENCE) also wait
+# for one mined file per module: its pages and confidence are per module
+PIPELINE_ARCHITECT_MODULE_COVERAGE_LIMIT = int(
+    ARCHITECT_HEURISTIC_MAX_MODULES / ARCHITECT_HEURISTIC_MIN_CONFIDENCE
+)
+
+# Scribe pages written concurrently. Actual request pacing comes from the
+# shared per-provider RateLimiter, so this only caps pages in flight.
+SCRIBE_WORKER_POOL_SIZE = 6
@@ -0,0 +1,164 @@
+import hashlib
+import io
+import tokenize
+from pathlib import PurePosixPath
+from typing import List
+
+# Languages whose comments use C-style `//` and `/* */` delimiters
+C_STYLE_COMMENT_EXTENSIONS = {
+    ".js",
+    ".jsx",
+    ".mjs",
+    ".cjs",
+    ".ts",
+    ".tsx",
+    ".java",
+    ".kt",
+    ".scala",
+    ".go",
+    ".rs",
+    ".c",
+    ".h",
+    ".cpp",
+    ".hpp",
+    ".cc",
+    ".cs",
+    ".swift",
+    ".php",
+    ".dart",
+    ".css",
+    ".scss",
+    ".less",
+}
+
+# Languages / config formats whose comments are full lines starting with `#`
+HASH_COMMENT_EXTENSIONS = {
+    ".sh",
+    ".bash",
+    ".rb",
+    ".yml",
+    ".yaml",
+    ".toml",
+    ".ini",
+    ".cfg",
+    ".conf",
+    ".r",
+    ".pl",
+}
+HASH_COMMENT_FILENAMES = {"Dockerfile", "Makefile", "Gemfile", "Procfile"}
+
+
+def _strip_python_comments(content: str) -> str:
+    """
+    Rebuilds Python source from its token stream without comments or layout.
+    Indentation is kept as INDENT/DEDENT markers so that block structure still
+    affects the digest, while the exact whitespace width does not.
+    """
+    parts: List[str] = []
+    readline = io.StringIO(content).readline
+    for tok in tokenize.generate_tokens(readline):
+        if tok.type in (tokenize.COMMENT, tokenize.NL, tokenize.ENDMARKER):
+            continue
+        if tok.type == tokenize.NEWLINE:
+            parts.append("\n")
+        elif tok.type == tokenize.INDENT:
+            parts.append("<INDENT>\n")
+        elif tok.type == tokenize.DEDENT:
+            parts.append("<DEDENT>\n")
+        else:
+            parts.append(tok.string + " ")
+    return "".join(parts)
+
+
+def _strip_c_style_comments(content: str) -> str:
+    """Removes `//` and `/* */` comments while leaving string literals intact."""
+    out: List[str] = []
+    i = 0
+    n = len(content)
+    quote = None
+
+    while i < n:
+        ch = content[i]
+
+        if quote:
+            out.append(ch)
+            if ch == "\\" and i + 1 < n:
+                out.append(content[i + 1])
+                i += 2
+                continue
+            if ch == quote:
+                quote = None
+            i += 1
+            continue
+
+        if ch in ("'", '"', "`"):
+            quote = ch
+            out.append(ch)
+            i += 1
+            continue
+
+        if ch == "/" and i + 1 < n:
+            nxt = content[i + 1]
+            if nxt == "/":
+                end = content.find("\n", i)
+                i = n if end == -1 else end
+                continue
+            if nxt == "*":
+                end = content.find("*/", i + 2)
+                i = n if end == -1 else end + 2
+                out.append(" ")
+                continue
+
+        out.append(ch)
+        i += 1
+
+    return "".join(out)
+
+
+def _strip_hash_comments(content: str) -> str:
+    """Drops full-line `#` comments (shebangs included)."""
+    return "\n".join(
+        line for line in content.splitlines() if not line.lstrip().startswith("#")
+    )
+
+
+def normalize_source(content: str, file_path: str = "") -> str:
+    """
+    Produces a canonical form of a source file for change detection.
+
+    Comments are removed (per language family) and whitespace runs are
+    collapsed, so whitespace- and comment-only edits normalize to the same
+    text. Python keeps its block structure via INDENT/DEDENT markers.
+    """
+    path = PurePosixPath(file_path.replace("\\", "/"))
+    suffix = path.suffix.lower()
+
+    if suffix == ".py":
+        try:
+            # Token stream is already layout-free; line breaks carry meaning
+            return _strip_python_comments(content)
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            text = _strip_hash_comments(content)
+    elif suffix in C_STYLE_COMMENT_EXTENSIONS:
+        text = _strip_c_style_comments(content)
+    elif suffix in HASH_COMMENT_EXTENSIONS or path.name in HASH_COMMENT_FILENAMES:
+        text = _strip_hash_comments(content)
+    else:
+        text = content
+
+    return " ".join(text.split())
+
+
+def content_hash(content: str, file_path: str = "") -> str:
+    """Returns the SHA-256 digest of the normalized file content."""
+    normalized = normalize_source(content, file_path)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def miner_cache_key(digest: str, model: str, prompt_version: str) -> str:
+    """
+    Combines a content digest with the model and prompt version.
+    A change in any of the three invalidates previously mined facts.
+    """
+    raw = f"{prompt_version}|{model}|{digest}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
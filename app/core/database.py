@@ -1,4 +1,5 @@
 from typing import AsyncGenerator
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel, create_engine
@@ -19,6 +20,30 @@ engine = create_async_engine(
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
+# Columns added after tables were first created: (table, column, SQL type).
+# create_all() only creates missing tables, so these are added in place.
+SCHEMA_MIGRATIONS = [
+    ("projects", "last_commit", "TEXT"),
+]
+
+
+def _add_missing_columns(conn) -> None:
+    inspector = inspect(conn)
+    for table, column, sql_type in SCHEMA_MIGRATIONS:
+        if not inspector.has_table(table):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
+
+
+async def init_db(db_engine=engine) -> None:
+    """Creates missing tables and applies SCHEMA_MIGRATIONS."""
+    async with db_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Dependency for getting async sessions."""
     async with AsyncSessionLocal() as session:
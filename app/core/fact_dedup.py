@@ -0,0 +1,215 @@
+import os
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.core.bm25 import tokenize
+from app.core.constants import (
+    FACT_DEDUP_BANDS,
+    FACT_DEDUP_NUM_PERM,
+    FACT_DEDUP_SHINGLE_SIZE,
+    FACT_DEDUP_THRESHOLD,
+    SCRIBE_IMPACT_WEIGHTS,
+)
+from app.core.fact_index import FactIndex
+from app.core.tokenizer import Tokenizer
+
+# Mersenne prime 2^61 - 1: (a * x + b) stays below 2^64 for 31-bit a, b and
+# 32-bit shingle hashes, so the permutations run in uint64 without overflow
+_PRIME = np.uint64((1 << 61) - 1)
+# Facts hashed per block, bounding the (permutations x shingles) matrix
+_BLOCK_FACTS = 2048
+
+
+@dataclass
+class DedupStats:
+    """What one collapsing pass removed from the prompt context."""
+
+    facts_in: int = 0
+    facts_out: int = 0
+    # Groups of two or more facts merged into one
+    clusters: int = 0
+    tokens_saved: int = 0
+
+    def add(self, other: "DedupStats"):
+        self.facts_in += other.facts_in
+        self.facts_out += other.facts_out
+        self.clusters += other.clusters
+        self.tokens_saved += other.tokens_saved
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "facts_in": self.facts_in,
+            "facts_out": self.facts_out,
+            "facts_merged": self.facts_in - self.facts_out,
+            "clusters": self.clusters,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+class MinHasher:
+    """
+    MinHash signatures of word shingles, with LSH banding to find
+    near-duplicate candidates without comparing every pair.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = FACT_DEDUP_NUM_PERM,
+        bands: int = FACT_DEDUP_BANDS,
+        shingle_size: int = FACT_DEDUP_SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=(num_perm, 1), dtype=np.uint64)
+
+    def shingles(self, text: str) -> List[int]:
+        """32-bit hashes of the distinct word shingles of `text`."""
+        words = tokenize(text)
+        size = min(self.shingle_size, len(words))
+        return sorted(
+            {
+                zlib.crc32(" ".join(words[i : i + size]).encode("utf-8"))
+                for i in range(len(words) - size + 1)
+            }
+            if size
+            else ()
+        )
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """
+        One signature row per text. Texts without words get a row of the
+        maximum value, which never agrees with a real signature.
+        """
+        signatures = np.full((len(texts), self.num_perm), _PRIME, dtype=np.uint64)
+        for start in range(0, len(texts), _BLOCK_FACTS):
+            shingled = [self.shingles(t) for t in texts[start : start + _BLOCK_FACTS]]
+            sizes = np.array([len(s) for s in shingled], dtype=np.int64)
+            rows = np.flatnonzero(sizes)
+            if not rows.size:
+                continue
+            hashes = np.fromiter(
+                (h for s in shingled for h in s), dtype=np.uint64, count=int(sizes.sum())
+            )
+            permuted = (self._a * hashes + self._b) % _PRIME
+            offsets = np.concatenate(([0], np.cumsum(sizes[rows])[:-1]))
+            signatures[start + rows] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return signatures
+
+    def candidate_pairs(self, signatures: np.ndarray, groups: List[Any]):
+        """
+        (anchor, other) index pairs sharing an LSH bucket within the same
+        group. Each bucket pairs its first member with every later one, so
+        the work stays linear even for large groups of identical facts.
+        """
+        for band in range(self.bands):
+            block = signatures[:, band * self.rows : (band + 1) * self.rows]
+            buckets: Dict[Tuple[Any, bytes], int] = {}
+            for idx, group in enumerate(groups):
+                if signatures[idx, 0] == _PRIME:
+                    continue
+                anchor = buckets.setdefault((group, block[idx].tobytes()), idx)
+                if anchor != idx:
+                    yield anchor, idx
+
+
+def _find(parent: List[int], idx: int) -> int:
+    while parent[idx] != idx:
+        parent[idx] = parent[parent[idx]]
+        idx = parent[idx]
+    return idx
+
+
+def collapse_near_duplicates(
+    results: List[Dict[str, Any]],
+    per_module: bool = True,
+    threshold: float = FACT_DEDUP_THRESHOLD,
+    hasher: MinHasher = None,
+) -> Tuple[List[Dict[str, Any]], DedupStats]:
+    """
+    Merges near-duplicate conclusions of Miner results, either within each
+    module (FactIndex modules) or across the whole project.
+
+    Each group of similar statements keeps its first fact in reading order,
+    raised to the highest impact of the group, with `sources` listing every
+    file the statement came from (its own file first); the other facts are
+    dropped from their files. Files stay in place even if left without
+    conclusions, so module matching is unchanged. The input is not modified.
+    Returns (results, stats).
+    """
+    hasher = hasher or MinHasher()
+    facts = [
+        (r_idx, c_idx, conclusion)
+        for r_idx, result in enumerate(results)
+        for c_idx, conclusion in enumerate(result.get("conclusions", []))
+    ]
+    stats = DedupStats(facts_in=len(facts), facts_out=len(facts))
+    if len(facts) < 2:
+        return results, stats
+
+    signatures = hasher.signatures([str(c.get("statement") or "") for _, _, c in facts])
+    groups = [
+        (os.path.dirname(results[r_idx].get("file", "")) or "root") if per_module else ""
+        for r_idx, _, _ in facts
+    ]
+    parent = list(range(len(facts)))
+    for anchor, other in hasher.candidate_pairs(signatures, groups):
+        root_a, root_b = _find(parent, anchor), _find(parent, other)
+        if root_a == root_b:
+            continue
+        if np.mean(signatures[anchor] == signatures[other]) >= threshold:
+            # The earlier fact stays the representative
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters: Dict[int, List[int]] = {}
+    for idx in range(len(facts)):
+        clusters.setdefault(_find(parent, idx), []).append(idx)
+
+    dropped = set()
+    merged: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    for rep, members in clusters.items():
+        if len(members) == 1:
+            continue
+        stats.clusters += 1
+        r_idx, c_idx, conclusion = facts[rep]
+        sources = list(dict.fromkeys(results[facts[m][0]].get("file", "") for m in members))
+        representative = dict(conclusion)
+        representative["impact"] = max(
+            (facts[m][2].get("impact") for m in members),
+            key=lambda impact: SCRIBE_IMPACT_WEIGHTS.get(str(impact).upper(), 0.0),
+        )
+        if len(sources) > 1:
+            representative["sources"] = sources
+        merged[(r_idx, c_idx)] = representative
+
+        saved = Tokenizer.count(FactIndex._fact_line(conclusion)) - Tokenizer.count(
+            FactIndex._fact_line(representative)
+        )
+        for m in members[1:]:
+            dropped.add(facts[m][:2])
+            saved += Tokenizer.count(FactIndex._fact_line(facts[m][2]))
+        stats.tokens_saved += saved
+
+    if not merged:
+        return results, stats
+
+    stats.facts_out -= len(dropped)
+    collapsed = []
+    for r_idx, result in enumerate(results):
+        conclusions = result.get("conclusions", [])
+        kept = [
+            merged.get((r_idx, c_idx), conclusion)
+            for c_idx, conclusion in enumerate(conclusions)
+            if (r_idx, c_idx) not in dropped
+        ]
+        collapsed.append({**result, "conclusions": kept} if conclusions else result)
+    return collapsed, stats
@@ -0,0 +1,283 @@
+import hashlib
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.bm25 import BM25Index, tokenize
+from app.core.constants import (
+    FACT_DEDUP_MAX_LISTED_SOURCES,
+    SCRIBE_IMPACT_WEIGHTS,
+    SCRIBE_MODULE_MATCH_BOOST,
+)
+from app.core.tokenizer import Tokenizer
+
+
+def _target_parts(mod_target: str) -> List[str]:
+    # 'modules-scanner' / 'modules_scanner' -> ['modules', 'scanner']
+    return mod_target.lower().replace("_", "-").split("-")
+
+
+def _key_parts(mod_key: str) -> List[str]:
+    # 'ira/app/modules/scanner' -> ['ira', 'app', 'modules', 'scanner']
+    return mod_key.lower().replace("\\", "/").split("/")
+
+
+class FactIndex:
+    """
+    Miner results indexed by module, built once per pipeline run.
+
+    Modules are the parent directories of the mined files ("root" for files
+    at the top level). The index keeps:
+    - `modules`: module -> file analyses, in first-seen order;
+    - an inverted index from each lowercased path segment to the modules
+      containing it, so resolving a page target is a set intersection;
+    - the formatted fact block of each module, built on first use and
+      kept, so assembling a module context again is a join over strings;
+    - a BM25 index over the individual conclusions (statement, topic and
+      file path), built on first use, for ranked, token-budgeted selection.
+    """
+
+    def __init__(self, results: Iterable[Dict[str, Any]]):
+        self.modules: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for item in results:
+            parent_dir = os.path.dirname(item.get("file", "")) or "root"
+            self.modules[parent_dir].append(item)
+        self.modules = dict(self.modules)
+
+        self._order = {key: idx for idx, key in enumerate(self.modules)}
+        self._segments: Dict[str, Set[str]] = defaultdict(set)
+        for key in self.modules:
+            for part in _key_parts(key):
+                self._segments[part].add(key)
+
+        # Formatted fact blocks by (module, full_paths), on first use: most
+        # indexes (page subsets, pipelined pages) never format a block
+        self._blocks: Dict[Tuple[str, bool], str] = {}
+
+        # Every conclusion as (module, file path, conclusion), in reading order
+        self.facts: List[Tuple[str, str, Dict[str, Any]]] = [
+            (key, f.get("file", ""), c)
+            for key, files in self.modules.items()
+            for f in files
+            for c in f.get("conclusions", [])
+        ]
+        # Ranking state, built on first use (see _ensure_ranking); the lock
+        # covers callers ranking from the tokenizer pool concurrently
+        self._ranking_lock = threading.Lock()
+        self._bm25: Optional[BM25Index] = None
+        self._fact_tokens: Optional[np.ndarray] = None
+        self._fact_modules: Optional[np.ndarray] = None
+        self._fact_impact: Optional[np.ndarray] = None
+        self._module_header_tokens: Dict[str, int] = {}
+        self._file_header_tokens: Dict[str, int] = {}
+        # Per-module fact digests, computed on first use (see fingerprint)
+        self._module_digests: Dict[str, str] = {}
+
+    @classmethod
+    def from_miner_output(cls, miner_output: Dict[str, Any]) -> "FactIndex":
+        return cls(miner_output.get("results", []))
+
+    @staticmethod
+    def _format_block(
+        key: str, files: List[Dict[str, Any]], full_paths: bool
+    ) -> str:
+        lines = [f"=== MODULE: {key} ===\n"]
+        for f in files:
+            fname = f.get("file", "")
+            if not full_paths:
+                fname = os.path.basename(fname)
+            lines.append(f"\nFILE: {fname}\n")
+            lines.extend(FactIndex._fact_line(c) for c in f.get("conclusions", []))
+        return "".join(lines)
+
+    def match(self, mod_target: str) -> List[str]:
+        """
+        Modules whose path contains every part of `mod_target`, in module
+        order (same rule as `ScribeAgent._module_matches`).
+        """
+        matched = None
+        for part in _target_parts(mod_target):
+            keys = self._segments.get(part)
+            if not keys:
+                return []
+            matched = set(keys) if matched is None else matched & keys
+        return sorted(matched or (), key=self._order.__getitem__)
+
+    def match_any(self, targets: Iterable[str]) -> List[str]:
+        """Modules matched by any target: by target order, then module order."""
+        seen: Dict[str, None] = {}
+        for mod_target in targets:
+            for key in self.match(mod_target):
+                seen.setdefault(key)
+        return list(seen)
+
+    def block(self, key: str, full_paths: bool = True) -> str:
+        """Formatted facts of one module ("" for an unknown module)."""
+        if key not in self.modules:
+            return ""
+        block = self._blocks.get((key, full_paths))
+        if block is None:
+            block = self._format_block(key, self.modules[key], full_paths)
+            self._blocks[(key, full_paths)] = block
+        return block
+
+    def subset(self, keys: Iterable[str]) -> "FactIndex":
+        """Index over the given modules only (unknown modules are ignored)."""
+        return FactIndex(f for key in keys for f in self.modules.get(key, []))
+
+    def context_for(self, targets: Iterable[str]) -> str:
+        """Concatenated fact blocks of every module matched by `targets`."""
+        return "".join(self.block(key) for key in self.match_any(targets))
+
+    def fingerprint(self, keys: Iterable[str]) -> str:
+        """
+        Digest of the facts of the given modules (unknown modules are
+        ignored). Module and file order do not count, so indexes built from
+        the same facts in another order agree.
+        """
+        digest = hashlib.sha256()
+        for key in sorted(set(keys) & self.modules.keys()):
+            if key not in self._module_digests:
+                files = sorted(
+                    (f.get("file", ""), "".join(map(self._fact_line, f.get("conclusions", []))))
+                    for f in self.modules[key]
+                )
+                self._module_digests[key] = hashlib.sha256(
+                    "\x00".join(part for entry in files for part in entry).encode("utf-8")
+                ).hexdigest()
+            digest.update(f"{key}\x00{self._module_digests[key]}\x00".encode("utf-8"))
+        return digest.hexdigest()
+
+    # ==================== RANKED SELECTION ====================
+
+    @staticmethod
+    def _fact_line(conclusion: Dict[str, Any]) -> str:
+        line = f"- [{conclusion.get('topic')}]: {conclusion.get('statement')}"
+        # Merged near-duplicates (see fact_dedup) list the other files they cover
+        others = conclusion.get("sources", [])[1:]
+        if others:
+            shown = ", ".join(others[:FACT_DEDUP_MAX_LISTED_SOURCES])
+            extra = len(others) - FACT_DEDUP_MAX_LISTED_SOURCES
+            line += f" (also in: {shown}{f', +{extra} more' if extra > 0 else ''})"
+        return line + "\n"
+
+    def _ensure_ranking(self):
+        if self._bm25 is not None:
+            return
+        with self._ranking_lock:
+            if self._bm25 is None:
+                self._build_ranking()
+
+    def _build_ranking(self):
+        self._fact_tokens = np.array(
+            Tokenizer.count_batch([self._fact_line(c) for _, _, c in self.facts]),
+            dtype=np.int64,
+        )
+        self._fact_modules = np.array(
+            [self._order[module] for module, _, _ in self.facts], dtype=np.int64
+        )
+        self._fact_impact = np.array(
+            [
+                SCRIBE_IMPACT_WEIGHTS.get(str(c.get("impact", "")).upper(), 1.0)
+                for _, _, c in self.facts
+            ],
+            dtype=np.float64,
+        )
+        for module, file_path, _ in self.facts:
+            if module not in self._module_header_tokens:
+                self._module_header_tokens[module] = Tokenizer.count(
+                    f"=== MODULE: {module} ===\n"
+                )
+            if file_path not in self._file_header_tokens:
+                self._file_header_tokens[file_path] = Tokenizer.count(
+                    f"\nFILE: {file_path}\n"
+                )
+        # Set last: a non-None index means the ranking state is complete
+        self._bm25 = BM25Index(
+            [
+                tokenize(
+                    f"{c.get('statement', '')} {c.get('topic', '')} {file_path}"
+                )
+                for _, file_path, c in self.facts
+            ]
+        )
+
+    def rank(
+        self, query: Dict[str, float], boost_targets: Iterable[str] = ()
+    ) -> np.ndarray:
+        """
+        Relevance of every fact: BM25 against `query`, plus a fixed boost for
+        facts of modules matched by `boost_targets`, scaled by impact.
+        """
+        self._ensure_ranking()
+        scores = self._bm25.scores(query)
+        boosted = [self._order[key] for key in self.match_any(boost_targets)]
+        if boosted:
+            scores[np.isin(self._fact_modules, boosted)] += SCRIBE_MODULE_MATCH_BOOST
+        return scores * self._fact_impact
+
+    def relevant_modules(self, query: Dict[str, float]) -> List[str]:
+        """Modules with at least one fact relevant to `query`, in module order."""
+        if not self.facts:
+            return []
+        self._ensure_ranking()
+        indexes = np.unique(self._fact_modules[self._bm25.scores(query) > 0])
+        keys = list(self.modules)
+        return [keys[idx] for idx in indexes]
+
+    def select_context(
+        self,
+        query: Dict[str, float],
+        token_budget: int,
+        boost_targets: Iterable[str] = (),
+    ) -> str:
+        """
+        Greedily packs the highest-ranked facts into `token_budget` tokens
+        (module and file headers included) and renders them grouped by module
+        and file, in reading order. Facts with no relevance are never included.
+        """
+        if not self.facts:
+            return ""
+        scores = self.rank(query, boost_targets)
+
+        candidates = np.flatnonzero(scores > 0)
+        if not candidates.size:
+            return ""
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        smallest = int(self._fact_tokens[candidates].min())
+
+        chosen: List[int] = []
+        seen_modules: Set[str] = set()
+        seen_files: Set[str] = set()
+        used = 0
+        for idx in ranked:
+            if token_budget - used < smallest:
+                break
+            module, file_path, _ = self.facts[idx]
+            cost = int(self._fact_tokens[idx])
+            if module not in seen_modules:
+                cost += self._module_header_tokens[module]
+            if file_path not in seen_files:
+                cost += self._file_header_tokens[file_path]
+            if used + cost > token_budget:
+                continue
+            used += cost
+            seen_modules.add(module)
+            seen_files.add(file_path)
+            chosen.append(int(idx))
+
+        lines: List[str] = []
+        current_module = current_file = None
+        for idx in sorted(chosen):
+            module, file_path, conclusion = self.facts[idx]
+            if module != current_module:
+                lines.append(f"=== MODULE: {module} ===\n")
+                current_module, current_file = module, None
+            if file_path != current_file:
+                lines.append(f"\nFILE: {file_path}\n")
+                current_file = file_path
+            lines.append(self._fact_line(conclusion))
+        return "".join(lines)
@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.constants import (
+    TOKENIZER_CALIBRATION_MAX_CHARS_PER_TOKEN,
+    TOKENIZER_CALIBRATION_MIN_CALLS,
+    TOKENIZER_CALIBRATION_MIN_CHARS_PER_TOKEN,
+    TOKENIZER_CALIBRATION_WINDOW_TOKENS,
+)
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+_VERSION = 1
+
+
+class TokenCalibration:
+    """
+    Characters per token observed from provider-reported prompt usage.
+
+    Observations are kept as running sums of prompt characters and reported
+    tokens per "<provider>:<model>", both overall (extension "") and per file
+    extension of the source the prompt was about. Once a window of tokens is
+    exceeded the sums are halved, so recent usage outweighs older runs.
+    """
+
+    def __init__(self):
+        # "<provider>:<model>" -> extension -> [chars, tokens, calls]
+        self._samples: Dict[str, Dict[str, List[float]]] = {}
+        self._lock = threading.Lock()
+        self.dirty = False
+
+    @staticmethod
+    def _model_key(provider: str, model: str) -> str:
+        return f"{provider}:{model}"
+
+    def observe(
+        self, provider: str, model: str, chars: int, tokens: int, extension: str = ""
+    ) -> bool:
+        """
+        Records one prompt of `chars` characters billed as `tokens` tokens.
+        Returns False (and records nothing) for implausible ratios, e.g. a
+        prompt mostly served from the provider's prompt cache.
+        """
+        if chars <= 0 or tokens <= 0:
+            return False
+        ratio = chars / tokens
+        if not (
+            TOKENIZER_CALIBRATION_MIN_CHARS_PER_TOKEN
+            <= ratio
+            <= TOKENIZER_CALIBRATION_MAX_CHARS_PER_TOKEN
+        ):
+            return False
+
+        with self._lock:
+            by_extension = self._samples.setdefault(self._model_key(provider, model), {})
+            for key in {"", extension}:
+                sample = by_extension.setdefault(key, [0.0, 0.0, 0])
+                sample[0] += chars
+                sample[1] += tokens
+                sample[2] += 1
+                if sample[1] > TOKENIZER_CALIBRATION_WINDOW_TOKENS:
+                    sample[0] /= 2
+                    sample[1] /= 2
+            self.dirty = True
+        return True
+
+    def chars_per_token(
+        self, provider: str, model: str, extension: str = ""
+    ) -> Optional[float]:
+        """
+        Calibrated ratio for the extension, else for the model overall;
+        None until TOKENIZER_CALIBRATION_MIN_CALLS prompts were observed.
+        """
+        by_extension = self._samples.get(self._model_key(provider, model))
+        if not by_extension:
+            return None
+        for key in (extension, ""):
+            sample = by_extension.get(key)
+            if sample and sample[2] >= TOKENIZER_CALIBRATION_MIN_CALLS:
+                return sample[0] / sample[1]
+        return None
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": _VERSION,
+                "models": {
+                    model: {
+                        ext: {"chars": s[0], "tokens": s[1], "calls": s[2]}
+                        for ext, s in by_extension.items()
+                    }
+                    for model, by_extension in self._samples.items()
+                },
+            }
+
+    # ==================== PERSISTENCE ====================
+
+    @classmethod
+    def load(cls, path: str) -> "TokenCalibration":
+        """Calibration saved at `path`; empty when missing or unreadable."""
+        calibration = cls()
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return calibration
+        except (OSError, ValueError) as e:
+            logger.warning(f"[Tokenizer] Ignoring unreadable calibration {path}: {e}")
+            return calibration
+        if data.get("version") != _VERSION:
+            return calibration
+
+        for model, by_extension in data.get("models", {}).items():
+            calibration._samples[model] = {
+                ext: [float(s["chars"]), float(s["tokens"]), int(s["calls"])]
+                for ext, s in by_extension.items()
+            }
+        logger.info(
+            f"[Tokenizer] Loaded token calibration for {len(calibration._samples)} models"
+        )
+        return calibration
+
+    def save(self, path: str) -> None:
+        """Writes the calibration to `path` (atomically) if it changed."""
+        if not self.dirty:
+            return
+        data = self.as_dict()
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(target.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        os.replace(tmp, target)
+        self.dirty = False
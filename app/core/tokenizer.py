@@ -1,9 +1,57 @@
+import asyncio
+import contextvars
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple, TypeVar
+
 import tiktoken
-from typing import Dict, Any, Optional, Tuple
+
+from app.core.constants import (
+    TOKENIZER_COUNT_CACHE_MIN_CHARS,
+    TOKENIZER_COUNT_CACHE_SIZE,
+    TOKENIZER_THREADS,
+)
+from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.token_calibration import TokenCalibration
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
+# File extension of the source being counted or prompted about (see
+# Tokenizer.source); selects the per-extension calibration
+_source_extension: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "token_source_extension", default=""
+)
+
+TRUNCATION_MARKER = "\n...(content truncated)..."
+
+
+@dataclass
+class TokenFit:
+    """A text measured and cut to a token limit by a single encode."""
+
+    # Tokens of the whole text
+    count: int
+    # The text to send: the original, or its kept prefix plus a marker
+    text: str
+    # Tokens of `text` before the marker (at most the limit)
+    kept: int
+    # Token ids of the kept prefix; None when nothing was encoded (cached
+    # count, or a character-estimate provider)
+    tokens: Optional[List[int]] = None
+
+    @property
+    def truncated(self) -> bool:
+        return self.kept < self.count
+
 
 class Tokenizer:
     """
@@ -20,6 +68,24 @@ class Tokenizer:
     _current_provider: str = "openai"
     _current_model: str = "gpt-4o-mini"
 
+    # Exact counts by "<encoding>:<content digest>", least recently used first
+    _counts: "OrderedDict[str, int]" = OrderedDict()
+    _counts_lock = threading.Lock()
+
+    # Dedicated pool for encoding off the event loop (see the *_async API)
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+
+    # Loading an encoding may download it; loads are serialized
+    _encodings_lock = threading.Lock()
+    # Set once `preload` has loaded every encoding (see PRELOAD)
+    _ready = threading.Event()
+    _preload_status: Dict[str, str] = {}
+
+    # Observed chars/token of non-tiktoken providers, loaded on first use
+    _calibration: Optional[TokenCalibration] = None
+    _calibration_lock = threading.Lock()
+
     # Map OpenAI models to their tiktoken encoding
     OPENAI_MODEL_ENCODINGS = {
         "gpt-4o": "o200k_base",
@@ -29,8 +95,9 @@ class Tokenizer:
         "gpt-3.5-turbo": "cl100k_base",
     }
 
-    # Average characters per token for non-OpenAI providers.
-    # These values are calibrated approximations:
+    # Average characters per token for non-OpenAI providers, used until
+    # enough usage has been observed (see CALIBRATION). These values are
+    # calibrated approximations:
     # - Gemini uses SentencePiece (Unigram), ~4 chars/token for English code
     # - Ollama models (Llama, Mistral) use SentencePiece (BPE), ~3.8 chars/token
     CHARS_PER_TOKEN_BY_PROVIDER = {
@@ -54,23 +121,43 @@ class Tokenizer:
         cls._current_model = model
         logger.info(f"Tokenizer configured for provider={provider}, model={model}")
 
+    @classmethod
+    def _use_encoding_dir(cls) -> None:
+        """
+        Points tiktoken at settings.tiktoken_cache_dir, unless the environment
+        already sets TIKTOKEN_CACHE_DIR. tiktoken reads encoding files from
+        there and only downloads (and stores) the ones missing.
+        """
+        if settings.tiktoken_cache_dir and not os.environ.get("TIKTOKEN_CACHE_DIR"):
+            os.environ["TIKTOKEN_CACHE_DIR"] = os.path.abspath(settings.tiktoken_cache_dir)
+
+    @classmethod
+    def _load_encoding(cls, encoding_name: str):
+        """Returns the tiktoken encoding `encoding_name`, loading it once; raises on failure."""
+        encoding = cls._encodings.get(encoding_name)
+        if encoding is not None and getattr(encoding, "name", encoding_name) == encoding_name:
+            return encoding
+        with cls._encodings_lock:
+            encoding = cls._encodings.get(encoding_name)
+            if encoding is None or getattr(encoding, "name", encoding_name) != encoding_name:
+                cls._use_encoding_dir()
+                encoding = tiktoken.get_encoding(encoding_name)
+                cls._encodings[encoding_name] = encoding
+                logger.info(f"Loaded tiktoken encoding: {encoding_name}")
+        return encoding
+
     @classmethod
     def _get_tiktoken_encoding(cls, encoding_name: str):
         """Returns a cached tiktoken encoding instance."""
         if encoding_name not in cls._encodings:
             try:
-                cls._encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
-                logger.info(f"Loaded tiktoken encoding: {encoding_name}")
+                cls._load_encoding(encoding_name)
             except Exception as e:
                 logger.warning(
                     f"Failed to load encoding {encoding_name}, "
                     f"falling back to {cls.DEFAULT_ENCODING}: {e}"
                 )
-                if cls.DEFAULT_ENCODING not in cls._encodings:
-                    cls._encodings[cls.DEFAULT_ENCODING] = tiktoken.get_encoding(
-                        cls.DEFAULT_ENCODING
-                    )
-                cls._encodings[encoding_name] = cls._encodings[cls.DEFAULT_ENCODING]
+                cls._encodings[encoding_name] = cls._load_encoding(cls.DEFAULT_ENCODING)
         return cls._encodings[encoding_name]
 
     @classmethod
@@ -80,9 +167,20 @@ class Tokenizer:
         return cls.OPENAI_MODEL_ENCODINGS.get(model, cls.DEFAULT_ENCODING)
 
     @classmethod
-    def _get_chars_per_token(cls, provider: Optional[str] = None) -> float:
-        """Returns the estimated chars-per-token ratio for a provider."""
+    def _get_chars_per_token(
+        cls, provider: Optional[str] = None, model: Optional[str] = None
+    ) -> float:
+        """
+        Returns the estimated chars-per-token ratio for a provider: the one
+        observed for the model (and current source extension) when known.
+        """
         provider = provider or cls._current_provider
+        if settings.token_calibration:
+            calibrated = cls.calibration().chars_per_token(
+                provider, model or cls._current_model, _source_extension.get()
+            )
+            if calibrated:
+                return calibrated
         return cls.CHARS_PER_TOKEN_BY_PROVIDER.get(provider, 4.0)
 
     @classmethod
@@ -91,8 +189,105 @@ class Tokenizer:
         provider = provider or cls._current_provider
         return provider == "openai"
 
+    # ==================== COUNT CACHE ====================
+
+    @classmethod
+    def count_key(
+        cls,
+        text: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Identifies the exact token count of `text` under the current (or given)
+        encoding, for memoizing and persisting it. None when the provider only
+        estimates or the text is too short to be worth caching.
+        """
+        provider = provider or cls._current_provider
+        if not cls._is_tiktoken_provider(provider) or len(text) < TOKENIZER_COUNT_CACHE_MIN_CHARS:
+            return None
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{cls._resolve_encoding_name(model)}:{digest}"
+
+    @classmethod
+    def cached_count(cls, key: Optional[str]) -> Optional[int]:
+        if key is None:
+            return None
+        with cls._counts_lock:
+            count = cls._counts.get(key)
+            if count is not None:
+                cls._counts.move_to_end(key)
+            return count
+
+    @classmethod
+    def remember(cls, key: Optional[str], count: int) -> None:
+        """Stores an exact count under its `count_key` (e.g. one persisted earlier)."""
+        if key is None:
+            return
+        with cls._counts_lock:
+            cls._counts[key] = count
+            cls._counts.move_to_end(key)
+            while len(cls._counts) > TOKENIZER_COUNT_CACHE_SIZE:
+                cls._counts.popitem(last=False)
+
     # ==================== PUBLIC API ====================
 
+    @classmethod
+    def fit(
+        cls,
+        text: str,
+        max_tokens: int,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> TokenFit:
+        """
+        Counts `text` and cuts it to `max_tokens` from one encode: the count,
+        the text to send and the kept token prefix all come from the same
+        token list. A memoized count that fits skips encoding altogether.
+        """
+        if not text:
+            return TokenFit(0, text, 0, [])
+
+        provider = provider or cls._current_provider
+        model = model or cls._current_model
+
+        if cls._is_tiktoken_provider(provider):
+            key = cls.count_key(text, provider, model)
+            cached = cls.cached_count(key)
+            if cached is not None and cached <= max_tokens:
+                return TokenFit(cached, text, cached)
+
+            encoding_name = cls._resolve_encoding_name(model)
+            tokens = cls._get_tiktoken_encoding(encoding_name).encode(text)
+            cls.remember(key, len(tokens))
+            if len(tokens) <= max_tokens:
+                return TokenFit(len(tokens), text, len(tokens), tokens)
+
+            logger.info(
+                f"Truncating text from {len(tokens)} to {max_tokens} tokens "
+                f"(encoding={encoding_name})"
+            )
+            kept = tokens[:max_tokens]
+            return TokenFit(
+                len(tokens),
+                cls._get_tiktoken_encoding(encoding_name).decode(kept) + TRUNCATION_MARKER,
+                max_tokens,
+                kept,
+            )
+
+        # Character-based approximation for non-tiktoken providers
+        chars_per_token = cls._get_chars_per_token(provider, model)
+        estimated_tokens = max(1, int(len(text) / chars_per_token))
+        if estimated_tokens <= max_tokens:
+            return TokenFit(estimated_tokens, text, estimated_tokens)
+
+        max_chars = int(max_tokens * chars_per_token)
+        logger.info(
+            f"Truncating text from ~{estimated_tokens} to ~{max_tokens} tokens "
+            f"(~{max_chars} chars, provider={provider})"
+        )
+        return TokenFit(estimated_tokens, text[:max_chars] + TRUNCATION_MARKER, max_tokens)
+
     @classmethod
     def count(
         cls,
@@ -118,23 +313,72 @@ class Tokenizer:
         model = model or cls._current_model
 
         if cls._is_tiktoken_provider(provider):
+            key = cls.count_key(text, provider, model)
+            cached = cls.cached_count(key)
+            if cached is not None:
+                return cached
             encoding_name = cls._resolve_encoding_name(model)
             encoding = cls._get_tiktoken_encoding(encoding_name)
-            return len(encoding.encode(text))
+            count = len(encoding.encode(text))
+            cls.remember(key, count)
+            return count
 
         # Character-based approximation for Gemini / Ollama
-        chars_per_token = cls._get_chars_per_token(provider)
+        chars_per_token = cls._get_chars_per_token(provider, model)
         return max(1, int(len(text) / chars_per_token))
 
     @classmethod
     def count_batch(
         cls,
-        texts: list,
+        texts: List[str],
         provider: Optional[str] = None,
         model: Optional[str] = None,
+    ) -> List[int]:
+        """
+        Token count of each text. Uncached texts are encoded together with
+        tiktoken's batch encoder, which spreads them over TOKENIZER_THREADS.
+        """
+        provider = provider or cls._current_provider
+        model = model or cls._current_model
+        if not cls._is_tiktoken_provider(provider):
+            return [cls.count(t, provider, model) for t in texts]
+
+        keys = [cls.count_key(t, provider, model) if t else None for t in texts]
+        counts: List[Optional[int]] = [
+            cls.cached_count(key) if t else 0 for t, key in zip(texts, keys)
+        ]
+        missing = [i for i, c in enumerate(counts) if c is None]
+        if missing:
+            encoding = cls._get_tiktoken_encoding(cls._resolve_encoding_name(model))
+            encoded = encoding.encode_batch(
+                [texts[i] for i in missing], num_threads=TOKENIZER_THREADS
+            )
+            for i, tokens in zip(missing, encoded):
+                counts[i] = len(tokens)
+                cls.remember(keys[i], len(tokens))
+        return counts
+
+    @staticmethod
+    def _message_chars(messages: list) -> int:
+        return sum(
+            len(m["content"]) for m in messages if isinstance(m.get("content"), str)
+        )
+
+    @classmethod
+    def count_messages(
+        cls, messages: list, provider: Optional[str] = None, model: Optional[str] = None
     ) -> int:
-        """Count total tokens across multiple text strings."""
-        return sum(cls.count(t, provider, model) for t in texts if t)
+        """
+        Estimates prompt tokens of a chat history (text content only).
+
+        Character-based for every provider: it runs before each LLM call to
+        size rate-limit reservations, where an estimate is enough and a full
+        encode of the whole history would be wasted work.
+        """
+        chars = cls._message_chars(messages)
+        if not chars:
+            return 0
+        return max(1, int(chars / cls._get_chars_per_token(provider, model)))
 
     @classmethod
     def truncate(
@@ -145,7 +389,8 @@ class Tokenizer:
         model: Optional[str] = None,
     ) -> str:
         """
-        Truncates text to stay within max_tokens.
+        Truncates text to stay within max_tokens (see `fit` for the count and
+        kept tokens of the same encode).
 
         For OpenAI: uses exact tiktoken-based truncation.
         For others: converts token limit to character limit and truncates.
@@ -154,35 +399,229 @@ class Tokenizer:
             return text
 
         provider = provider or cls._current_provider
+        # A token spans at least one byte: short enough texts cannot overflow
+        if cls._is_tiktoken_provider(provider) and len(text) <= max_tokens:
+            if len(text.encode("utf-8")) <= max_tokens:
+                return text
+        return cls.fit(text, max_tokens, provider, model).text
 
-        if cls._is_tiktoken_provider(provider):
-            model = model or cls._current_model
-            encoding_name = cls._resolve_encoding_name(model)
-            encoding = cls._get_tiktoken_encoding(encoding_name)
-            tokens = encoding.encode(text)
+    @classmethod
+    def truncate_batch(
+        cls,
+        texts: List[str],
+        max_tokens: int,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> List[str]:
+        """`truncate` for several texts, batch-encoding those that may overflow."""
+        provider = provider or cls._current_provider
+        if not cls._is_tiktoken_provider(provider):
+            return [cls.truncate(t, max_tokens, provider, model) for t in texts]
+
+        # Only texts that can exceed the limit (see truncate) need their count
+        unsure = [
+            i for i, t in enumerate(texts) if t and len(t.encode("utf-8")) > max_tokens
+        ]
+        counts = cls.count_batch([texts[i] for i in unsure], provider, model)
+        over = {i for i, count in zip(unsure, counts) if count > max_tokens}
+        return [
+            cls.fit(t, max_tokens, provider, model).text if i in over else t
+            for i, t in enumerate(texts)
+        ]
+
+    # ==================== ASYNC API ====================
+    # Encoding is CPU-bound; async callers await these instead so the event
+    # loop (WebSocket heartbeats, other pipelines) keeps running meanwhile.
 
-            if len(tokens) <= max_tokens:
-                return text
+    @classmethod
+    def executor(cls) -> ThreadPoolExecutor:
+        """The tokenizer's dedicated thread pool, created on first use."""
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=TOKENIZER_THREADS, thread_name_prefix="tokenizer"
+                    )
+        return cls._executor
 
-            logger.info(
-                f"Truncating text from {len(tokens)} to {max_tokens} tokens "
-                f"(encoding={encoding_name})"
-            )
-            return encoding.decode(tokens[:max_tokens]) + "\n...(content truncated)..."
+    @classmethod
+    async def offload(cls, fn: Callable[..., T], *args) -> T:
+        """
+        Runs a tokenizer-heavy callable on the tokenizer pool, in a copy of
+        the caller's context (so `source` scopes apply there too).
+        """
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(cls.executor(), call)
 
-        # Character-based truncation for non-tiktoken providers
-        chars_per_token = cls._get_chars_per_token(provider)
-        max_chars = int(max_tokens * chars_per_token)
-        estimated_tokens = max(1, int(len(text) / chars_per_token))
+    @classmethod
+    def _runs_inline(cls, provider: Optional[str]) -> bool:
+        # Character estimates are cheaper than a thread hop
+        return not cls._is_tiktoken_provider(provider or cls._current_provider)
 
-        if estimated_tokens <= max_tokens:
-            return text
+    @classmethod
+    async def count_async(
+        cls, text: str, provider: Optional[str] = None, model: Optional[str] = None
+    ) -> int:
+        if cls._runs_inline(provider) or not text:
+            return cls.count(text, provider, model)
+        cached = cls.cached_count(cls.count_key(text, provider, model))
+        if cached is not None:
+            return cached
+        return await cls.offload(cls.count, text, provider, model)
 
-        logger.info(
-            f"Truncating text from ~{estimated_tokens} to ~{max_tokens} tokens "
-            f"(~{max_chars} chars, provider={provider})"
-        )
-        return text[:max_chars] + "\n...(content truncated)..."
+    @classmethod
+    async def count_batch_async(
+        cls, texts: List[str], provider: Optional[str] = None, model: Optional[str] = None
+    ) -> List[int]:
+        if cls._runs_inline(provider):
+            return cls.count_batch(texts, provider, model)
+        return await cls.offload(cls.count_batch, texts, provider, model)
+
+    @classmethod
+    async def fit_async(
+        cls,
+        text: str,
+        max_tokens: int,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> TokenFit:
+        if cls._runs_inline(provider):
+            return cls.fit(text, max_tokens, provider, model)
+        return await cls.offload(cls.fit, text, max_tokens, provider, model)
+
+    @classmethod
+    async def truncate_async(
+        cls,
+        text: str,
+        max_tokens: int,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> str:
+        if cls._runs_inline(provider) or not text or len(text) <= max_tokens:
+            return cls.truncate(text, max_tokens, provider, model)
+        return await cls.offload(cls.truncate, text, max_tokens, provider, model)
+
+    @classmethod
+    async def truncate_batch_async(
+        cls,
+        texts: List[str],
+        max_tokens: int,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> List[str]:
+        if cls._runs_inline(provider):
+            return cls.truncate_batch(texts, max_tokens, provider, model)
+        return await cls.offload(cls.truncate_batch, texts, max_tokens, provider, model)
+
+    # ==================== PRELOAD ====================
+    # Encodings are loaded lazily on first use, which on a fresh container
+    # means a download in the middle of the first pipeline. The API preloads
+    # them at startup (see app.main lifespan) and reports readiness once warm.
+
+    @classmethod
+    def encoding_names(cls) -> List[str]:
+        """Every encoding the supported OpenAI models resolve to."""
+        return sorted(set(cls.OPENAI_MODEL_ENCODINGS.values()) | {cls.DEFAULT_ENCODING})
+
+    @classmethod
+    def preload(cls, encoding_names: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Loads and warms the encodings (all by default) with no fallback, so a
+        missing file is reported rather than masked. Marks the tokenizer
+        ready once every encoding loaded; returns the status per encoding.
+        """
+        for name in encoding_names or cls.encoding_names():
+            cls._preload_status[name] = "loading"
+            try:
+                encoding = cls._load_encoding(name)
+                # The first encode pays one-off setup; do it here, not in a request
+                encoding.encode("def warm_up(self) -> str:\n    return 'ready'\n")
+                cls._preload_status[name] = "ready"
+            except Exception as e:
+                cls._preload_status[name] = f"failed: {e}"
+                logger.warning(f"[Tokenizer] Could not preload encoding {name}: {e}")
+
+        if all(status == "ready" for status in cls._preload_status.values()):
+            cls._ready.set()
+            logger.info(f"[Tokenizer] Encodings ready: {', '.join(cls._preload_status)}")
+        return dict(cls._preload_status)
+
+    @classmethod
+    async def preload_async(cls, encoding_names: Optional[List[str]] = None) -> Dict[str, str]:
+        """`preload` on the tokenizer pool, leaving the event loop free."""
+        return await cls.offload(cls.preload, encoding_names)
+
+    @classmethod
+    def is_ready(cls) -> bool:
+        return cls._ready.is_set()
+
+    @classmethod
+    def readiness(cls) -> Dict[str, Any]:
+        """Preload state for the readiness probe."""
+        return {
+            "ready": cls.is_ready(),
+            "encodings": dict(cls._preload_status),
+            "cache_dir": os.environ.get("TIKTOKEN_CACHE_DIR"),
+        }
+
+    # ==================== CALIBRATION ====================
+    # Gemini and Ollama clients report the prompt tokens the provider counted;
+    # the observed ratios replace CHARS_PER_TOKEN_BY_PROVIDER per model.
+
+    @classmethod
+    def calibration(cls) -> TokenCalibration:
+        """The process-wide calibration, loaded from disk on first use."""
+        if cls._calibration is None:
+            with cls._calibration_lock:
+                if cls._calibration is None:
+                    cls._calibration = TokenCalibration.load(
+                        settings.token_calibration_path
+                    )
+        return cls._calibration
+
+    @classmethod
+    def save_calibration(cls) -> None:
+        """Persists the observations made since loading (no-op otherwise)."""
+        if cls._calibration is None:
+            return
+        try:
+            cls._calibration.save(settings.token_calibration_path)
+        except OSError as e:
+            logger.warning(f"[Tokenizer] Could not save token calibration: {e}")
+
+    @classmethod
+    @contextmanager
+    def source(cls, path: str) -> Iterator[None]:
+        """
+        Attributes estimates and reported usage inside the block to the file
+        type of `path` (including tasks and offloaded calls started from it).
+        """
+        token = _source_extension.set(os.path.splitext(path)[1].lower())
+        try:
+            yield
+        finally:
+            _source_extension.reset(token)
+
+    @classmethod
+    def record_usage(
+        cls, provider: str, model: str, messages: list, prompt_tokens: Optional[int]
+    ) -> None:
+        """
+        Records the prompt tokens a provider reported for `messages` (chat
+        messages as sent; text content only, like `count_messages`).
+        """
+        if (
+            not settings.token_calibration
+            or not prompt_tokens
+            or cls._is_tiktoken_provider(provider)
+        ):
+            return
+        chars = cls._message_chars(messages)
+        extension = _source_extension.get()
+        if not cls.calibration().observe(provider, model, chars, prompt_tokens, extension):
+            logger.debug(
+                f"[Tokenizer] Ignored usage sample: {chars} chars, {prompt_tokens} tokens"
+            )
 
     @classmethod
     def estimate_cost(
@@ -223,6 +662,9 @@ class Tokenizer:
         if cls._is_tiktoken_provider():
             info["encoding"] = cls._resolve_encoding_name()
         else:
-            info["chars_per_token"] = cls._get_chars_per_token()
+            info["chars_per_token"] = round(cls._get_chars_per_token(), 3)
+            info["calibrated"] = settings.token_calibration and bool(
+                cls.calibration().chars_per_token(provider, model)
+            )
 
         return info
@@ -91,6 +91,64 @@ class GitClient:
             "authored_datetime": commit.authored_datetime.isoformat(),
         }
 
+    def ensure_commit(
+        self, repo_path: str, commit_sha: str, remote_name: str = "origin"
+    ) -> None:
+        """
+        Makes sure a commit object is available locally.
+        Shallow clones (depth=1) only hold the tip, so an older commit is
+        fetched by SHA on its own, without deepening the whole history.
+        """
+        repo = self.open_repository(repo_path)
+        try:
+            repo.git.cat_file("-e", f"{commit_sha}^{{commit}}")
+            return
+        except GitCommandError:
+            pass
+        try:
+            repo.git.fetch("--depth=1", remote_name, commit_sha)
+        except GitCommandError as exc:
+            raise RuntimeError(f"Failed to fetch commit {commit_sha}: {exc}") from exc
+
+    def diff_name_status(
+        self, repo_path: str, old_commit: str, new_commit: str
+    ) -> list[tuple[str, str]]:
+        """
+        Returns `git diff --name-status old..new` as (status, path) pairs.
+
+        Status is A (added), M (modified) or D (deleted). Renames and copies
+        are reported as a deletion of the old path (renames only) and an
+        addition of the new one; type changes count as modifications.
+        """
+        self.ensure_commit(repo_path, old_commit)
+        repo = self.open_repository(repo_path)
+        try:
+            # -z: NUL-separated fields, paths are never quoted or escaped
+            output = repo.git.diff(
+                "--name-status", "-z", "--no-color", f"{old_commit}..{new_commit}"
+            )
+        except GitCommandError as exc:
+            raise RuntimeError(
+                f"Failed to diff {old_commit}..{new_commit}: {exc}"
+            ) from exc
+
+        changes: list[tuple[str, str]] = []
+        fields = [f for f in output.split("\0") if f]
+        i = 0
+        while i < len(fields):
+            status = fields[i][:1]
+            if status in ("R", "C"):
+                old_path, new_path = fields[i + 1], fields[i + 2]
+                if status == "R":
+                    changes.append(("D", old_path))
+                changes.append(("A", new_path))
+                i += 3
+                continue
+            path = fields[i + 1]
+            changes.append((status if status in ("A", "D") else "M", path))
+            i += 2
+        return changes
+
     def get_github_repo(self, owner: str, repo: str) -> dict[str, Any]:
         return self._request_json("GET", f"/repos/{owner}/{repo}")
 
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 from types import SimpleNamespace
 from enum import Enum
@@ -6,11 +7,13 @@ import json
 import os
 
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
-from sqlmodel import SQLModel
 
 from app.agents.tools import registry  # Import registry and triggers tool registration
-from app.core.database import engine
+from app.core.config import settings
+from app.core.database import init_db
+from app.core.tokenizer import Tokenizer
 from app.models import (
     Project,
     File,
@@ -24,15 +27,27 @@ from app.pipeline.steps.prepare_workspace import WorkspaceError, prepare_workspa
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Initialize DB tables
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+    # Initialize DB tables (and add columns introduced since they were created)
+    await init_db()
 
     # Export Tool Definitions to JSON for visibility/external use
     registry.save_to_json("app/agents/tools/definitions.json")
 
+    # Load the tiktoken encodings in the background; /ready reports when done
+    preload = (
+        asyncio.create_task(Tokenizer.preload_async())
+        if settings.tokenizer_preload
+        else None
+    )
+
     yield
 
+    if preload and not preload.done():
+        preload.cancel()
+
+    # Keep the token calibration observed by runs interrupted by the shutdown
+    Tokenizer.save_calibration()
+
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -57,6 +72,17 @@ def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def readiness_check():
+    """503 until the tokenizer encodings are loaded (see Tokenizer.preload)."""
+    readiness = Tokenizer.readiness()
+    if not settings.tokenizer_preload:
+        readiness["ready"] = True
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content=readiness)
+    return readiness
+
+
 @app.get("/")
 def read_root() -> dict[str, str]:
     return {"message": "IRADocument API is running"}
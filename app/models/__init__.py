@@ -4,5 +4,6 @@ from .fact import Fact
 from .relation import Relation
 from .endpoint import Endpoint
 from .tree_node import TreeNode
+from .mined_fact import MinedFact
 
-__all__ = ["Project", "File", "Fact", "Relation", "TreeNode", "Endpoint"]
+__all__ = ["Project", "File", "Fact", "Relation", "TreeNode", "Endpoint", "MinedFact"]
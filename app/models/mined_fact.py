@@ -0,0 +1,19 @@
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+
+class MinedFact(SQLModel, table=True):
+    """
+    Miner conclusions shared across projects, addressed by the Miner cache key
+    (normalized content hash + model + prompt version) of the mined content.
+    """
+
+    __tablename__ = "mined_facts"
+
+    key: str = Field(primary_key=True)
+    # Serialized list of MinerConclusion dicts (file-agnostic)
+    conclusions: str
+    size_bytes: int = 0
+    hits: int = 0
+    created_at: Optional[str] = None
+    last_used_at: Optional[str] = Field(default=None, index=True)
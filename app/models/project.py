@@ -16,6 +16,8 @@ class Project(SQLModel, table=True):
     root_path: Optional[str] = None
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
+    # Commit the documentation was last generated from (incremental mode)
+    last_commit: Optional[str] = None
 
     # Relationships
     files: List["File"] = Relationship(back_populates="project")
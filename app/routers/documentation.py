@@ -22,6 +22,8 @@ class DocumentationRequest(BaseModel):
     branch: str = "main"
     provider: str = "openai"
     model: Optional[str] = "gpt-4o-mini"
+    # Only redo what changed since the commit documented by the previous run
+    incremental: bool = True
 
 
 class DocumentationResponse(BaseModel):
@@ -87,6 +89,7 @@ async def generate_documentation(
         repo_path=repo_path,
         provider=request.provider,
         model=request.model,
+        incremental=request.incremental,
     )
 
     return DocumentationResponse(
@@ -0,0 +1,42 @@
+import os
+from dataclasses import dataclass, field
+from typing import Iterable, Set, Tuple
+
+
+@dataclass
+class ChangeSet:
+    """Files touched between the last documented commit and the current one."""
+
+    base_commit: str
+    head_commit: str
+    # Added or modified paths (relative to the repository root)
+    changed: Set[str] = field(default_factory=set)
+    deleted: Set[str] = field(default_factory=set)
+
+    @classmethod
+    def from_name_status(
+        cls, base_commit: str, head_commit: str, changes: Iterable[Tuple[str, str]]
+    ) -> "ChangeSet":
+        """Builds a ChangeSet from `GitClient.diff_name_status` output."""
+        change_set = cls(base_commit, head_commit)
+        for status, path in changes:
+            if status == "D":
+                change_set.deleted.add(path)
+                change_set.changed.discard(path)
+            else:
+                change_set.changed.add(path)
+                change_set.deleted.discard(path)
+        return change_set
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.changed and not self.deleted
+
+    def affected_modules(self) -> Set[str]:
+        """
+        Module keys (parent directories, "root" for top-level files) of every
+        changed or deleted file, as grouped by the Architect and Scribe.
+        """
+        return {
+            os.path.dirname(path) or "root" for path in self.changed | self.deleted
+        }
@@ -7,26 +7,36 @@ import aiofiles
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
+from app.agents.agent_executor import ExecutorStats, track_executor_stats
 from app.agents.core.factory import LLMFactory
+from app.agents.core.rate_limiter import get_rate_limiter_for_client
 from app.agents.miner.agent import MinerAgent
 from app.agents.architect.agent import ArchitectAgent
 from app.agents.scribe.agent import ScribeAgent
 from app.core.logger import get_logger
 from app.core.socket_manager import manager
 from app.core.tokenizer import Tokenizer
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.fact_dedup import DedupStats, collapse_near_duplicates
+from app.core.fact_index import FactIndex
+from app.infra.git_client import GitClient
+from app.services.change_set import ChangeSet
+from app.services.fact_store import FactStore
+from app.services.file_service import FileService
+from app.services.miner_pipeline import MinerPipeline
+from app.services.mining_tracker import MiningTracker
+from app.services.project_service import ProjectService
+from app.scanners.technology_scanner import TechnologyScanner
 from app.core.constants import (
-    SKIP_DIRS,
-    IGNORE_EXTENSIONS,
-    IGNORE_FILENAMES,
-    MAX_FILE_SIZE_BYTES,
-    MAX_FILES_LIMIT,
     COST_PER_MILLION_INPUT_TOKENS,
     COST_PER_MILLION_OUTPUT_TOKENS,
     DEFAULT_MAX_COST_USD,
-    MINER_CONCURRENCY_LIMIT,
-    MINER_RATE_DELAY_SECONDS,
-    MINER_MAX_TOKENS_PER_FILE,
+    PIPELINE_ARCHITECT_MIN_SAMPLE_FILES,
+    PIPELINE_ARCHITECT_MODULE_COVERAGE_LIMIT,
+    PIPELINE_ARCHITECT_SAMPLE_FRACTION,
     SCRIBE_MAX_INPUT_TOKENS,
+    SCRIBE_WORKER_POOL_SIZE,
 )
 
 logger = get_logger(__name__)
@@ -39,12 +49,15 @@ class DocumentationService:
     This service manages the full lifecycle of documentation generation with:
     - Per-model cost estimation and safety limits.
     - Concurrency and rate-limit protection.
-    - Multi-phase caching (Miner output, Navigation, and individual Scribe pages).
+    - Multi-phase caching (per-file Miner results, Navigation, and individual Scribe pages).
+    - Incremental mode: a git diff against the last documented commit drops
+      deleted files and regenerates only the pages of affected modules.
     - Real-time progress broadcasting via WebSocket.
     """
 
-    def __init__(self):
+    def __init__(self, session_factory=AsyncSessionLocal):
         self.output_dir = Path("output/docs")
+        self.session_factory = session_factory
 
     # ==================== PUBLIC API ====================
 
@@ -54,6 +67,7 @@ class DocumentationService:
         repo_path: str,
         provider: str = "openai",
         model: Optional[str] = None,
+        incremental: bool = True,
     ) -> Dict[str, Any]:
         """
         Executes the full Triad pipeline (Miner -> Architect -> Scribe).
@@ -63,6 +77,10 @@ class DocumentationService:
             repo_path: Local filesystem path to the repository root.
             provider: LLM provider id (openai, gemini, ollama).
             model: Specific model name (e.g., gpt-4o-mini, gemini-1.5-flash).
+            incremental: Diff against the commit recorded by the previous run and
+                only redo what changed. Falls back to a full pass when there is
+                no recorded commit or the diff cannot be computed; the cost
+                report's "incremental" entry says which happened and why.
 
         Returns:
             Dict containing status, output path, statistics, and cost report.
@@ -91,8 +109,21 @@ class DocumentationService:
             # Configure tokenizer for accurate counting with this provider/model
             Tokenizer.configure(provider, resolved_model)
 
-            # ============== PHASE 1: MINER ==============
-            miner_output, miner_cost = await self._run_miner_phase(
+            # ============== CHANGE DETECTION ==============
+            head_commit = await self._head_commit(repo_path)
+            change_set = None
+            if incremental:
+                change_set = await self._resolve_change_set(
+                    project_id, repo_path, head_commit, cost_tracker
+                )
+
+            # ============== PHASES: MINER -> ARCHITECT -> SCRIBE ==============
+            run_phases = (
+                self._run_phases_pipelined
+                if settings.pipelined_phases
+                else self._run_phases_sequential
+            )
+            pages_generated, error = await run_phases(
                 project_id=project_id,
                 repo_path=repo_path,
                 output_path=project_output_path,
@@ -100,45 +131,28 @@ class DocumentationService:
                 event_handler=event_handler,
                 model_name=resolved_model,
                 provider=provider,
+                change_set=change_set,
+                cost_tracker=cost_tracker,
             )
-
-            if miner_output is None:
-                return {"status": "error", "message": "Miner phase failed"}
-
-            cost_tracker["phases"]["miner"] = miner_cost
-
-            # ============== PHASE 2: ARCHITECT ==============
-            navigation, architect_cost = await self._run_architect_phase(
-                project_id=project_id,
-                output_path=project_output_path,
-                client=client,
-                event_handler=event_handler,
-                miner_output=miner_output,
-            )
-
-            if navigation is None:
-                return {"status": "error", "message": "Architect phase failed"}
-
-            cost_tracker["phases"]["architect"] = architect_cost
-
-            # ============== PHASE 3: SCRIBE ==============
-            pages_generated, scribe_cost = await self._run_scribe_phase(
-                project_id=project_id,
-                output_path=project_output_path,
-                client=client,
-                event_handler=event_handler,
-                navigation=navigation,
-                miner_output=miner_output,
-            )
-
-            cost_tracker["phases"]["scribe"] = scribe_cost
+            if error:
+                return {"status": "error", "message": error}
 
             # ============== COMPLETE ==============
+            if head_commit:
+                await self._record_commit(project_id, repo_path, head_commit)
+            # Usage reported during the run tightens later estimates
+            Tokenizer.save_calibration()
+            cost_tracker["tokenizer"] = Tokenizer.get_info()
+
             elapsed = time.time() - pipeline_start
             total_cost = sum(
                 phase.get("estimated_cost_usd", 0)
                 for phase in cost_tracker["phases"].values()
             )
+            cost_tracker["llm_calls_saved"] = sum(
+                phase.get("llm_calls_saved", 0)
+                for phase in cost_tracker["phases"].values()
+            )
 
             await self._broadcast_stage(
                 project_id,
@@ -166,9 +180,9 @@ class DocumentationService:
             await self._broadcast_stage(project_id, "error", str(e))
             raise
 
-    # ==================== PHASE 1: MINER ====================
+    # ==================== PHASE SCHEDULING ====================
 
-    async def _run_miner_phase(
+    async def _run_phases_sequential(
         self,
         project_id: str,
         repo_path: str,
@@ -177,111 +191,347 @@ class DocumentationService:
         event_handler,
         model_name: str,
         provider: str,
+        change_set: Optional[ChangeSet],
+        cost_tracker: Dict[str, Any],
     ) -> tuple:
         """
-        Runs the Miner phase: collect files, estimate cost, analyze with LLM.
-        Returns (miner_output_dict, cost_info_dict).
+        Runs the phases one after another, each on the complete output of
+        the previous one. Returns (pages_generated, error_message).
         """
-        miner_output_file = output_path / "miner_output.json"
-        cost_info = {"estimated_cost_usd": 0, "cached": False}
-
-        # Check cache
-        if miner_output_file.exists():
-            logger.info(f"[Miner] Loading cached output from {miner_output_file}")
-            await self._broadcast_stage(
-                project_id, "mining", "Loading cached analysis (skipping mining)..."
+        cost_tracker["schedule"] = {"mode": "sequential"}
+        with track_executor_stats() as miner_calls:
+            miner_output, miner_cost = await self._run_miner_phase(
+                project_id=project_id,
+                repo_path=repo_path,
+                output_path=output_path,
+                client=client,
+                event_handler=event_handler,
+                model_name=model_name,
+                provider=provider,
+                change_set=change_set,
             )
-            miner_output = await self._load_json(miner_output_file)
-            cost_info["cached"] = True
-            return miner_output, cost_info
 
-        await self._broadcast_stage(project_id, "mining", "Collecting source files...")
+        if miner_output is None:
+            return 0, "Miner phase failed"
 
-        # Collect files
-        files = await self._collect_source_files(repo_path)
-        logger.info(f"[Miner] Collected {len(files)} source files")
+        cost_tracker["phases"]["miner"] = miner_cost
+        self._record_call_stats(miner_cost, miner_calls)
 
-        if not files:
-            await self._broadcast_stage(
-                project_id, "error", "No source files found in repository"
+        # Near-duplicate facts are merged per module for the Scribe pages and
+        # across the whole project for the Architect
+        scribe_output, architect_output = await self._collapse_facts(
+            miner_output, cost_tracker
+        )
+        fact_index = FactIndex.from_miner_output(scribe_output)
+
+        with track_executor_stats() as architect_calls:
+            navigation, architect_cost = await self._run_architect_phase(
+                project_id=project_id,
+                output_path=output_path,
+                client=client,
+                event_handler=event_handler,
+                miner_output=architect_output,
+                fact_index=(
+                    fact_index
+                    if architect_output is scribe_output
+                    else FactIndex.from_miner_output(architect_output)
+                ),
+                repo_path=repo_path,
             )
-            return None, cost_info
 
-        # Estimate cost
-        total_tokens = sum(Tokenizer.count(content) for _, content in files)
-        input_cost_rate = self._get_input_cost_rate(model_name, provider)
-        output_cost_rate = self._get_output_cost_rate(model_name, provider)
+        if navigation is None:
+            return 0, "Architect phase failed"
 
-        # Estimate: each file produces ~200 output tokens
-        estimated_output_tokens = len(files) * 200
-        estimated_input_cost = (total_tokens / 1_000_000) * input_cost_rate
-        estimated_output_cost = (estimated_output_tokens / 1_000_000) * output_cost_rate
-        estimated_total = estimated_input_cost + estimated_output_cost
+        cost_tracker["phases"]["architect"] = architect_cost
+        self._record_call_stats(architect_cost, architect_calls)
 
-        cost_info["input_tokens"] = total_tokens
-        cost_info["estimated_output_tokens"] = estimated_output_tokens
-        cost_info["estimated_cost_usd"] = round(estimated_total, 6)
-        cost_info["model"] = model_name
-        cost_info["files_count"] = len(files)
+        with track_executor_stats() as scribe_calls:
+            pages_generated, scribe_cost = await self._run_scribe_phase(
+                project_id=project_id,
+                output_path=output_path,
+                client=client,
+                event_handler=event_handler,
+                navigation=navigation,
+                miner_output=scribe_output,
+                change_set=change_set,
+                fact_index=fact_index,
+            )
 
-        logger.info(
-            f"[Miner] Cost estimate: {total_tokens:,} input tokens, "
-            f"~{estimated_output_tokens:,} output tokens, "
-            f"${estimated_total:.4f} (rate: ${input_cost_rate}/M in, ${output_cost_rate}/M out)"
-        )
+        cost_tracker["phases"]["scribe"] = scribe_cost
+        self._record_call_stats(scribe_cost, scribe_calls)
+        return pages_generated, None
 
-        await self._broadcast_stage(
-            project_id,
-            "mining",
-            f"Analyzing {len(files)} files (~{total_tokens:,} tokens, "
-            f"est. ${estimated_total:.4f})...",
-        )
+    async def _run_phases_pipelined(
+        self,
+        project_id: str,
+        repo_path: str,
+        output_path: Path,
+        client,
+        event_handler,
+        model_name: str,
+        provider: str,
+        change_set: Optional[ChangeSet],
+        cost_tracker: Dict[str, Any],
+    ) -> tuple:
+        """
+        Runs the phases as a dependency graph instead of barriers:
+        - the Architect starts once a sample of the files (see
+          PIPELINE_ARCHITECT_SAMPLE_FRACTION) has been mined, planning from
+          their facts and the full module map of the walked files (unmined
+          files are listed without facts). For layouts the heuristic
+          planner may plan, the sample covers every module;
+        - each Scribe page starts once the plan exists and every file of the
+          modules it matches has been mined.
+        Returns (pages_generated, error_message).
+        """
+        tracker = MiningTracker()
+        with track_executor_stats() as miner_calls:
+            miner_task = asyncio.create_task(
+                self._run_miner_phase(
+                    project_id=project_id,
+                    repo_path=repo_path,
+                    output_path=output_path,
+                    client=client,
+                    event_handler=event_handler,
+                    model_name=model_name,
+                    provider=provider,
+                    change_set=change_set,
+                    tracker=tracker,
+                )
+            )
+        scribe_task: Optional[asyncio.Task] = None
+
+        async def stop(message: str) -> tuple:
+            for task in (miner_task, scribe_task):
+                if task and not task.done():
+                    task.cancel()
+            await asyncio.gather(
+                *(t for t in (miner_task, scribe_task) if t), return_exceptions=True
+            )
+            return 0, message
+
+        try:
+            # A cached plan does not need any facts
+            if not (output_path / "navigation.json").exists():
+                sample_wait = asyncio.create_task(
+                    tracker.wait_for_sample(
+                        PIPELINE_ARCHITECT_SAMPLE_FRACTION,
+                        PIPELINE_ARCHITECT_MIN_SAMPLE_FILES,
+                        (
+                            PIPELINE_ARCHITECT_MODULE_COVERAGE_LIMIT
+                            if settings.architect_heuristic_planner
+                            else 0
+                        ),
+                    )
+                )
+                await asyncio.wait(
+                    {sample_wait, miner_task}, return_when=asyncio.FIRST_COMPLETED
+                )
+                sample_wait.cancel()
+            if miner_task.done() and miner_task.result()[0] is None:
+                cost_tracker["phases"]["miner"] = miner_task.result()[1]
+                return 0, "Miner phase failed"
 
-        if estimated_total > DEFAULT_MAX_COST_USD:
-            msg = (
-                f"SAFETY LIMIT: Estimated cost ${estimated_total:.2f} "
-                f"exceeds ${DEFAULT_MAX_COST_USD:.2f}. "
-                f"Reduce files or use a cheaper model."
+            sample_output, architect_output = await self._collapse_facts(
+                tracker.snapshot_output(), cost_tracker
+            )
+            cost_tracker["schedule"] = {
+                "mode": "pipelined",
+                "architect_sample_files": len(tracker.results),
+                "files_walked": len(tracker.paths),
+            }
+            logger.info(
+                f"[Pipeline] Architect starting after {len(tracker.results)}/"
+                f"{len(tracker.paths)} files mined"
             )
-            logger.error(f"[Miner] {msg}")
-            await self._broadcast_stage(project_id, "error", msg)
-            return None, cost_info
 
-        # Run analysis with concurrency control
-        miner = MinerAgent(client, on_event=event_handler)
-        semaphore = asyncio.Semaphore(MINER_CONCURRENCY_LIMIT)
-        total_files = len(files)
+            with track_executor_stats() as architect_calls:
+                navigation, architect_cost = await self._run_architect_phase(
+                    project_id=project_id,
+                    output_path=output_path,
+                    client=client,
+                    event_handler=event_handler,
+                    miner_output=architect_output,
+                    fact_index=FactIndex.from_miner_output(architect_output),
+                    repo_path=repo_path,
+                )
 
-        async def analyze_with_limit(idx: int, file_path: str, content: str):
-            async with semaphore:
-                await asyncio.sleep(MINER_RATE_DELAY_SECONDS)
+            if navigation is None:
+                return await stop("Architect phase failed")
 
-                truncated_content = Tokenizer.truncate(
-                    content, MINER_MAX_TOKENS_PER_FILE
+            cost_tracker["phases"]["architect"] = architect_cost
+            self._record_call_stats(architect_cost, architect_calls)
+
+            with track_executor_stats() as scribe_calls:
+                scribe_task = asyncio.create_task(
+                    self._run_scribe_phase(
+                        project_id=project_id,
+                        output_path=output_path,
+                        client=client,
+                        event_handler=event_handler,
+                        navigation=navigation,
+                        miner_output=sample_output,
+                        change_set=change_set,
+                        tracker=tracker,
+                    )
                 )
 
-                await self._broadcast_progress(
-                    project_id,
-                    idx + 1,
-                    total_files,
-                    file_path,
-                    f"Mining: {file_path}",
+            miner_output, miner_cost = await miner_task
+            cost_tracker["phases"]["miner"] = miner_cost
+            self._record_call_stats(miner_cost, miner_calls)
+            if miner_output is None:
+                return await stop("Miner phase failed")
+
+            pages_generated, scribe_cost = await scribe_task
+            cost_tracker["phases"]["scribe"] = scribe_cost
+            if "fact_dedup" in scribe_cost:
+                # Pages collapse their modules as they are mined
+                cost_tracker["fact_dedup"]["module"] = scribe_cost.pop("fact_dedup")
+            self._record_call_stats(scribe_cost, scribe_calls)
+            return pages_generated, None
+        except BaseException:
+            await stop("cancelled")
+            raise
+
+    # ==================== PHASE 1: MINER ====================
+
+    async def _run_miner_phase(
+        self,
+        project_id: str,
+        repo_path: str,
+        output_path: Path,
+        client,
+        event_handler,
+        model_name: str,
+        provider: str,
+        change_set: Optional[ChangeSet] = None,
+        tracker: Optional[MiningTracker] = None,
+    ) -> tuple:
+        """
+        Runs the Miner phase: stream files from disk into the Miner.
+
+        Files flow through a bounded MinerPipeline (walker -> reader pool ->
+        Miner workers), so mining starts with the first file read and memory
+        stays flat regardless of repository size.
+
+        Results are cached per file in the `files` table, keyed on the
+        normalized content hash, the model and MINER_PROMPT_VERSION (and
+        MINER_COMPACTION_VERSION with settings.miner_compaction). Only files
+        whose key changed since the last run are sent to the LLM, which in
+        incremental mode are the added/modified files of `change_set`.
+        Cached facts of files deleted in `change_set` are dropped. Files that
+        miss the project cache are looked up in the cross-project FactStore,
+        and duplicated content within the repository is mined once.
+        Returns (miner_output_dict, cost_info_dict).
+        """
+        miner_output_file = output_path / "miner_output.json"
+        cost_info = {"estimated_cost_usd": 0, "cached": False}
+
+        await self._broadcast_stage(
+            project_id, "mining", "Collecting and analyzing source files..."
+        )
+
+        # Load per-file cache (minus files deleted since the last run)
+        async with self.session_factory() as session:
+            file_service = FileService(session)
+            if change_set and change_set.deleted:
+                removed = await file_service.remove_files(
+                    project_id, sorted(change_set.deleted)
                 )
-                return await miner.analyze_file(file_path, truncated_content)
+                cost_info["files_removed"] = removed
+                logger.info(f"[Miner] Dropped cached facts of {removed} deleted files")
+            cached_files = await file_service.get_analysis_cache(project_id)
+
+        input_cost_rate = self._get_input_cost_rate(model_name, provider)
+        output_cost_rate = self._get_output_cost_rate(model_name, provider)
+
+        async def on_progress(current: int, discovered: int, file_path: str):
+            await self._broadcast_progress(
+                project_id, current, discovered, file_path, f"Mining: {file_path}"
+            )
+
+        async def on_flush(entries):
+            async with self.session_factory() as session:
+                await FileService(session).save_analyses(project_id, entries)
+
+        # Optional second client for retrying calls that miss their deadline
+        fallback_miner = None
+        if settings.miner_fallback_provider:
+            fallback_kwargs = {}
+            if settings.miner_fallback_model:
+                fallback_kwargs["model"] = settings.miner_fallback_model
+            fallback_client = LLMFactory.get_client(
+                provider=settings.miner_fallback_provider, **fallback_kwargs
+            )
+            fallback_miner = MinerAgent(fallback_client, on_event=event_handler)
+
+        fact_store = FactStore(self.session_factory)
+        pipeline = MinerPipeline(
+            repo_path=repo_path,
+            miner=MinerAgent(client, on_event=event_handler),
+            model_name=model_name,
+            cached_files=cached_files,
+            input_cost_rate=input_cost_rate,
+            output_cost_rate=output_cost_rate,
+            max_cost_usd=DEFAULT_MAX_COST_USD,
+            on_progress=on_progress,
+            on_flush=on_flush,
+            batch_token_budget=settings.miner_batch_token_budget,
+            fallback_miner=fallback_miner,
+            fact_store=fact_store,
+            tracker=tracker,
+            compaction=settings.miner_compaction,
+        )
+        run = await pipeline.run()
 
-        tasks = [
-            analyze_with_limit(i, fpath, fcontent)
-            for i, (fpath, fcontent) in enumerate(files)
-        ]
-        results = await asyncio.gather(*tasks)
+        cost_info["input_tokens"] = run.input_tokens
+        cost_info["estimated_output_tokens"] = run.estimated_output_tokens
+        cost_info["estimated_cost_usd"] = round(run.estimated_cost_usd, 6)
+        cost_info["model"] = model_name
+        cost_info["files_count"] = len(run.paths)
+        cost_info["files_cached"] = run.files_cached
+        cost_info["files_mined"] = run.files_mined
+        cost_info["files_shared"] = run.files_shared
+        cost_info["files_deduplicated"] = run.files_deduplicated
+        cost_info["fact_store"] = dict(fact_store.stats)
+        cost_info["llm_requests"] = run.llm_requests
+        cost_info["batches"] = run.batches
+        cost_info["batch_retries"] = run.batch_retries
+        cost_info["files_chunked"] = run.files_chunked
+        cost_info["chunks_mined"] = run.chunks_mined
+        cost_info["chunks_cached"] = run.chunks_cached
+        if settings.miner_compaction:
+            cost_info["compaction"] = run.compaction_summary()
+        cost_info["timeouts"] = run.timeouts
+        cost_info["deadline_retries"] = run.deadline_retries
+        cost_info["file_latency"] = run.latency_summary()
+        cost_info["cached"] = run.files_mined == 0 and run.files_failed == 0
+        cost_info["rate_limiter"] = get_rate_limiter_for_client(client).snapshot()
+
+        if run.aborted:
+            logger.error(f"[Miner] {run.aborted}")
+            await self._broadcast_stage(project_id, "error", run.aborted)
+            return None, cost_info
 
-        miner_results = [res.model_dump() for res in results if res is not None]
-        miner_output = {"results": miner_results}
+        if not run.paths:
+            await self._broadcast_stage(
+                project_id, "error", "No source files found in repository"
+            )
+            return None, cost_info
 
         logger.info(
-            f"[Miner] Completed. Analyzed {len(miner_results)}/{total_files} files."
+            f"[Miner] Completed. Mined {run.files_mined} files, "
+            f"reused {run.files_cached} from cache, {run.files_shared} from the "
+            f"shared fact store, {run.files_deduplicated} duplicates, "
+            f"{run.files_failed} failed, "
+            f"in {run.llm_requests} requests ({run.batches} batches). "
+            f"Cost estimate: {run.input_tokens:,} input tokens, "
+            f"~{run.estimated_output_tokens:,} output tokens, "
+            f"${run.estimated_cost_usd:.4f} "
+            f"(rate: ${input_cost_rate}/M in, ${output_cost_rate}/M out)"
         )
 
+        miner_output = {"results": run.ordered_results()}
         await self._save_json(miner_output_file, miner_output)
         return miner_output, cost_info
 
@@ -294,9 +544,16 @@ class DocumentationService:
         client,
         event_handler,
         miner_output: Dict[str, Any],
+        fact_index: Optional[FactIndex] = None,
+        repo_path: Optional[str] = None,
     ) -> tuple:
         """
         Runs the Architect phase: plan navigation structure.
+        With `repo_path` (and settings.architect_heuristic_planner), the
+        repository is scanned for technologies so that small or conventional
+        layouts can be planned deterministically, without LLM calls.
+        Large repositories are summarized by directory subtree first; those
+        summaries are cached in subtree_summaries.json next to the navigation.
         Returns (navigation_dict, cost_info_dict).
         """
         navigation_file = output_path / "navigation.json"
@@ -321,8 +578,38 @@ class DocumentationService:
             project_id, "planning", "Designing documentation structure..."
         )
 
-        architect = ArchitectAgent(client, on_event=event_handler)
-        nav_obj = await architect.plan_navigation(miner_output)
+        # Subtree summaries of earlier runs (large repositories only)
+        summaries_file = output_path / "subtree_summaries.json"
+        summary_cache = (
+            await self._load_json(summaries_file) if summaries_file.exists() else {}
+        )
+
+        architect = ArchitectAgent(
+            client,
+            on_event=event_handler,
+            fact_index=fact_index,
+            summary_cache=summary_cache,
+        )
+        ecosystems = None
+        if repo_path and settings.architect_heuristic_planner:
+            try:
+                ecosystems = await asyncio.to_thread(
+                    TechnologyScanner(repo_path).scan
+                )
+            except Exception as e:
+                logger.warning(f"[Architect] Technology scan failed: {e}")
+        nav_obj = await architect.plan_navigation(
+            miner_output, ecosystems=ecosystems, repo_path=repo_path or ""
+        )
+        cost_info["planner"] = architect.plan_source
+        if architect.plan_confidence is not None:
+            cost_info["planner_confidence"] = architect.plan_confidence
+
+        summary_stats = architect.summarizer.stats
+        if summary_stats["map_calls"] or summary_stats["reduce_calls"]:
+            await self._save_json(summaries_file, architect.summarizer.cache)
+        if any(summary_stats.values()):
+            cost_info["subtree_summaries"] = dict(summary_stats)
 
         if not nav_obj:
             await self._broadcast_stage(
@@ -357,19 +644,58 @@ class DocumentationService:
         event_handler,
         navigation: Dict[str, Any],
         miner_output: Dict[str, Any],
+        change_set: Optional[ChangeSet] = None,
+        fact_index: Optional[FactIndex] = None,
+        tracker: Optional[MiningTracker] = None,
     ) -> tuple:
         """
         Runs the Scribe phase: write documentation pages.
-        Caches individual pages to avoid regenerating existing ones.
+        Every page file is stamped with the digest of the prompt, facts and
+        model it was written from (ScribePageInput.digest). A page is rewritten
+        only when that digest changes, so editing the navigation or the facts
+        of one module leaves every other page untouched. Pages written before
+        digests existed are kept unless, with a `change_set`, they draw on an
+        affected module.
+        Pages are independent, so up to SCRIBE_WORKER_POOL_SIZE are written at
+        once; each page file is saved as soon as it completes and progress
+        events are emitted in navigation order. With settings.scribe_streaming,
+        content_markdown is broadcast as `page_delta` events while each page is
+        generated, followed by the validated page in `page_completed`.
+        With settings.scribe_hierarchical, pages are written bottom-up along
+        the navigation tree (see _page_summary_sources): an overview or parent
+        page waits for its sub-pages and is written from their summaries plus
+        only the facts no sub-page covers.
+        With a `tracker` the Miner is still running: each page starts once the
+        modules it matches are mined and draws its facts from those modules
+        only (pages matching no module wait for the whole run), with
+        near-duplicates merged per module as in the sequential schedule.
+        The prompt then lacks the relevant facts of other modules that a
+        sequential run ranks in, but the digest only covers the page's own
+        module facts (ScribePageInput.digest), so pages written in either mode
+        are fresh in the other.
         Returns (pages_generated_count, cost_info_dict).
         """
         cost_info = {"estimated_cost_usd": 0, "pages_written": 0, "pages_cached": 0}
+        affected_modules = change_set.affected_modules() if change_set else set()
+        pages_invalidated = 0
 
         await self._broadcast_stage(
             project_id, "writing", "Writing documentation pages..."
         )
 
-        scribe = ScribeAgent(client, on_event=event_handler)
+        async def on_content(page_id: str, delta: Optional[str]):
+            if delta is None:
+                message = {"type": "page_stream_reset", "page_id": page_id}
+            else:
+                message = {"type": "page_delta", "page_id": page_id, "delta": delta}
+            await manager.broadcast(project_id, message)
+
+        scribe = ScribeAgent(
+            client,
+            on_event=event_handler,
+            fact_index=fact_index or FactIndex.from_miner_output(miner_output),
+            on_content=on_content if settings.scribe_streaming else None,
+        )
         pages_dir = output_path / "pages"
         pages_dir.mkdir(exist_ok=True)
 
@@ -380,170 +706,262 @@ class DocumentationService:
         )
         all_pages = self._get_all_pages_from_dict(tree_data)
 
-        pages_generated = 0
-        pages_cached = 0
+        # Bottom-up synthesis: every page publishes its summary (None if it
+        # has none) once cached, written or failed; parents wait for them
+        summary_sources = (
+            self._page_summary_sources(tree_data) if settings.scribe_hierarchical else {}
+        )
+        loop = asyncio.get_running_loop()
+        summaries: Dict[str, asyncio.Future] = {
+            page["id"]: loop.create_future() for page in all_pages
+        }
+        pages_synthesized = 0
+
+        total_pages = len(all_pages)
+        pages_fresh = 0
+        pages_stale = 0
+        pages_unstamped = 0
+
+        # Progress goes out in navigation order: a page's event waits until
+        # every page before it has been cached, written or has failed
+        reports: Dict[int, str] = {}
+        next_report = 0
+        report_lock = asyncio.Lock()
+
+        async def report(idx: int, message: str):
+            nonlocal next_report
+            async with report_lock:
+                reports[idx] = message
+                while next_report in reports:
+                    await self._broadcast_progress(
+                        project_id,
+                        next_report + 1,
+                        total_pages,
+                        all_pages[next_report]["label"],
+                        reports.pop(next_report),
+                    )
+                    next_report += 1
+
+        pages_written = 0
+        # Pacing and concurrency per provider come from the shared RateLimiter;
+        # this only caps pages in flight
+        slots = asyncio.Semaphore(SCRIBE_WORKER_POOL_SIZE)
+        full_index: Dict[str, FactIndex] = {}
+        # Pipelined runs: facts of each completed module, near-duplicates
+        # merged (settings.fact_dedup)
+        module_facts: Dict[str, List[Dict[str, Any]]] = {}
+        dedup_stats = DedupStats()
+
+        def completed_facts(modules: List[str]) -> List[Dict[str, Any]]:
+            results = []
+            for module in modules:
+                if module not in module_facts:
+                    facts = tracker.module_results([module])
+                    if settings.fact_dedup:
+                        facts, stats = collapse_near_duplicates(facts, per_module=True)
+                        dedup_stats.add(stats)
+                    module_facts[module] = facts
+                results.extend(module_facts[module])
+            return results
+
+        async def page_facts(page_info: Dict[str, Any]) -> Optional[FactIndex]:
+            """
+            With a `tracker` (pipelined run), waits until the page's modules are
+            mined and returns an index of their facts; a page matching no
+            module waits for the whole run. Otherwise the shared index is used.
+            """
+            if tracker is None:
+                return None
+            await tracker.wait_for_walk()
+            modules = tracker.module_index().match_any(page_info["modules"])
+            if modules:
+                await tracker.wait_for_modules(modules)
+                return FactIndex(completed_facts(modules))
+            await tracker.wait_until_finished()
+            if "all" not in full_index:
+                full_index["all"] = FactIndex(
+                    completed_facts(list(tracker.module_index().modules))
+                )
+            return full_index["all"]
 
-        for idx, page_info in enumerate(all_pages):
+        async def handle(idx: int, page_info: Dict[str, Any]):
+            summary = None
+            try:
+                summary = await write(idx, page_info)
+            finally:
+                published = summaries[page_info["id"]]
+                if not published.done():
+                    published.set_result(
+                        {"id": page_info["id"], "title": page_info["label"], "summary": summary}
+                        if summary
+                        else None
+                    )
+
+        async def write(idx: int, page_info: Dict[str, Any]) -> Optional[str]:
+            """Caches or writes one page; returns its summary, if any."""
+            nonlocal pages_fresh, pages_stale, pages_unstamped
+            nonlocal pages_invalidated, pages_written, pages_synthesized
             page_id = page_info["id"]
-            page_title = page_info["label"]
-            target_modules = page_info["modules"]
-            page_filename = f"{page_id}.json"
-            page_file_path = pages_dir / page_filename
-
-            # Cache check: skip pages that already exist
-            if page_file_path.exists():
-                logger.info(f"[Scribe] Skipping cached page: {page_id}")
-                pages_cached += 1
-                pages_generated += 1
-                await self._broadcast_progress(
-                    project_id,
-                    idx + 1,
-                    len(all_pages),
-                    page_title,
-                    f"Cached: {page_title}",
+            page_file_path = pages_dir / f"{page_id}.json"
+
+            # Sub-pages first: their summaries stand in for their raw facts
+            child_summaries = [
+                child
+                for child in await asyncio.gather(
+                    *(
+                        summaries[c]
+                        for c in summary_sources.get(page_id, [])
+                        if c in summaries
+                    )
                 )
-                continue
-
-            await self._broadcast_progress(
-                project_id,
-                idx + 1,
-                len(all_pages),
-                page_title,
-                f"Writing: {page_title}",
+                if child
+            ]
+
+            # The exact prompt this page would be written from; a page is
+            # fresh only if it was stamped with the same input digest
+            page_input = await scribe.prepare_page(
+                page_id,
+                self._scribe_page_type(page_id),
+                page_info["label"],
+                page_info["modules"],
+                miner_output,
+                fact_index=await page_facts(page_info),
+                child_summaries=child_summaries,
             )
+            page_info["digest"] = page_input.digest
 
-            page_type = (
-                "architecture_overview" if "overview" in page_id.lower() else "page"
-            )
-
-            try:
-                page_content = await scribe.write_page(
-                    page_id=page_id,
-                    page_type=page_type,
-                    page_title=page_title,
-                    target_modules=target_modules,
-                    miner_output=miner_output,
+            if page_file_path.exists():
+                stored = await self._stored_page(page_file_path)
+                # Unreadable files are always stale; unstamped pages (None)
+                # were written before digests existed
+                stored_digest = stored.get("input_digest") if stored is not None else ""
+                if stored_digest == page_info["digest"]:
+                    logger.info(f"[Scribe] Skipping fresh page: {page_id}")
+                    pages_fresh += 1
+                    await report(idx, f"Cached: {page_info['label']}")
+                    return stored.get("summary")
+                if stored_digest is not None:
+                    logger.info(f"[Scribe] Page inputs changed, rewriting: {page_id}")
+                    pages_stale += 1
+                # Unstamped pages (written before digests) are kept unless
+                # (incremental mode) they draw facts from a changed module
+                elif ScribeAgent.depends_on_modules(
+                    page_info["modules"], affected_modules
+                ):
+                    logger.info(f"[Scribe] Invalidating page affected by changes: {page_id}")
+                    pages_invalidated += 1
+                else:
+                    logger.info(f"[Scribe] Skipping cached page: {page_id}")
+                    pages_unstamped += 1
+                    await report(idx, f"Cached: {page_info['label']}")
+                    return stored.get("summary")
+
+            async with slots:
+                page_data = await self._write_scribe_page(
+                    scribe, page_info, page_file_path, miner_output
                 )
+            if not page_data:
+                await report(idx, f"Failed: {page_info['label']}")
+                return None
+
+            pages_written += 1
+            if child_summaries:
+                pages_synthesized += 1
+            if settings.scribe_streaming:
+                await manager.broadcast(
+                    project_id,
+                    {
+                        "type": "page_completed",
+                        "page_id": page_id,
+                        "page": page_data,
+                    },
+                )
+            await report(idx, f"Written: {page_info['label']}")
+            return page_data.get("summary")
 
-                if page_content:
-                    page_data = page_content.model_dump()
-
-                    if not page_data.get("id"):
-                        page_data["id"] = page_id
-
-                    if not page_data.get("content_markdown"):
-                        page_data["content_markdown"] = "# Content not generated."
-
-                    async with aiofiles.open(
-                        page_file_path, "w", encoding="utf-8"
-                    ) as f:
-                        await f.write(json.dumps(page_data, indent=2))
-
-                    pages_generated += 1
-                    await asyncio.sleep(0.3)
-
-            except Exception as e:
-                logger.error(f"[Scribe] Failed to write page {page_id}: {e}")
+        await asyncio.gather(
+            *(handle(idx, page_info) for idx, page_info in enumerate(all_pages))
+        )
 
+        pages_cached = pages_fresh + pages_unstamped
+        pages_generated = pages_cached + pages_written
         cost_info["pages_written"] = pages_generated - pages_cached
         cost_info["pages_cached"] = pages_cached
+        cost_info["pages_fresh"] = pages_fresh
+        cost_info["pages_stale"] = pages_stale
+        cost_info["pages_invalidated"] = pages_invalidated
+        cost_info["pages_synthesized"] = pages_synthesized
+        if tracker is not None and settings.fact_dedup:
+            cost_info["fact_dedup"] = dedup_stats.as_dict()
 
         logger.info(
             f"[Scribe] Completed. Written: {pages_generated - pages_cached}, "
-            f"Cached: {pages_cached}, Total: {pages_generated}"
+            f"Cached: {pages_cached}, Stale: {pages_stale}, Total: {pages_generated}"
         )
 
         return pages_generated, cost_info
 
-    # ==================== FILE COLLECTION ====================
-
-    async def _collect_source_files(self, repo_path: str) -> List[tuple]:
+    async def _write_scribe_page(
+        self,
+        scribe: ScribeAgent,
+        page_info: Dict[str, Any],
+        page_file_path: Path,
+        miner_output: Dict[str, Any],
+    ) -> Optional[Dict[str, Any]]:
         """
-        Collects source files from the repository.
-        Uses pre-filtering by size and extension before reading content.
-        Returns list of (relative_path, content) tuples.
+        Writes one page with the Scribe and saves its JSON atomically, so a
+        crash or a concurrent reader never sees a partial page file.
+        Returns the saved page data, or None if the page was not written.
         """
-        files = []
-        repo = Path(repo_path)
-        skipped_stats = {
-            "dirs": 0,
-            "ext": 0,
-            "hidden": 0,
-            "size": 0,
-            "binary": 0,
-            "name": 0,
-        }
+        page_id = page_info["id"]
+        page_type = self._scribe_page_type(page_id)
 
-        for root, dirs, filenames in os.walk(repo_path):
-            # Prune directories in-place
-            original_count = len(dirs)
-            dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith(".")]
-            skipped_stats["dirs"] += original_count - len(dirs)
-
-            for filename in filenames:
-                file_path = Path(root) / filename
-
-                # Skip by filename
-                if filename in IGNORE_FILENAMES:
-                    skipped_stats["name"] += 1
-                    continue
-
-                # Skip hidden files
-                if filename.startswith("."):
-                    skipped_stats["hidden"] += 1
-                    continue
-
-                # Skip by extension
-                if file_path.suffix.lower() in IGNORE_EXTENSIONS:
-                    skipped_stats["ext"] += 1
-                    continue
-
-                # Pre-filter by file size (avoids reading large files)
-                try:
-                    file_size = file_path.stat().st_size
-                    if file_size > MAX_FILE_SIZE_BYTES:
-                        skipped_stats["size"] += 1
-                        continue
-                    if file_size == 0:
-                        continue
-                except OSError:
-                    continue
+        try:
+            page_content = await scribe.write_page(
+                page_id=page_id,
+                page_type=page_type,
+                page_title=page_info["label"],
+                target_modules=page_info["modules"],
+                miner_output=miner_output,
+            )
+            if not page_content:
+                return None
 
-                try:
-                    async with aiofiles.open(
-                        file_path, "r", encoding="utf-8", errors="ignore"
-                    ) as f:
-                        content = await f.read()
+            page_data = page_content.model_dump()
 
-                    # Check for null bytes (binary file detection)
-                    if "\0" in content:
-                        skipped_stats["binary"] += 1
-                        continue
+            if not page_data.get("id"):
+                page_data["id"] = page_id
 
-                    relative_path = str(file_path.relative_to(repo))
-                    files.append((relative_path, content))
+            if not page_data.get("content_markdown"):
+                page_data["content_markdown"] = "# Content not generated."
 
-                    if len(files) >= MAX_FILES_LIMIT:
-                        logger.warning(
-                            f"[Collector] Reached file limit ({MAX_FILES_LIMIT}). "
-                            f"Stopping collection."
-                        )
-                        break
+            if page_info.get("digest"):
+                page_data["input_digest"] = page_info["digest"]
 
-                except Exception as e:
-                    logger.warning(f"[Collector] Could not read {file_path}: {e}")
+            tmp_path = page_file_path.with_name(f".{page_file_path.name}.tmp")
+            async with aiofiles.open(tmp_path, "w", encoding="utf-8") as f:
+                await f.write(json.dumps(page_data, indent=2))
+            os.replace(tmp_path, page_file_path)
+            return page_data
 
-            if len(files) >= MAX_FILES_LIMIT:
-                break
+        except Exception as e:
+            logger.error(f"[Scribe] Failed to write page {page_id}: {e}")
+            return None
 
-        logger.info(
-            f"[Collector] Collected {len(files)} files. Skipped: "
-            f"dirs={skipped_stats['dirs']}, ext={skipped_stats['ext']}, "
-            f"hidden={skipped_stats['hidden']}, size={skipped_stats['size']}, "
-            f"binary={skipped_stats['binary']}, name={skipped_stats['name']}"
-        )
+    @staticmethod
+    def _scribe_page_type(page_id: str) -> str:
+        return "architecture_overview" if "overview" in page_id.lower() else "page"
 
-        return files
+    async def _stored_page(self, page_file_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        A saved page file (its `input_digest` and `summary` drive caching and
+        synthesis), or None if it cannot be read.
+        """
+        try:
+            page_data = await self._load_json(page_file_path)
+        except (OSError, ValueError):
+            return None
+        return page_data if isinstance(page_data, dict) else None
 
     # ==================== COST ESTIMATION ====================
 
@@ -597,6 +1015,161 @@ class DocumentationService:
                 pages.extend(self._get_all_pages_from_dict(children, child_modules))
         return pages
 
+    def _page_summary_sources(self, items: List[Dict]) -> Dict[str, List[str]]:
+        """
+        For every page synthesized from other pages, the ids of the pages
+        whose summaries it is written from:
+        - a page with sub-pages covers its children;
+        - an overview page covers its siblings (other overviews excepted);
+        - a category among those is represented by its own overview page
+          when it has one, otherwise by its pages.
+        Sources never include the page itself or its ancestors, so writing
+        pages in this order is always possible.
+        """
+
+        def is_overview(node: Dict) -> bool:
+            return (
+                node.get("type") == "page"
+                and self._scribe_page_type(node.get("id") or "") == "architecture_overview"
+            )
+
+        def covering(nodes: List[Dict], skip_overviews: bool = False) -> List[str]:
+            if not skip_overviews:
+                overview = next((n for n in nodes if is_overview(n)), None)
+                if overview:
+                    return [overview["id"]]
+            ids = []
+            for node in nodes:
+                if node.get("type") == "page":
+                    if not (skip_overviews and is_overview(node)):
+                        ids.append(node["id"])
+                elif node.get("children"):
+                    ids.extend(covering(node["children"]))
+            return ids
+
+        sources: Dict[str, List[str]] = {}
+
+        def visit(nodes: List[Dict]):
+            for node in nodes:
+                children = node.get("children", [])
+                if node.get("type") == "page" and node.get("id"):
+                    ids = covering(nodes, skip_overviews=True) if is_overview(node) else []
+                    if children:
+                        ids.extend(covering(children))
+                    ids = [i for i in dict.fromkeys(ids) if i != node["id"]]
+                    if ids:
+                        sources[node["id"]] = ids
+                if children:
+                    visit(children)
+
+        visit(items)
+
+        # Duplicate page ids could still close a cycle: drop the closing edges
+        state: Dict[str, bool] = {}  # id -> still on the DFS path
+
+        def drop_cycles(page_id: str):
+            state[page_id] = True
+            kept = []
+            for source in sources.get(page_id, []):
+                if state.get(source):
+                    continue
+                if source not in state:
+                    drop_cycles(source)
+                kept.append(source)
+            if page_id in sources:
+                sources[page_id] = kept
+            state[page_id] = False
+
+        for page_id in list(sources):
+            if page_id not in state:
+                drop_cycles(page_id)
+        return sources
+
+    # ==================== INCREMENTAL MODE ====================
+
+    async def _head_commit(self, repo_path: str) -> Optional[str]:
+        """Returns the checked-out commit SHA, or None if not a git repository."""
+        try:
+            commit = await asyncio.to_thread(GitClient().latest_commit, repo_path)
+            return commit["hexsha"]
+        except Exception:
+            return None
+
+    async def _resolve_change_set(
+        self,
+        project_id: str,
+        repo_path: str,
+        head_commit: Optional[str],
+        cost_tracker: Optional[Dict[str, Any]] = None,
+    ) -> Optional[ChangeSet]:
+        """
+        Diffs the last documented commit against `head_commit`.
+        Returns None (full pass) when there is nothing to diff against.
+        The outcome, or the reason for the full pass, is recorded in
+        `cost_tracker["incremental"]`.
+        """
+        report = cost_tracker if cost_tracker is not None else {}
+
+        def full_pass(reason: str) -> None:
+            report["incremental"] = {"full_pass": True, "reason": reason}
+
+        async with self.session_factory() as session:
+            project = await ProjectService(session).get_project(project_id)
+        base_commit = project.last_commit if project else None
+
+        if not head_commit:
+            logger.info(
+                f"[Pipeline] {repo_path} is not a git repository. Running a full pass."
+            )
+            return full_pass("not a git repository")
+        if not base_commit:
+            logger.info(
+                f"[Pipeline] No previous commit for {project_id}. Running a full pass."
+            )
+            return full_pass("no previous run recorded a commit")
+
+        if base_commit == head_commit:
+            logger.info(f"[Pipeline] {project_id} unchanged since {head_commit[:8]}")
+            change_set = ChangeSet(base_commit, head_commit)
+        else:
+            try:
+                changes = await asyncio.to_thread(
+                    GitClient().diff_name_status, repo_path, base_commit, head_commit
+                )
+            except RuntimeError as e:
+                logger.warning(f"[Pipeline] Git diff failed, running a full pass: {e}")
+                return full_pass(f"git diff failed: {e}")
+
+            change_set = ChangeSet.from_name_status(base_commit, head_commit, changes)
+            logger.info(
+                f"[Pipeline] {base_commit[:8]}..{head_commit[:8]}: "
+                f"{len(change_set.changed)} added/modified, "
+                f"{len(change_set.deleted)} deleted"
+            )
+
+        report["incremental"] = {
+            "full_pass": False,
+            "base_commit": change_set.base_commit,
+            "head_commit": change_set.head_commit,
+            "files_changed": len(change_set.changed),
+            "files_deleted": len(change_set.deleted),
+        }
+        return change_set
+
+    async def _record_commit(self, project_id: str, repo_path: str, commit: str):
+        """Stores the commit this run documented, creating the project if needed."""
+        async with self.session_factory() as session:
+            project_service = ProjectService(session)
+            if not await project_service.get_project(project_id):
+                await project_service.create_project(
+                    id=project_id,
+                    name=os.path.basename(os.path.normpath(repo_path)),
+                    root_path=repo_path,
+                )
+            await project_service.update_project(
+                project_id, {"last_commit": commit, "root_path": repo_path}
+            )
+
     # ==================== I/O HELPERS ====================
 
     async def _save_json(self, path: Path, data: Dict[str, Any]):
@@ -634,6 +1207,44 @@ class DocumentationService:
             },
         )
 
+    async def _collapse_facts(
+        self, miner_output: Dict[str, Any], cost_tracker: Dict[str, Any]
+    ) -> tuple:
+        """
+        Merges near-duplicate Miner conclusions (settings.fact_dedup), once
+        per module and once across the project, and records the context
+        tokens each pass saved in cost_tracker["fact_dedup"].
+        Returns (per_module_output, per_project_output); both are the input
+        itself when deduplication is off.
+        """
+        if not settings.fact_dedup:
+            return miner_output, miner_output
+
+        results = miner_output.get("results", [])
+        module_results, module_stats = await asyncio.to_thread(
+            collapse_near_duplicates, results, True
+        )
+        project_results, project_stats = await asyncio.to_thread(
+            collapse_near_duplicates, module_results, False
+        )
+        cost_tracker["fact_dedup"] = {
+            "module": module_stats.as_dict(),
+            "project": project_stats.as_dict(),
+        }
+        logger.info(
+            f"[Pipeline] Near-duplicate facts: {module_stats.facts_in} -> "
+            f"{module_stats.facts_out} per module ({module_stats.tokens_saved} tokens saved), "
+            f"{project_stats.facts_out} across the project "
+            f"({project_stats.tokens_saved} more tokens saved)"
+        )
+        return {"results": module_results}, {"results": project_results}
+
+    @staticmethod
+    def _record_call_stats(cost_info: Dict[str, Any], stats: ExecutorStats):
+        """Adds LLM round-trips made and saved by terminal tools to a phase report."""
+        cost_info["llm_calls"] = stats.llm_calls
+        cost_info["llm_calls_saved"] = stats.calls_saved
+
     def _create_event_handler(self, project_id: str):
         """Creates an event handler for agent callbacks."""
 
@@ -40,20 +40,15 @@ class EndpointService:
         )
         logger.info(f"AI selected {len(candidate_files)} candidate files for analysis.")
 
-        all_endpoints = []
-
-        # 3. Analyze each candidate file
-        BATCH_SIZE = 5
-        for i in range(0, len(candidate_files), BATCH_SIZE):
-            batch = candidate_files[i : i + BATCH_SIZE]
-            tasks = [self._analyze_file(project_id, root_path, f) for f in batch]
-            results = await asyncio.gather(*tasks)
-
-            for res in results:
-                if res:
-                    all_endpoints.extend(res)
+        # 3. Analyze all candidates at once; the shared RateLimiter paces the calls
+        results = await asyncio.gather(
+            *(self._analyze_file(project_id, root_path, f) for f in candidate_files)
+        )
 
-            await asyncio.sleep(1)  # Rate limit protection
+        all_endpoints = [endpoint for res in results if res for endpoint in res]
+        # Single commit: concurrent analyses must not share the session
+        self.session.add_all(all_endpoints)
+        await self.session.commit()
 
         return all_endpoints
 
@@ -103,7 +98,7 @@ class EndpointService:
                 selection["files"] = selected_files
                 return "Selection received"
 
-            executor.register_tool(tool_def, submit_selected_files)
+            executor.register_tool(tool_def, submit_selected_files, terminal=True)
 
             await executor.run_until_complete(max_iterations=1)
 
@@ -122,6 +117,7 @@ class EndpointService:
     ) -> List[Endpoint]:
         """
         Uses LLM to extract endpoints from a single file.
+        Returns unsaved Endpoint rows; the caller persists them.
         """
         try:
             with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
@@ -184,13 +180,12 @@ class EndpointService:
                 extracted_data["items"] = endpoints
                 return "Saved"
 
-            executor.register_tool(tool_def, submit_endpoints)
+            executor.register_tool(tool_def, submit_endpoints, terminal=True)
 
             await executor.run_until_complete(max_iterations=1)
 
             new_endpoints = []
             for item in extracted_data["items"]:
-                # Save to DB
                 endpoint = Endpoint(
                     project_id=project_id,
                     path=item.get("path"),
@@ -200,10 +195,8 @@ class EndpointService:
                     description=item.get("description"),
                     framework="detected",
                 )
-                self.session.add(endpoint)
                 new_endpoints.append(endpoint)
 
-            await self.session.commit()
             return new_endpoints
 
         except Exception as e:
@@ -0,0 +1,88 @@
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.models.mined_fact import MinedFact
+from app.storage.mined_fact_repository import MinedFactRepository
+
+logger = get_logger(__name__)
+
+
+class FactStore:
+    """
+    Content-addressed store of Miner conclusions shared by every project.
+
+    Entries are keyed by the Miner cache key (normalized content hash, model
+    and prompt version), so identical files in forks, vendored copies or
+    other workspaces are mined once. Lookups read straight from the DB;
+    new entries and hit counts are buffered and written by `flush()`, which
+    also applies LRU eviction by entry count and total size.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.session_factory = session_factory
+        self.max_entries = (
+            settings.fact_store_max_entries if max_entries is None else max_entries
+        )
+        self.max_bytes = (
+            settings.fact_store_max_mb * 1024 * 1024 if max_bytes is None else max_bytes
+        )
+        self._pending: Dict[str, str] = {}
+        self._hits: Dict[str, int] = {}
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    async def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Returns the stored conclusions for `key`, or None on a miss."""
+        conclusions = self._pending.get(key)
+        if conclusions is None:
+            async with self.session_factory() as session:
+                fact = await MinedFactRepository(session).get_by_id(key)
+            conclusions = fact.conclusions if fact else None
+
+        if conclusions is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self._hits[key] = self._hits.get(key, 0) + 1
+        return json.loads(conclusions)
+
+    def put(self, key: str, conclusions: List[Dict[str, Any]]):
+        """Buffers freshly mined conclusions until the next `flush()`."""
+        if key:
+            self._pending[key] = json.dumps(conclusions)
+
+    async def flush(self) -> None:
+        """Writes buffered entries and hits, then evicts beyond the limits."""
+        pending, self._pending = self._pending, {}
+        hits, self._hits = self._hits, {}
+        if not pending and not hits:
+            return
+
+        now = datetime.now(timezone.utc).isoformat()
+        facts = [
+            MinedFact(
+                key=key,
+                conclusions=conclusions,
+                size_bytes=len(conclusions.encode("utf-8")),
+                created_at=now,
+                last_used_at=now,
+            )
+            for key, conclusions in pending.items()
+        ]
+        async with self.session_factory() as session:
+            repo = MinedFactRepository(session)
+            self.stats["stored"] += await repo.insert_missing(facts)
+            if hits:
+                await repo.touch(hits, now)
+            if pending:
+                evicted = await repo.evict(self.max_entries, self.max_bytes)
+                if evicted:
+                    logger.info(f"[FactStore] Evicted {evicted} least recently used entries")
+                self.stats["evicted"] += evicted
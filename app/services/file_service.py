@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.file import File
 from app.storage.file_repository import FileRepository
@@ -43,3 +43,42 @@ class FileService:
         # Our base repo uses a single id, but File has composite key (project_id, path)
         # We might need to adjust the repository but for now we follow the pattern
         return await self.repo.update((project_id, path), data)
+
+    async def get_analysis_cache(self, project_id: str) -> Dict[str, File]:
+        """
+        Returns the analyzed files of a project indexed by path.
+        Each file's `hash` holds the Miner cache key it was analyzed with and
+        its `summary` holds the serialized MinerOutput.
+        """
+        files = await self.repo.get_by_project(project_id)
+        return {f.path: f for f in files if f.analyzed and f.summary}
+
+    async def remove_files(self, project_id: str, paths: List[str]) -> int:
+        """Drops files (and their cached Miner facts) that no longer exist."""
+        return await self.repo.delete_paths(project_id, paths)
+
+    async def save_analyses(
+        self, project_id: str, entries: List[Tuple[str, str, str]]
+    ) -> None:
+        """
+        Stores Miner results for several files at once.
+
+        Args:
+            project_id: Project the files belong to.
+            entries: List of (path, cache_key, serialized_miner_output) tuples.
+        """
+        if not entries:
+            return
+        analyzed_at = datetime.now(timezone.utc).isoformat()
+        files = [
+            File(
+                project_id=project_id,
+                path=path,
+                hash=cache_key,
+                analyzed=1,
+                summary=summary,
+                last_analyzed_at=analyzed_at,
+            )
+            for path, cache_key, summary in entries
+        ]
+        await self.repo.upsert_many(files)
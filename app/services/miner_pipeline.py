@@ -0,0 +1,984 @@
+import os
+import json
+import math
+import time
+import asyncio
+import itertools
+import aiofiles
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional,
+    Iterator,
+    Callable,
+    Awaitable,
+    Tuple,
+    Union,
+)
+
+from app.agents.core.rate_limiter import CallDeadlineExceeded, call_deadline
+from app.agents.miner.agent import MinerAgent
+from app.agents.miner.schema import MinerOutput
+from app.core.chunking import split_into_chunks
+from app.core.compaction import compact_source
+from app.core.content_hash import content_hash, miner_cache_key
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+from app.services.fact_store import FactStore
+from app.services.mining_tracker import MiningTracker
+from app.core.constants import (
+    SKIP_DIRS,
+    IGNORE_EXTENSIONS,
+    IGNORE_FILENAMES,
+    MAX_FILE_SIZE_BYTES,
+    MAX_FILES_LIMIT,
+    MINER_WORKER_POOL_SIZE,
+    MINER_MAX_TOKENS_PER_FILE,
+    MINER_PROMPT_VERSION,
+    MINER_READER_POOL_SIZE,
+    MINER_QUEUE_SIZE,
+    MINER_CACHE_FLUSH_SIZE,
+    MINER_OUTPUT_TOKENS_PER_FILE,
+    MINER_BATCH_MAX_FILE_TOKENS,
+    MINER_BATCH_FILE_OVERHEAD_TOKENS,
+    MINER_BATCH_WINDOW_BATCHES,
+    MINER_SCHEDULE_WINDOW,
+    MINER_CALL_TIMEOUT_SECONDS_PER_1K_TOKENS,
+    MINER_COMPACTION_REPORT_FILES,
+    MINER_COMPACTION_VERSION,
+)
+
+logger = get_logger(__name__)
+
+# Sentinel used to signal the end of a queue to its consumers
+_END = None
+# Priority of the end sentinel: always dequeued after every real item
+_END_PRIORITY = math.inf
+# Key of the per-chunk conclusions stored alongside a chunked file's summary
+_CHUNKS_KEY = "chunks"
+# Key of the file's exact token count ({"key": count_key, "count": n}) stored
+# alongside its summary, reused when the content is unchanged but the Miner
+# cache key is not (new model or prompt version)
+_TOKENS_KEY = "tokens"
+
+
+@dataclass
+class ChunkedFile:
+    """
+    A large file mined as several chunks.
+    Collects the conclusions of each chunk until all of them are in.
+    """
+
+    path: str
+    # Cache key of the whole file content
+    cache_key: str
+    chunk_keys: List[str]
+    # Conclusions (as dicts) per chunk, in file order; None until mined
+    outputs: List[Optional[List[Dict[str, Any]]]]
+    pending: int = 0
+    failed: int = 0
+    reused: int = 0
+    started_at: Optional[float] = None
+
+
+@dataclass
+class SourceFile:
+    """A source file (or one chunk of it) that still needs to be mined."""
+
+    path: str
+    content: str
+    cache_key: str
+    tokens: int = 0
+    # Set for chunks of a large file: the parent file and this chunk's index
+    parent: Optional[ChunkedFile] = None
+    index: int = 0
+    # Human-readable position of the chunk, passed to the Miner
+    part: Optional[str] = None
+
+
+# A unit of Miner work: one file, or several small files sharing a request
+MinerWorkItem = Union[SourceFile, List[SourceFile]]
+
+
+def _work_item_tokens(item: MinerWorkItem) -> int:
+    if isinstance(item, list):
+        return sum(f.tokens for f in item)
+    return item.tokens
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class MinerPipelineResult:
+    """Outcome of a streaming Miner run."""
+
+    # Relative paths of every accepted file, in walk order
+    paths: List[str] = field(default_factory=list)
+    # Miner output dicts by relative path (cached and freshly mined)
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    files_cached: int = 0
+    files_mined: int = 0
+    files_failed: int = 0
+    # Files answered by the cross-project FactStore, and files whose content
+    # duplicates another file of this run (mined once, shared)
+    files_shared: int = 0
+    files_deduplicated: int = 0
+    # Large files mined in chunks, and how many of their chunks were
+    # mined vs. reused from the previous run
+    files_chunked: int = 0
+    chunks_mined: int = 0
+    chunks_cached: int = 0
+    # LLM requests issued (single files, batches and per-file retries)
+    llm_requests: int = 0
+    batches: int = 0
+    batch_retries: int = 0
+    # Calls cancelled for exceeding their deadline, and how many were retried
+    timeouts: int = 0
+    deadline_retries: int = 0
+    # Wall time of the LLM work for each mined file (seconds, by path)
+    latencies: Dict[str, float] = field(default_factory=dict)
+    input_tokens: int = 0
+    estimated_output_tokens: int = 0
+    estimated_cost_usd: float = 0.0
+    skipped: Dict[str, int] = field(default_factory=dict)
+    # Set when the cost guard stopped the run
+    aborted: Optional[str] = None
+    # Input compaction: tokens of the files before compaction, files changed
+    # and reduced to a skeleton, and tokens saved by path
+    compaction_input_tokens: int = 0
+    files_compacted: int = 0
+    files_skeletonized: int = 0
+    compaction_savings: Dict[str, int] = field(default_factory=dict)
+
+    def ordered_results(self) -> List[Dict[str, Any]]:
+        """Returns the Miner outputs in walk order."""
+        return [self.results[p] for p in self.paths if p in self.results]
+
+    def latency_summary(self) -> Dict[str, Any]:
+        """Returns p50/p99/max per-file latency and the slowest file."""
+        values = list(self.latencies.values())
+        slowest = max(self.latencies, key=self.latencies.get) if values else None
+        return {
+            "p50_s": round(_percentile(values, 50), 3),
+            "p99_s": round(_percentile(values, 99), 3),
+            "max_s": round(max(values), 3) if values else 0.0,
+            "slowest_file": slowest,
+        }
+
+    def compaction_summary(self) -> Dict[str, Any]:
+        """Tokens saved by input compaction, with the files that saved most."""
+        saved = sum(self.compaction_savings.values())
+        top = sorted(self.compaction_savings.items(), key=lambda kv: kv[1], reverse=True)
+        return {
+            "files_compacted": self.files_compacted,
+            "files_skeletonized": self.files_skeletonized,
+            "tokens_before": self.compaction_input_tokens,
+            "tokens_saved": saved,
+            "saved_pct": round(100 * saved / max(1, self.compaction_input_tokens), 1),
+            "top_files": dict(top[:MINER_COMPACTION_REPORT_FILES]),
+        }
+
+
+def walk_source_files(
+    repo_path: str, skipped_stats: Dict[str, int]
+) -> Iterator[Tuple[Path, str, int]]:
+    """
+    Lazily yields (absolute_path, relative_path, size_bytes) for candidate
+    source files.
+
+    Filtering is metadata-only (directory, name, extension, size); content is
+    never read here so the walk stays cheap on large repositories.
+    """
+    repo = Path(repo_path)
+
+    for root, dirs, filenames in os.walk(repo_path):
+        # Prune directories in-place
+        original_count = len(dirs)
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith(".")]
+        skipped_stats["dirs"] += original_count - len(dirs)
+
+        for filename in filenames:
+            file_path = Path(root) / filename
+
+            # Skip by filename
+            if filename in IGNORE_FILENAMES:
+                skipped_stats["name"] += 1
+                continue
+
+            # Skip hidden files
+            if filename.startswith("."):
+                skipped_stats["hidden"] += 1
+                continue
+
+            # Skip by extension
+            if file_path.suffix.lower() in IGNORE_EXTENSIONS:
+                skipped_stats["ext"] += 1
+                continue
+
+            # Pre-filter by file size (avoids reading large files)
+            try:
+                file_size = file_path.stat().st_size
+                if file_size > MAX_FILE_SIZE_BYTES:
+                    skipped_stats["size"] += 1
+                    continue
+                if file_size == 0:
+                    continue
+            except OSError:
+                continue
+
+            yield file_path, str(file_path.relative_to(repo)), file_size
+
+
+def pack_first_fit_decreasing(
+    files: List[SourceFile], token_budget: int
+) -> List[List[SourceFile]]:
+    """
+    Packs files into batches of at most `token_budget` tokens.
+
+    First-fit decreasing: files are sorted by size (largest first) and each
+    one goes into the first batch with enough room left, opening a new batch
+    when none fits. Per-file framing overhead counts against the budget.
+    """
+    bins: List[List[SourceFile]] = []
+    remaining: List[int] = []
+
+    for source in sorted(files, key=lambda f: f.tokens, reverse=True):
+        cost = source.tokens + MINER_BATCH_FILE_OVERHEAD_TOKENS
+        for idx, room in enumerate(remaining):
+            if cost <= room:
+                bins[idx].append(source)
+                remaining[idx] -= cost
+                break
+        else:
+            bins.append([source])
+            remaining.append(token_budget - cost)
+
+    return bins
+
+
+class MinerPipeline:
+    """
+    Bounded producer/consumer pipeline between the file walker and the Miner.
+
+    Stages:
+    - Walker: lazily yields candidate paths into a bounded path queue.
+    - Readers: a small pool that reads files, drops binaries, resolves cache
+      hits and pushes the remaining files into a bounded work queue.
+    - Workers: a fixed pool of Miner workers consuming the work queue.
+
+    When `batch_token_budget` is set, files of at most
+    MINER_BATCH_MAX_FILE_TOKENS are buffered and bin-packed (first-fit
+    decreasing) into shared `MinerAgent.analyze_batch` requests, so small
+    files no longer pay for their own round-trip and system prompt. Larger
+    files are still mined alone, and any file missing from a batch response
+    is retried on its own.
+
+    Scheduling is longest-processing-time first: up to `schedule_window`
+    walked paths wait in a priority queue ordered by file size, and the work
+    queue is ordered by token count, so large files start early instead of
+    becoming the straggler that decides when the phase ends. Paths are cheap,
+    so the window can be far larger than the content queue.
+
+    Files above MINER_MAX_TOKENS_PER_FILE are split along syntax boundaries
+    (`split_into_chunks`) rather than truncated. Chunks are scheduled like
+    independent files, so they are mined in parallel, and their conclusions
+    are merged back into one `MinerOutput`. Each chunk has its own cache key,
+    stored with the file's summary, so editing one function re-mines only
+    the chunk that contains it.
+
+    Before any LLM call, a file's cache key is checked against the other
+    files of the run, so duplicated content is mined once and shared, and
+    then against the cross-project `fact_store` when one is given. Freshly
+    mined conclusions (whole files and chunks) are added to the store.
+
+    Every LLM call gets a deadline that scales with its token count. A call
+    past its deadline is cancelled and retried once, on `fallback_miner` when
+    one is configured. Per-file latency is recorded in the result.
+
+    With a `tracker`, walked paths and file results are reported as they
+    happen, so later phases can start on the files they depend on.
+
+    With `compaction`, each file is compacted (`compact_source`) once it is
+    counted and before it is batched, chunked or mined, and the tokens saved
+    are recorded per file. Compacted files use their own cache keys.
+
+    Mining starts as soon as the first file is read, and at most
+    `queue_size` file contents are held in memory at any time regardless of
+    repository size. The cost safety limit is enforced as a running budget.
+    """
+
+    def __init__(
+        self,
+        repo_path: str,
+        miner: MinerAgent,
+        model_name: str,
+        cached_files: Dict[str, Any],
+        input_cost_rate: float,
+        output_cost_rate: float,
+        max_cost_usd: float,
+        on_progress: Optional[Callable[[int, int, str], Awaitable[None]]] = None,
+        on_flush: Optional[Callable[[List[Tuple[str, str, str]]], Awaitable[None]]] = None,
+        batch_token_budget: int = 0,
+        reader_count: int = MINER_READER_POOL_SIZE,
+        worker_count: int = MINER_WORKER_POOL_SIZE,
+        queue_size: int = MINER_QUEUE_SIZE,
+        schedule_window: int = MINER_SCHEDULE_WINDOW,
+        fallback_miner: Optional[MinerAgent] = None,
+        call_timeout_seconds: Optional[float] = None,
+        fact_store: Optional[FactStore] = None,
+        tracker: Optional[MiningTracker] = None,
+        compaction: bool = False,
+    ):
+        self.repo_path = repo_path
+        self.miner = miner
+        self.model_name = model_name
+        self.cached_files = cached_files
+        self.input_cost_rate = input_cost_rate
+        self.output_cost_rate = output_cost_rate
+        self.max_cost_usd = max_cost_usd
+        self.on_progress = on_progress
+        self.on_flush = on_flush
+        self.batch_token_budget = batch_token_budget
+        self.reader_count = reader_count
+        self.worker_count = worker_count
+        self.fallback_miner = fallback_miner
+        self.fact_store = fact_store
+        self.tracker = tracker
+        self.compaction = compaction
+        # Compacted files get other facts than the raw ones: separate cache keys
+        self.prompt_version = (
+            f"{MINER_PROMPT_VERSION}+{MINER_COMPACTION_VERSION}"
+            if compaction
+            else MINER_PROMPT_VERSION
+        )
+        self.call_timeout_seconds = (
+            settings.miner_call_timeout_seconds
+            if call_timeout_seconds is None
+            else call_timeout_seconds
+        )
+
+        # Both queues hold (priority, sequence, item); lower priority first
+        self.path_queue: asyncio.PriorityQueue = asyncio.PriorityQueue(
+            maxsize=schedule_window
+        )
+        self.work_queue: asyncio.PriorityQueue = asyncio.PriorityQueue(
+            maxsize=queue_size
+        )
+        self._sequence = itertools.count()
+        self.result = MinerPipelineResult(
+            skipped={
+                "dirs": 0,
+                "ext": 0,
+                "hidden": 0,
+                "size": 0,
+                "binary": 0,
+                "name": 0,
+            }
+        )
+        self._active_readers = reader_count
+        self._discovered = 0
+        self._started = 0
+        self._pending_entries: List[Tuple[str, str, str]] = []
+        self._batch_buffer: List[SourceFile] = []
+        self._batch_buffer_tokens = 0
+        self._flush_lock = asyncio.Lock()
+        # Content keys being mined in this run -> duplicate paths waiting on them
+        self._followers: Dict[str, List[str]] = {}
+        # Content keys already resolved in this run -> their conclusions
+        self._resolved: Dict[str, List[Dict[str, Any]]] = {}
+        # Exact token counts measured this run, persisted with each summary
+        self._token_counts: Dict[str, Dict[str, Any]] = {}
+
+    async def run(self) -> MinerPipelineResult:
+        """Runs all stages to completion and returns the collected results."""
+        tasks = [asyncio.create_task(self._walk())]
+        tasks += [asyncio.create_task(self._reader()) for _ in range(self.reader_count)]
+        tasks += [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            if self.tracker:
+                self.tracker.finish()
+
+        await self._flush(force=True)
+
+        skipped = self.result.skipped
+        logger.info(
+            f"[Collector] Collected {len(self.result.paths)} files. Skipped: "
+            f"dirs={skipped['dirs']}, ext={skipped['ext']}, "
+            f"hidden={skipped['hidden']}, size={skipped['size']}, "
+            f"binary={skipped['binary']}, name={skipped['name']}"
+        )
+        if self.result.latencies:
+            latency = self.result.latency_summary()
+            logger.info(
+                f"[Miner] File latency p50={latency['p50_s']}s "
+                f"p99={latency['p99_s']}s max={latency['max_s']}s "
+                f"({latency['slowest_file']}), timeouts={self.result.timeouts}"
+            )
+        return self.result
+
+    # ==================== STAGES ====================
+
+    def _should_stop(self) -> bool:
+        return (
+            self.result.aborted is not None
+            or len(self.result.paths) >= MAX_FILES_LIMIT
+        )
+
+    async def _walk(self):
+        """Producer: feeds candidate paths to the reader pool, largest first."""
+        for abs_path, rel_path, size in walk_source_files(
+            self.repo_path, self.result.skipped
+        ):
+            if self._should_stop():
+                if len(self.result.paths) >= MAX_FILES_LIMIT:
+                    logger.warning(
+                        f"[Collector] Reached file limit ({MAX_FILES_LIMIT}). "
+                        f"Stopping collection."
+                    )
+                break
+            self._discovered += 1
+            if self.tracker:
+                self.tracker.discovered(rel_path)
+            await self._put(self.path_queue, -size, (abs_path, rel_path))
+
+        if self.tracker:
+            self.tracker.walk_complete()
+        for _ in range(self.reader_count):
+            await self._put(self.path_queue, _END_PRIORITY, _END)
+
+    async def _reader(self):
+        """Reads files, resolves cache hits and forwards misses to the workers."""
+        try:
+            await self._read_until_end()
+        finally:
+            self._active_readers -= 1
+
+        # The last reader to finish flushes pending batches and closes the queue
+        if self._active_readers == 0:
+            await self._dispatch_batches()
+            for _ in range(self.worker_count):
+                await self._put(self.work_queue, _END_PRIORITY, _END)
+
+    async def _read_until_end(self):
+        while True:
+            _, _, item = await self.path_queue.get()
+            if item is _END:
+                return
+            if self._should_stop():
+                continue
+
+            abs_path, rel_path = item
+            try:
+                async with aiofiles.open(
+                    abs_path, "r", encoding="utf-8", errors="ignore"
+                ) as f:
+                    content = await f.read()
+            except Exception as e:
+                logger.warning(f"[Collector] Could not read {abs_path}: {e}")
+                continue
+
+            # Check for null bytes (binary file detection)
+            if "\0" in content:
+                self.result.skipped["binary"] += 1
+                continue
+
+            if self._should_stop():
+                continue
+            self.result.paths.append(rel_path)
+
+            key = miner_cache_key(
+                content_hash(content, rel_path), self.model_name, self.prompt_version
+            )
+            cached = self.cached_files.get(rel_path)
+            if cached and cached.hash == key:
+                data = json.loads(cached.summary)
+                data.pop(_CHUNKS_KEY, None)
+                data.pop(_TOKENS_KEY, None)
+                self._store_result(rel_path, data)
+                self.result.files_cached += 1
+                continue
+
+            if await self._resolve_shared(rel_path, key):
+                continue
+
+            # One encode per file: the count is memoized for chunking and the
+            # request, and persisted with the summary for later runs
+            count_key = Tokenizer.count_key(content)
+            stored = _cached_token_count(cached)
+            if count_key and stored.get("key") == count_key:
+                Tokenizer.remember(count_key, stored["count"])
+            with Tokenizer.source(rel_path):
+                tokens = await Tokenizer.count_async(content)
+                if count_key:
+                    self._token_counts[rel_path] = {"key": count_key, "count": tokens}
+                if self.compaction:
+                    content, tokens = await self._compact(rel_path, content, tokens)
+                if tokens > MINER_MAX_TOKENS_PER_FILE:
+                    await self._dispatch_chunks(rel_path, content, key, cached)
+                    continue
+            if not self._reserve_budget(tokens):
+                continue
+
+            source = SourceFile(rel_path, content, key, tokens)
+            if self.batch_token_budget and tokens <= MINER_BATCH_MAX_FILE_TOKENS:
+                self._batch_buffer.append(source)
+                self._batch_buffer_tokens += tokens
+                window = self.batch_token_budget * MINER_BATCH_WINDOW_BATCHES
+                if self._batch_buffer_tokens >= window:
+                    await self._dispatch_batches()
+                continue
+
+            await self._enqueue_work(source)
+
+    async def _compact(self, rel_path: str, content: str, tokens: int) -> Tuple[str, int]:
+        """Compacts a file's Miner input; returns the content and its tokens."""
+        compacted = await Tokenizer.offload(
+            compact_source, content, rel_path, MINER_MAX_TOKENS_PER_FILE, tokens
+        )
+        self.result.compaction_input_tokens += tokens
+        if compacted.text is content:
+            return content, tokens
+        self.result.files_compacted += 1
+        if compacted.skeleton:
+            self.result.files_skeletonized += 1
+        self.result.compaction_savings[rel_path] = compacted.tokens_saved
+        logger.debug(
+            f"[Miner] Compacted {rel_path}: {tokens} -> {compacted.tokens} tokens"
+            + (
+                f" (skeleton, {compacted.bodies_kept} bodies kept)"
+                if compacted.skeleton
+                else ""
+            )
+        )
+        return compacted.text, compacted.tokens
+
+    async def _dispatch_chunks(
+        self, rel_path: str, content: str, key: str, cached: Optional[Any]
+    ):
+        """
+        Splits a large file into chunks, reuses the chunks whose content is
+        unchanged since the previous run and enqueues the others.
+        """
+        chunks = await Tokenizer.offload(
+            split_into_chunks, content, rel_path, MINER_MAX_TOKENS_PER_FILE
+        )
+        previous = _cached_chunks(cached)
+        parent = ChunkedFile(rel_path, key, [], [None] * len(chunks))
+        self.result.files_chunked += 1
+
+        to_mine: List[SourceFile] = []
+        for index, chunk in enumerate(chunks):
+            chunk_key = miner_cache_key(
+                content_hash(chunk.text, rel_path),
+                self.model_name,
+                self.prompt_version,
+            )
+            parent.chunk_keys.append(chunk_key)
+            shared = previous.get(chunk_key)
+            if shared is None and self.fact_store:
+                shared = await self.fact_store.get(chunk_key)
+            if shared is not None:
+                parent.outputs[index] = shared
+                parent.reused += 1
+                continue
+            if not self._reserve_budget(chunk.tokens):
+                return
+            part = (
+                f"lines {chunk.start_line}-{chunk.end_line} "
+                f"(part {index + 1} of {len(chunks)})"
+            )
+            to_mine.append(
+                SourceFile(
+                    rel_path, chunk.text, chunk_key, chunk.tokens, parent, index, part
+                )
+            )
+
+        self.result.chunks_cached += parent.reused
+        parent.pending = len(to_mine)
+        logger.info(
+            f"[Miner] {rel_path}: {len(chunks)} chunks, "
+            f"{parent.reused} unchanged, {len(to_mine)} to mine"
+        )
+        if not to_mine:
+            self._complete_chunked(parent)
+            return
+        for source in to_mine:
+            await self._enqueue_work(source)
+
+    async def _dispatch_batches(self):
+        """Bin-packs the buffered small files and enqueues the batches."""
+        buffered, self._batch_buffer = self._batch_buffer, []
+        self._batch_buffer_tokens = 0
+        if not buffered:
+            return
+
+        for batch in pack_first_fit_decreasing(buffered, self.batch_token_budget):
+            # A lone file gains nothing from the batch prompt
+            await self._enqueue_work(batch[0] if len(batch) == 1 else batch)
+
+    async def _worker(self):
+        """Mines files from the work queue until the end sentinel arrives."""
+        while True:
+            _, _, item = await self.work_queue.get()
+            if item is _END:
+                return
+            if self.result.aborted:
+                continue
+
+            # Pacing and concurrency are enforced by the shared RateLimiter
+            if isinstance(item, list):
+                await self._mine_batch(item)
+            else:
+                await self._mine_single(item)
+            await self._flush()
+
+    async def _mine_single(self, source: SourceFile):
+        """Mines one file in its own request."""
+        # Estimates and reported usage are calibrated per file type
+        with Tokenizer.source(source.path):
+            await self._mine_source(source)
+
+    async def _mine_source(self, source: SourceFile):
+        self._started += 1
+        # Sources are counted (and oversized files chunked) when dispatched,
+        # so only a source over the limit needs another encode here
+        truncated_content = (
+            source.content
+            if source.tokens <= MINER_MAX_TOKENS_PER_FILE
+            else await Tokenizer.truncate_async(source.content, MINER_MAX_TOKENS_PER_FILE)
+        )
+        if self.on_progress:
+            await self.on_progress(self._started, self._discovered, source.path)
+
+        started = time.monotonic()
+        if source.parent and source.parent.started_at is None:
+            source.parent.started_at = started
+        # Only chunks carry a part description
+        part = {"part": source.part} if source.part else {}
+        output = await self._call_with_deadline(
+            f"{source.path} {source.part}" if source.part else source.path,
+            source.tokens,
+            lambda miner: miner.analyze_file(source.path, truncated_content, **part),
+        )
+        if source.parent:
+            self._record_chunk(source, output)
+            return
+        self.result.latencies[source.path] = time.monotonic() - started
+        if output is None:
+            self.result.files_failed += 1
+            self._settle(source.cache_key, None)
+            return
+        self._record(source, output)
+
+    async def _mine_batch(self, batch: List[SourceFile]):
+        """
+        Mines several small files in one request.
+        Files missing from the batch response are retried individually.
+        """
+        self._started += len(batch)
+        if self.on_progress:
+            await self.on_progress(
+                self._started,
+                self._discovered,
+                f"{batch[0].path} (+{len(batch) - 1} files)",
+            )
+
+        self.result.batches += 1
+        files = [(f.path, f.content) for f in batch]
+        started = time.monotonic()
+        output = await self._call_with_deadline(
+            f"batch of {len(batch)} files",
+            _work_item_tokens(batch),
+            lambda miner: miner.analyze_batch(files),
+        )
+        elapsed = time.monotonic() - started
+
+        returned: Dict[str, MinerOutput] = {}
+        if output:
+            for file_output in output.results:
+                returned[_normalize_result_path(file_output.file)] = file_output
+
+        for source in batch:
+            file_output = returned.get(_normalize_result_path(source.path))
+            if file_output is None:
+                logger.info(
+                    f"[Miner] {source.path} missing from batch response, retrying alone"
+                )
+                self.result.batch_retries += 1
+                self._started -= 1
+                await self._mine_single(source)
+                continue
+            file_output.file = source.path
+            self.result.latencies[source.path] = elapsed
+            self._record(source, file_output)
+
+    def _record(self, source: SourceFile, output: MinerOutput):
+        result_data = output.model_dump()
+        self._store_result(source.path, result_data)
+        self.result.files_mined += 1
+        summary = dict(result_data)
+        if source.path in self._token_counts:
+            summary[_TOKENS_KEY] = self._token_counts.pop(source.path)
+        self._pending_entries.append((source.path, source.cache_key, json.dumps(summary)))
+        if self.fact_store:
+            self.fact_store.put(source.cache_key, result_data["conclusions"])
+        self._settle(source.cache_key, result_data["conclusions"])
+
+    def _record_chunk(self, source: SourceFile, output: Optional[MinerOutput]):
+        parent = source.parent
+        parent.pending -= 1
+        if output is None:
+            parent.failed += 1
+        else:
+            self.result.chunks_mined += 1
+            parent.outputs[source.index] = [
+                c.model_dump() for c in output.conclusions
+            ]
+            if self.fact_store:
+                self.fact_store.put(source.cache_key, parent.outputs[source.index])
+        if parent.pending == 0:
+            self._complete_chunked(parent)
+
+    def _complete_chunked(self, parent: ChunkedFile):
+        """
+        Merges the conclusions of all chunks (in file order, dropping exact
+        duplicates) into one MinerOutput and queues it for the cache.
+        """
+        if parent.started_at is not None:
+            self.result.latencies[parent.path] = time.monotonic() - parent.started_at
+
+        mined = [c for c in parent.outputs if c is not None]
+        if not mined:
+            self.result.files_failed += 1
+            self._settle(parent.cache_key, None)
+            return
+
+        conclusions: List[Dict[str, Any]] = []
+        seen = set()
+        for chunk_conclusions in mined:
+            for conclusion in chunk_conclusions:
+                identity = (conclusion.get("topic"), conclusion.get("statement"))
+                if identity in seen:
+                    continue
+                seen.add(identity)
+                conclusions.append(conclusion)
+
+        result_data = MinerOutput(file=parent.path, conclusions=conclusions).model_dump()
+        self._store_result(parent.path, result_data)
+        if parent.reused == len(parent.outputs):
+            self.result.files_cached += 1
+        else:
+            self.result.files_mined += 1
+
+        summary = dict(result_data)
+        summary[_CHUNKS_KEY] = {
+            key: outputs
+            for key, outputs in zip(parent.chunk_keys, parent.outputs)
+            if outputs is not None
+        }
+        if parent.path in self._token_counts:
+            summary[_TOKENS_KEY] = self._token_counts.pop(parent.path)
+        # With a failed chunk the whole-file key must not match next time;
+        # the chunks that did succeed are still reused
+        cache_key = "" if parent.failed else parent.cache_key
+        self._pending_entries.append((parent.path, cache_key, json.dumps(summary)))
+        if self.fact_store and not parent.failed:
+            self.fact_store.put(parent.cache_key, conclusions)
+        self._settle(parent.cache_key, conclusions)
+
+    # ==================== SHARED CONTENT ====================
+
+    async def _resolve_shared(self, rel_path: str, key: str) -> bool:
+        """
+        Answers a file without mining it when identical content was already
+        mined in this run, is being mined right now, or is in the FactStore.
+        Otherwise registers the file as the one to mine for its key.
+        """
+        conclusions = self._resolved.get(key)
+        if conclusions is not None:
+            self.result.files_deduplicated += 1
+            self._reuse(rel_path, key, conclusions)
+            return True
+        if key in self._followers:
+            self.result.files_deduplicated += 1
+            self._followers[key].append(rel_path)
+            return True
+
+        # Registered before the store lookup so concurrent duplicates wait
+        self._followers[key] = []
+        if self.fact_store:
+            conclusions = await self.fact_store.get(key)
+            if conclusions is not None:
+                self.result.files_shared += 1
+                self._reuse(rel_path, key, conclusions)
+                self._settle(key, conclusions)
+                return True
+        return False
+
+    def _reuse(self, path: str, key: str, conclusions: List[Dict[str, Any]]):
+        """Records conclusions mined for identical content under `path`."""
+        result_data = MinerOutput(file=path, conclusions=conclusions).model_dump()
+        self._store_result(path, result_data)
+        self._pending_entries.append((path, key, json.dumps(result_data)))
+
+    def _settle(self, key: str, conclusions: Optional[List[Dict[str, Any]]]):
+        """
+        Resolves a content key and the duplicate files waiting on it.
+        With no conclusions (mining failed) the duplicates fail as well.
+        """
+        followers = self._followers.pop(key, [])
+        if conclusions is None:
+            self.result.files_failed += len(followers)
+            return
+        self._resolved[key] = conclusions
+        for path in followers:
+            self._reuse(path, key, conclusions)
+
+    # ==================== HELPERS ====================
+
+    def _store_result(self, path: str, result_data: Dict[str, Any]):
+        self.result.results[path] = result_data
+        if self.tracker:
+            self.tracker.completed(path, result_data)
+
+    async def _put(self, queue: asyncio.PriorityQueue, priority: float, item: Any):
+        # The sequence number keeps FIFO order among equal priorities and
+        # means items themselves are never compared
+        await queue.put((priority, next(self._sequence), item))
+
+    async def _enqueue_work(self, item: MinerWorkItem):
+        """Enqueues Miner work, largest token count first (LPT)."""
+        await self._put(self.work_queue, -_work_item_tokens(item), item)
+
+    def _deadline_for(self, tokens: int) -> float:
+        """Deadline of one LLM call: a base plus a per-1k-token allowance."""
+        return (
+            self.call_timeout_seconds
+            + tokens / 1000 * MINER_CALL_TIMEOUT_SECONDS_PER_1K_TOKENS
+        )
+
+    async def _call_with_deadline(
+        self,
+        description: str,
+        tokens: int,
+        call: Callable[[MinerAgent], Awaitable[Any]],
+    ) -> Any:
+        """
+        Runs a Miner call with a deadline on each of its provider calls.
+        The deadline starts once the rate limiter grants the call a slot, so
+        time spent queueing behind other workers does not count (see
+        call_deadline). On timeout the call is retried once, on the fallback
+        Miner when one is configured. Returns None if both attempts time out.
+        """
+        if not self.call_timeout_seconds:
+            self.result.llm_requests += 1
+            return await call(self.miner)
+
+        deadline = self._deadline_for(tokens)
+        attempts = [self.miner, self.fallback_miner or self.miner]
+        for attempt, miner in enumerate(attempts):
+            if attempt:
+                self.result.deadline_retries += 1
+            self.result.llm_requests += 1
+            try:
+                with call_deadline(deadline):
+                    return await call(miner)
+            except CallDeadlineExceeded:
+                self.result.timeouts += 1
+                logger.warning(
+                    f"[Miner] {description} exceeded its {deadline:.0f}s deadline "
+                    f"(attempt {attempt + 1}/{len(attempts)})"
+                )
+        return None
+
+    def _reserve_budget(self, tokens: int) -> bool:
+        """
+        Adds a file to the running cost estimate.
+        Returns False (and marks the run as aborted) when the safety limit
+        would be exceeded.
+        """
+        input_tokens = self.result.input_tokens + tokens
+        output_tokens = self.result.estimated_output_tokens + MINER_OUTPUT_TOKENS_PER_FILE
+        estimated = (input_tokens / 1_000_000) * self.input_cost_rate + (
+            output_tokens / 1_000_000
+        ) * self.output_cost_rate
+
+        if estimated > self.max_cost_usd:
+            self.result.aborted = (
+                f"SAFETY LIMIT: Estimated cost ${estimated:.2f} "
+                f"exceeds ${self.max_cost_usd:.2f}. "
+                f"Reduce files or use a cheaper model."
+            )
+            return False
+
+        self.result.input_tokens = input_tokens
+        self.result.estimated_output_tokens = output_tokens
+        self.result.estimated_cost_usd = estimated
+        return True
+
+    async def _flush(self, force: bool = False):
+        """Persists mined results in batches so progress survives a crash."""
+        if not self.on_flush and not self.fact_store:
+            return
+        if not force and len(self._pending_entries) < MINER_CACHE_FLUSH_SIZE:
+            return
+        async with self._flush_lock:
+            entries, self._pending_entries = self._pending_entries, []
+            if entries and self.on_flush:
+                await self.on_flush(entries)
+            if self.fact_store:
+                # The store is a cache shared with other runs: never fail this one
+                try:
+                    await self.fact_store.flush()
+                except Exception as e:
+                    logger.warning(f"[Miner] Fact store flush failed: {e}")
+
+
+def _cached_chunks(cached: Optional[Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """Per-chunk conclusions stored with a file's cached summary, by chunk key."""
+    if not cached or not cached.summary:
+        return {}
+    try:
+        data = json.loads(cached.summary)
+    except json.JSONDecodeError:
+        return {}
+    chunks = data.get(_CHUNKS_KEY) if isinstance(data, dict) else None
+    return chunks if isinstance(chunks, dict) else {}
+
+
+def _cached_token_count(cached: Optional[Any]) -> Dict[str, Any]:
+    """Token count stored with a file's cached summary ({} if none)."""
+    if not cached or not cached.summary:
+        return {}
+    try:
+        data = json.loads(cached.summary)
+    except json.JSONDecodeError:
+        return {}
+    tokens = data.get(_TOKENS_KEY) if isinstance(data, dict) else None
+    return tokens if isinstance(tokens, dict) else {}
+
+
+def _normalize_result_path(path: str) -> str:
+    """Normalizes paths echoed back by the LLM for matching against inputs."""
+    path = (path or "").strip().replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path.lstrip("/")
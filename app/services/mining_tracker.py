@@ -0,0 +1,142 @@
+import asyncio
+import math
+import os
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core.fact_index import FactIndex
+
+
+def _module_of(path: str) -> str:
+    # Same module keys as FactIndex
+    return os.path.dirname(path) or "root"
+
+
+class MiningTracker:
+    """
+    Live view of a Miner run, for phases that start before it ends.
+
+    MinerPipeline reports every walked path, the end of the walk and every
+    file result. Consumers wait for what they depend on:
+    - `wait_for_sample`: enough files, from every top-level directory (and,
+      for small layouts, every module), for the Architect to plan from;
+    - `wait_for_modules`: every file of some modules, for a Scribe page.
+    Walked files that never produce a result (binary, over the file limit,
+    failed) hold their module until the run finishes.
+    """
+
+    def __init__(self):
+        # Walked paths in walk order, and their results as they arrive
+        self.paths: List[str] = []
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, Set[str]] = defaultdict(set)
+        self._walk_complete = False
+        self.finished = False
+        self._module_index: Optional[FactIndex] = None
+        self._changed = asyncio.Event()
+
+    # ==================== REPORTING (MinerPipeline) ====================
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def discovered(self, path: str):
+        self.paths.append(path)
+        if path not in self.results:
+            self._pending[_module_of(path)].add(path)
+
+    def walk_complete(self):
+        self._walk_complete = True
+        self._notify()
+
+    def completed(self, path: str, result: Dict[str, Any]):
+        self.results[path] = result
+        self._pending[_module_of(path)].discard(path)
+        self._notify()
+
+    def finish(self):
+        self._walk_complete = True
+        self.finished = True
+        self._notify()
+
+    # ==================== QUERIES ====================
+
+    async def _wait(self, ready):
+        while not ready():
+            await self._changed.wait()
+
+    def sample_ready(
+        self, fraction: float, min_files: int, module_coverage_limit: int = 0
+    ) -> bool:
+        """
+        True once the walk is done and `fraction` of its files (at least
+        `min_files`) are mined, with one from every top-level directory.
+        Walks of at most `module_coverage_limit` modules also need a mined
+        file in every module, so a plan derived per module (the heuristic
+        planner) sees facts of each.
+        """
+        if self.finished:
+            return True
+        if not self._walk_complete:
+            return False
+        total = len(self.paths)
+        needed = min(total, max(min_files, math.ceil(fraction * total)))
+        if len(self.results) < needed:
+            return False
+        covered = {p.split("/")[0] if "/" in p else "" for p in self.results}
+        if not all((p.split("/")[0] if "/" in p else "") in covered for p in self.paths):
+            return False
+        modules = {_module_of(p) for p in self.paths}
+        if len(modules) > module_coverage_limit:
+            return True
+        return modules <= {_module_of(p) for p in self.results}
+
+    async def wait_for_sample(
+        self, fraction: float, min_files: int, module_coverage_limit: int = 0
+    ):
+        await self._wait(
+            lambda: self.sample_ready(fraction, min_files, module_coverage_limit)
+        )
+
+    async def wait_for_walk(self):
+        await self._wait(lambda: self._walk_complete)
+
+    async def wait_until_finished(self):
+        await self._wait(lambda: self.finished)
+
+    def modules_done(self, modules: Iterable[str]) -> bool:
+        if self.finished:
+            return True
+        return self._walk_complete and not any(self._pending.get(m) for m in modules)
+
+    async def wait_for_modules(self, modules: Iterable[str]):
+        modules = list(modules)
+        await self._wait(lambda: self.modules_done(modules))
+
+    def module_index(self) -> FactIndex:
+        """Module matching over every walked file (call after the walk)."""
+        if self._module_index is None:
+            self._module_index = FactIndex({"file": p} for p in self.paths)
+        return self._module_index
+
+    def module_results(self, modules: Iterable[str]) -> List[Dict[str, Any]]:
+        """Results of the given modules, in walk order."""
+        wanted = set(modules)
+        return [
+            self.results[p]
+            for p in self.paths
+            if p in self.results and _module_of(p) in wanted
+        ]
+
+    def snapshot_output(self) -> Dict[str, Any]:
+        """
+        A Miner output of the run so far: every walked file, with its facts
+        when mined and none yet otherwise, so the module map is complete.
+        """
+        return {
+            "results": [
+                self.results.get(p) or {"file": p, "conclusions": []}
+                for p in self.paths
+            ]
+        }
@@ -3,6 +3,7 @@ from .file_repository import FileRepository
 from .fact_repository import FactRepository
 from .relation_repository import RelationRepository
 from .tree_node_repository import TreeNodeRepository
+from .mined_fact_repository import MinedFactRepository
 
 __all__ = [
     "ProjectRepository",
@@ -10,4 +11,5 @@ __all__ = [
     "FactRepository",
     "RelationRepository",
     "TreeNodeRepository",
+    "MinedFactRepository",
 ]
@@ -1,5 +1,5 @@
 from typing import List
-from sqlmodel import select
+from sqlmodel import delete, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.file import File
 from .base_repository import BaseRepository
@@ -14,3 +14,20 @@ class FileRepository(BaseRepository[File]):
         statement = select(File).where(File.project_id == project_id)
         results = await self.session.exec(statement)
         return results.all()
+
+    async def delete_paths(self, project_id: str, paths: List[str]) -> int:
+        """Delete the given files of a project. Returns the number removed."""
+        if not paths:
+            return 0
+        statement = delete(File).where(
+            File.project_id == project_id, File.path.in_(paths)
+        )
+        result = await self.session.exec(statement)
+        await self.session.commit()
+        return result.rowcount
+
+    async def upsert_many(self, files: List[File]) -> None:
+        """Insert or update several files in a single transaction."""
+        for file_obj in files:
+            await self.session.merge(file_obj)
+        await self.session.commit()
@@ -0,0 +1,76 @@
+from typing import Dict, List
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.mined_fact import MinedFact
+from .base_repository import BaseRepository
+
+
+class MinedFactRepository(BaseRepository[MinedFact]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(MinedFact, session)
+
+    async def get_many(self, keys: List[str]) -> List[MinedFact]:
+        """Get the stored entries for the given keys (missing keys are skipped)."""
+        if not keys:
+            return []
+        statement = select(MinedFact).where(MinedFact.key.in_(keys))
+        results = await self.session.exec(statement)
+        return results.all()
+
+    async def insert_missing(self, facts: List[MinedFact]) -> int:
+        """
+        Insert entries whose key is not stored yet. Returns the number added.
+        One INSERT ... ON CONFLICT DO NOTHING, so stores of other projects
+        writing the same key concurrently cannot make it fail.
+        """
+        if not facts:
+            return 0
+        rows = [fact.model_dump() for fact in facts]
+        result = await self.session.exec(
+            insert(MinedFact).values(rows).on_conflict_do_nothing(index_elements=["key"])
+        )
+        await self.session.commit()
+        return result.rowcount
+    async def touch(self, hits: Dict[str, int], used_at: str) -> None:
+        """Record cache hits: bumps `hits` and `last_used_at` of each key."""
+        for key, count in hits.items():
+            await self.session.exec(
+                update(MinedFact)
+                .where(MinedFact.key == key)
+                .values(hits=MinedFact.hits + count, last_used_at=used_at)
+            )
+        await self.session.commit()
+
+    async def evict(self, max_entries: int, max_bytes: int) -> int:
+        """
+        Delete least recently used entries until at most `max_entries` remain
+        and their total size is at most `max_bytes`. Returns the number removed.
+        Runs in SQL: the stored entries are never loaded.
+        """
+        count, total_bytes = (
+            await self.session.exec(
+                select(func.count(), func.coalesce(func.sum(MinedFact.size_bytes), 0))
+            )
+        ).one()
+        if count <= max_entries and total_bytes <= max_bytes:
+            return 0
+
+        # Rank by recency; an entry goes once it falls past either limit
+        recency = (MinedFact.last_used_at.desc(), MinedFact.key)
+        ranked = select(
+            MinedFact.key,
+            func.row_number().over(order_by=recency).label("position"),
+            func.sum(func.coalesce(MinedFact.size_bytes, 0))
+            .over(order_by=recency, rows=(None, 0))
+            .label("kept_bytes"),
+        ).subquery()
+        stale = select(ranked.c.key).where(
+            (ranked.c.position > max_entries) | (ranked.c.kept_bytes > max_bytes)
+        )
+        result = await self.session.exec(
+            delete(MinedFact).where(MinedFact.key.in_(stale))
+        )
+        await self.session.commit()
+        return result.rowcount
@@ -13,7 +13,8 @@ CREATE TABLE projects (
     name TEXT,                  -- Human-readable project name
     root_path TEXT,             -- Absolute or relative path in the filesystem
     created_at TEXT,            -- Project registration date (ISO 8601)
-    updated_at TEXT             -- Last time the project metadata was updated
+    updated_at TEXT,            -- Last time the project metadata was updated
+    last_commit TEXT            -- Commit SHA the documentation was last generated from
 );
 
 -- TABLE: files
@@ -22,10 +23,10 @@ CREATE TABLE projects (
 CREATE TABLE files (
     project_id TEXT,            -- Reference to the project
     path TEXT,                  -- Relative path of the file within the project
-    hash TEXT,                  -- Content hash for change detection (optional)
+    hash TEXT,                  -- Miner cache key: normalized content hash + model + prompt version
     language TEXT,              -- Detected programming language (e.g., python, javascript)
     analyzed INTEGER DEFAULT 0, -- Flag (0/1) indicating if the LLM has processed this file
-    summary TEXT,               -- AI-generated summary of the file's purpose
+    summary TEXT,               -- Serialized Miner output (conclusions) for the file
     last_analyzed_at TEXT,      -- Timestamp of the last analysis
     PRIMARY KEY (project_id, path),
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
@@ -73,3 +74,16 @@ CREATE TABLE tree_nodes (
     PRIMARY KEY (project_id, path),
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
 );
+
+-- TABLE: mined_facts
+-- Content-addressed Miner conclusions shared by all projects.
+-- Identical file contents (forks, vendored code, boilerplate) are mined once.
+CREATE TABLE mined_facts (
+    key TEXT PRIMARY KEY,       -- Miner cache key: normalized content hash + model + prompt version
+    conclusions TEXT,           -- Serialized list of Miner conclusions (file-agnostic)
+    size_bytes INTEGER DEFAULT 0, -- Size of `conclusions`, used for size-based eviction
+    hits INTEGER DEFAULT 0,     -- Number of times the entry was reused
+    created_at TEXT,            -- When the content was first mined
+    last_used_at TEXT           -- Last store or reuse; least recently used entries are evicted first
+);
+CREATE INDEX ix_mined_facts_last_used_at ON mined_facts (last_used_at);
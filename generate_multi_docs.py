@@ -2,8 +2,7 @@ import asyncio
 import json
 import os
 import uuid
-from sqlmodel import SQLModel
-from app.core.database import engine, AsyncSessionLocal
+from app.core.database import AsyncSessionLocal, init_db
 from app.services.project_service import ProjectService
 from app.services.analysis_service import AnalysisService
 from app.services.fact_service import FactService
@@ -41,8 +40,7 @@ async def run_documentation_generation():
     os.makedirs("audit_reports", exist_ok=True)
 
     # Initialize DB
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+    await init_db()
 
     for i, p in enumerate(PROMPTS):
         project_id = f"audit-{p['name']}-{uuid.uuid4().hex[:4]}"
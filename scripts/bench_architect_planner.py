@@ -0,0 +1,153 @@
+"""
+Benchmark: heuristic Architect planning vs. LLM planning on one repository.
+
+Reports the latency of each path and how far their navigations overlap:
+- page ids shared by both trees (Jaccard);
+- module coverage: for every LLM page, the best Jaccard between the modules
+  it resolves to (same matching as the Scribe) and those of a heuristic page.
+
+The LLM side is either planned live (--provider/--model) or read from a
+navigation.json of an earlier run (--navigation; no latency then). Without a
+--miner-output file, Miner facts are synthesized from the repository files,
+with each file's directory as its topic.
+
+Usage:
+  python scripts/bench_architect_planner.py REPO [--miner-output FILE]
+      [--navigation FILE | --provider ollama --model mistral:7b-instruct]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.agents.architect.agent import ArchitectAgent
+from app.agents.architect.heuristic import HeuristicPlanner
+from app.agents.core.factory import LLMFactory
+from app.core.constants import ARCHITECT_HEURISTIC_MIN_CONFIDENCE, SKIP_DIRS
+from app.core.fact_index import FactIndex
+from app.core.tokenizer import Tokenizer
+from app.scanners.technology_scanner import TechnologyScanner
+
+
+def synthetic_miner_output(repo_path: str) -> dict:
+    results = []
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith("."))
+        for name in sorted(files):
+            if not name.endswith((".py", ".js", ".ts", ".tsx", ".go", ".java")):
+                continue
+            rel = os.path.relpath(os.path.join(root, name), repo_path).replace("\\", "/")
+            topic = os.path.basename(os.path.dirname(rel)) or "root"
+            results.append(
+                {
+                    "file": rel,
+                    "conclusions": [
+                        {"topic": topic.title(), "impact": "MEDIUM", "statement": f"{name} in {topic}"}
+                    ],
+                }
+            )
+    return {"results": results}
+
+
+def pages_of(tree: list, parents: list = None) -> dict:
+    """Page id -> navigation modules (ancestor ids plus its own)."""
+    parents = parents or []
+    pages = {}
+    for node in tree:
+        modules = parents + [node["id"]]
+        if node.get("type") == "page":
+            pages[node["id"]] = modules
+        pages.update(pages_of(node.get("children", []), modules))
+    return pages
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def overlap(index: FactIndex, heuristic_nav: dict, llm_nav: dict) -> tuple:
+    ours = pages_of(heuristic_nav["tree"])
+    theirs = pages_of(llm_nav["tree"])
+    id_overlap = jaccard(set(ours), set(theirs))
+
+    # Only a page's own id selects modules; ancestors would match too broadly
+    our_modules = [set(index.match(page_id)) for page_id in ours]
+    best = [
+        max((jaccard(set(index.match(page_id)), mods) for mods in our_modules), default=0.0)
+        for page_id in theirs
+    ]
+    module_overlap = sum(best) / len(best) if best else 0.0
+    return id_overlap, module_overlap
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("repo")
+    parser.add_argument("--miner-output")
+    parser.add_argument("--navigation")
+    parser.add_argument("--provider")
+    parser.add_argument("--model")
+    args = parser.parse_args()
+
+    Tokenizer.configure(args.provider or "ollama", args.model or "benchmark")
+    if args.miner_output:
+        with open(args.miner_output) as f:
+            miner_output = json.load(f)
+    else:
+        miner_output = synthetic_miner_output(args.repo)
+    index = FactIndex.from_miner_output(miner_output)
+
+    start = time.perf_counter()
+    ecosystems = TechnologyScanner(args.repo).scan()
+    scan_s = time.perf_counter() - start
+    start = time.perf_counter()
+    plan = HeuristicPlanner(index, ecosystems, args.repo).plan()
+    plan_s = time.perf_counter() - start
+    heuristic_nav = plan.navigation.model_dump()
+
+    print(f"files={len(miner_output['results'])} modules={len(index.modules)}")
+    print(
+        f"heuristic        : {(scan_s + plan_s) * 1000:9.1f} ms "
+        f"(scan {scan_s * 1000:.1f} ms, plan {plan_s * 1000:.1f} ms), "
+        f"{len(pages_of(heuristic_nav['tree']))} pages"
+    )
+    used = plan.confidence >= ARCHITECT_HEURISTIC_MIN_CONFIDENCE
+    print(
+        f"confidence       : {plan.confidence:9.3f} {plan.signals} -> "
+        f"{'heuristic used' if used else 'falls back to LLM'}"
+    )
+
+    llm_nav = None
+    if args.provider:
+        client = LLMFactory.get_client(args.provider, model=args.model)
+        start = time.perf_counter()
+        nav_obj = await ArchitectAgent(client, fact_index=index).plan_navigation(miner_output)
+        llm_s = time.perf_counter() - start
+        if nav_obj is None:
+            print(f"LLM planning     : failed after {llm_s * 1000:.1f} ms")
+            return
+        llm_nav = nav_obj.model_dump()
+        print(
+            f"LLM planning     : {llm_s * 1000:9.1f} ms, "
+            f"{len(pages_of(llm_nav['tree']))} pages "
+            f"({llm_s / (scan_s + plan_s):.0f}x the heuristic)"
+        )
+    elif args.navigation:
+        with open(args.navigation) as f:
+            llm_nav = json.load(f)
+        print(f"LLM navigation   : {len(pages_of(llm_nav['tree']))} pages (from {args.navigation})")
+
+    if llm_nav:
+        id_overlap, module_overlap = overlap(index, heuristic_nav, llm_nav)
+        print(f"page id overlap  : {id_overlap:9.3f} (Jaccard)")
+        print(f"module coverage  : {module_overlap:9.3f} (mean best Jaccard per LLM page)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+Microbenchmark: Scribe page context assembly on a synthetic 10k-file Miner
+output, comparing a per-page rebuild (group + scan + string `+=`) with the
+shared FactIndex, the per-page subset indexes, and BM25-ranked selection
+packed into the Scribe token budget.
+
+Usage: python scripts/bench_fact_index.py [files] [pages]
+"""
+
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.agents.scribe.agent import ScribeAgent
+from app.core.bm25 import tokenize
+from app.core.config import settings
+from app.core.fact_index import FactIndex
+from app.core.tokenizer import Tokenizer
+
+AREAS = ["app", "lib", "services", "web", "packages"]
+PARTS = [
+    "api", "auth", "core", "db", "models", "scanner", "modules", "utils",
+    "routes", "storage", "workers", "billing", "search", "admin", "events",
+]
+
+
+def synthetic_miner_output(files: int, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    results = []
+    for i in range(files):
+        segments = [rng.choice(AREAS)] + rng.sample(PARTS, rng.randint(1, 4))
+        results.append(
+            {
+                "file": "/".join(segments + [f"file_{i}.py"]),
+                "conclusions": [
+                    {
+                        "topic": rng.choice(PARTS).title(),
+                        "impact": "MEDIUM",
+                        "statement": f"File {i} handles concern {j} " + "detail " * 30,
+                    }
+                    for j in range(3)
+                ],
+            }
+        )
+    return {"results": results}
+
+
+def page_targets(pages: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [
+        [rng.choice(AREAS), "-".join(rng.sample(PARTS, rng.randint(1, 2)))]
+        for _ in range(pages)
+    ]
+
+
+def legacy_context(miner_output: dict, targets: list) -> str:
+    """The per-page work done before the index existed."""
+    modules = defaultdict(list)
+    for item in miner_output["results"]:
+        modules[os.path.dirname(item["file"]) or "root"].append(item)
+    text = ""
+    for mod_target in targets:
+        for mod_key, mod_files in modules.items():
+            if ScribeAgent._module_matches(mod_target, mod_key):
+                text += f"=== MODULE: {mod_key} ===\n"
+                for f in mod_files:
+                    text += f"\nFILE: {f['file']}\n"
+                    for c in f["conclusions"]:
+                        text += f"- [{c['topic']}]: {c['statement']}\n"
+    return text
+
+
+def main():
+    Tokenizer.configure("ollama", "benchmark")
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    miner_output = synthetic_miner_output(files)
+    targets = page_targets(pages)
+
+    start = time.perf_counter()
+    legacy_chars = sum(len(legacy_context(miner_output, t)) for t in targets)
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = FactIndex.from_miner_output(miner_output)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed_chars = sum(len(index.context_for(t)) for t in targets)
+    lookup_s = time.perf_counter() - start
+
+    # Per-page indexes, as built for pipelined and synthesis pages
+    start = time.perf_counter()
+    for page_targets_ in targets:
+        index.subset(index.match_any(page_targets_))
+    subset_s = time.perf_counter() - start
+
+    budget = settings.scribe_context_token_budget
+    start = time.perf_counter()
+    ranked_chars = 0
+    for page_targets_ in targets:
+        query = {term: 1.0 for term in tokenize(" ".join(page_targets_))}
+        ranked_chars += len(
+            index.select_context(query, budget, boost_targets=page_targets_)
+        )
+    ranked_s = time.perf_counter() - start
+
+    print(f"files={files} modules={len(index.modules)} pages={pages}")
+    print(f"per-page rebuild : {legacy_s * 1000:9.1f} ms ({legacy_chars:,} chars)")
+    print(f"index build      : {build_s * 1000:9.1f} ms (once per run)")
+    print(
+        f"indexed lookups  : {lookup_s * 1000:9.1f} ms ({indexed_chars:,} chars, "
+        f"module blocks formatted on first use)"
+    )
+    print(f"speedup          : {legacy_s / (build_s + lookup_s):9.1f}x")
+    print(f"page subsets     : {subset_s * 1000:9.1f} ms ({pages} per-page indexes)")
+    print(
+        f"BM25 selection   : {ranked_s * 1000:9.1f} ms ({ranked_chars:,} chars, "
+        f"budget {budget:,} tokens/page, ranking built on first page)"
+    )
+
+
+if __name__ == "__main__":
+    main()
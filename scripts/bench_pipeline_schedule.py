@@ -0,0 +1,170 @@
+"""
+Benchmark: end-to-end wall clock of the phase barrier (Miner, then Architect,
+then Scribe) vs. the pipelined schedule (settings.pipelined_phases).
+
+Runs DocumentationService.generate_documentation on a generated fixture
+repository with an in-memory database and a fake LLM client that answers
+every tool call after a fixed latency, so the difference comes from
+scheduling alone.
+
+Usage:
+  python scripts/bench_pipeline_schedule.py [--modules 6] [--files 12]
+      [--file-latency 0.05] [--page-latency 0.3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import app.models  # noqa: F401 - registers tables on SQLModel.metadata
+from app.agents.core.base import BaseLLMClient
+from app.agents.core.factory import LLMFactory
+from app.core.config import settings
+from app.core.database import init_db
+from app.services.documentation_service import DocumentationService
+
+
+class LatencyClient(BaseLLMClient):
+    """Answers each tool call with a plausible payload after a fixed delay."""
+
+    def __init__(self, file_latency: float, page_latency: float):
+        self.model = "bench-model"
+        self.file_latency = file_latency
+        self.page_latency = page_latency
+
+    async def generate(self, prompt, system=None):
+        return ""
+
+    async def stream_generate(self, prompt, system=None):
+        yield ""
+
+    def _arguments(self, tool: str, prompt: str) -> dict:
+        if tool == "submit_conclusions":
+            path = re.search(r"Path: (\S+)", prompt).group(1)
+            return {"file": path, "conclusions": [self._fact(path)]}
+        if tool == "submit_batch_results":
+            paths = re.findall(r"=== FILE: (\S+) ===", prompt)
+            return {"results": [{"file": p, "conclusions": [self._fact(p)]} for p in paths]}
+        if tool == "submit_subsystems":
+            return {"subsystems": []}
+        if tool == "submit_subtree_summary":
+            return {"summary": "Fixture code.", "responsibilities": [], "technologies": []}
+        if tool == "submit_navigation":
+            modules = sorted(set(re.findall(r"\b(pkg\d+)\b", prompt)))
+            tree = [{"id": m, "label": m.title(), "type": "page"} for m in modules]
+            return {"project_name": "bench", "tree": tree}
+        if tool == "submit_page":
+            title = re.search(r"Page Title: (.+)", prompt).group(1)
+            return {
+                "id": title.lower(),
+                "title": title,
+                "description": "Fixture page",
+                "content_markdown": f"# {title}\n\nGenerated for the benchmark.",
+            }
+        raise ValueError(f"Unexpected tool: {tool}")
+
+    @staticmethod
+    def _fact(path: str) -> dict:
+        return {"topic": "Module", "impact": "MEDIUM", "statement": f"{path} holds fixture code."}
+
+    async def process_messages(self, messages, tools=None):
+        tool = tools[0]["function"]["name"]
+        prompt = "\n".join(str(m.get("content") or "") for m in messages)
+        mining = tool in ("submit_conclusions", "submit_batch_results")
+        await asyncio.sleep(self.file_latency if mining else self.page_latency)
+        arguments = self._arguments(tool, prompt)
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": "call_1",
+                    "type": "function",
+                    "function": {"name": tool, "arguments": json.dumps(arguments)},
+                }
+            ],
+        }
+
+
+def write_fixture(root: Path, modules: int, files: int):
+    for m in range(modules):
+        for f in range(files):
+            target = root / f"pkg{m}" / f"module_{f}.py"
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # Large enough to be mined alone rather than batched
+            body = "".join(
+                f"\n\ndef handler_{f}_{i}(value, scale={i}):\n"
+                f"    return [value * scale + offset for offset in range({f + i})]\n"
+                for i in range(80)
+            )
+            target.write_text(f'"""pkg{m}.module_{f}"""\n{body}', encoding="utf-8")
+
+
+async def run_once(repo: Path, client: LatencyClient, pipelined: bool) -> tuple:
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    await init_db(engine)
+    service = DocumentationService(
+        session_factory=sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    settings.pipelined_phases = pipelined
+    with tempfile.TemporaryDirectory() as output_dir:
+        service.output_dir = Path(output_dir)
+        start = time.perf_counter()
+        result = await service.generate_documentation(
+            project_id="bench", repo_path=str(repo), provider="ollama", model=client.model
+        )
+        elapsed = time.perf_counter() - start
+    await engine.dispose()
+    if result.get("status") != "completed":
+        raise RuntimeError(f"Run failed: {result}")
+    return elapsed, result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modules", type=int, default=6)
+    parser.add_argument("--files", type=int, default=12)
+    parser.add_argument("--file-latency", type=float, default=0.05)
+    parser.add_argument("--page-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    client = LatencyClient(args.file_latency, args.page_latency)
+    LLMFactory.get_client = staticmethod(lambda provider=None, model=None, **kw: client)
+
+    with tempfile.TemporaryDirectory() as repo_dir:
+        repo = Path(repo_dir)
+        write_fixture(repo, args.modules, args.files)
+        print(
+            f"Fixture: {args.modules} modules x {args.files} files, "
+            f"{args.file_latency}s per file, {args.page_latency}s per LLM plan/page call"
+        )
+
+        barrier, baseline = await run_once(repo, client, pipelined=False)
+        pipelined, result = await run_once(repo, client, pipelined=True)
+
+    schedule = result.get("cost_report", {}).get("schedule", {})
+    print(f"Barrier:   {barrier:.2f}s, {baseline['pages_generated']} pages")
+    print(f"Pipelined: {pipelined:.2f}s, {result['pages_generated']} pages ({schedule})")
+    print(f"Saved:     {barrier - pipelined:.2f}s ({(1 - pipelined / barrier) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""
+Benchmark: event-loop stall while counting the tokens of a repository,
+inline (Tokenizer.count in the coroutine, as before) vs. batched on the
+tokenizer thread pool (Tokenizer.count_batch_async).
+
+A heartbeat coroutine sleeps for a fixed tick and records how late it wakes
+up; the worst and total lateness is the time the loop could not serve
+anything else (WebSocket frames, other pipelines).
+
+Requires the tiktoken encoding to be available (downloaded or cached).
+
+Usage:
+  python scripts/bench_tokenizer_stall.py [--files 300] [--lines 400]
+      [--model gpt-4o-mini]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.tokenizer import Tokenizer
+
+TICK = 0.005
+
+
+def make_files(files: int, lines: int) -> list:
+    return [
+        "".join(
+            f"def handler_{f}_{i}(value, scale={i}):\n"
+            f"    return [value * scale + offset for offset in range({f + i})]\n"
+            for i in range(lines // 2)
+        )
+        for f in range(files)
+    ]
+
+
+async def heartbeat(lags: list, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def measure(label: str, work) -> None:
+    Tokenizer._counts.clear()
+    lags: list = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(TICK * 2)
+
+    start = time.perf_counter()
+    total = await work()
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await beat
+    print(
+        f"{label:<8} {elapsed:6.2f}s for {total:,} tokens | "
+        f"max stall {max(lags) * 1000:7.1f}ms, total stall {sum(lags) * 1000:8.1f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--lines", type=int, default=400)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    args = parser.parse_args()
+
+    Tokenizer.configure("openai", args.model)
+    texts = make_files(args.files, args.lines)
+    # Load the encoding outside the measurements
+    Tokenizer.count("warm up")
+    print(f"Fixture: {args.files} files x {args.lines} lines")
+
+    async def inline():
+        total = 0
+        for text in texts:
+            total += Tokenizer.count(text)
+            await asyncio.sleep(0)
+        return total
+
+    async def batched():
+        return sum(await Tokenizer.count_batch_async(texts))
+
+    await measure("Inline", inline)
+    await measure("Batched", batched)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
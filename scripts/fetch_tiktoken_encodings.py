@@ -0,0 +1,51 @@
+"""
+Downloads the tiktoken encodings the Tokenizer uses into a directory, in
+tiktoken's cache layout, so air-gapped workers and fresh containers load
+them from disk instead of the network.
+
+Run it where the network is available (e.g. in the image build), then ship
+the directory and point IRA_TIKTOKEN_CACHE_DIR (or TIKTOKEN_CACHE_DIR) at it.
+
+Usage:
+  python scripts/fetch_tiktoken_encodings.py [--dir data/tiktoken]
+"""
+
+import argparse
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.config import settings
+from app.core.tokenizer import Tokenizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--dir",
+        default=settings.tiktoken_cache_dir or "data/tiktoken",
+        help="Target directory (default: IRA_TIKTOKEN_CACHE_DIR or data/tiktoken)",
+    )
+    args = parser.parse_args()
+
+    target = os.path.abspath(args.dir)
+    os.makedirs(target, exist_ok=True)
+    # tiktoken stores what it downloads in TIKTOKEN_CACHE_DIR
+    os.environ["TIKTOKEN_CACHE_DIR"] = target
+
+    status = Tokenizer.preload()
+    for name, state in status.items():
+        print(f"{name:<14} {state}")
+    print(f"Encoding files in {target}:")
+    for entry in sorted(os.listdir(target)):
+        size = os.path.getsize(os.path.join(target, entry))
+        print(f"  {entry}  {size / 1_000_000:.1f} MB")
+
+    if not Tokenizer.is_ready():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import pytest
+
+from app.agents.architect.agent import ArchitectAgent
+from app.agents.architect.heuristic import HeuristicPlanner
+from app.agents.core.base import BaseLLMClient
+from app.core.fact_index import FactIndex
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+
+logger = get_logger(__name__)
+
+
+class CountingClient(BaseLLMClient):
+    """Never submits a plan; only counts how often it was asked."""
+
+    def __init__(self):
+        self.model = "planner-model"
+        self.calls = 0
+
+    async def generate(self, prompt, system=None):
+        return ""
+
+    async def stream_generate(self, prompt, system=None):
+        yield ""
+
+    async def process_messages(self, messages, tools=None):
+        self.calls += 1
+        return {"role": "assistant", "content": "No plan."}
+
+
+def miner_output(files_by_topic):
+    return {
+        "results": [
+            {
+                "file": path,
+                "conclusions": [{"topic": topic, "statement": f"{path} does {topic}"}],
+            }
+            for path, topic in files_by_topic
+        ]
+    }
+
+
+def page_ids(nodes):
+    ids = []
+    for node in nodes:
+        if node.type == "page":
+            ids.append(node.id)
+        ids.extend(page_ids(node.children))
+    return ids
+
+
+SMALL_REPO = miner_output(
+    [
+        ("app/api/routes.py", "API"),
+        ("app/api/deps.py", "API"),
+        ("app/db/models.py", "Data"),
+        ("app/main.py", "Startup"),
+        ("scripts/seed.py", "CLI"),
+        ("setup.py", "Packaging"),
+    ]
+)
+
+
+def test_heuristic_plan_for_conventional_repo():
+    index = FactIndex.from_miner_output(SMALL_REPO)
+
+    plan = HeuristicPlanner(index, ecosystems=[], repo_path="/repos/shop").plan()
+
+    ids = page_ids(plan.navigation.tree)
+    logger.info(f"Pages: {ids}, confidence: {plan.confidence} {plan.signals}")
+    assert plan.navigation.project_name == "shop"
+    assert ids == [
+        "architecture-overview",
+        "app-api",
+        "app-db",
+        "app-overview",
+        "scripts",
+        "root",
+    ]
+    assert set(plan.navigation.detected_subsystems) == {"backend", "cli"}
+    assert plan.confidence == pytest.approx(1.0)
+    # Each module page resolves to exactly its own module
+    assert index.match("app-api") == ["app/api"]
+    assert index.match("app-db") == ["app/db"]
+
+
+def test_scanner_frameworks_resolve_unconventional_directories():
+    index = FactIndex.from_miner_output(
+        miner_output([("storefront/cart.tsx", "Checkout"), ("storefront/home.tsx", "Pages")])
+    )
+    ecosystems = [
+        {
+            "type": "ecosystem",
+            "name": "javascript",
+            "languages": {
+                "typescript": {
+                    "detected": True,
+                    "files": ["/repos/shop/storefront/cart.tsx", "/repos/shop/storefront/home.tsx"],
+                    "count": 2,
+                }
+            },
+            "frameworks": {"detected": True, "items": ["react"], "count": 1},
+        }
+    ]
+
+    with_scan = HeuristicPlanner(index, ecosystems, "/repos/shop").plan()
+    without_scan = HeuristicPlanner(index, [], "/repos/shop").plan()
+
+    assert with_scan.navigation.detected_subsystems == ["frontend"]
+    assert with_scan.signals["convention"] == 1.0
+    assert without_scan.signals["convention"] == 0.0
+    assert without_scan.confidence < with_scan.confidence
+
+
+@pytest.mark.asyncio
+async def test_plan_navigation_skips_llm_when_confident():
+    Tokenizer.configure("ollama", "fake-model")
+    client = CountingClient()
+    architect = ArchitectAgent(client)
+
+    nav = await architect.plan_navigation(SMALL_REPO, ecosystems=[], repo_path="/repos/shop")
+
+    assert nav is not None
+    assert client.calls == 0
+    assert architect.plan_source == "heuristic"
+
+
+@pytest.mark.asyncio
+async def test_plan_navigation_falls_back_to_llm_for_large_repos():
+    Tokenizer.configure("ollama", "fake-model")
+    client = CountingClient()
+    architect = ArchitectAgent(client)
+    sprawling = miner_output(
+        [(f"misc{i}/part{j}/mod.py", f"Topic{j}") for i in range(10) for j in range(5)]
+    )
+
+    nav = await architect.plan_navigation(sprawling, ecosystems=[], repo_path="/repos/big")
+
+    logger.info(f"Confidence: {architect.plan_confidence}, LLM calls: {client.calls}")
+    assert nav is None
+    assert architect.plan_source == "llm"
+    assert architect.plan_confidence < 0.7
+    assert client.calls >= 1
@@ -0,0 +1,133 @@
+import json
+
+import pytest
+
+import app.agents.architect.agent as architect_module
+from app.agents.architect.agent import ArchitectAgent
+from app.agents.architect.summarizer import SubtreeSummarizer, build_directory_tree
+from app.agents.core.base import BaseLLMClient
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+
+logger = get_logger(__name__)
+
+
+def tool_call(name, arguments):
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {
+                "id": f"call_{name}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)},
+            }
+        ],
+    }
+
+
+class SummaryClient(BaseLLMClient):
+    """Summarizes subtrees by counting their files; records every prompt."""
+
+    provider = "test-summary"
+
+    def __init__(self):
+        self.model = "summary-model"
+        self.prompts = []
+
+    async def generate(self, prompt, system=None):
+        return ""
+
+    async def stream_generate(self, prompt, system=None):
+        yield ""
+
+    async def process_messages(self, messages, tools=None):
+        prompt = messages[-1]["content"]
+        self.prompts.append((str(tools), prompt))
+        if "submit_subtree_summary" in str(tools):
+            title = prompt.split("\n", 1)[0]
+            return tool_call(
+                "submit_subtree_summary",
+                {
+                    "summary": f"{title} holds {prompt.count('File: ')} files.",
+                    "role": "library",
+                    "technologies": ["Python"],
+                },
+            )
+        if "submit_subsystems" in str(tools):
+            return tool_call(
+                "submit_subsystems",
+                {
+                    "subsystems": [
+                        {"name": "Services", "role": "backend", "root_path": "services"}
+                    ]
+                },
+            )
+        return tool_call(
+            "submit_navigation",
+            {
+                "project_name": "Big",
+                "tree": [{"id": "services", "label": "Services", "type": "page"}],
+            },
+        )
+
+
+def synthetic_results(services=12, modules=6, files=25):
+    return [
+        {
+            "file": f"services/svc_{s}/mod_{m}/file_{f}.py",
+            "conclusions": [
+                {"topic": "Logic", "statement": f"Service {s} module {m} file {f} logic."}
+            ],
+        }
+        for s in range(services)
+        for m in range(modules)
+        for f in range(files)
+    ] + [{"file": "README.md", "conclusions": []}]
+
+
+@pytest.mark.asyncio
+async def test_map_reduce_covers_every_file_with_bounded_outline():
+    Tokenizer.configure("ollama", "fake-model")
+    results = synthetic_results()
+    root = build_directory_tree(results)
+    assert root.file_count == len(results)
+
+    client = SummaryClient()
+    summarizer = SubtreeSummarizer(client, subtree_budget=2_000, reduce_budget=1_500)
+    outline = await summarizer.outline(results)
+    logger.info(f"Stats: {summarizer.stats}\n{outline}")
+
+    # Every file was seen by exactly one map call
+    summarized = sum(
+        p.count("File: ") for tools, p in client.prompts if "submit_subtree" in tools
+    )
+    assert summarized == len(results)
+    assert summarizer.stats["map_calls"] < len(results) / 10
+    assert summarizer.stats["failed"] == 0
+    assert Tokenizer.count(outline) <= 1_500
+
+    # Unchanged subtrees are served from the cache
+    cached_client = SummaryClient()
+    again = SubtreeSummarizer(
+        cached_client, cache=summarizer.cache, subtree_budget=2_000, reduce_budget=1_500
+    )
+    assert await again.outline(results) == outline
+    assert cached_client.prompts == []
+
+
+@pytest.mark.asyncio
+async def test_plan_navigation_uses_summaries_for_large_repos(monkeypatch):
+    Tokenizer.configure("ollama", "fake-model")
+    monkeypatch.setattr(architect_module, "ARCHITECT_DIRECT_CONTEXT_TOKENS", 1_000)
+
+    client = SummaryClient()
+    architect = ArchitectAgent(client)
+    architect.summarizer.subtree_budget = 2_000
+    navigation = await architect.plan_navigation({"results": synthetic_results()})
+
+    detector_prompt = next(p for tools, p in client.prompts if "submit_subsystems" in tools)
+    assert navigation.project_name == "Big"
+    assert architect.summarizer.stats["map_calls"] > 0
+    assert "Directory summaries" in detector_prompt
+    assert "file_0.py" not in detector_prompt
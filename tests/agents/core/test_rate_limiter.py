@@ -0,0 +1,240 @@
+import asyncio
+
+import pytest
+
+from app.agents.agent_executor import AgentExecutor
+from app.agents.core.base import BaseLLMClient
+from app.agents.core.rate_limiter import (
+    CallDeadlineExceeded,
+    RateLimiter,
+    call_deadline,
+    get_rate_limiter,
+    get_rate_limiter_for_client,
+    parse_reset_duration,
+)
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+
+logger = get_logger(__name__)
+
+
+class RateLimitedError(Exception):
+    status_code = 429
+
+
+class FlakyClient(BaseLLMClient):
+    """Answers with 429 for the first `failures` calls, then succeeds."""
+
+    provider = "test-flaky"
+
+    def __init__(self, failures: int):
+        self.model = "flaky-model"
+        self.failures = failures
+        self.calls = 0
+
+    async def generate(self, prompt, system=None):
+        return ""
+
+    async def stream_generate(self, prompt, system=None):
+        yield ""
+
+    async def process_messages(self, messages, tools=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RateLimitedError("429 Too Many Requests")
+        return {"role": "assistant", "content": "ok"}
+
+
+def make_limiter(**overrides) -> RateLimiter:
+    config = {
+        "name": "test",
+        "requests_per_minute": None,
+        "tokens_per_minute": None,
+        "max_concurrency": 8,
+        "initial_concurrency": 2,
+    }
+    config.update(overrides)
+    return RateLimiter(**config)
+
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("20") == 20.0
+    assert parse_reset_duration("6m0s") == 360.0
+    assert parse_reset_duration("1s500ms") == 1.5
+    assert parse_reset_duration("soon") is None
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped_and_grows_additively():
+    limiter = make_limiter(initial_concurrency=2, max_concurrency=4)
+    in_flight = 0
+    peak = 0
+
+    async def call():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return True
+
+    await asyncio.gather(*(limiter.run(call) for _ in range(6)))
+    logger.info(f"Peak in-flight: {peak}, concurrency: {limiter.concurrency:.2f}")
+
+    assert peak <= 4
+    assert limiter.concurrency > 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_halves_concurrency_and_honors_retry_after():
+    limiter = make_limiter(initial_concurrency=8)
+    limiter.record_rate_limited(retry_after=0.05)
+    assert limiter.concurrency == 4
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    async with limiter.acquire():
+        pass
+    assert loop.time() - started >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_blocks_until_refill():
+    # 600 tokens/min = 10 tokens/s; bucket starts full
+    limiter = make_limiter(tokens_per_minute=600)
+    async with limiter.acquire(tokens=600):
+        pass
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    async with limiter.acquire(tokens=2):
+        pass
+    assert loop.time() - started >= 0.15
+
+
+def test_headers_update_limits_and_remaining():
+    limiter = make_limiter(requests_per_minute=100, tokens_per_minute=1000)
+    limiter.update_from_headers(
+        {
+            "x-ratelimit-limit-requests": "5000",
+            "x-ratelimit-limit-tokens": "2000000",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "2s",
+        }
+    )
+    assert limiter.requests_per_minute == 5000
+    assert limiter.tokens_per_minute == 2000000
+    assert limiter._reserve(0) > 1.5
+
+
+@pytest.mark.asyncio
+async def test_executor_retries_through_shared_limiter(monkeypatch):
+    import app.agents.core.rate_limiter as rate_limiter_module
+
+    monkeypatch.setattr(rate_limiter_module, "RATE_LIMIT_BACKOFF_SECONDS", 0.01)
+    Tokenizer.configure("ollama", "fake-model")
+
+    client = FlakyClient(failures=2)
+    limiter = get_rate_limiter_for_client(client)
+    limiter.concurrency = 4.0
+
+    executor = AgentExecutor(client)
+    executor.set_system_prompt("system")
+    executor.add_user_message("hello")
+    result = await executor.run_until_complete()
+
+    assert result == "ok"
+    assert client.calls == 3
+    assert executor.rate_limiter is limiter
+    assert AgentExecutor(FlakyClient(0)).rate_limiter is limiter
+    assert limiter.stats["rate_limited"] == 2
+    assert limiter.concurrency < 4
+
+
+@pytest.mark.asyncio
+async def test_call_deadline_starts_once_the_slot_is_granted():
+    limiter = make_limiter(max_concurrency=1, initial_concurrency=1)
+    calls = []
+
+    async def call(seconds):
+        calls.append(seconds)
+        await asyncio.sleep(seconds)
+        return seconds
+
+    with call_deadline(0.08):
+        # Each call fits the deadline, though the last one queues longer
+        results = await asyncio.gather(*(limiter.run(lambda: call(0.05)) for _ in range(3)))
+        assert results == [0.05] * 3
+
+        # A call over the deadline fails at once, without limiter retries
+        with pytest.raises(CallDeadlineExceeded):
+            await limiter.run(lambda: call(1.0))
+    assert calls.count(1.0) == 1
+    assert limiter.stats["retries"] == 0
+
+
+def test_shared_limiter_serves_successive_event_loops():
+    limiter = make_limiter(max_concurrency=1, initial_concurrency=1)
+
+    async def calls():
+        return await asyncio.gather(
+            *(limiter.run(lambda i=i: asyncio.sleep(0, result=i)) for i in range(3))
+        )
+
+    # Each asyncio.run has its own loop; the limiter must not stay bound to the first
+    assert asyncio.run(calls()) == [0, 1, 2]
+    assert asyncio.run(calls()) == [0, 1, 2]
+    assert limiter.stats["requests"] == 6
+
+
+def test_provider_limits_are_overridden_from_settings(monkeypatch):
+    import app.agents.core.rate_limiter as rate_limiter_module
+
+    monkeypatch.setattr(rate_limiter_module, "_limiters", {})
+    monkeypatch.setattr(
+        settings,
+        "rate_limits",
+        {"Gemini": {"requests_per_minute": 1000, "max_concurrency": 16}},
+    )
+
+    limiter = get_rate_limiter("gemini", "gemini-2.5-flash")
+    assert limiter.requests_per_minute == 1000
+    assert limiter.max_concurrency == 16
+    # Keys left out keep the provider defaults
+    assert limiter.tokens_per_minute == 1_000_000
+
+    # Other providers are untouched
+    assert get_rate_limiter("openai", "gpt-4o").requests_per_minute == 500
+
+
+@pytest.mark.asyncio
+async def test_unreachable_provider_fails_without_retries(monkeypatch):
+    import app.agents.core.rate_limiter as rate_limiter_module
+
+    monkeypatch.setattr(rate_limiter_module, "RATE_LIMIT_BACKOFF_SECONDS", 0.01)
+    limiter = make_limiter()
+    calls = []
+
+    async def refused():
+        calls.append("refused")
+        # What the ollama SDK raises when nothing listens on the port
+        try:
+            raise ConnectionRefusedError(111, "Connection refused")
+        except ConnectionRefusedError:
+            raise ConnectionError("Failed to connect to Ollama.") from None
+
+    with pytest.raises(ConnectionError):
+        await limiter.run(refused)
+    assert calls == ["refused"]
+    assert limiter.stats["retries"] == 0
+
+    # Connections dropped mid-call are still retried
+    async def dropped():
+        calls.append("dropped")
+        if calls.count("dropped") < 3:
+            raise ConnectionResetError("Connection reset by peer")
+        return "ok"
+
+    assert await limiter.run(dropped) == "ok"
+    assert limiter.stats["retries"] == 2
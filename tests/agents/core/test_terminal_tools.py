@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from app.agents.agent_executor import AgentExecutor, track_executor_stats
+from app.agents.core.base import BaseLLMClient
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+
+logger = get_logger(__name__)
+
+
+SUBMIT_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "submit_result",
+        "description": "Submit the result.",
+        "parameters": {
+            "type": "object",
+            "properties": {"value": {"type": "string"}},
+            "required": ["value"],
+        },
+    },
+}
+
+
+class SubmittingClient(BaseLLMClient):
+    """Calls `submit_result` until a tool result arrives, then replies with text."""
+
+    def __init__(self):
+        self.model = "submit-model"
+        self.calls = 0
+
+    async def generate(self, prompt, system=None):
+        return ""
+
+    async def stream_generate(self, prompt, system=None):
+        yield ""
+
+    async def process_messages(self, messages, tools=None):
+        self.calls += 1
+        if messages[-1].get("role") == "tool":
+            return {"role": "assistant", "content": "Done."}
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": f"call_{self.calls}",
+                    "type": "function",
+                    "function": {
+                        "name": "submit_result",
+                        "arguments": json.dumps({"value": "42"}),
+                    },
+                }
+            ],
+        }
+
+
+def make_executor(client, func, terminal):
+    executor = AgentExecutor(client)
+    executor.set_system_prompt("system")
+    executor.add_user_message("Submit the answer.")
+    executor.register_tool(SUBMIT_TOOL, func, terminal=terminal)
+    return executor
+
+
+@pytest.mark.asyncio
+async def test_terminal_tool_ends_loop_without_extra_call():
+    Tokenizer.configure("ollama", "fake-model")
+    submitted = []
+
+    def submit_result(value):
+        submitted.append(value)
+        return "Saved."
+
+    client = SubmittingClient()
+    with track_executor_stats() as stats:
+        result = await make_executor(client, submit_result, terminal=True).run_until_complete()
+
+    logger.info(f"Calls: {client.calls}, saved: {stats.calls_saved}")
+    assert result == "Saved."
+    assert submitted == ["42"]
+    assert client.calls == 1
+    assert stats.llm_calls == 1
+    assert stats.calls_saved == 1
+
+
+@pytest.mark.asyncio
+async def test_non_terminal_tool_keeps_closing_round_trip():
+    Tokenizer.configure("ollama", "fake-model")
+
+    client = SubmittingClient()
+    with track_executor_stats() as stats:
+        result = await make_executor(
+            client, lambda value: "Saved.", terminal=False
+        ).run_until_complete()
+
+    assert result == "Done."
+    assert client.calls == 2
+    assert stats.calls_saved == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_terminal_tool_does_not_end_loop():
+    Tokenizer.configure("ollama", "fake-model")
+
+    def failing_submit(value):
+        raise ValueError("bad payload")
+
+    client = SubmittingClient()
+    executor = make_executor(client, failing_submit, terminal=True)
+    result = await executor.run_until_complete()
+
+    assert result == "Done."
+    assert client.calls == 2
+    assert executor.finished is False
@@ -0,0 +1,76 @@
+import pytest
+
+from app.agents.core.ollama_client import OllamaClient
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.token_calibration import TokenCalibration
+from app.core.tokenizer import Tokenizer
+
+logger = get_logger(__name__)
+
+
+def test_ratios_need_enough_calls_and_fall_back_to_the_model():
+    calibration = TokenCalibration()
+    for _ in range(2):
+        calibration.observe("ollama", "m", 3000, 1000, ".py")
+    assert calibration.chars_per_token("ollama", "m", ".py") is None
+
+    calibration.observe("ollama", "m", 3000, 1000, ".py")
+    assert calibration.chars_per_token("ollama", "m", ".py") == 3.0
+    # Other file types use the model-wide ratio, other models nothing
+    assert calibration.chars_per_token("ollama", "m", ".md") == 3.0
+    assert calibration.chars_per_token("ollama", "other") is None
+
+    # A prompt mostly answered from the provider's cache is not a sample
+    assert not calibration.observe("ollama", "m", 3000, 10, ".py")
+    assert calibration.chars_per_token("ollama", "m", ".py") == 3.0
+
+
+def test_calibration_survives_a_restart(tmp_path):
+    path = str(tmp_path / "calibration.json")
+    calibration = TokenCalibration()
+    for _ in range(3):
+        calibration.observe("gemini", "g", 5000, 1000, ".ts")
+    calibration.save(path)
+    assert not calibration.dirty
+
+    loaded = TokenCalibration.load(path)
+    assert loaded.chars_per_token("gemini", "g", ".ts") == 5.0
+    assert TokenCalibration.load(str(tmp_path / "missing.json")).as_dict()["models"] == {}
+
+
+class FakeOllama:
+    """Counts prompt tokens as one per 3 characters, like a code-heavy prompt."""
+
+    async def chat(self, model, messages, tools=None):
+        chars = sum(len(m["content"]) for m in messages)
+        return {
+            "message": {"role": "assistant", "content": "ok"},
+            "prompt_eval_count": chars // 3,
+        }
+
+
+@pytest.mark.asyncio
+async def test_reported_usage_tightens_estimates(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "token_calibration_path", str(tmp_path / "c.json"))
+    monkeypatch.setattr(Tokenizer, "_calibration", TokenCalibration())
+    Tokenizer.configure("ollama", "fake-model")
+    client = OllamaClient(model="fake-model")
+    client.client = FakeOllama()
+    code = "def handler(value):\n    return value * 2\n" * 300
+
+    default = Tokenizer.count(code)
+    with Tokenizer.source("app/handlers.py"):
+        for _ in range(3):
+            await client.process_messages([{"role": "user", "content": code}])
+        calibrated = Tokenizer.count(code)
+        truncated = Tokenizer.truncate(code, 1000)
+    logger.info(f"Estimate: default {default}, calibrated {calibrated}")
+
+    assert calibrated == len(code) // 3 > default
+    assert len(truncated) < 1000 * 3.8
+    assert Tokenizer.get_info()["calibrated"] is True
+
+    Tokenizer.save_calibration()
+    restored = TokenCalibration.load(settings.token_calibration_path)
+    assert restored.chars_per_token("ollama", "fake-model", ".py") == 3.0
@@ -0,0 +1,138 @@
+import json
+
+import pytest
+
+from app.core.logger import get_logger
+from app.core.tokenizer import TRUNCATION_MARKER, Tokenizer
+from app.services.miner_pipeline import MinerPipeline
+
+logger = get_logger(__name__)
+
+
+class WordEncoding:
+    """Stands in for a tiktoken encoding: one token per space-separated word."""
+
+    def __init__(self):
+        self.encodes = 0
+        self.batches = []
+
+    def encode(self, text):
+        self.encodes += 1
+        return list(range(len(text.split(" "))))
+
+    def encode_batch(self, texts, num_threads=8):
+        self.batches.append(len(texts))
+        return [self.encode(t) for t in texts]
+
+    def decode(self, tokens):
+        return " ".join("w" for _ in tokens)
+
+
+@pytest.fixture
+def encoding(monkeypatch):
+    fake = WordEncoding()
+    monkeypatch.setattr(Tokenizer, "_encodings", {"o200k_base": fake})
+    monkeypatch.setattr(Tokenizer, "_counts", type(Tokenizer._counts)())
+    Tokenizer.configure("openai", "gpt-4o-mini")
+    yield fake
+    Tokenizer.configure("ollama", "fake-model")
+
+
+def test_fit_counts_and_truncates_from_one_encode(encoding):
+    text = " ".join(["word"] * 300)
+
+    fit = Tokenizer.fit(text, 100)
+
+    assert encoding.encodes == 1
+    assert (fit.count, fit.kept, fit.truncated) == (300, 100, True)
+    assert fit.tokens == list(range(100))
+    assert fit.text.endswith(TRUNCATION_MARKER)
+
+    # The count is memoized by content: no further encodes
+    assert Tokenizer.count(text) == 300
+    assert Tokenizer.fit(text, 500).text == text
+    assert encoding.encodes == 1
+
+
+def test_short_texts_skip_encoding_when_truncating(encoding):
+    text = "a b c"
+    assert Tokenizer.truncate(text, 100) == text
+    assert encoding.encodes == 0
+
+
+def test_char_estimate_providers_still_fit():
+    Tokenizer.configure("ollama", "fake-model")
+    fit = Tokenizer.fit("x" * 380, 50)
+    assert (fit.count, fit.kept, fit.tokens) == (100, 50, None)
+    assert fit.text == "x" * 190 + TRUNCATION_MARKER
+
+
+@pytest.mark.asyncio
+async def test_batches_encode_once_and_skip_memoized_texts(encoding):
+    texts = [" ".join(["word"] * n) for n in (200, 300, 400)]
+    assert Tokenizer.count(texts[0]) == 200
+
+    assert Tokenizer.count_batch(texts + [""]) == [200, 300, 400, 0]
+    # Only the two uncounted texts went to the batch encoder
+    assert encoding.batches == [2]
+
+    truncated = Tokenizer.truncate_batch(texts + ["short"], 250)
+    assert truncated[0] == texts[0]
+    assert truncated[1].endswith(TRUNCATION_MARKER)
+    assert truncated[3] == "short"
+    # Counts came from the memo; only the cut texts were encoded again
+    assert encoding.batches == [2]
+
+    assert await Tokenizer.count_batch_async(texts) == [200, 300, 400]
+    assert await Tokenizer.count_async(" ".join(["v"] * 50)) == 50
+    assert (await Tokenizer.fit_async(texts[2], 100)).kept == 100
+    assert await Tokenizer.truncate_async(texts[0], 250) == texts[0]
+
+
+class StaleEntry:
+    """A cached file whose Miner key no longer matches (e.g. new prompt)."""
+
+    def __init__(self, summary):
+        self.hash = "outdated"
+        self.summary = summary
+
+
+@pytest.mark.asyncio
+async def test_miner_persists_counts_and_reuses_them(
+    tmp_path, encoding, recording_miner
+):
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "big.py").write_text(" ".join(["x = 1"] * 400), encoding="utf-8")
+    saved = []
+
+    async def on_flush(entries):
+        saved.extend(entries)
+
+    async def run(cached_files):
+        pipeline = MinerPipeline(
+            repo_path=str(tmp_path),
+            miner=recording_miner(),
+            model_name="gpt-4o-mini",
+            cached_files=cached_files,
+            input_cost_rate=0.0,
+            output_cost_rate=0.0,
+            max_cost_usd=1.0,
+            on_flush=on_flush,
+            batch_token_budget=0,
+        )
+        return await pipeline.run()
+
+    await run({})
+    # Counted once, for dispatch, chunking and the request together
+    assert encoding.encodes == 1
+    path, _, summary = saved[0]
+    stored = json.loads(summary)["tokens"]
+    logger.info(f"Persisted count for {path}: {stored}")
+    assert stored["count"] == 1200
+
+    # A later process (empty memo) reuses the persisted count
+    Tokenizer._counts.clear()
+    result = await run({path: StaleEntry(summary)})
+    assert encoding.encodes == 1
+    assert result.files_mined == 1
+    assert "tokens" not in result.results[path]
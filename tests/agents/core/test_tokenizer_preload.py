@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+
+import pytest
+
+from app.core import tokenizer as tokenizer_module
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+from app.main import readiness_check
+
+logger = get_logger(__name__)
+
+
+class FakeEncoding:
+    def __init__(self, name):
+        self.name = name
+        self.encodes = 0
+
+    def encode(self, text):
+        self.encodes += 1
+        return text.split()
+
+
+@pytest.fixture
+def loader(monkeypatch, tmp_path):
+    """Fake tiktoken.get_encoding recording the cache directory of each load."""
+    loads = []
+    missing = set()
+
+    def get_encoding(name):
+        loads.append((name, os.environ.get("TIKTOKEN_CACHE_DIR")))
+        if name in missing:
+            raise ValueError(f"no file for {name}")
+        return FakeEncoding(name)
+
+    monkeypatch.setattr(tokenizer_module.tiktoken, "get_encoding", get_encoding)
+    monkeypatch.setattr(Tokenizer, "_encodings", {})
+    monkeypatch.setattr(Tokenizer, "_ready", threading.Event())
+    monkeypatch.setattr(Tokenizer, "_preload_status", {})
+    monkeypatch.setattr(settings, "tokenizer_preload", True)
+    monkeypatch.setattr(settings, "tiktoken_cache_dir", str(tmp_path / "encodings"))
+    # Restored to the original (unset) value after the test
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", "")
+    yield loads, missing
+
+
+@pytest.mark.asyncio
+async def test_readiness_flips_once_encodings_are_warm(loader, tmp_path):
+    loads, _ = loader
+    assert readiness_check().status_code == 503
+
+    status = await Tokenizer.preload_async()
+    logger.info(f"Preload: {status}")
+
+    assert status == {"cl100k_base": "ready", "o200k_base": "ready"}
+    assert readiness_check()["ready"] is True
+    # Loaded from the configured directory, and warmed
+    assert {cache_dir for _, cache_dir in loads} == {str(tmp_path / "encodings")}
+    assert all(Tokenizer._encodings[name].encodes == 1 for name in status)
+
+    # Later calls reuse the preloaded encodings
+    Tokenizer.count("one two three", provider="openai", model="gpt-4o")
+    assert len(loads) == 2
+
+
+def test_missing_encoding_keeps_the_tokenizer_unready(loader):
+    loads, missing = loader
+    missing.add("o200k_base")
+
+    status = Tokenizer.preload()
+
+    assert status["o200k_base"].startswith("failed")
+    response = readiness_check()
+    assert response.status_code == 503
+    assert json.loads(response.body)["encodings"]["cl100k_base"] == "ready"
+
+    # Lazy use still falls back to the default encoding
+    assert Tokenizer.count("one two", provider="openai", model="gpt-4o") == 2
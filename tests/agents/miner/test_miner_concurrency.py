@@ -0,0 +1,110 @@
+import asyncio
+import json
+import random
+import re
+
+import pytest
+
+from app.agents.core.base import BaseLLMClient
+from app.agents.core.rate_limiter import get_rate_limiter_for_client
+from app.agents.miner.agent import MinerAgent
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+
+logger = get_logger(__name__)
+
+
+class EchoMinerClient(BaseLLMClient):
+    """
+    Fake client that answers `submit_conclusions` with the path and marker it
+    finds in the conversation, after a random delay so calls interleave.
+    Records every conversation it sees that holds more than one file.
+    """
+
+    provider = "test-stress"
+
+    def __init__(self):
+        self.model = "echo-model"
+        self.in_flight = 0
+        self.peak = 0
+        self.contaminated = []
+
+    async def generate(self, prompt, system=None):
+        return ""
+
+    async def stream_generate(self, prompt, system=None):
+        yield ""
+
+    async def process_messages(self, messages, tools=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(random.uniform(0, 0.01))
+
+            if messages[-1].get("role") == "tool":
+                return {"role": "assistant", "content": "Done."}
+
+            contexts = [
+                m["content"]
+                for m in messages
+                if m.get("role") == "user" and "File Context" in m["content"]
+            ]
+            if len(contexts) != 1 or len(messages) != 3:
+                self.contaminated.append(contexts)
+
+            path = re.search(r"Path: (\S+)", contexts[-1]).group(1)
+            marker = re.search(r"MARKER = \"(\w+)\"", contexts[-1]).group(1)
+            arguments = {
+                "file": path,
+                "conclusions": [
+                    {"topic": "marker", "statement": marker, "impact": "LOW"}
+                ],
+            }
+            return {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{marker}",
+                        "type": "function",
+                        "function": {
+                            "name": "submit_conclusions",
+                            "arguments": json.dumps(arguments),
+                        },
+                    }
+                ],
+            }
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_analyze_file_is_isolated():
+    Tokenizer.configure("ollama", "fake-model")
+
+    client = EchoMinerClient()
+    limiter = get_rate_limiter_for_client(client)
+    limiter.max_concurrency = 100
+    limiter.concurrency = 100.0
+
+    miner = MinerAgent(client)
+    files = {
+        f"pkg/module_{i}.py": f'MARKER = "m{i}x{random.randint(0, 10**6)}"\n'
+        for i in range(100)
+    }
+
+    outputs = await asyncio.gather(
+        *(miner.analyze_file(path, content) for path, content in files.items())
+    )
+
+    logger.info(
+        f"Peak concurrent LLM calls: {client.peak}, "
+        f"contaminated conversations: {len(client.contaminated)}"
+    )
+    assert client.contaminated == []
+    assert client.peak > 1
+    for (path, content), output in zip(files.items(), outputs):
+        assert output is not None
+        assert output.file == path
+        assert len(output.conclusions) == 1
+        assert f'"{output.conclusions[0].statement}"' in content
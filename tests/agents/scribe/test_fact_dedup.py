@@ -0,0 +1,99 @@
+from app.core.fact_dedup import MinHasher, collapse_near_duplicates
+from app.core.fact_index import FactIndex
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+
+logger = get_logger(__name__)
+
+CRUD = (
+    "Repository class exposing create, read, update and delete operations for the "
+    "{entity} entity through the shared SQLAlchemy async session and base repository"
+)
+
+
+def crud_results():
+    results = [
+        {
+            "file": f"app/repositories/{entity}_repository.py",
+            "conclusions": [
+                {"topic": "Data", "impact": "LOW", "statement": CRUD.format(entity=entity)},
+                {
+                    "topic": "Data",
+                    "impact": "MEDIUM",
+                    "statement": f"Adds a {entity} lookup by external reference",
+                },
+            ],
+        }
+        for entity in ("user", "order", "invoice", "product")
+    ]
+    results[2]["conclusions"][0]["impact"] = "HIGH"
+    results.append(
+        {
+            "file": "app/api/orders.py",
+            "conclusions": [
+                {"topic": "Data", "impact": "LOW", "statement": CRUD.format(entity="order")}
+            ],
+        }
+    )
+    return results
+
+
+def test_minhash_estimates_jaccard_similarity():
+    hasher = MinHasher(num_perm=128, bands=32)
+    sigs = hasher.signatures(
+        [CRUD.format(entity="user"), CRUD.format(entity="order"), "Renders the login form", ""]
+    )
+
+    def similarity(a, b):
+        return float((sigs[a] == sigs[b]).mean())
+
+    assert similarity(0, 1) > 0.7
+    assert similarity(0, 2) < 0.2
+    assert similarity(3, 3) == 1.0
+    assert similarity(0, 3) == 0.0
+
+
+def test_near_duplicates_merge_per_module_and_per_project():
+    Tokenizer.configure("ollama", "fake-model")
+    results = crud_results()
+
+    per_module, stats = collapse_near_duplicates(results, per_module=True)
+    logger.info(f"Per module: {stats.as_dict()}")
+
+    # The four repository statements collapse into the first, which keeps
+    # the highest impact and lists every source file
+    merged = per_module[0]["conclusions"][0]
+    assert merged["impact"] == "HIGH"
+    assert merged["sources"] == [r["file"] for r in results[:4]]
+    assert [len(r["conclusions"]) for r in per_module] == [2, 1, 1, 1, 1]
+    # Distinct statements survive, and the other module is untouched
+    assert per_module[1]["conclusions"][0]["statement"].startswith("Adds a order")
+    assert per_module[4] == results[4]
+    assert stats.facts_in == 9 and stats.facts_out == 6 and stats.clusters == 1
+    assert stats.tokens_saved > 0
+    # The input is left as it was
+    assert "sources" not in results[0]["conclusions"][0]
+
+    per_project, project_stats = collapse_near_duplicates(per_module, per_module=False)
+    assert per_project[4]["conclusions"] == []
+    assert per_project[0]["conclusions"][0]["sources"][-1] == "app/api/orders.py"
+    assert project_stats.facts_out == 5
+
+
+def test_merged_facts_render_their_other_sources():
+    Tokenizer.configure("ollama", "fake-model")
+    collapsed, stats = collapse_near_duplicates(crud_results(), per_module=False)
+    index = FactIndex(collapsed)
+
+    block = index.block("app/repositories")
+    raw_block = FactIndex(crud_results()).block("app/repositories")
+    assert block.count("Repository class exposing") == 1
+    assert "(also in: app/repositories/order_repository.py" in block
+    saved = (
+        Tokenizer.count(raw_block)
+        + Tokenizer.count(FactIndex(crud_results()).block("app/api"))
+        - Tokenizer.count(block)
+        - Tokenizer.count(index.block("app/api"))
+    )
+    # Reported savings match the rendered prompt, up to headers
+    assert abs(saved - stats.tokens_saved) <= 10
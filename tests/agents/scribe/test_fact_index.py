@@ -0,0 +1,149 @@
+import random
+
+import pytest
+
+from app.agents.scribe.agent import ScribeAgent
+from app.core.bm25 import BM25Index, tokenize
+from app.core.fact_index import FactIndex
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+
+logger = get_logger(__name__)
+
+
+def synthetic_results(files: int, seed: int = 7):
+    rng = random.Random(seed)
+    areas = ["app", "lib", "services", "web"]
+    parts = ["api", "auth", "core", "db", "models", "scanner", "modules", "utils"]
+    results = []
+    for i in range(files):
+        depth = rng.randint(0, 3)
+        segments = [rng.choice(areas)] + rng.sample(parts, depth)
+        path = "/".join(segments[: depth + 1] + [f"file_{i}.py"]) if depth else f"file_{i}.py"
+        results.append(
+            {
+                "file": path,
+                "conclusions": [
+                    {"topic": "Topic", "impact": "LOW", "statement": f"Fact {i}.{j}"}
+                    for j in range(2)
+                ],
+            }
+        )
+    return results
+
+
+def legacy_context(results, targets):
+    """Reference: group per call and scan every module for every target."""
+    modules = {}
+    for item in results:
+        parent = item["file"].rsplit("/", 1)[0] if "/" in item["file"] else "root"
+        modules.setdefault(parent, []).append(item)
+    matched = []
+    for target in targets:
+        for key in modules:
+            if ScribeAgent._module_matches(target, key) and key not in matched:
+                matched.append(key)
+    text = ""
+    for key in matched:
+        text += f"=== MODULE: {key} ===\n"
+        for f in modules[key]:
+            text += f"\nFILE: {f['file']}\n"
+            for c in f["conclusions"]:
+                text += f"- [{c['topic']}]: {c['statement']}\n"
+    return text
+
+
+@pytest.mark.parametrize(
+    "targets",
+    [
+        ["api"],
+        ["backend", "auth"],
+        ["modules-scanner"],
+        ["app_core", "db"],
+        ["root"],
+        ["nothing-here"],
+    ],
+)
+def test_index_context_matches_full_scan(targets):
+    results = synthetic_results(500)
+    index = FactIndex(results)
+
+    context = index.context_for(targets)
+
+    assert context == legacy_context(results, targets)
+
+
+def test_bm25_ranks_matching_terms_first():
+    index = BM25Index(
+        [
+            tokenize("JWT tokens are validated by the AuthMiddleware"),
+            tokenize("Database sessions are pooled"),
+            tokenize("auth auth auth retries for the database"),
+        ]
+    )
+
+    scores = index.scores({"jwt": 1.0, "auth": 1.0})
+
+    assert tokenize("app/agents/MinerAgent") == ["app", "agents", "miner", "agent"]
+    assert scores[1] == 0
+    assert scores[0] > scores[2] > 0
+
+
+def ranked_results():
+    return [
+        {
+            "file": "app/auth/jwt.py",
+            "conclusions": [
+                {"topic": "Auth", "impact": "HIGH", "statement": "JWT tokens are signed with RS256."},
+                {"topic": "Auth", "impact": "LOW", "statement": "Helper formats log lines."},
+            ],
+        },
+        {
+            "file": "app/api/routes.py",
+            "conclusions": [
+                {"topic": "API", "impact": "MEDIUM", "statement": "Login route issues JWT tokens for auth."},
+            ],
+        },
+        {
+            "file": "app/db/models.py",
+            "conclusions": [
+                {"topic": "Data", "impact": "HIGH", "statement": "Users are stored in Postgres."},
+            ],
+        },
+    ]
+
+
+def test_selection_packs_relevant_facts_within_budget():
+    Tokenizer.configure("ollama", "fake-model")
+    index = FactIndex(ranked_results())
+    query = {term: 1.0 for term in tokenize("Authentication auth jwt")}
+
+    context = index.select_context(query, token_budget=10_000, boost_targets=["auth"])
+    logger.info(f"Selected context:\n{context}")
+
+    # Boosted module first, relevant fact from another module also included
+    assert context.index("MODULE: app/auth") < context.index("MODULE: app/api")
+    assert "Login route issues JWT tokens" in context
+    assert "Postgres" not in context
+
+    tight = index.select_context(query, token_budget=25, boost_targets=["auth"])
+    assert Tokenizer.count(tight) <= 25
+    assert "RS256" in tight
+    assert "Login route" not in tight
+
+
+@pytest.mark.asyncio
+async def test_scribe_uses_shared_index():
+    Tokenizer.configure("ollama", "fake-model")
+    index = FactIndex(ranked_results())
+    scribe = ScribeAgent(client=None, fact_index=index)
+
+    text = await scribe._prepare_facts(
+        index, ["backend", "auth"], page_id="auth", page_title="Authentication"
+    )
+    logger.info(f"Context length: {len(text)}")
+
+    assert "RS256" in text
+    assert await scribe._prepare_facts(
+        index, ["missing"], page_id="missing", page_title="Nothing"
+    ) == "No specific technical facts found for this module."
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.agents.core.base import BaseLLMClient
+from app.agents.scribe.agent import ScribeAgent
+from app.agents.scribe.streaming import JsonStringFieldStream
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+
+logger = get_logger(__name__)
+
+PAGE = {
+    "id": "api",
+    "title": "API",
+    "description": "HTTP layer",
+    "content_markdown": '# API\n\nRoutes "/users" and "/orders" — see `routes.py`.\n',
+}
+
+
+class StreamingClient(BaseLLMClient):
+    """Streams a submit_page call in small argument pieces."""
+
+    def __init__(self, piece_size=8, delay=0.01):
+        self.model = "stream-model"
+        self.piece_size = piece_size
+        self.delay = delay
+
+    async def generate(self, prompt, system=None):
+        return ""
+
+    async def stream_generate(self, prompt, system=None):
+        yield ""
+
+    async def process_messages(self, messages, tools=None):
+        raise AssertionError("streaming mode must not use process_messages")
+
+    async def stream_messages(self, messages, tools=None):
+        arguments = json.dumps(PAGE)
+        for i in range(0, len(arguments), self.piece_size):
+            await asyncio.sleep(self.delay)
+            yield {
+                "tool_call": 0,
+                "name": "submit_page",
+                "arguments": arguments[i : i + self.piece_size],
+            }
+        yield {
+            "message": {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": "call_1",
+                        "type": "function",
+                        "function": {"name": "submit_page", "arguments": arguments},
+                    }
+                ],
+            }
+        }
+
+
+class BlockingClient(StreamingClient):
+    """No native streaming: the whole page arrives at once."""
+
+    async def process_messages(self, messages, tools=None):
+        async for event in StreamingClient.stream_messages(self, messages, tools):
+            if "message" in event:
+                return event["message"]
+
+    stream_messages = BaseLLMClient.stream_messages
+
+
+@pytest.mark.asyncio
+async def test_streaming_scribe_forwards_content_before_completion():
+    Tokenizer.configure("ollama", "fake-model")
+    deltas = []
+    timeline = {}
+    start = time.perf_counter()
+
+    async def on_content(page_id, delta):
+        timeline.setdefault("first", time.perf_counter() - start)
+        deltas.append((page_id, delta))
+
+    scribe = ScribeAgent(StreamingClient(), on_content=on_content)
+    page = await scribe.write_page("api", "page", "API", ["api"], {"results": []})
+    total = time.perf_counter() - start
+
+    logger.info(f"First content after {timeline['first']:.3f}s of {total:.3f}s")
+    assert page.content_markdown == PAGE["content_markdown"]
+    assert "".join(delta for _, delta in deltas) == PAGE["content_markdown"]
+    assert {page_id for page_id, _ in deltas} == {"api"}
+    assert len(deltas) > 1
+    # Content flows while later pieces are still being generated
+    assert timeline["first"] < total - 5 * 0.01
+
+
+@pytest.mark.asyncio
+async def test_clients_without_streaming_still_complete_the_page():
+    Tokenizer.configure("ollama", "fake-model")
+    deltas = []
+
+    scribe = ScribeAgent(BlockingClient(), on_content=lambda page_id, delta: deltas.append(delta))
+    page = await scribe.write_page("api", "page", "API", ["api"], {"results": []})
+
+    assert page.content_markdown == PAGE["content_markdown"]
+    assert deltas == []
+
+
+def test_field_stream_decodes_escapes_split_across_pieces():
+    raw = json.dumps({"title": "x", "content_markdown": "line\n\"é\" 😀", "id": "p"})
+    stream = JsonStringFieldStream("content_markdown")
+
+    decoded = "".join(stream.feed(ch) for ch in raw)
+
+    assert decoded == "line\n\"é\" 😀"
+    assert stream.done
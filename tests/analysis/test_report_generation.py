@@ -4,9 +4,8 @@ import os
 import json
 from app.services.project_service import ProjectService
 from app.services.analysis_service import AnalysisService
-from app.core.database import AsyncSessionLocal, engine
+from app.core.database import AsyncSessionLocal, init_db
 from app.core.logger import get_logger
-from sqlmodel import SQLModel
 
 logger = get_logger(__name__)
 
@@ -19,8 +18,7 @@ async def test_project_report_generation_flow():
     logger.info("Starting test_project_report_generation_flow")
 
     # Initialize DB for testing
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+    await init_db()
 
     async with AsyncSessionLocal() as session:
         project_service = ProjectService(session)
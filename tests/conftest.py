@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from app.agents.core.rate_limiter import RateLimiter
+from app.agents.miner.schema import MinerConclusion, MinerOutput
+
+
+class RecordingMiner:
+    """
+    Stands in for MinerAgent. Records the path and content of every call and
+    answers with one conclusion stating the file content. Calls go through a
+    rate limiter, like MinerAgent's, taking `latency` seconds (or hanging on
+    `hang_on`, to trigger the call deadline).
+    """
+
+    def __init__(self, hang_on=None, latency=0.0, slots=8):
+        self.hang_on = hang_on
+        self.latency = latency
+        self.calls = []
+        self.contents = {}
+        self.limiter = RateLimiter(
+            name="recording",
+            requests_per_minute=None,
+            tokens_per_minute=None,
+            max_concurrency=slots,
+            initial_concurrency=slots,
+        )
+
+    async def analyze_file(self, file_path, file_content, part=None):
+        self.calls.append(file_path)
+        self.contents[file_path] = file_content
+        delay = 10 if file_path == self.hang_on else self.latency
+        await self.limiter.run(lambda: asyncio.sleep(delay))
+        return MinerOutput(
+            file=file_path,
+            conclusions=[
+                MinerConclusion(
+                    topic="Content", impact="LOW", statement=file_content.strip()
+                )
+            ],
+        )
+
+
+@pytest.fixture
+def recording_miner():
+    """The RecordingMiner class, to build fakes with per-test options."""
+    return RecordingMiner
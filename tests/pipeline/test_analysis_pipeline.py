@@ -1,8 +1,7 @@
 import pytest
 import os
 from app.pipeline.orchestrator import create_standard_pipeline, PipelineContext
-from app.core.database import AsyncSessionLocal, engine
-from sqlmodel import SQLModel
+from app.core.database import AsyncSessionLocal, init_db
 
 
 @pytest.mark.asyncio
@@ -11,8 +10,7 @@ async def test_full_analysis_pipeline():
     Test the complete parent pipeline: Prepare -> Clone -> Analyze
     """
     # Initialize DB
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+    await init_db()
 
     async with AsyncSessionLocal() as session:
         # Use a real public small repo for testing if possible, or just this one
@@ -0,0 +1,18 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import app.models  # noqa: F401 - registers tables on SQLModel.metadata
+
+
+@pytest.fixture
+def session_factory():
+    """(engine, session factory) of a fresh in-memory database."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    return engine, sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
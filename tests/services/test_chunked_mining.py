@@ -0,0 +1,164 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import app.services.miner_pipeline as miner_pipeline_module
+from app.agents.miner.schema import MinerConclusion, MinerOutput
+from app.core.chunking import split_into_chunks
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+from app.services.miner_pipeline import MinerPipeline
+
+logger = get_logger(__name__)
+
+CHUNK_TOKENS = 200
+
+
+def make_module(functions: int, edited: int = -1) -> str:
+    blocks = []
+    for i in range(functions):
+        body = "    return value * 2\n" if i == edited else "    return value + 1\n"
+        blocks.append(
+            f"def handler_{i}(value):\n"
+            f'    """Handles request type {i} for the service layer."""\n'
+            f"    result = compute_{i}(value)\n"
+            f"{body}"
+        )
+    return "import os\n\n\n" + "\n\n".join(blocks)
+
+
+class ChunkMiner:
+    """Stands in for MinerAgent; one conclusion per function in the chunk."""
+
+    def __init__(self):
+        self.parts = []
+
+    async def analyze_file(self, file_path, file_content, part=None):
+        self.parts.append(part)
+        names = [
+            line.split("(")[0][len("def ") :]
+            for line in file_content.splitlines()
+            if line.startswith("def ")
+        ]
+        return MinerOutput(
+            file=file_path,
+            conclusions=[
+                MinerConclusion(topic="Handlers", impact="LOW", statement=name)
+                for name in names + ["shared fact"]
+            ],
+        )
+
+
+def test_split_follows_definitions_and_is_stable_under_edits():
+    Tokenizer.configure("ollama", "fake-model")
+    original = make_module(40)
+    edited = make_module(40, edited=17)
+
+    chunks = split_into_chunks(original, "service.py", CHUNK_TOKENS)
+    edited_chunks = split_into_chunks(edited, "service.py", CHUNK_TOKENS)
+    logger.info(f"{len(chunks)} chunks, sizes {[c.tokens for c in chunks]}")
+
+    assert len(chunks) > 2
+    assert "".join(c.text for c in chunks) == original
+    for chunk in chunks[1:]:
+        assert chunk.text.startswith("def ")
+    unchanged = {c.text for c in chunks} & {c.text for c in edited_chunks}
+    assert len(unchanged) == len(chunks) - 1
+
+
+def test_python_cuts_ignore_splitlines_only_separators():
+    Tokenizer.configure("ollama", "fake-model")
+    # A form feed inside a string ends a line for str.splitlines, not for ast
+    content = 'PAGE_BREAK = "a\x0cb"\n\n' + make_module(40)
+
+    chunks = split_into_chunks(content, "service.py", CHUNK_TOKENS)
+
+    assert len(chunks) > 2
+    assert "".join(c.text for c in chunks) == content
+    for chunk in chunks[1:]:
+        assert chunk.text.startswith("def ")
+
+
+def test_brace_language_splits_at_top_level():
+    Tokenizer.configure("ollama", "fake-model")
+    content = "\n".join(
+        f"function handler{i}(req) {{\n  if (req) {{\n    return {i};\n  }}\n}}\n"
+        for i in range(60)
+    )
+
+    chunks = split_into_chunks(content, "handlers.js", CHUNK_TOKENS)
+
+    assert len(chunks) > 1
+    assert "".join(c.text for c in chunks) == content
+    for chunk in chunks:
+        assert chunk.text.startswith("function ")
+
+
+@pytest.mark.asyncio
+async def test_large_file_is_mined_in_chunks_and_reuses_unchanged_ones(
+    tmp_path, monkeypatch
+):
+    Tokenizer.configure("ollama", "fake-model")
+    monkeypatch.setattr(
+        miner_pipeline_module, "MINER_MAX_TOKENS_PER_FILE", CHUNK_TOKENS
+    )
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "service.py").write_text(make_module(40), encoding="utf-8")
+    (repo / "small.py").write_text("VALUE = 1\n", encoding="utf-8")
+
+    cache = {}
+
+    async def on_flush(entries):
+        for path, key, summary in entries:
+            cache[path] = SimpleNamespace(hash=key, summary=summary)
+
+    async def run_pipeline():
+        miner = ChunkMiner()
+        pipeline = MinerPipeline(
+            repo_path=str(repo),
+            miner=miner,
+            model_name="fake-model",
+            cached_files=dict(cache),
+            input_cost_rate=0.0,
+            output_cost_rate=0.0,
+            max_cost_usd=1.0,
+            on_flush=on_flush,
+        )
+        return miner, await pipeline.run()
+
+    miner, result = await run_pipeline()
+    output = result.results["service.py"]
+    statements = [c["statement"] for c in output["conclusions"]]
+    logger.info(
+        f"First run: {result.chunks_mined} chunks mined, parts {miner.parts}"
+    )
+
+    assert result.files_chunked == 1
+    assert result.chunks_mined > 2
+    assert result.files_mined == 2
+    assert all(part for part in miner.parts if part is not None)
+    # Merged in file order, shared fact deduplicated
+    assert [s for s in statements if s != "shared fact"] == [
+        f"handler_{i}" for i in range(40)
+    ]
+    assert statements.count("shared fact") == 1
+    assert "chunks" not in output
+    assert len(json.loads(cache["service.py"].summary)["chunks"]) == result.chunks_mined
+
+    # Editing one function re-mines only its chunk
+    (repo / "service.py").write_text(make_module(40, edited=17), encoding="utf-8")
+    miner, result = await run_pipeline()
+    logger.info(f"After edit: {result.chunks_mined} mined, {result.chunks_cached} reused")
+
+    assert result.chunks_mined == 1
+    assert result.chunks_cached > 1
+    assert [p for p in miner.parts if p is not None] == miner.parts
+    assert len(result.results["service.py"]["conclusions"]) == 41
+
+    # Unchanged file: whole-file cache hit, no chunk work at all
+    miner, result = await run_pipeline()
+    assert miner.parts == []
+    assert result.files_cached == 2
+    assert "chunks" not in result.results["service.py"]
@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import app.models  # noqa: F401 - registers tables on SQLModel.metadata
+from app.core.database import init_db
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+from app.models.mined_fact import MinedFact
+from app.services.fact_store import FactStore
+from app.services.miner_pipeline import MinerPipeline
+from app.storage.mined_fact_repository import MinedFactRepository
+
+logger = get_logger(__name__)
+
+
+def write_repo(root, files):
+    for path, content in files.items():
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content, encoding="utf-8")
+    return str(root)
+
+
+async def run_pipeline(repo_path, fact_store, miner):
+    pipeline = MinerPipeline(
+        repo_path=repo_path,
+        miner=miner,
+        model_name="fake-model",
+        cached_files={},
+        input_cost_rate=0.0,
+        output_cost_rate=0.0,
+        max_cost_usd=1.0,
+        fact_store=fact_store,
+    )
+    return miner, await pipeline.run()
+
+
+@pytest.mark.asyncio
+async def test_identical_files_are_mined_once_across_projects(
+    tmp_path, session_factory, recording_miner
+):
+    engine, factory = session_factory
+    await init_db(engine)
+    Tokenizer.configure("ollama", "fake-model")
+
+    vendored = "def helper():\n    return 'vendored'\n"
+    first_repo = write_repo(
+        tmp_path / "first",
+        {
+            "app/main.py": "APP = 'first'\n",
+            "copies/a/helper.py": vendored,
+            "copies/b/helper.py": vendored,
+            "copies/c/helper.py": vendored,
+        },
+    )
+    second_repo = write_repo(
+        tmp_path / "second",
+        {"src/main.py": "APP = 'second'\n", "shared/helper.py": vendored},
+    )
+
+    miner, first = await run_pipeline(
+        first_repo, FactStore(factory), recording_miner(latency=0.001)
+    )
+    logger.info(f"First project mined: {miner.calls}")
+    assert len(miner.calls) == 2
+    assert first.files_deduplicated == 2
+    assert set(first.results) == {
+        "app/main.py",
+        "copies/a/helper.py",
+        "copies/b/helper.py",
+        "copies/c/helper.py",
+    }
+    assert first.results["copies/c/helper.py"]["file"] == "copies/c/helper.py"
+
+    # A different project (fresh workspace, empty per-project cache)
+    store = FactStore(factory)
+    miner, second = await run_pipeline(second_repo, store, recording_miner(latency=0.001))
+    logger.info(f"Second project mined: {miner.calls}, store stats {store.stats}")
+    assert miner.calls == ["src/main.py"]
+    assert second.files_shared == 1
+    assert second.results["shared/helper.py"]["conclusions"][0]["statement"] == (
+        vendored.strip()
+    )
+
+    async with factory() as session:
+        shared = await MinedFactRepository(session).get_all()
+    assert {fact.hits for fact in shared} == {0, 1}
+
+
+@pytest.mark.asyncio
+async def test_store_evicts_least_recently_used(session_factory):
+    engine, factory = session_factory
+    await init_db(engine)
+
+    store = FactStore(factory, max_entries=2, max_bytes=10_000)
+    for key in ("a", "b"):
+        store.put(key, [{"topic": "t", "impact": "LOW", "statement": key}])
+        await store.flush()
+        await asyncio.sleep(0.001)
+
+    # Reusing "a" makes "b" the least recently used entry
+    assert await store.get("a") is not None
+    await store.flush()
+    store.put("c", [{"topic": "t", "impact": "LOW", "statement": "c"}])
+    await store.flush()
+
+    assert await store.get("b") is None
+    assert await store.get("a") is not None
+    assert store.stats["evicted"] == 1
+
+    # Size limit: a single oversized entry does not fit at all
+    small = FactStore(factory, max_entries=100, max_bytes=10)
+    small.put("big", [{"topic": "t", "impact": "LOW", "statement": "x" * 100}])
+    await small.flush()
+    assert await small.get("big") is None
+
+
+@pytest.mark.asyncio
+async def test_eviction_by_size_keeps_the_most_recent_entries(session_factory):
+    engine, factory = session_factory
+    await init_db(engine)
+
+    async with factory() as session:
+        repo = MinedFactRepository(session)
+        await repo.insert_missing(
+            [
+                MinedFact(key=key, conclusions="[]", size_bytes=40, last_used_at=used_at)
+                for key, used_at in (
+                    ("old", "2024-01-01"),
+                    ("mid", "2024-02-01"),
+                    ("new", "2024-03-01"),
+                )
+            ]
+        )
+        # Within both limits: nothing to do
+        assert await repo.evict(max_entries=3, max_bytes=120) == 0
+        # 120 bytes stored, 100 allowed: only the oldest entry goes
+        assert await repo.evict(max_entries=3, max_bytes=100) == 1
+        assert {f.key for f in await repo.get_all()} == {"mid", "new"}
+        assert await repo.evict(max_entries=1, max_bytes=100) == 1
+        assert [f.key for f in await repo.get_all()] == ["new"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_stores_share_a_key_without_conflict(tmp_path):
+    # Two runs of different projects, each with its own connection
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'store.db'}")
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await init_db(engine)
+
+    stores = [FactStore(factory), FactStore(factory)]
+    for store in stores:
+        store.put("shared", [{"topic": "t", "impact": "LOW", "statement": "same file"}])
+        store.put(f"own-{id(store)}", [{"topic": "t", "impact": "LOW", "statement": "x"}])
+    await asyncio.gather(*(store.flush() for store in stores))
+
+    assert sum(store.stats["stored"] for store in stores) == 3
+    async with factory() as session:
+        assert len(await MinedFactRepository(session).get_all()) == 3
+    await engine.dispose()
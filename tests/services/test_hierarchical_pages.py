@@ -0,0 +1,129 @@
+import pytest
+
+from app.agents.architect.schema import WikiPageDetail
+from app.agents.scribe.agent import ScribeAgent
+from app.core.config import settings
+from app.core.fact_index import FactIndex
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+from app.services.documentation_service import DocumentationService
+
+logger = get_logger(__name__)
+
+NAVIGATION = {
+    "tree": [
+        {"id": "architecture-overview", "label": "Architecture Overview", "type": "page"},
+        {
+            "id": "backend",
+            "label": "Backend",
+            "type": "category",
+            "children": [
+                {"id": "backend-overview", "label": "Backend Overview", "type": "page"},
+                {"id": "backend-api", "label": "API", "type": "page"},
+                {
+                    "id": "backend-db",
+                    "label": "Database",
+                    "type": "page",
+                    "children": [
+                        {"id": "backend-db-migrations", "label": "Migrations", "type": "page"}
+                    ],
+                },
+            ],
+        },
+        {
+            "id": "web",
+            "label": "Web",
+            "type": "category",
+            "children": [{"id": "web-ui", "label": "UI", "type": "page"}],
+        },
+    ]
+}
+
+
+def miner_output():
+    results = []
+    for module in ("backend", "backend/api", "backend/db", "backend/db/migrations", "web/ui"):
+        for i in range(3):
+            results.append(
+                {
+                    "file": f"{module}/file_{i}.py",
+                    "conclusions": [
+                        {
+                            "topic": module.split("/")[-1].title(),
+                            "impact": "MEDIUM",
+                            "statement": f"{module} file {i} implements step {j} of the "
+                            f"{module} workflow with detailed validation rules",
+                        }
+                        for j in range(4)
+                    ],
+                }
+            )
+    return {"results": results}
+
+
+def test_summary_sources_follow_the_navigation_tree():
+    sources = DocumentationService()._page_summary_sources(NAVIGATION["tree"])
+
+    assert sources == {
+        # Categories are represented by their overview when they have one
+        "architecture-overview": ["backend-overview", "web-ui"],
+        "backend-overview": ["backend-api", "backend-db"],
+        "backend-db": ["backend-db-migrations"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_parents_are_written_from_child_summaries(tmp_path, monkeypatch):
+    Tokenizer.configure("ollama", "fake-model")
+    prompts = {}
+
+    async def fake_write_page(self, page_id, page_type, page_title, target_modules, miner_output):
+        prompts[page_id] = self._prepared[page_id].user_message
+        return WikiPageDetail(
+            id=page_id,
+            title=page_title,
+            description="d",
+            content_markdown="# Page",
+            summary=f"{page_title} summary.",
+        )
+
+    monkeypatch.setattr(ScribeAgent, "write_page", fake_write_page)
+
+    async def run(hierarchical, output_path):
+        monkeypatch.setattr(settings, "scribe_hierarchical", hierarchical)
+        output = miner_output()
+        output_path.mkdir()
+        prompts.clear()
+        _, cost = await DocumentationService()._run_scribe_phase(
+            project_id="hierarchy",
+            output_path=output_path,
+            client=None,
+            event_handler=None,
+            navigation=NAVIGATION,
+            miner_output=output,
+            fact_index=FactIndex.from_miner_output(output),
+        )
+        logger.info(f"Scribe cost info: {cost}")
+        return dict(prompts), cost
+
+    flat, _ = await run(False, tmp_path / "flat")
+    tree, cost = await run(True, tmp_path / "tree")
+
+    assert cost["pages_synthesized"] == 3
+    # Children are written before the pages built from them
+    order = list(tree)
+    assert order.index("backend-db-migrations") < order.index("backend-db")
+    assert order.index("backend-overview") < order.index("architecture-overview")
+
+    overview = tree["backend-overview"]
+    assert "### API (backend-api)\nAPI summary." in overview
+    assert "### Database (backend-db)\nDatabase summary." in overview
+    # Facts of covered modules are not sent again; the group's own files are
+    assert "backend/api/file_0.py" not in overview
+    assert "backend/file_0.py" in overview
+    assert "backend/api/file_0.py" in flat["backend-overview"]
+
+    flat_tokens = sum(Tokenizer.count(p) for p in flat.values())
+    tree_tokens = sum(Tokenizer.count(p) for p in tree.values())
+    logger.info(f"Prompt tokens: flat {flat_tokens}, bottom-up {tree_tokens}")
+    assert tree_tokens < flat_tokens
@@ -0,0 +1,201 @@
+import json
+
+import pytest
+from git import Repo
+from sqlalchemy import inspect, text
+
+import app.models  # noqa: F401 - registers tables on SQLModel.metadata
+from app.agents.architect.schema import WikiPageDetail
+from app.agents.scribe.agent import ScribeAgent
+from app.core.database import init_db
+from app.core.logger import get_logger
+from app.infra.git_client import GitClient
+from app.services.change_set import ChangeSet
+from app.services.documentation_service import DocumentationService
+from app.services.file_service import FileService
+
+logger = get_logger(__name__)
+
+
+def _commit_all(repo: Repo, message: str) -> str:
+    repo.git.add(A=True)
+    repo.git.commit("-m", message, "--no-gpg-sign")
+    return repo.head.commit.hexsha
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    path = tmp_path / "repo"
+    (path / "app" / "api").mkdir(parents=True)
+    (path / "app" / "db").mkdir(parents=True)
+    (path / "app" / "api" / "routes.py").write_text("ROUTES = []\n")
+    (path / "app" / "db" / "models.py").write_text("MODELS = []\n")
+    (path / "app" / "db" / "legacy.py").write_text("LEGACY = True\n")
+    (path / "main.py").write_text("print('hi')\n")
+
+    repo = Repo.init(path)
+    repo.git.config("user.email", "dev@example.com")
+    repo.git.config("user.name", "Dev")
+    base = _commit_all(repo, "initial")
+
+    (path / "app" / "api" / "routes.py").write_text("ROUTES = ['/users']\n")
+    (path / "app" / "db" / "legacy.py").unlink()
+    (path / "main.py").rename(path / "app" / "main.py")
+    head = _commit_all(repo, "change api, drop legacy, move main")
+    return path, base, head
+
+
+def test_diff_name_status_builds_change_set(git_repo):
+    path, base, head = git_repo
+
+    changes = GitClient().diff_name_status(str(path), base, head)
+    change_set = ChangeSet.from_name_status(base, head, changes)
+
+    logger.info(f"Changes: {changes}")
+    assert change_set.changed == {"app/api/routes.py", "app/main.py"}
+    assert change_set.deleted == {"app/db/legacy.py", "main.py"}
+    assert change_set.affected_modules() == {"app/api", "app/db", "app", "root"}
+
+
+def test_page_dependency_uses_scribe_module_matching():
+    affected = {"app/api"}
+
+    assert ScribeAgent.depends_on_modules(["backend", "api"], affected)
+    assert not ScribeAgent.depends_on_modules(["backend", "db"], affected)
+
+
+@pytest.mark.asyncio
+async def test_incremental_run_invalidates_only_affected_pages(
+    tmp_path, git_repo, session_factory, monkeypatch
+):
+    path, base, head = git_repo
+    engine, factory = session_factory
+    await init_db(engine)
+
+    service = DocumentationService(session_factory=factory)
+    await service._record_commit("incr", str(path), base)
+
+    # Cached Miner facts from the previous run, including the deleted file
+    async with factory() as session:
+        await FileService(session).save_analyses(
+            "incr",
+            [
+                ("app/db/legacy.py", "k1", json.dumps({"file": "app/db/legacy.py"})),
+                ("app/db/models.py", "k2", json.dumps({"file": "app/db/models.py"})),
+            ],
+        )
+
+    change_set = await service._resolve_change_set("incr", str(path), head)
+    assert change_set.changed == {"app/api/routes.py", "app/main.py"}
+
+    async with factory() as session:
+        removed = await FileService(session).remove_files(
+            "incr", sorted(change_set.deleted)
+        )
+        remaining = await FileService(session).get_analysis_cache("incr")
+    assert removed == 1
+    assert set(remaining) == {"app/db/models.py"}
+
+    # Previously written pages: one per module
+    output_path = tmp_path / "out"
+    pages_dir = output_path / "pages"
+    pages_dir.mkdir(parents=True)
+    for page_id in ("api", "models"):
+        (pages_dir / f"{page_id}.json").write_text("{}")
+
+    written = []
+
+    async def fake_write_page(self, page_id, page_type, page_title, target_modules, miner_output):
+        written.append(page_id)
+        return WikiPageDetail(
+            id=page_id, title=page_title, description="d", content_markdown="# New"
+        )
+
+    monkeypatch.setattr(ScribeAgent, "write_page", fake_write_page)
+
+    navigation = {
+        "tree": [
+            {"id": "api", "label": "API", "type": "page"},
+            {"id": "models", "label": "Models", "type": "page"},
+        ]
+    }
+    # Only app/api changed among the page modules; app/db lost a file too,
+    # but the "models" page id does not match the app/db path
+    _, cost = await service._run_scribe_phase(
+        project_id="incr",
+        output_path=output_path,
+        client=None,
+        event_handler=None,
+        navigation=navigation,
+        miner_output={"results": []},
+        change_set=change_set,
+    )
+
+    logger.info(f"Scribe cost info: {cost}")
+    assert written == ["api"]
+    assert cost["pages_invalidated"] == 1
+    assert cost["pages_cached"] == 1
+
+    await service._record_commit("incr", str(path), head)
+    unchanged = await service._resolve_change_set("incr", str(path), head)
+    assert unchanged.is_empty
+
+
+@pytest.mark.asyncio
+async def test_incremental_fallback_is_reported(tmp_path, git_repo, session_factory):
+    path, _, head = git_repo
+    engine, factory = session_factory
+    await init_db(engine)
+    service = DocumentationService(session_factory=factory)
+
+    # Requested, but no previous run recorded a commit
+    cost_tracker = {}
+    assert await service._resolve_change_set("new", str(path), head, cost_tracker) is None
+    assert cost_tracker["incremental"] == {
+        "full_pass": True,
+        "reason": "no previous run recorded a commit",
+    }
+
+    # Requested on a directory that is not a git repository
+    await service._record_commit("plain", str(tmp_path), head)
+    cost_tracker = {}
+    assert await service._resolve_change_set("plain", str(tmp_path), None, cost_tracker) is None
+    assert cost_tracker["incremental"]["reason"] == "not a git repository"
+
+    await service._record_commit("new", str(path), head)
+    cost_tracker = {}
+    await service._resolve_change_set("new", str(path), head, cost_tracker)
+    assert cost_tracker["incremental"]["full_pass"] is False
+    assert cost_tracker["incremental"]["files_changed"] == 0
+
+
+def test_incremental_default_matches_the_api():
+    import inspect as pyinspect
+
+    from app.routers.documentation import DocumentationRequest
+
+    signature = pyinspect.signature(DocumentationService.generate_documentation)
+    assert (
+        signature.parameters["incremental"].default
+        == DocumentationRequest.model_fields["incremental"].default
+    )
+
+
+@pytest.mark.asyncio
+async def test_init_db_adds_last_commit_to_existing_projects_table(session_factory):
+    engine, _ = session_factory
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE projects (id VARCHAR PRIMARY KEY, name VARCHAR, "
+                "root_path VARCHAR, created_at VARCHAR, updated_at VARCHAR)"
+            )
+        )
+
+    await init_db(engine)
+
+    async with engine.connect() as conn:
+        columns = await conn.run_sync(
+            lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns("projects")}
+        )
+    assert "last_commit" in columns
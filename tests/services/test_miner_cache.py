@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+import app.models  # noqa: F401 - registers tables on SQLModel.metadata
+from app.agents.core.base import BaseLLMClient
+from app.agents.miner.agent import MinerAgent
+from app.core.config import settings
+from app.core.content_hash import content_hash
+from app.core.database import init_db
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+from app.services.documentation_service import DocumentationService
+
+logger = get_logger(__name__)
+
+
+class FakeMinerClient(BaseLLMClient):
+    """Answers every Miner request with a single conclusion about the file."""
+
+    async def generate(self, *args, **kwargs):
+        pass
+
+    async def stream_generate(self, *args, **kwargs):
+        pass
+
+    async def process_messages(self, messages, tools=None):
+        if messages[-1]["role"] == "tool":
+            return {"role": "assistant", "content": "Done."}
+
+        file_context = next(
+            m["content"] for m in messages if m["content"].startswith("File Context")
+        )
+        path = file_context.split("\n")[1].replace("Path: ", "")
+        arguments = {
+            "file": path,
+            "conclusions": [
+                {"topic": "Test", "impact": "LOW", "statement": f"Facts for {path}"}
+            ],
+        }
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": "call_1",
+                    "type": "function",
+                    "function": {
+                        "name": "submit_conclusions",
+                        "arguments": json.dumps(arguments),
+                    },
+                }
+            ],
+        }
+
+
+@pytest.fixture
+def counted_miner_calls(monkeypatch):
+    calls = []
+    original = MinerAgent.analyze_file
+
+    async def counting_analyze_file(self, file_path, file_content):
+        calls.append(file_path)
+        return await original(self, file_path, file_content)
+
+    monkeypatch.setattr(MinerAgent, "analyze_file", counting_analyze_file)
+    monkeypatch.setattr(settings, "miner_batch_token_budget", 0)
+    return calls
+
+
+def test_content_hash_ignores_whitespace_and_comments():
+    python_src = "def add(a, b):\n    return a + b\n"
+    python_edit = "# helper\ndef add(a, b):  # sum\n\n    return a + b   \n"
+    js_src = "function add(a, b) { return a + b; }\n"
+    js_edit = "/* helper */\nfunction add(a, b) {\n  // sum\n  return a + b;\n}\n"
+
+    logger.info("Comparing normalized digests for python and javascript")
+
+    assert content_hash(python_src, "m.py") == content_hash(python_edit, "m.py")
+    assert content_hash(js_src, "m.js") == content_hash(js_edit, "m.js")
+    assert content_hash(python_src, "m.py") != content_hash(
+        python_src.replace("+", "-"), "m.py"
+    )
+    assert content_hash('url = "http://x"', "m.js") != content_hash(
+        'url = "http:"', "m.js"
+    )
+
+
+@pytest.mark.asyncio
+async def test_miner_phase_only_mines_changed_files(
+    tmp_path, session_factory, counted_miner_calls
+):
+    engine, factory = session_factory
+    await init_db(engine)
+
+    Tokenizer.configure("ollama", "fake-model")
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for i in range(6):
+        (repo / f"module_{i}.py").write_text(
+            f"def handler_{i}():\n    return {i}\n", encoding="utf-8"
+        )
+
+    service = DocumentationService(session_factory=factory)
+    output_path = tmp_path / "out"
+    output_path.mkdir()
+
+    async def run_miner():
+        return await service._run_miner_phase(
+            project_id="cache-test",
+            repo_path=str(repo),
+            output_path=output_path,
+            client=FakeMinerClient(),
+            event_handler=None,
+            model_name="fake-model",
+            provider="ollama",
+        )
+
+    first_output, first_cost = await run_miner()
+    logger.info(f"First run cost info: {first_cost}")
+    assert len(counted_miner_calls) == 6
+    assert len(first_output["results"]) == 6
+
+    # One real change, one whitespace/comment-only change
+    (repo / "module_0.py").write_text(
+        "def handler_0():\n    return 100\n", encoding="utf-8"
+    )
+    (repo / "module_1.py").write_text(
+        "# reformatted\ndef handler_1():\n\n    return 1   # same\n", encoding="utf-8"
+    )
+
+    counted_miner_calls.clear()
+    second_output, second_cost = await run_miner()
+    logger.info(f"Second run cost info: {second_cost}")
+
+    assert counted_miner_calls == ["module_0.py"]
+    assert second_cost["files_cached"] == 5
+    assert len(second_output["results"]) == 6
+
+    counted_miner_calls.clear()
+    _, third_cost = await run_miner()
+    assert counted_miner_calls == []
+    assert third_cost["cached"] is True
+
+    await engine.dispose()
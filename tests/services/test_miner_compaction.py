@@ -0,0 +1,169 @@
+import ast
+
+import pytest
+
+from app.core.compaction import compact_source
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+from app.services.miner_pipeline import MinerPipeline
+
+logger = get_logger(__name__)
+
+LICENSE = (
+    "# Copyright (c) 2024 Example Corp.\n"
+    "#\n"
+    "# Licensed under the Apache License, Version 2.0 (the \"License\");\n"
+    "# you may not use this file except in compliance with the License.\n"
+)
+
+
+def python_module(functions: int = 3) -> str:
+    handlers = "".join(
+        f"\n\n@router.get('/items/{i}')\n"
+        f"async def handler_{i}(request, item_id: int) -> dict:\n"
+        f'    """\n    Returns item {i}.\n\n'
+        + "".join(f"    Detail line {j} about the handler.\n" for j in range(8))
+        + '    """\n'
+        + "".join(f"    step_{j} = compute(item_id, {j})\n" for j in range(12))
+        + "    return {'item': step_0}\n"
+        for i in range(functions)
+    )
+    table = "".join(f"    ('code_{i}', {i}, 'Label number {i}'),\n" for i in range(30))
+    return (
+        LICENSE
+        + "import os\nfrom app.core import router\n\n"
+        + f"CODES = [\n{table}]\n"
+        + f"BANNER = {'=' * 400!r}\n"
+        + handlers
+    )
+
+
+def script_module() -> str:
+    rows = "".join(f'  {{ code: "C{i}", label: "Label {i}" }},\n' for i in range(30))
+    return (
+        "/*\n * Copyright 2024 Example Corp.\n * SPDX-License-Identifier: MIT\n */\n"
+        'import { http } from "./http";\n\n'
+        f"export const CODES = [\n{rows}];\n\n"
+        "export class ItemService {\n"
+        "  constructor(private client: Http) {\n    this.cache = new Map();\n  }\n"
+        "  async load(id: string): Promise<Item[]> {\n"
+        "    const url = `/items/${id}?q=${encode(\"}\")}`;\n"
+        "    if (id) {\n      return [];\n    }\n"
+        "    return http.get(url);\n  }\n}\n"
+    )
+
+
+def test_python_compaction_keeps_structure_and_stays_valid():
+    Tokenizer.configure("ollama", "fake-model")
+    content = python_module()
+
+    compacted = compact_source(content, "app/api/items.py", max_tokens=100_000)
+    logger.info(f"Python: {compacted.original_tokens} -> {compacted.tokens} tokens")
+
+    ast.parse(compacted.text)
+    assert "Copyright" not in compacted.text
+    assert "('code_2', 2, 'Label number 2'),  # ... 27 more items" in compacted.text
+    assert "code_3" not in compacted.text
+    assert "'" + "=" * 80 + "...'" in compacted.text
+    # Docstrings keep their first paragraph; bodies are untouched
+    assert "Returns item 0." in compacted.text
+    assert "Detail line 0" not in compacted.text
+    assert "step_11 = compute(item_id, 11)" in compacted.text
+    assert not compacted.skeleton
+    assert compacted.tokens_saved > compacted.original_tokens // 2
+
+
+def test_oversized_python_becomes_a_skeleton_within_budget():
+    Tokenizer.configure("ollama", "fake-model")
+    content = python_module(functions=20)
+    full = compact_source(content, "items.py", max_tokens=100_000)
+
+    compacted = compact_source(content, "items.py", max_tokens=full.tokens // 2)
+    logger.info(
+        f"Skeleton: {compacted.tokens} tokens, {compacted.bodies_kept} bodies kept, "
+        f"{compacted.bodies_elided} elided"
+    )
+
+    ast.parse(compacted.text)
+    assert compacted.tokens <= full.tokens // 2
+    assert compacted.skeleton and compacted.bodies_kept > 0
+    # Every decorator and signature survives
+    for i in range(20):
+        assert f"@router.get('/items/{i}')\nasync def handler_{i}(" in compacted.text
+    assert "...  # 13 lines omitted" in compacted.text
+
+
+def test_python_offsets_ignore_splitlines_only_separators():
+    Tokenizer.configure("ollama", "fake-model")
+    # Form feed and U+2028 end lines for str.splitlines, but not for ast
+    content = (
+        "import os\n\x0c\n"
+        "NOTE = 'first\u2028second'\n"
+        "def f(x):\n"
+        f"    s = '{'a' * 600}'\n"
+        "    return s\n"
+    )
+
+    compacted = compact_source(content, "m.py", max_tokens=10_000)
+
+    ast.parse(compacted.text)
+    assert compacted.text == content.replace("a" * 600, "a" * 80 + "...")
+
+
+def test_script_compaction_uses_the_lexer():
+    Tokenizer.configure("ollama", "fake-model")
+    content = script_module()
+
+    compacted = compact_source(content, "web/items.ts", max_tokens=100_000)
+    assert "SPDX" not in compacted.text
+    assert compacted.text.startswith('import { http } from "./http";')
+    assert '  { code: "C2", label: "Label 2" },\n  // ... 27 more lines\n];' in compacted.text
+    assert "return http.get(url);" in compacted.text
+
+    skeleton = compact_source(content, "web/items.ts", max_tokens=compacted.tokens - 20)
+    logger.info(f"Script skeleton:\n{skeleton.text}")
+    # The smaller body fits the budget, the larger one is elided
+    assert "constructor(private client: Http) {\n    this.cache" in skeleton.text
+    assert "Promise<Item[]> { /* ... 5 lines omitted */ }" in skeleton.text
+    assert (skeleton.bodies_kept, skeleton.bodies_elided) == (1, 1)
+
+
+def test_other_files_are_left_alone():
+    content = "# Copyright notice\nkey: value\n"
+    compacted = compact_source(content, "config.yaml", max_tokens=10)
+    assert compacted.text is content and compacted.tokens_saved == 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_mines_compacted_input_and_reports_savings(
+    tmp_path, recording_miner
+):
+    Tokenizer.configure("ollama", "fake-model")
+    (tmp_path / "api").mkdir()
+    (tmp_path / "api" / "items.py").write_text(python_module(), encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("plain text " * 20, encoding="utf-8")
+
+    async def run(compaction):
+        miner = recording_miner()
+        pipeline = MinerPipeline(
+            repo_path=str(tmp_path),
+            miner=miner,
+            model_name="fake-model",
+            cached_files={},
+            input_cost_rate=0.0,
+            output_cost_rate=0.0,
+            max_cost_usd=1.0,
+            compaction=compaction,
+        )
+        return miner, await pipeline.run()
+
+    raw_miner, raw = await run(False)
+    miner, result = await run(True)
+    summary = result.compaction_summary()
+    logger.info(f"Compaction: {summary}")
+
+    assert "Copyright" in raw_miner.contents["api/items.py"]
+    assert "Copyright" not in miner.contents["api/items.py"]
+    assert summary["files_compacted"] == 1
+    assert list(summary["top_files"]) == ["api/items.py"]
+    assert summary["tokens_saved"] == raw.input_tokens - result.input_tokens > 0
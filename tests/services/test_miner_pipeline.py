@@ -0,0 +1,274 @@
+import asyncio
+
+import pytest
+
+import app.services.miner_pipeline as miner_pipeline_module
+from app.agents.miner.schema import MinerOutput
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+from app.agents.miner.schema import MinerBatchOutput
+from app.services.miner_pipeline import (
+    MinerPipeline,
+    SourceFile,
+    pack_first_fit_decreasing,
+)
+
+logger = get_logger(__name__)
+
+
+class SlowMiner:
+    """Stands in for MinerAgent; tracks how many file contents are in flight."""
+
+    def __init__(self, pipeline_state):
+        self.state = pipeline_state
+        self.calls = []
+
+    async def analyze_file(self, file_path, file_content):
+        self.calls.append((file_path, self.state["walked"]))
+        await asyncio.sleep(0.001)
+        self.state["in_memory"] -= 1
+        return MinerOutput(file=file_path, conclusions=[])
+
+
+@pytest.mark.asyncio
+async def test_pipeline_streams_with_bounded_memory(tmp_path, monkeypatch):
+    Tokenizer.configure("ollama", "fake-model")
+
+    total_files = 120
+    for i in range(total_files):
+        pkg = tmp_path / f"pkg_{i % 10}"
+        pkg.mkdir(exist_ok=True)
+        (pkg / f"file_{i}.py").write_text(f"VALUE = {i}\n", encoding="utf-8")
+
+    state = {"walked": 0, "in_memory": 0, "peak": 0}
+    original_walk = miner_pipeline_module.walk_source_files
+
+    def counting_walk(repo_path, skipped_stats):
+        for item in original_walk(repo_path, skipped_stats):
+            state["walked"] += 1
+            yield item
+
+    monkeypatch.setattr(miner_pipeline_module, "walk_source_files", counting_walk)
+
+    original_reserve = MinerPipeline._reserve_budget
+
+    def tracking_reserve(self, tokens):
+        state["in_memory"] += 1
+        state["peak"] = max(state["peak"], state["in_memory"])
+        return original_reserve(self, tokens)
+
+    monkeypatch.setattr(MinerPipeline, "_reserve_budget", tracking_reserve)
+
+    miner = SlowMiner(state)
+    pipeline = MinerPipeline(
+        repo_path=str(tmp_path),
+        miner=miner,
+        model_name="fake-model",
+        cached_files={},
+        input_cost_rate=0.0,
+        output_cost_rate=0.0,
+        max_cost_usd=1.0,
+        reader_count=2,
+        worker_count=3,
+        queue_size=4,
+        schedule_window=4,
+    )
+    result = await pipeline.run()
+
+    logger.info(
+        f"Mined {result.files_mined} files, first call after "
+        f"{miner.calls[0][1]} walked paths, peak in-memory files {state['peak']}"
+    )
+
+    assert result.files_mined == total_files
+    assert len(result.ordered_results()) == total_files
+    # Mining began long before the walk finished
+    assert miner.calls[0][1] < total_files
+    # Work queue + in-flight workers + a reader about to enqueue
+    assert state["peak"] <= 4 + 3 + 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_aborts_when_budget_exceeded(tmp_path, monkeypatch):
+    Tokenizer.configure("ollama", "fake-model")
+
+    for i in range(20):
+        # Distinct contents: identical files would be mined once and shared
+        (tmp_path / f"file_{i}.py").write_text(f"x = {i}\n" * 200, encoding="utf-8")
+
+    pipeline = MinerPipeline(
+        repo_path=str(tmp_path),
+        miner=SlowMiner({"walked": 0, "in_memory": 0}),
+        model_name="fake-model",
+        cached_files={},
+        input_cost_rate=1000.0,
+        output_cost_rate=0.0,
+        max_cost_usd=1.0,
+    )
+    result = await pipeline.run()
+
+    logger.info(f"Abort reason: {result.aborted}")
+    assert result.aborted is not None
+    assert "SAFETY LIMIT" in result.aborted
+    assert result.files_mined < 20
+
+
+class BatchingMiner:
+    """Answers batches but silently drops one file to exercise the retry path."""
+
+    def __init__(self, dropped_path):
+        self.dropped_path = dropped_path
+        self.batch_sizes = []
+        self.single_calls = []
+
+    async def analyze_file(self, file_path, file_content, part=None):
+        self.single_calls.append(file_path)
+        return MinerOutput(file=file_path, conclusions=[])
+
+    async def analyze_batch(self, files):
+        self.batch_sizes.append(len(files))
+        return MinerBatchOutput(
+            results=[
+                MinerOutput(file=f"./{path}", conclusions=[])
+                for path, _ in files
+                if path != self.dropped_path
+            ]
+        )
+
+
+def test_first_fit_decreasing_respects_budget():
+    sizes = [70, 10, 50, 30, 20, 60, 40, 5]
+    files = [SourceFile(f"f{i}.py", "", "", tokens) for i, tokens in enumerate(sizes)]
+
+    batches = pack_first_fit_decreasing(files, token_budget=100 + 2 * 20)
+
+    logger.info(f"Packed batches: {[[f.tokens for f in b] for b in batches]}")
+    assert sorted(f.path for b in batches for f in b) == sorted(f.path for f in files)
+    for batch in batches:
+        assert sum(f.tokens + 20 for f in batch) <= 140
+    # Lower bound is ceil(285 / 140) = 3 batches; FFD should not waste more
+    assert len(batches) <= 4
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_small_files_and_retries_missing(tmp_path, monkeypatch):
+    Tokenizer.configure("ollama", "fake-model")
+
+    for i in range(30):
+        (tmp_path / f"small_{i}.py").write_text(f"VALUE_{i} = {i}\n", encoding="utf-8")
+    (tmp_path / "large.py").write_text("x = 1\n" * 3000, encoding="utf-8")
+
+    miner = BatchingMiner(dropped_path="small_7.py")
+    pipeline = MinerPipeline(
+        repo_path=str(tmp_path),
+        miner=miner,
+        model_name="fake-model",
+        cached_files={},
+        input_cost_rate=0.0,
+        output_cost_rate=0.0,
+        max_cost_usd=1.0,
+        batch_token_budget=200,
+    )
+    result = await pipeline.run()
+
+    logger.info(
+        f"Batches: {miner.batch_sizes}, single calls: {miner.single_calls}, "
+        f"requests: {result.llm_requests}"
+    )
+    assert result.files_mined == 31
+    assert set(result.results) == {f"small_{i}.py" for i in range(30)} | {"large.py"}
+    # large.py exceeds MINER_MAX_TOKENS_PER_FILE and is mined in chunks
+    assert set(miner.single_calls) == {"large.py", "small_7.py"}
+    assert miner.single_calls.count("small_7.py") == 1
+    assert result.files_chunked == 1
+    assert result.batch_retries == 1
+    assert result.llm_requests - result.chunks_mined < 31 / 3
+
+
+@pytest.mark.asyncio
+async def test_pipeline_schedules_largest_files_first(tmp_path, recording_miner):
+    Tokenizer.configure("ollama", "fake-model")
+
+    sizes = {"tiny.py": 1, "huge.py": 400, "medium.py": 50, "large.py": 200}
+    for name, lines in sizes.items():
+        (tmp_path / name).write_text("x = 1\n" * lines, encoding="utf-8")
+
+    miner = recording_miner()
+    pipeline = MinerPipeline(
+        repo_path=str(tmp_path),
+        miner=miner,
+        model_name="fake-model",
+        cached_files={},
+        input_cost_rate=0.0,
+        output_cost_rate=0.0,
+        max_cost_usd=1.0,
+        reader_count=1,
+        worker_count=1,
+    )
+    result = await pipeline.run()
+
+    logger.info(f"Call order: {miner.calls}")
+    assert miner.calls == ["huge.py", "large.py", "medium.py", "tiny.py"]
+    assert set(result.latencies) == set(sizes)
+    assert result.latency_summary()["p99_s"] >= result.latency_summary()["p50_s"]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_retries_timed_out_call_on_fallback(tmp_path, recording_miner):
+    Tokenizer.configure("ollama", "fake-model")
+
+    (tmp_path / "slow.py").write_text("SLOW = 1\n", encoding="utf-8")
+    (tmp_path / "fast.py").write_text("FAST = 1\n", encoding="utf-8")
+
+    primary = recording_miner(hang_on="slow.py")
+    fallback = recording_miner()
+    pipeline = MinerPipeline(
+        repo_path=str(tmp_path),
+        miner=primary,
+        model_name="fake-model",
+        cached_files={},
+        input_cost_rate=0.0,
+        output_cost_rate=0.0,
+        max_cost_usd=1.0,
+        fallback_miner=fallback,
+        call_timeout_seconds=0.05,
+    )
+    result = await pipeline.run()
+
+    logger.info(
+        f"Timeouts: {result.timeouts}, fallback calls: {fallback.calls}, "
+        f"latency: {result.latency_summary()}"
+    )
+    assert result.files_mined == 2
+    assert result.timeouts == 1
+    assert result.deadline_retries == 1
+    assert fallback.calls == ["slow.py"]
+    assert result.latency_summary()["slowest_file"] == "slow.py"
+
+
+@pytest.mark.asyncio
+async def test_deadline_ignores_time_queued_behind_the_rate_limiter(
+    tmp_path, recording_miner
+):
+    Tokenizer.configure("ollama", "fake-model")
+    for i in range(6):
+        (tmp_path / f"module_{i}.py").write_text(f"X = {i}\n", encoding="utf-8")
+
+    # One slot: the last call queues ~5 x 0.03s, well past the 0.1s deadline
+    miner = recording_miner(latency=0.03, slots=1)
+    pipeline = MinerPipeline(
+        repo_path=str(tmp_path),
+        miner=miner,
+        model_name="fake-model",
+        cached_files={},
+        input_cost_rate=0.0,
+        output_cost_rate=0.0,
+        max_cost_usd=1.0,
+        call_timeout_seconds=0.1,
+    )
+    result = await pipeline.run()
+
+    logger.info(f"Latency with one slot: {result.latency_summary()}")
+    assert result.latency_summary()["p99_s"] > 0.1
+    assert result.timeouts == 0
+    assert result.files_mined == 6
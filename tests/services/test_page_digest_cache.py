@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from app.agents.architect.schema import WikiPageDetail
+from app.agents.scribe.agent import ScribeAgent
+from app.core.fact_index import FactIndex
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+from app.services.documentation_service import DocumentationService
+
+logger = get_logger(__name__)
+
+
+def miner_output(db_statement="Declares the order table"):
+    return {
+        "results": [
+            {
+                "file": "api/routes.py",
+                "conclusions": [{"topic": "Routing", "statement": "Serves checkout endpoints"}],
+            },
+            {
+                "file": "db/models.py",
+                "conclusions": [{"topic": "Schema", "statement": db_statement}],
+            },
+        ]
+    }
+
+
+NAVIGATION = {
+    "tree": [
+        {"id": "api", "label": "API", "type": "page"},
+        {"id": "db", "label": "Database", "type": "page"},
+    ]
+}
+
+
+@pytest.fixture
+def written(monkeypatch):
+    pages = []
+
+    async def fake_write_page(self, page_id, page_type, page_title, target_modules, miner_output):
+        pages.append(page_id)
+        return WikiPageDetail(
+            id=page_id, title=page_title, description="d", content_markdown="# Page"
+        )
+
+    monkeypatch.setattr(ScribeAgent, "write_page", fake_write_page)
+    return pages
+
+
+async def run_scribe(output_path, navigation, output):
+    _, cost = await DocumentationService()._run_scribe_phase(
+        project_id="digest",
+        output_path=output_path,
+        client=None,
+        event_handler=None,
+        navigation=navigation,
+        miner_output=output,
+        fact_index=FactIndex.from_miner_output(output),
+    )
+    logger.info(f"Scribe cost info: {cost}")
+    return cost
+
+
+@pytest.mark.asyncio
+async def test_only_pages_with_changed_inputs_are_rewritten(tmp_path, written):
+    Tokenizer.configure("ollama", "fake-model")
+    output_path = tmp_path / "out"
+    output_path.mkdir()
+
+    await run_scribe(output_path, NAVIGATION, miner_output())
+    assert written == ["api", "db"]
+    page = json.loads((output_path / "pages" / "api.json").read_text())
+    assert len(page["input_digest"]) == 64
+
+    # Same inputs: everything is fresh
+    written.clear()
+    cost = await run_scribe(output_path, NAVIGATION, miner_output())
+    assert written == []
+    assert cost["pages_fresh"] == 2
+    assert cost["pages_stale"] == 0
+
+    # A navigation change only writes the new page
+    written.clear()
+    navigation = {"tree": NAVIGATION["tree"] + [{"id": "ops", "label": "Ops", "type": "page"}]}
+    cost = await run_scribe(output_path, navigation, miner_output())
+    assert written == ["ops"]
+    assert cost["pages_fresh"] == 2
+
+    # Changed facts of one module only make its page stale
+    written.clear()
+    cost = await run_scribe(output_path, navigation, miner_output("Declares the invoice table"))
+    assert written == ["db"]
+    assert cost["pages_stale"] == 1
+    assert cost["pages_fresh"] == 2
+
+
+@pytest.mark.asyncio
+async def test_digest_covers_model_and_unstamped_pages_are_kept(tmp_path, written):
+    Tokenizer.configure("ollama", "fake-model")
+    output = miner_output()
+    scribe = ScribeAgent(client=None, fact_index=FactIndex.from_miner_output(output))
+    first = await scribe.prepare_page("api", "page", "API", ["api"], output)
+    first_again = await scribe.prepare_page("api", "page", "API", ["api"], output)
+    other_model = await scribe.prepare_page("api", "page", "API", ["api"], output)
+    other_model.model = "another-model"
+
+    assert first.digest == first_again.digest
+    assert first.digest != other_model.digest
+
+    # Pages written before digests are reused as they are
+    pages_dir = tmp_path / "out" / "pages"
+    pages_dir.mkdir(parents=True)
+    (pages_dir / "api.json").write_text("{}")
+    (pages_dir / "db.json").write_text("not json")
+
+    cost = await run_scribe(tmp_path / "out", NAVIGATION, output)
+    assert written == ["db"]
+    assert cost["pages_cached"] == 1
+    assert cost["pages_stale"] == 1
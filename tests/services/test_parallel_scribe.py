@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import pytest
+
+from app.agents.architect.schema import WikiPageDetail
+from app.agents.scribe.agent import ScribeAgent
+from app.core.logger import get_logger
+from app.services.documentation_service import DocumentationService
+
+logger = get_logger(__name__)
+
+
+@pytest.mark.asyncio
+async def test_scribe_pages_are_written_in_parallel_with_ordered_progress(
+    tmp_path, monkeypatch
+):
+    page_count = 12
+    state = {"in_flight": 0, "peak": 0}
+
+    async def fake_write_page(
+        self, page_id, page_type, page_title, target_modules, miner_output
+    ):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        # Earlier pages are slower, so completions arrive out of order
+        index = int(page_id.split("-")[1])
+        await asyncio.sleep(0.002 * (page_count - index))
+        state["in_flight"] -= 1
+        if page_id == "page-3":
+            raise RuntimeError("LLM failure")
+        return WikiPageDetail(
+            id=page_id, title=page_title, description="d", content_markdown="# Page"
+        )
+
+    progress = []
+
+    async def record_progress(self, project_id, current, total, label, message):
+        progress.append((current, message))
+
+    monkeypatch.setattr(ScribeAgent, "write_page", fake_write_page)
+    monkeypatch.setattr(DocumentationService, "_broadcast_progress", record_progress)
+
+    output_path = tmp_path / "out"
+    (output_path / "pages").mkdir(parents=True)
+    (output_path / "pages" / "page-0.json").write_text("{}")
+    navigation = {
+        "tree": [
+            {"id": f"page-{i}", "label": f"Page {i}", "type": "page"}
+            for i in range(page_count)
+        ]
+    }
+
+    generated, cost = await DocumentationService()._run_scribe_phase(
+        project_id="parallel",
+        output_path=output_path,
+        client=None,
+        event_handler=None,
+        navigation=navigation,
+        miner_output={"results": []},
+    )
+
+    logger.info(f"Peak concurrent pages: {state['peak']}, progress: {progress}")
+    assert state["peak"] > 1
+    assert generated == page_count - 1
+    assert cost["pages_cached"] == 1
+    assert cost["pages_written"] == page_count - 2
+    assert [current for current, _ in progress] == list(range(1, page_count + 1))
+    assert progress[0][1] == "Cached: Page 0"
+    assert progress[3][1] == "Failed: Page 3"
+    assert progress[4][1] == "Written: Page 4"
+
+    written = sorted(p.name for p in (output_path / "pages").iterdir())
+    assert ".page-3.json.tmp" not in written
+    assert not any(name.endswith(".tmp") for name in written)
+    assert "page-3.json" not in written
+    page = json.loads((output_path / "pages" / "page-5.json").read_text())
+    assert page["id"] == "page-5"
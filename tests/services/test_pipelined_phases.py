@@ -0,0 +1,189 @@
+import asyncio
+
+import pytest
+
+from app.agents.architect.heuristic import HeuristicPlanner
+from app.agents.architect.schema import WikiPageDetail
+from app.core.fact_index import FactIndex
+from app.agents.scribe.agent import ScribeAgent
+from app.core.logger import get_logger
+from app.core.tokenizer import Tokenizer
+from app.services.documentation_service import DocumentationService
+from app.services.mining_tracker import MiningTracker
+
+logger = get_logger(__name__)
+
+
+def result(path):
+    return {"file": path, "conclusions": [{"topic": "Role", "statement": f"Defines {path}"}]}
+
+
+def test_sample_needs_walk_fraction_and_every_top_level_directory():
+    tracker = MiningTracker()
+    paths = [f"api/r{i}.py" for i in range(8)] + ["db/models.py", "main.py"]
+    for path in paths:
+        tracker.discovered(path)
+
+    for path in paths[:4]:
+        tracker.completed(path, result(path))
+    # The walk is not over yet
+    assert not tracker.sample_ready(0.3, 2)
+
+    tracker.walk_complete()
+    # Enough files, but db/ and the root files are not represented
+    assert not tracker.sample_ready(0.3, 2)
+
+    tracker.completed("db/models.py", result("db/models.py"))
+    tracker.completed("main.py", result("main.py"))
+    assert tracker.sample_ready(0.3, 2)
+    assert not tracker.sample_ready(0.3, 8)
+
+    snapshot = tracker.snapshot_output()["results"]
+    assert [r["file"] for r in snapshot] == paths
+    assert snapshot[5] == {"file": "api/r5.py", "conclusions": []}
+
+
+def test_heuristic_sample_covers_every_module_of_small_layouts():
+    tracker = MiningTracker()
+    paths = [f"api/r{i}.py" for i in range(6)] + ["api/v2/routes.py", "db/models.py"]
+    for path in paths:
+        tracker.discovered(path)
+    tracker.walk_complete()
+    for path in ("api/r0.py", "api/r1.py", "db/models.py"):
+        tracker.completed(path, result(path))
+
+    # Every top-level directory is covered, but not the api/v2 module
+    assert tracker.sample_ready(0.3, 2)
+    assert not tracker.sample_ready(0.3, 2, module_coverage_limit=17)
+    # Layouts too large for the heuristic planner keep the directory rule
+    assert tracker.sample_ready(0.3, 2, module_coverage_limit=2)
+
+    tracker.completed("api/v2/routes.py", result("api/v2/routes.py"))
+    assert tracker.sample_ready(0.3, 2, module_coverage_limit=17)
+
+    # The plan sees every walked module, mined or not
+    plan = HeuristicPlanner(FactIndex.from_miner_output(tracker.snapshot_output())).plan()
+    categories = {node.id: node for node in plan.navigation.tree}
+    assert [c.id for c in categories["api"].children] == ["api-overview", "api-v2"]
+    assert plan.signals["modules"] == 3
+
+
+@pytest.mark.asyncio
+async def test_pages_start_when_their_modules_are_mined(tmp_path, monkeypatch):
+    Tokenizer.configure("ollama", "fake-model")
+    written = []
+
+    async def fake_write_page(self, page_id, page_type, page_title, target_modules, miner_output):
+        prompt = self._prepared[page_id].user_message
+        written.append((page_id, [f for f in ("api/routes.py", "db/models.py") if f in prompt]))
+        return WikiPageDetail(
+            id=page_id, title=page_title, description="d", content_markdown="# Page"
+        )
+
+    monkeypatch.setattr(ScribeAgent, "write_page", fake_write_page)
+
+    tracker = MiningTracker()
+    for path in ("api/routes.py", "db/models.py"):
+        tracker.discovered(path)
+    tracker.walk_complete()
+    tracker.completed("api/routes.py", result("api/routes.py"))
+
+    navigation = {
+        "tree": [
+            {"id": "api", "label": "API", "type": "page"},
+            {"id": "db", "label": "Database", "type": "page"},
+        ]
+    }
+    scribe = asyncio.create_task(
+        DocumentationService()._run_scribe_phase(
+            project_id="pipelined",
+            output_path=tmp_path,
+            client=None,
+            event_handler=None,
+            navigation=navigation,
+            miner_output=tracker.snapshot_output(),
+            tracker=tracker,
+        )
+    )
+
+    # db/ is still being mined: only the API page can be written
+    # (fact selection runs on the tokenizer pool, so give it real time)
+    for _ in range(100):
+        if written:
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    assert [page_id for page_id, _ in written] == ["api"]
+
+    tracker.completed("db/models.py", result("db/models.py"))
+    tracker.finish()
+    pages, cost = await scribe
+    logger.info(f"Scribe cost info: {cost}")
+
+    assert pages == 2
+    # Each page only sees the facts of its own modules
+    assert written == [("api", ["api/routes.py"]), ("db", ["db/models.py"])]
+
+
+@pytest.mark.asyncio
+async def test_pipelined_pages_are_fresh_in_a_sequential_run(tmp_path, monkeypatch):
+    Tokenizer.configure("ollama", "fake-model")
+    written = []
+
+    async def fake_write_page(self, page_id, page_type, page_title, target_modules, miner_output):
+        written.append(page_id)
+        return WikiPageDetail(
+            id=page_id, title=page_title, description="d", content_markdown="# Page"
+        )
+
+    monkeypatch.setattr(ScribeAgent, "write_page", fake_write_page)
+
+    paths = ("api/routes.py", "api/checkout.py", "db/models.py", "main.py")
+    results = {path: result(path) for path in paths}
+    # Relevant to the API page: a sequential run ranks it into that page
+    results["db/models.py"]["conclusions"].append(
+        {"topic": "Api", "statement": "Stores the orders the api serves"}
+    )
+    tracker = MiningTracker()
+    for path in paths:
+        tracker.discovered(path)
+    tracker.walk_complete()
+    # Mined out of order: the tracker's module order differs from the walk
+    for path in reversed(paths):
+        tracker.completed(path, results[path])
+    tracker.finish()
+
+    navigation = {
+        "tree": [
+            {"id": "api", "label": "API", "type": "page"},
+            {"id": "db", "label": "Database", "type": "page"},
+            {"id": "overview", "label": "Overview", "type": "page"},
+        ]
+    }
+    service = DocumentationService()
+    await service._run_scribe_phase(
+        project_id="pipelined",
+        output_path=tmp_path,
+        client=None,
+        event_handler=None,
+        navigation=navigation,
+        miner_output=tracker.snapshot_output(),
+        tracker=tracker,
+    )
+    assert written == ["api", "db", "overview"]
+
+    written.clear()
+    output = {"results": [results[path] for path in paths]}
+    _, cost = await service._run_scribe_phase(
+        project_id="sequential",
+        output_path=tmp_path,
+        client=None,
+        event_handler=None,
+        navigation=navigation,
+        miner_output=output,
+        fact_index=FactIndex.from_miner_output(output),
+    )
+    logger.info(f"Scribe cost info: {cost}")
+
+    assert written == []
+    assert cost["pages_fresh"] == 3